@@ -0,0 +1,90 @@
+"""
+Fused headroom estimate with:
+- A scalar Kalman filter on net export, fed by the grid meter and PV - consumption - battery
+- Reading variance that grows with age, so a lagging meter counts for less
+- Step detection that re-opens the filter on a real load step
+- Uncertainty from the filter variance and the spread between sources
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Iterable, Optional, Tuple
+
+# Measurement: (value W, sigma W, age of the reading in seconds)
+Measurement = Tuple[float, float, float]
+
+
+class HeadroomEstimator:
+    """
+    One estimator per Main device.
+
+      x, P     : estimate (W) and its variance (W^2)
+      q        : process variance per second (W^2/s); how fast true headroom can wander
+      gate     : innovations beyond gate * sigma are treated as steps (P re-opened)
+      max_age  : cap on the age penalty; a meter whose value simply has not changed is
+                 still a valid reading (staleness is the freshness watchdog's job)
+
+    update() predicts to `now`, then folds in each measurement, oldest first. A reading's
+    variance is sigma^2 plus the drift the process could have made since it was taken
+    (q * age). Disagreement between sources does not move the estimate; it widens
+    `uncertainty` (and so the scheduler's start margin).
+    """
+
+    __slots__ = ("q", "gate", "max_age", "x", "P", "ts", "spread")
+
+    def __init__(self, process_w_per_sqrt_s: float = 40.0, gate: float = 3.0, max_age: float = 120.0):
+        self.q = float(process_w_per_sqrt_s) ** 2
+        self.gate = float(gate)
+        self.max_age = float(max_age)
+        self.x: Optional[float] = None
+        self.P = 0.0
+        self.ts: Optional[float] = None
+        self.spread = 0.0                        # max - min of the current readings (W)
+
+    def reset(self) -> None:
+        self.x, self.P, self.ts, self.spread = None, 0.0, None, 0.0
+
+    def update(self, now: float, measurements: Iterable[Measurement]) -> Optional[float]:
+        if self.x is not None and self.ts is not None and now > self.ts:
+            self.P += self.q * (now - self.ts)
+        self.ts = now
+
+        # Oldest reading first, so when sources disagree the freshest one has the last word
+        # (equal ages: the lower reading goes last, erring towards less headroom)
+        readings = sorted(((min(max(0.0, age), self.max_age), float(z), float(sigma))
+                           for z, sigma, age in measurements if z is not None and math.isfinite(z)),
+                          reverse=True)
+        values = [z for _a, z, _s in readings]
+        self.spread = (max(values) - min(values)) if len(values) > 1 else 0.0
+
+        for age, z, sigma in readings:
+            # An old reading says less about *now*: add the drift since it was taken
+            r = sigma * sigma + self.q * age
+            if self.x is None:
+                self.x, self.P = z, r
+                continue
+            innov = z - self.x
+            if innov * innov > self.gate * self.gate * (self.P + r):
+                # Step change (load switched): follow it at once instead of averaging it away
+                self.P = max(self.P, innov * innov)
+            k = self.P / (self.P + r)
+            self.x += k * innov
+            self.P *= (1.0 - k)
+        return self.x
+
+    @property
+    def sigma(self) -> float:
+        return math.sqrt(self.P) if self.P > 0 else 0.0
+
+    @property
+    def uncertainty(self) -> float:
+        """Filter sigma combined with half the disagreement between sources (W)."""
+        return math.sqrt(self.P + (self.spread / 2.0) ** 2)
+
+    def confidence(self, ref_w: float = 250.0) -> int:
+        """0-100 %; 50 % when the uncertainty equals ref_w."""
+        if self.x is None:
+            return 0
+        u = self.uncertainty
+        return int(round(100.0 * ref_w * ref_w / (ref_w * ref_w + u * u)))
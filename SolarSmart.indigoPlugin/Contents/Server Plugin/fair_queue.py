@@ -0,0 +1,148 @@
+"""
+Fair share of start slots within a tier with:
+- Virtual tags: a minute of running advances a load by rated kW / quota target minutes
+- Loads that become eligible join at the tier's virtual time (lowest eligible tag)
+- Candidates ordered by tag, and the lead set of loads due their share
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Hashable, Iterable, List, Optional
+
+DEFAULT_WEIGHT_MINS = 60.0      # weight of a load without a quota target
+
+
+def cost_per_min(rated_w: float, target_mins: float) -> float:
+    """Tag advance per minute of running: rated kW over the quota target (the load's weight)."""
+    weight = float(target_mins) if target_mins and target_mins > 0 else DEFAULT_WEIGHT_MINS
+    return max(1.0, float(rated_w or 0)) / 1000.0 / weight
+
+
+class _Flow:
+    __slots__ = ("tier", "cost", "tag", "eligible")
+
+    def __init__(self, tier: int, cost: float, tag: float):
+        self.tier = tier
+        self.cost = cost
+        self.tag = tag
+        self.eligible = False
+
+
+class FairQueue:
+    """Virtual tags of the loads of every tier, and each tier's virtual time."""
+
+    def __init__(self):
+        self._flows: Dict[Hashable, _Flow] = {}
+        self._members: Dict[int, set] = {}      # tier -> eligible keys
+        self._vtime: Dict[int, float] = {}      # tier -> last known virtual time
+        self._stale: set = set()                # tiers whose virtual time must be worked out again
+
+    def __len__(self) -> int:
+        return len(self._flows)
+
+    def __contains__(self, key) -> bool:
+        return key in self._flows
+
+    # ----- membership -----
+    def update(self, key: Hashable, tier: int, cost: float, eligible: bool, served_mins: float = 0.0) -> None:
+        """
+        Register / refresh a load. A load seen for the first time starts at served_mins x cost
+        (a restart keeps the order of the quota slot); a known load turning eligible joins at
+        the tier's virtual time.
+        """
+        flow = self._flows.get(key)
+        if flow is None:
+            flow = self._flows[key] = _Flow(tier, cost, max(0.0, float(served_mins)) * cost)
+            if eligible:
+                self._join(key, flow)
+            return
+        flow.cost = cost
+        if flow.tier != tier:
+            self._leave(key, flow)
+            flow.tier = tier
+        if eligible and not flow.eligible:
+            flow.tag = max(flow.tag, self.vtime(tier))
+            self._join(key, flow)
+        elif not eligible and flow.eligible:
+            self._leave(key, flow)
+
+    def remove(self, key: Hashable) -> None:
+        flow = self._flows.pop(key, None)
+        if flow is not None:
+            self._leave(key, flow)
+
+    def reset(self, key: Hashable) -> None:
+        """New quota slot: re-join at the virtual time of the other eligible loads."""
+        flow = self._flows.get(key)
+        if flow is None:
+            return
+        eligible = flow.eligible
+        self._leave(key, flow)
+        flow.tag = self.vtime(flow.tier)
+        if eligible:
+            self._join(key, flow)
+
+    def charge(self, key: Hashable, minutes: float) -> None:
+        """A running load was served this many minutes."""
+        flow = self._flows.get(key)
+        if flow is not None and minutes > 0:
+            flow.tag += minutes * flow.cost
+            if flow.eligible:
+                self._stale.add(flow.tier)
+
+    # ----- reads -----
+    def tag(self, key: Hashable) -> Optional[float]:
+        flow = self._flows.get(key)
+        return flow.tag if flow is not None else None
+
+    def vtime(self, tier: int) -> float:
+        """Lowest tag among the tier's eligible loads (the last one seen if none is eligible)."""
+        if tier in self._stale:
+            self._stale.discard(tier)
+            members = self._members.get(tier)
+            if members:
+                flows = self._flows
+                low = min(flows[k].tag for k in members)
+                self._vtime[tier] = max(self._vtime.get(tier, 0.0), low)
+        return self._vtime.get(tier, 0.0)
+
+    def lag_mins(self, key: Hashable) -> float:
+        """Minutes of running this load is ahead of the least-served eligible load of its tier."""
+        flow = self._flows.get(key)
+        if flow is None:
+            return 0.0
+        return max(0.0, flow.tag - self.vtime(flow.tier)) / flow.cost
+
+    def lead(self, keys: Iterable[Hashable], max_lag_mins: float) -> set:
+        """The keys at most max_lag_mins of running ahead of their tier's least-served eligible load."""
+        flows, vtimes, out = self._flows, {}, set()
+        for k in keys:
+            flow = flows.get(k)
+            if flow is None:
+                continue
+            vt = vtimes.get(flow.tier)
+            if vt is None:
+                vt = vtimes[flow.tier] = self.vtime(flow.tier)
+            if flow.tag - vt <= max_lag_mins * flow.cost:
+                out.add(k)
+        return out
+
+    def order(self, keys: Iterable[Hashable]) -> List[Hashable]:
+        """keys in fair order: least served (lowest tag) first, unknown keys last."""
+        flows = self._flows
+        return sorted(keys, key=lambda k: flows[k].tag if k in flows else math.inf)
+
+    # ----- eligible sets -----
+    def _join(self, key: Hashable, flow: _Flow) -> None:
+        flow.eligible = True
+        members = self._members.setdefault(flow.tier, set())
+        if not members:
+            self._stale.add(flow.tier)      # first eligible load: the virtual time moves to its tag
+        members.add(key)
+
+    def _leave(self, key: Hashable, flow: _Flow) -> None:
+        if flow.eligible:
+            flow.eligible = False
+            self._members.get(flow.tier, set()).discard(key)
+            self._stale.add(flow.tier)
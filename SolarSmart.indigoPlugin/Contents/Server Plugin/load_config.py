@@ -0,0 +1,236 @@
+"""
+Pre-parsed Load settings with:
+- LoadConfig: an immutable view of a Load's pluginProps, rebuilt only when they change
+- Start / keep thresholds, windows, quota and catch-up settings
+- Optional power meter, setpoint control, extra stages and phase
+- Run and catch-up windows as minute-of-week bitmaps
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, time as dtime, timedelta
+from typing import Any, Mapping, Optional
+
+from phases import phase_of
+from setpoint import SetpointConfig
+from stages import stages_from_props
+from source_adapters import parse_source_list
+
+WINDOW_KEYS = ("12h", "24h", "2d", "3d")
+DOW_KEYS = ("dowMon", "dowTue", "dowWed", "dowThu", "dowFri", "dowSat", "dowSun")
+
+DAY_MINS = 24 * 60
+WEEK_MINS = 7 * DAY_MINS
+_DAY_ALL = (1 << DAY_MINS) - 1
+_WEEK_ALL = (1 << WEEK_MINS) - 1
+
+
+def _num(v: Any, default: float) -> float:
+    try:
+        return float(str(v).replace(",", "").strip())
+    except Exception:
+        return default
+
+
+def _count(v: Any, default: int = 0) -> int:
+    """Integer prop; blank / invalid -> default (like the old `int(props.get(k) or 0)`)."""
+    return int(_num(v, default)) if v not in (None, "") else default
+
+
+def _hhmm_minutes(s: Any) -> Optional[int]:
+    try:
+        hh, mm = str(s).strip().split(":", 1)
+        return int(hh) * 60 + int(mm)
+    except Exception:
+        return None
+
+
+def _hhmm_time(s: Any) -> dtime:
+    try:
+        hh, mm = str(s or "").strip().split(":")
+        return dtime(hour=int(hh), minute=int(mm))
+    except Exception:
+        return dtime(0, 0)          # safe default for bad input
+
+
+def _span(lo: int, hi: int) -> int:
+    """Bits lo..hi (inclusive) of one day."""
+    return ((1 << (hi + 1)) - 1) ^ ((1 << lo) - 1) if lo <= hi else 0
+
+
+def day_bits(start_min: Optional[int], end_min: Optional[int], inclusive_end: bool) -> int:
+    """
+    Minute-of-day bitmap of a daily window; start > end crosses midnight.
+    inclusive_end: run windows include their end minute, catch-up windows do not
+    (and start == end then means all day). None for either end = all day.
+    """
+    if start_min is None or end_min is None:
+        return _DAY_ALL
+    s, e = start_min % DAY_MINS, end_min % DAY_MINS
+    if not inclusive_end:
+        if s == e:
+            return _DAY_ALL
+        e = (e - 1) % DAY_MINS
+    if s <= e:
+        return _span(s, e)
+    return _span(s, DAY_MINS - 1) | _span(0, e)
+
+
+def week_bits(day: int, dow_mask: int = 0x7F) -> int:
+    """Repeat a minute-of-day bitmap on every weekday set in dow_mask (bit 0 = Monday)."""
+    week = 0
+    for i in range(7):
+        if dow_mask >> i & 1:
+            week |= day << (i * DAY_MINS)
+    return week
+
+
+def minute_of_week(now_dt: datetime) -> int:
+    return now_dt.weekday() * DAY_MINS + now_dt.hour * 60 + now_dt.minute
+
+
+def next_flip(bits: int, now_dt: datetime) -> Optional[datetime]:
+    """
+    Start of the next minute whose bit differs from the current one (window opens if
+    it is closed now, closes if it is open), or None if the bitmap never changes.
+    """
+    if bits == 0 or bits == _WEEK_ALL:
+        return None
+    m = minute_of_week(now_dt)
+    # Rotate so bit 0 is the current minute, then look for the first differing bit
+    rot = ((bits >> m) | (bits << (WEEK_MINS - m))) & _WEEK_ALL
+    want = ~rot & _WEEK_ALL if rot & 1 else rot
+    ahead = (want & -want).bit_length() - 1
+    return now_dt.replace(second=0, microsecond=0) + timedelta(minutes=ahead)
+
+
+def window_key(raw: Any, default: str = "24h") -> str:
+    """Canonical quota / catch-up window period ("1d" is "24h"); unknown -> default."""
+    key = (str(raw or "")).lower().strip()
+    if key == "1d":
+        key = "24h"
+    return key if key in WINDOW_KEYS else default
+
+
+class LoadConfig:
+    """
+    Parsed settings of one SolarSmart Load. Immutable: rebuild from the props instead.
+
+    `source` keeps the props it was built from, so a device update only triggers a
+    rebuild when something actually changed.
+    """
+
+    __slots__ = (
+        "source",
+        "tier", "rated_w", "surge_mult", "start_margin", "keep_margin",
+        "needed_w", "reserve_w", "keep_w", "shed_hysteresis_w", "sustain_secs",
+        "min_runtime_mins", "max_runtime_mins", "cooldown_mins",
+        "quota_window", "quota_target_mins",
+        "window_start_min", "window_end_min", "dow_mask",
+        "enable_catchup", "catchup_target_mins", "catchup_window",
+        "catchup_start", "catchup_end",
+        "run_week", "catchup_week",
+        "invert_on_off", "control_mode", "control_device_id",
+        "power_source", "power_inrush_secs", "setpoint",
+        "stages", "stage_min_run_mins", "stage_cooldown_mins", "phase",
+    )
+
+    def __init__(self, props: Mapping[str, Any]):
+        props = dict(props or {})
+        s = object.__setattr__
+        s(self, "source", props)
+
+        tier = _count(props.get("tier"), 2)
+        s(self, "tier", tier if tier else 2)
+        rated = int(_num(props.get("ratedWatts"), 0) or 0)
+        surge = _num(props.get("surgeMultiplier") or 1.2, 1.2) or 1.2
+        start_margin = _num(props.get("startMarginPct") or 20.0, 20.0) / 100.0
+        keep_margin = _num(props.get("keepMarginPct") or 5.0, 5.0) / 100.0
+        s(self, "rated_w", rated)
+        s(self, "surge_mult", surge)
+        s(self, "start_margin", start_margin)
+        s(self, "keep_margin", keep_margin)
+        # Setpoint loads start (and are kept) at their lowest setting
+        setpoint = SetpointConfig.from_props(props)
+        s(self, "setpoint", setpoint)
+        base = int(setpoint.min_w) if setpoint is not None else rated
+        # Start threshold: rated * surge * (1 + start margin); reserve: what a start books
+        s(self, "needed_w", int(base * surge * (1.0 + start_margin)))
+        s(self, "reserve_w", int(base * surge))
+        s(self, "keep_w", int(base * (1.0 + keep_margin)))
+        s(self, "shed_hysteresis_w", _count(props.get("shedHysteresisW"), 100) or 100)
+        s(self, "sustain_secs", max(0, _count(props.get("sustainSecs"), 0)))
+
+        s(self, "min_runtime_mins", _count(props.get("minRuntimeMins"), 0))
+        s(self, "max_runtime_mins", _count(props.get("maxRuntimeMins"), 0))
+        s(self, "cooldown_mins", _count(props.get("cooldownMins"), 0))
+        s(self, "quota_window", window_key(props.get("quotaWindow") or "24h"))
+        s(self, "quota_target_mins", _count(props.get("maxRuntimePerQuotaMins"), 0))
+
+        # Allowed time window (inclusive, may cross midnight); None = misconfigured -> allow
+        s(self, "window_start_min", _hhmm_minutes(props.get("windowStart", "00:00")))
+        s(self, "window_end_min", _hhmm_minutes(props.get("windowEnd", "23:59")))
+        # Weekday bitmask, bit 0 = Monday (datetime.weekday())
+        mask = 0
+        for i, k in enumerate(DOW_KEYS):
+            if props.get(k, False) in (True, "true", "True"):
+                mask |= 1 << i
+        s(self, "dow_mask", mask)
+
+        s(self, "enable_catchup", bool(props.get("enableCatchup", False)))
+        s(self, "catchup_target_mins", _count(props.get("catchupRuntimeMins"), 0))
+        # Catch-up period: blank = same as the quota window
+        s(self, "catchup_window", window_key(props.get("catchupWindowPeriod"), self.quota_window))
+        s(self, "catchup_start", _hhmm_time(props.get("catchupWindowStart", "00:00")))
+        s(self, "catchup_end", _hhmm_time(props.get("catchupWindowEnd", "06:00")))
+
+        # Minute-of-week bitmaps. Run window: weekday AND time of day (a window crossing
+        # midnight belongs to the day it is evaluated on, as before). Catch-up: every day.
+        s(self, "run_week", week_bits(day_bits(self.window_start_min, self.window_end_min, True), mask))
+        cs, ce = self.catchup_start, self.catchup_end
+        s(self, "catchup_week", week_bits(day_bits(cs.hour * 60 + cs.minute, ce.hour * 60 + ce.minute, False)))
+
+        s(self, "invert_on_off", bool(props.get("invertOnOff", False)))
+        s(self, "control_mode", (props.get("controlMode") or "").lower())
+        s(self, "control_device_id", _count(props.get("controlDeviceId"), 0))
+
+        # Measured power (optional): (device id, state key, scale) of the Load's own meter
+        try:
+            sources = parse_source_list(props.get("powerSource", ""))
+        except ValueError:
+            sources = []        # validateDeviceConfigUi reports it
+        s(self, "power_source", sources[0] if sources else None)
+        s(self, "power_inrush_secs", max(0, _count(props.get("powerInrushSecs"), 20)))
+
+        # Multi-stage load (extraStages > 0): () = single stage
+        s(self, "stages", stages_from_props(props, rated))
+        s(self, "stage_min_run_mins", max(0, _count(props.get("stageMinRunMins"), 2)))
+        s(self, "stage_cooldown_mins", max(0, _count(props.get("stageCooldownMins"), 2)))
+
+        # Three-phase site: the phase it is wired to (0 = a three-phase load, all phases)
+        s(self, "phase", phase_of(props.get("phase")))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("LoadConfig is immutable; build a new one from the props")
+
+    def __repr__(self) -> str:
+        return (f"LoadConfig(tier={self.tier}, rated={self.rated_w}W, needed={self.needed_w}W, "
+                f"quota={self.quota_target_mins}m/{self.quota_window})")
+
+    # ----- window checks (bit tests / scans on the minute-of-week bitmaps) -----
+    def run_allowed(self, now_dt: datetime) -> bool:
+        """Allowed weekday and inside the time window (misconfigured times allow all day)."""
+        return bool(self.run_week >> minute_of_week(now_dt) & 1)
+
+    def dow_allowed(self, now_dt: datetime) -> bool:
+        return bool(self.dow_mask >> now_dt.weekday() & 1)
+
+    def in_catchup_window(self, now_dt: datetime) -> bool:
+        return bool(self.catchup_week >> minute_of_week(now_dt) & 1)
+
+    def run_next_change(self, now_dt: datetime) -> Optional[datetime]:
+        """When the run window next opens (if closed now) or closes (if open); None = never."""
+        return next_flip(self.run_week, now_dt)
+
+    def catchup_next_change(self, now_dt: datetime) -> Optional[datetime]:
+        return next_flip(self.catchup_week, now_dt)
@@ -0,0 +1,101 @@
+"""
+Measured load power with:
+- PowerLearner: EWMA of steady draw and inrush from the Load's own meter
+- Near-zero readings while running (thermostat satisfied) ignored
+- power_figures(): start, reserve, keep and draw figures - measured, else from headroom
+  steps, else rated x surge
+"""
+
+from __future__ import annotations
+
+from typing import Any, NamedTuple, Optional
+
+ALPHA = 0.2             # EWMA weight of a new reading / a new start's inrush peak
+MIN_STEADY = 3          # steady-state readings before the measured figures replace the rated ones
+IDLE_FRACTION = 0.05    # readings below this share of the estimate (or rated) are idle, not draw
+IDLE_FLOOR_W = 10.0
+
+
+class PowerFigures(NamedTuple):
+    needed_w: int       # headroom that must be free to start (inrush x (1 + start margin))
+    reserve_w: int      # what a start books in the headroom ledger (inrush)
+    keep_w: int         # steady draw x (1 + keep margin)
+    draw_w: int         # what stopping it frees (steady draw)
+    measured: bool      # False: rated figures (nothing learned yet)
+
+
+class PowerLearner:
+    """Steady-state and inrush EWMA of one Load's measured draw."""
+
+    __slots__ = ("steady_w", "inrush_w", "steady_n", "starts", "last_w", "last_ts", "_peak", "_peak_start")
+
+    def __init__(self, steady_w: Optional[float] = None, inrush_w: Optional[float] = None,
+                 steady_n: int = 0, starts: int = 0):
+        self.steady_w = steady_w
+        self.inrush_w = inrush_w
+        self.steady_n = int(steady_n or 0)
+        self.starts = int(starts or 0)
+        self.last_w: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self._peak: Optional[float] = None
+        self._peak_start: Optional[float] = None
+
+    @property
+    def learned(self) -> bool:
+        return self.steady_w is not None and self.steady_n >= MIN_STEADY
+
+    def observe(self, watts: Optional[float], ts: float, start_ts: Optional[float],
+                inrush_secs: float, rated_w: float = 0.0) -> bool:
+        """
+        One meter reading. start_ts: when the load was started (None = not running).
+        Returns True if the steady / inrush estimate moved.
+        """
+        if watts is None:
+            return False
+        watts = float(watts)
+        self.last_w, self.last_ts = watts, ts
+        if start_ts is None:
+            return self._close_peak()
+        ref = self.steady_w if self.steady_w else float(rated_w or 0)
+        if watts < max(IDLE_FLOOR_W, IDLE_FRACTION * ref):
+            return False
+        if ts - start_ts < inrush_secs:
+            if self._peak_start != start_ts:
+                self._close_peak()
+                self._peak_start, self._peak = start_ts, watts
+            else:
+                self._peak = max(self._peak or 0.0, watts)
+            return False
+        if self._peak_start == start_ts:
+            self._close_peak()
+        self._peak_start = start_ts     # past the inrush window of this start
+        self.steady_w = watts if self.steady_w is None else self.steady_w + ALPHA * (watts - self.steady_w)
+        self.steady_n += 1
+        return True
+
+    def _close_peak(self) -> bool:
+        """Fold the pending start's inrush peak into the estimate."""
+        peak, self._peak = self._peak, None
+        if peak is None:
+            return False
+        self.inrush_w = peak if self.inrush_w is None else self.inrush_w + ALPHA * (peak - self.inrush_w)
+        self.starts += 1
+        return True
+
+
+def power_figures(cfg: Any, learner: Optional[PowerLearner], step_w: Optional[float] = None) -> PowerFigures:
+    """
+    Scheduler figures for a Load: measured once the learner has enough readings, else the
+    headroom-step estimate step_w, else rated.
+    """
+    if learner is not None and learner.learned:
+        steady = learner.steady_w
+        # No start seen yet: the configured surge multiplier on the measured draw
+        inrush = max(steady, learner.inrush_w if learner.inrush_w is not None else steady * cfg.surge_mult)
+    elif step_w is not None and step_w > 0:
+        steady = float(step_w)
+        inrush = steady * cfg.surge_mult
+    else:
+        return PowerFigures(cfg.needed_w, cfg.reserve_w, cfg.keep_w, cfg.rated_w, False)
+    return PowerFigures(int(inrush * (1.0 + cfg.start_margin)), int(inrush),
+                        int(steady * (1.0 + cfg.keep_margin)), int(round(steady)), True)
@@ -0,0 +1,510 @@
+"""
+Direct meter readings (asyncio, stdlib only) with:
+- Modbus TCP, polled HTTP(S) JSON and MQTT 3.1.1 (QoS 0) sources
+- One persistent connection per endpoint, shared between meters
+- MeterHub: one task per meter, reconnect with backoff
+- json_value(): dotted-path lookup into a JSON document
+"""
+
+from __future__ import annotations
+
+import asyncio
+import http.client
+import json
+import math
+import struct
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+PROTOCOLS = ("modbus", "http", "mqtt")
+
+# data type -> (registers, struct format for the big-endian word sequence)
+MODBUS_TYPES = {
+    "int16": (1, ">h"),
+    "uint16": (1, ">H"),
+    "int32": (2, ">i"),
+    "uint32": (2, ">I"),
+    "float32": (2, ">f"),
+}
+
+OnValue = Callable[[float, float], None]      # (watts, epoch of the reading)
+OnError = Callable[[str], None]
+
+
+class MeterError(Exception):
+    """A meter endpoint could not be read (connection, protocol or decode error)."""
+
+
+@dataclass(frozen=True)
+class MeterConfig:
+    protocol: str                  # modbus | http | mqtt
+    host: str = ""
+    port: int = 0
+    poll_secs: float = 1.0         # modbus / http; mqtt is pushed by the broker
+    scale: float = 1.0             # raw value x scale = Watts (negative flips the sign)
+    timeout: float = 3.0
+    # Modbus TCP
+    unit: int = 1
+    function: int = 3              # 3 = holding, 4 = input registers
+    register: int = 0
+    data_type: str = "int16"
+    word_order: str = "big"        # 32-bit values: "little" = low word first
+    # HTTP JSON
+    url: str = ""
+    # MQTT
+    topic: str = ""
+    username: str = ""
+    password: str = ""
+    # HTTP / MQTT: where the number is inside the JSON document ("" = whole payload)
+    json_path: str = ""
+
+    def key(self) -> Tuple:
+        """Connection-sharing key: meters with the same key use one connection."""
+        if self.protocol == "http":
+            parts = urlsplit(self.url)
+            return ("http", parts.scheme, parts.hostname, parts.port)
+        if self.protocol == "mqtt":
+            return ("mqtt", self.host, self.port or 1883, self.username)
+        return ("modbus", self.host, self.port or 502)
+
+
+# ────────────────────────────────────────────────────────────
+# Decoding helpers (pure)
+# ────────────────────────────────────────────────────────────
+
+def json_value(doc: Any, path: str) -> Any:
+    """Follow a dotted path ('a.b.0.c') through dicts and lists. Raises MeterError if absent."""
+    cur = doc
+    for part in (p for p in (path or "").split(".") if p):
+        if isinstance(cur, dict) and part in cur:
+            cur = cur[part]
+        elif isinstance(cur, list) and part.lstrip("-").isdigit() and -len(cur) <= int(part) < len(cur):
+            cur = cur[int(part)]
+        else:
+            raise MeterError(f"'{path}' not found (stopped at '{part}')")
+    return cur
+
+
+def to_float(value: Any) -> float:
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    try:
+        out = float(value)
+    except (TypeError, ValueError):
+        raise MeterError(f"not a number: {value!r}") from None
+    if not math.isfinite(out):
+        raise MeterError(f"not a finite number: {value!r}")
+    return out
+
+
+def decode_payload(payload: bytes, json_path: str) -> float:
+    """HTTP body / MQTT payload -> number: JSON document + path, or a bare number."""
+    try:
+        text = payload.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        raise MeterError("payload is not UTF-8") from None
+    if not json_path:
+        try:
+            return to_float(text)
+        except MeterError:
+            pass
+    try:
+        doc = json.loads(text)
+    except ValueError:
+        raise MeterError(f"payload is not JSON: {text[:40]!r}") from None
+    return to_float(json_value(doc, json_path))
+
+
+def decode_registers(regs: List[int], data_type: str, word_order: str = "big") -> float:
+    count, fmt = MODBUS_TYPES[data_type]
+    if len(regs) != count:
+        raise MeterError(f"expected {count} register(s), got {len(regs)}")
+    if word_order == "little":
+        regs = list(reversed(regs))
+    return to_float(struct.unpack(fmt, struct.pack(f">{count}H", *regs))[0])
+
+
+# ────────────────────────────────────────────────────────────
+# Shared connections
+# ────────────────────────────────────────────────────────────
+
+class ModbusTcpConnection:
+    """
+    One TCP connection to a Modbus TCP server / gateway, shared by every meter on it.
+    Requests are serialised (many gateways accept a single client connection).
+    A broken connection is reopened once per request before the error is reported.
+    """
+
+    def __init__(self, host: str, port: int = 502, timeout: float = 3.0):
+        self.host, self.port, self.timeout = host, int(port), float(timeout)
+        self._lock = asyncio.Lock()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._tid = 0
+        self.connects = 0          # number of TCP connects, for diagnostics
+
+    async def _ensure(self) -> None:
+        if self._writer is None or self._writer.is_closing():
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout)
+            self.connects += 1
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def read_registers(self, unit: int, function: int, address: int, count: int) -> List[int]:
+        async with self._lock:
+            for attempt in (0, 1):
+                try:
+                    await self._ensure()
+                    return await self._transact(unit, function, address, count)
+                except (OSError, EOFError, asyncio.TimeoutError) as e:
+                    self.close()
+                    if attempt:
+                        raise MeterError(f"modbus {self.host}:{self.port}: {e or type(e).__name__}") from None
+        raise MeterError("unreachable")
+
+    async def _transact(self, unit: int, function: int, address: int, count: int) -> List[int]:
+        self._tid = (self._tid + 1) & 0xFFFF
+        pdu = struct.pack(">BHH", function, address, count)
+        self._writer.write(struct.pack(">HHHB", self._tid, 0, len(pdu) + 1, unit) + pdu)
+        await self._writer.drain()
+        header = await asyncio.wait_for(self._reader.readexactly(7), self.timeout)
+        tid, _proto, length, _unit = struct.unpack(">HHHB", header)
+        body = await asyncio.wait_for(self._reader.readexactly(length - 1), self.timeout)
+        if tid != self._tid:
+            # Out of step with the server: start over on a fresh connection
+            self.close()
+            raise MeterError(f"modbus {self.host}:{self.port}: transaction id {tid} != {self._tid}")
+        if body[0] & 0x80:
+            raise MeterError(f"modbus {self.host}:{self.port}: exception code {body[1]} "
+                             f"(unit {unit}, register {address})")
+        if body[0] != function or body[1] != 2 * count:
+            raise MeterError(f"modbus {self.host}:{self.port}: malformed response")
+        return list(struct.unpack(f">{count}H", body[2:2 + 2 * count]))
+
+
+class HttpConnection:
+    """
+    Keep-alive HTTP(S) connection shared by every meter on the same scheme://host:port.
+    http.client is blocking, so requests run in the loop's default executor, one at a time.
+    """
+
+    def __init__(self, scheme: str, host: str, port: Optional[int], timeout: float = 3.0):
+        self.scheme, self.host, self.port, self.timeout = scheme, host, port, float(timeout)
+        self._lock = asyncio.Lock()
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self.connects = 0
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+
+    def _get_blocking(self, path: str) -> bytes:
+        for attempt in (0, 1):
+            try:
+                if self._conn is None:
+                    cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+                    self._conn = cls(self.host, self.port, timeout=self.timeout)
+                    self.connects += 1
+                self._conn.request("GET", path, headers={"Accept": "application/json"})
+                resp = self._conn.getresponse()
+                body = resp.read()
+                if resp.will_close:
+                    self.close()
+                if resp.status != 200:
+                    raise MeterError(f"http {self.host}: HTTP {resp.status} for {path}")
+                return body
+            except (OSError, http.client.HTTPException) as e:
+                # Keep-alive connections are dropped by servers at will: retry once on a new one
+                self.close()
+                if attempt:
+                    raise MeterError(f"http {self.host}: {e or type(e).__name__}") from None
+        raise MeterError("unreachable")
+
+    async def get(self, path: str) -> bytes:
+        async with self._lock:
+            return await asyncio.get_running_loop().run_in_executor(None, self._get_blocking, path)
+
+
+def _mqtt_str(s: str) -> bytes:
+    raw = s.encode("utf-8")
+    return struct.pack(">H", len(raw)) + raw
+
+
+def _mqtt_packet(first: int, body: bytes) -> bytes:
+    n, out = len(body), bytearray([first])
+    while True:
+        byte, n = n % 128, n // 128
+        out.append(byte | (0x80 if n else 0))
+        if not n:
+            return bytes(out) + body
+
+
+def mqtt_topic_matches(pattern: str, topic: str) -> bool:
+    """MQTT filter match with '+' (one level) and '#' (rest)."""
+    p_parts, t_parts = pattern.split("/"), topic.split("/")
+    for i, p in enumerate(p_parts):
+        if p == "#":
+            return True
+        if i >= len(t_parts) or (p != "+" and p != t_parts[i]):
+            return False
+    return len(p_parts) == len(t_parts)
+
+
+class MqttConnection:
+    """
+    Minimal MQTT 3.1.1 subscriber shared by every meter on one broker: CONNECT,
+    SUBSCRIBE at QoS 0, PUBLISH dispatch to the matching callbacks, PINGREQ keep-alive.
+    run() reconnects with backoff until cancelled and resubscribes on every connect.
+    """
+
+    def __init__(self, host: str, port: int = 1883, username: str = "", password: str = "",
+                 client_id: str = "", keepalive: int = 30, timeout: float = 5.0):
+        self.host, self.port = host, int(port)
+        self.username, self.password = username, password
+        self.client_id = client_id or f"solarsmart-{int(time.time()) % 100000}"
+        self.keepalive, self.timeout = int(keepalive), float(timeout)
+        self._subs: Dict[int, Tuple[str, Callable[[bytes, float], None], OnError]] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._packet_id = 0
+        self._accepted = False      # set once the broker accepts a CONNECT; run() resets its backoff
+        self.connects = 0
+
+    # ----- subscriptions -----
+    def subscribe(self, meter_id: int, topic: str, on_payload: Callable[[bytes, float], None],
+                  on_error: OnError) -> None:
+        self._subs[meter_id] = (topic, on_payload, on_error)
+        if self._writer is not None:
+            self._send_subscribe([topic])
+
+    def unsubscribe(self, meter_id: int) -> None:
+        # Topics stay subscribed until the next reconnect; unmatched publishes are ignored
+        self._subs.pop(meter_id, None)
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+    def _send_subscribe(self, topics: List[str]) -> None:
+        self._packet_id = self._packet_id % 0xFFFF + 1
+        body = struct.pack(">H", self._packet_id) + b"".join(_mqtt_str(t) + b"\x00" for t in topics)
+        self._writer.write(_mqtt_packet(0x82, body))
+
+    def _fail_all(self, msg: str) -> None:
+        for _topic, _cb, on_error in list(self._subs.values()):
+            on_error(msg)
+
+    # ----- protocol -----
+    async def _read_packet(self, reader: asyncio.StreamReader, timeout: float) -> Tuple[int, bytes]:
+        first = (await asyncio.wait_for(reader.readexactly(1), timeout))[0]
+        length, shift = 0, 0
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                break
+            shift += 7
+            if shift > 21:
+                raise MeterError("mqtt: malformed remaining length")
+        return first, await reader.readexactly(length)
+
+    async def _session(self) -> None:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        self.connects += 1
+        try:
+            flags = 0x02 | (0x80 if self.username else 0) | (0x40 if self.password else 0)
+            body = _mqtt_str("MQTT") + bytes([4, flags]) + struct.pack(">H", self.keepalive) + _mqtt_str(self.client_id)
+            if self.username:
+                body += _mqtt_str(self.username)
+            if self.password:
+                body += _mqtt_str(self.password)
+            writer.write(_mqtt_packet(0x10, body))
+            first, ack = await self._read_packet(reader, self.timeout)
+            if first >> 4 != 2 or len(ack) < 2 or ack[1] != 0:
+                raise MeterError(f"mqtt {self.host}: connection refused (code {ack[1] if len(ack) > 1 else '?'})")
+            self._writer = writer
+            self._accepted = True
+            topics = sorted({t for t, _cb, _err in self._subs.values()})
+            if topics:
+                self._send_subscribe(topics)
+            idle = max(1.0, self.keepalive / 2.0)
+            last_rx = time.monotonic()
+            while True:
+                try:
+                    first, pkt = await self._read_packet(reader, idle)
+                except asyncio.TimeoutError:
+                    if time.monotonic() - last_rx > 1.5 * self.keepalive:
+                        raise MeterError(f"mqtt {self.host}: broker stopped responding")
+                    writer.write(b"\xc0\x00")                      # PINGREQ
+                    continue
+                last_rx = time.monotonic()
+                if first >> 4 == 3:                                # PUBLISH
+                    self._dispatch(first, pkt, time.time())
+        finally:
+            self._writer = None
+            writer.close()
+
+    def _dispatch(self, first: int, pkt: bytes, ts: float) -> None:
+        tlen = struct.unpack(">H", pkt[:2])[0]
+        topic = pkt[2:2 + tlen].decode("utf-8", "replace")
+        pos = 2 + tlen + (2 if (first >> 1) & 0x03 else 0)        # QoS>0 carries a packet id
+        payload = pkt[pos:]
+        for pattern, on_payload, _err in list(self._subs.values()):
+            if mqtt_topic_matches(pattern, topic):
+                on_payload(payload, ts)
+
+    async def run(self) -> None:
+        backoff = 1.0
+        while True:
+            self._accepted = False
+            try:
+                await self._session()
+            except asyncio.CancelledError:
+                raise
+            except (OSError, EOFError, asyncio.TimeoutError, MeterError) as e:
+                self._fail_all(str(e) if isinstance(e, MeterError) else f"mqtt {self.host}: {e or type(e).__name__}")
+            # A session the broker accepted was a working connection: reconnect quickly after it drops
+            if self._accepted:
+                backoff = 1.0
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2.0, 60.0)
+
+
+# ────────────────────────────────────────────────────────────
+# Hub
+# ────────────────────────────────────────────────────────────
+
+class MeterHub:
+    """
+    Runs every direct meter on the plugin's asyncio loop (all methods must be called on
+    that loop). start() replaces any running task for the meter id; meters that share a
+    host / URL origin / broker share one connection.
+
+      on_value(watts, ts) : each successful reading (raw x scale)
+      on_error(message)   : each failed poll / lost subscription
+    """
+
+    def __init__(self):
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._mqtt_ids: Dict[int, Tuple] = {}                 # meter id -> mqtt connection key
+        self._conns: Dict[Tuple, Any] = {}                     # config.key() -> shared connection
+        self._mqtt_tasks: Dict[Tuple, asyncio.Task] = {}
+
+    def __contains__(self, meter_id) -> bool:
+        return meter_id in self._tasks or meter_id in self._mqtt_ids
+
+    def connection_stats(self) -> Dict[str, int]:
+        """Connection key -> number of connects so far (reuse check / diagnostics)."""
+        return {":".join(str(p) for p in k if p not in (None, "")): getattr(c, "connects", 0)
+                for k, c in self._conns.items()}
+
+    def start(self, meter_id: int, cfg: MeterConfig, on_value: OnValue, on_error: OnError) -> None:
+        self.stop(meter_id)
+        if cfg.protocol == "mqtt":
+            self._start_mqtt(meter_id, cfg, on_value, on_error)
+            return
+        if cfg.protocol not in PROTOCOLS:
+            raise MeterError(f"unknown protocol {cfg.protocol!r}")
+        self._tasks[meter_id] = asyncio.get_running_loop().create_task(self._poll(cfg, on_value, on_error))
+
+    def stop(self, meter_id: int) -> None:
+        task = self._tasks.pop(meter_id, None)
+        if task is not None:
+            task.cancel()
+        key = self._mqtt_ids.pop(meter_id, None)
+        if key is not None:
+            conn = self._conns.get(key)
+            if conn is not None:
+                conn.unsubscribe(meter_id)
+                if not len(conn):
+                    self._conns.pop(key, None)
+                    t = self._mqtt_tasks.pop(key, None)
+                    if t is not None:
+                        t.cancel()
+
+    async def close(self) -> None:
+        pending = list(self._tasks.values()) + list(self._mqtt_tasks.values())
+        for meter_id in list(self._tasks) + list(self._mqtt_ids):
+            self.stop(meter_id)
+        await asyncio.gather(*pending, return_exceptions=True)
+        for conn in self._conns.values():
+            if hasattr(conn, "close"):
+                conn.close()
+        self._conns.clear()
+
+    # ----- polled meters -----
+    def _connection(self, cfg: MeterConfig):
+        key = cfg.key()
+        conn = self._conns.get(key)
+        if conn is None:
+            if cfg.protocol == "http":
+                parts = urlsplit(cfg.url)
+                conn = HttpConnection(parts.scheme or "http", parts.hostname or "", parts.port, cfg.timeout)
+            else:
+                conn = ModbusTcpConnection(cfg.host, cfg.port or 502, cfg.timeout)
+            self._conns[key] = conn
+        return conn
+
+    async def read_once(self, cfg: MeterConfig) -> float:
+        """One reading in Watts (raw x scale)."""
+        conn = self._connection(cfg)
+        if cfg.protocol == "http":
+            parts = urlsplit(cfg.url)
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            raw = decode_payload(await conn.get(path), cfg.json_path)
+        else:
+            count = MODBUS_TYPES[cfg.data_type][0]
+            regs = await conn.read_registers(cfg.unit, cfg.function, cfg.register, count)
+            raw = decode_registers(regs, cfg.data_type, cfg.word_order)
+        return raw * cfg.scale
+
+    async def _poll(self, cfg: MeterConfig, on_value: OnValue, on_error: OnError) -> None:
+        period = max(1.0, float(cfg.poll_secs))
+        backoff = period
+        next_at = time.monotonic()
+        while True:
+            try:
+                value = await self.read_once(cfg)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # MeterError is the expected failure; anything else must not end the poll loop either
+                on_error(str(e) if isinstance(e, MeterError) else f"{type(e).__name__}: {e}")
+                # Back off on a dead endpoint (up to 60 s), back to the poll rate once it answers
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2.0, max(60.0, period))
+                next_at = time.monotonic()
+                continue
+            backoff = period
+            on_value(value, time.time())
+            # Fixed-rate schedule: a slow read does not push every later poll back
+            next_at += period
+            delay = next_at - time.monotonic()
+            if delay < 0:
+                next_at, delay = time.monotonic(), 0.0
+            await asyncio.sleep(delay)
+
+    # ----- pushed meters -----
+    def _start_mqtt(self, meter_id: int, cfg: MeterConfig, on_value: OnValue, on_error: OnError) -> None:
+        key = cfg.key()
+        conn = self._conns.get(key)
+        if conn is None:
+            conn = MqttConnection(cfg.host, cfg.port or 1883, cfg.username, cfg.password, timeout=cfg.timeout)
+            self._conns[key] = conn
+            self._mqtt_tasks[key] = asyncio.get_running_loop().create_task(conn.run())
+
+        def _on_payload(payload: bytes, ts: float) -> None:
+            try:
+                value = decode_payload(payload, cfg.json_path) * cfg.scale
+            except MeterError as e:
+                on_error(f"mqtt {cfg.topic}: {e}")
+                return
+            on_value(value, ts)
+
+        conn.subscribe(meter_id, cfg.topic, _on_payload, on_error)
+        self._mqtt_ids[meter_id] = key
@@ -0,0 +1,49 @@
+"""
+Scheduler timers with:
+- EventHeap: min-heap of upcoming timed events (cooldowns, min runtimes, windows, rollovers)
+- The scheduler sleeps until the earliest one, or until headroom moves
+- pop_due(): which events woke a run
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Hashable, List, NamedTuple, Optional, Tuple
+
+
+class Event(NamedTuple):
+    when: float                     # epoch seconds
+    kind: str                       # "cooldown", "min-runtime", "window", ...
+    key: Optional[Hashable] = None  # load id; None = not tied to one load
+
+
+class EventHeap:
+    """Upcoming events, earliest first. Entries with equal times keep insertion order."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Event]] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def clear(self) -> None:
+        self._heap.clear()
+
+    def push(self, when: Optional[float], kind: str, key: Optional[Hashable] = None) -> None:
+        """Add an event; None / non-finite times are ignored."""
+        if when is None or not math.isfinite(when):
+            return
+        self._seq += 1
+        heapq.heappush(self._heap, (float(when), self._seq, Event(float(when), kind, key)))
+
+    def peek(self) -> Optional[Event]:
+        return self._heap[0][2] if self._heap else None
+
+    def pop_due(self, now: float) -> List[Event]:
+        """Remove and return every event at or before now, earliest first."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
@@ -0,0 +1,224 @@
+"""
+Start and shed planning with:
+- pack_starts(): the set of loads to start in one run, tier by tier (bounded subset-sum)
+- StartLedger: headroom held by recent starts until the meter shows them
+- plan_shed(): the fewest running loads, lowest priority first, that cover a deficit
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Container, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class StartCandidate(NamedTuple):
+    key: Hashable
+    tier: int
+    reserve_w: int      # draw to reserve once started (rated x surge)
+    need_w: int         # headroom that must be free to start it (reserve + start margin)
+
+
+def _units(watts: float, res: int, up: bool) -> int:
+    q, r = divmod(int(watts), res)
+    return q + (1 if up and r else 0)
+
+
+def pack_tier(cands: List[StartCandidate], budget_w: int, slots: int, max_units: int = 2000) -> List[StartCandidate]:
+    """
+    Best subset of one tier's candidates (given in priority order).
+
+    A set is feasible if the loads can be started one after another, each seeing headroom
+    >= its own need_w after the earlier ones reserved their draw, i.e.
+        sum(reserve_w) + max(need_w - reserve_w) <= budget_w,   len(set) <= slots.
+    Among feasible sets the one reserving the most Watts wins; ties go to earlier
+    candidates. Weights are bucketed (rounded up) so the DP stays <= max_units wide.
+    """
+    cands = [c for c in cands if c.need_w <= budget_w and c.reserve_w >= 0]
+    if not cands or slots <= 0 or budget_w <= 0:
+        return []
+    res = max(1, -(-int(budget_w) // max_units))
+    best: Tuple[int, List[int]] = (-1, [])
+
+    # The start margin of the *last* start must fit on top: try each distinct margin as the cap
+    for extra in sorted({max(0, c.need_w - c.reserve_w) for c in cands}):
+        idx = [i for i, c in enumerate(cands) if max(0, c.need_w - c.reserve_w) <= extra]
+        cap = _units(budget_w - extra, res, up=False)
+        if cap < 0:
+            continue
+        weights = [_units(cands[i].reserve_w, res, up=True) for i in idx]
+        k = min(slots, len(idx))
+        mask = (1 << (cap + 1)) - 1
+        # reach[j] bit s set <=> some j items of the prefix sum to s units; keep every prefix
+        reach = [1] + [0] * k
+        history = [reach[:]]
+        for w in weights:
+            for j in range(k, 0, -1):
+                reach[j] |= (reach[j - 1] << w) & mask
+            history.append(reach[:])
+        # Largest reachable total over any count
+        total, count = -1, 0
+        for j in range(k + 1):
+            if reach[j]:
+                top = reach[j].bit_length() - 1
+                if top > total:
+                    total, count = top, j
+        if total <= 0 or total * res <= best[0]:
+            continue
+        # Walk back, leaving out later items whenever the prefix can still make the total
+        chosen, s, j = [], total, count
+        for n in range(len(idx), 0, -1):
+            if (history[n - 1][j] >> s) & 1:
+                continue
+            chosen.append(idx[n - 1])
+            s -= weights[n - 1]
+            j -= 1
+        best = (total * res, sorted(chosen))
+    return [cands[i] for i in best[1]]
+
+
+def pack_starts(cands: Iterable[StartCandidate], budget_w: int, slots: int,
+                max_starts: Optional[int] = None,
+                lead: Optional[Container[Hashable]] = None) -> List[StartCandidate]:
+    """
+    Loads to start this tick, tier by tier (1 first). Each tier is packed against the
+    budget / slots the higher tiers left. max_starts=1 reproduces the old behaviour: the
+    first candidate in priority order whose need_w fits.
+    lead (fair share): keys packed first within their tier; the rest of the tier is packed
+    into what they left, so nothing that fits is left waiting.
+    """
+    cands = list(cands)
+    if max_starts is not None:
+        slots = min(slots, max_starts)
+    if max_starts == 1:
+        for c in cands:
+            if slots > 0 and c.need_w <= budget_w:
+                return [c]
+        return []
+    by_tier: Dict[int, List[StartCandidate]] = {}
+    for c in cands:
+        by_tier.setdefault(c.tier, []).append(c)
+    out: List[StartCandidate] = []
+    for tier in sorted(by_tier):
+        group = by_tier[tier]
+        parts = [group] if lead is None else [[c for c in group if c.key in lead],
+                                              [c for c in group if c.key not in lead]]
+        for part in parts:
+            picked = pack_tier(part, budget_w, slots)
+            out.extend(picked)
+            budget_w -= sum(c.reserve_w for c in picked)
+            slots -= len(picked)
+        if slots <= 0 or budget_w <= 0:
+            break
+    return out
+
+
+class ShedCandidate(NamedTuple):
+    key: Hashable
+    tier: int
+    watts: int          # draw freed by switching it off
+
+
+def _fewest_covering(cands: List[ShedCandidate], need_w: int, deadline: float,
+                     max_units: int = 2000) -> Optional[List[ShedCandidate]]:
+    """
+    Fewest candidates whose Watts add up to >= need_w; among those, the least overshoot
+    (ties go to earlier candidates). Weights are bucketed down, so a bucketed sum that
+    covers the need covers it for real. None if the deadline passes first.
+    """
+    total = sum(c.watts for c in cands)
+    res = max(1, -(-int(total) // max_units))
+    weights = [c.watts // res for c in cands]
+    need = -(-int(need_w) // res)
+    reach = [1] + [0] * len(cands)
+    history = [reach[:]]
+    for n, w in enumerate(weights, 1):
+        for j in range(n, 0, -1):
+            reach[j] |= reach[j - 1] << w
+        history.append(reach[:])
+        if time.monotonic() > deadline:
+            return None
+    for count in range(1, len(cands) + 1):
+        covering = reach[count] >> need
+        if not covering:
+            continue
+        # Lowest reachable sum >= need
+        s = need + ((covering & -covering).bit_length() - 1)
+        chosen, j = [], count
+        for n in range(len(cands), 0, -1):
+            if (history[n - 1][j] >> s) & 1:
+                continue
+            chosen.append(n - 1)
+            s -= weights[n - 1]
+            j -= 1
+        return [cands[i] for i in sorted(chosen)]
+    return None
+
+
+def plan_shed(cands: Iterable[ShedCandidate], deficit_w: int, time_budget_s: float = 0.02) -> List[ShedCandidate]:
+    """
+    Loads to switch off so the freed Watts cover deficit_w, all in one go.
+
+    Tier order is kept: the lowest-priority tier (highest number) is shed first, the next
+    one only if that tier alone cannot cover what is left. In the tier that finishes the
+    job, the fewest loads that cover the rest are picked (then the least overshoot).
+    If the search runs past time_budget_s, that tier falls back to largest-first.
+    When everything together cannot cover the deficit, everything is returned.
+    """
+    deadline = time.monotonic() + max(0.0, time_budget_s)
+    by_tier: Dict[int, List[ShedCandidate]] = {}
+    for c in cands:
+        if c.watts > 0:
+            by_tier.setdefault(c.tier, []).append(c)
+    out: List[ShedCandidate] = []
+    need = int(deficit_w)
+    for tier in sorted(by_tier, reverse=True):
+        if need <= 0:
+            break
+        group = by_tier[tier]
+        if sum(c.watts for c in group) < need:
+            out.extend(group)
+            need -= sum(c.watts for c in group)
+            continue
+        picked = _fewest_covering(group, need, deadline)
+        if picked is None:
+            picked = []
+            for c in sorted(group, key=lambda c: -c.watts):
+                if need - sum(p.watts for p in picked) <= 0:
+                    break
+                picked.append(c)
+        out.extend(picked)
+        need -= sum(c.watts for c in picked)
+    return out
+
+
+class StartLedger:
+    """
+    Headroom reserved by recent starts. A started load's draw takes a while to show up
+    in the measured headroom (meter / integration lag); until settle time has passed
+    its reserve is subtracted from what the next starts may use. Released early when
+    the load stops.
+    """
+
+    def __init__(self):
+        self._res: Dict[Hashable, Tuple[float, float]] = {}    # key -> (watts, release epoch)
+
+    def __len__(self) -> int:
+        return len(self._res)
+
+    def __contains__(self, key) -> bool:
+        return key in self._res
+
+    def reserve(self, key: Hashable, watts: float, now: float, settle_secs: float) -> None:
+        self._res[key] = (float(watts), now + max(0.0, settle_secs))
+
+    def release(self, key: Hashable) -> None:
+        self._res.pop(key, None)
+
+    def pending(self, now: float) -> float:
+        """Watts still reserved (expired reservations are dropped)."""
+        for key in [k for k, (_w, until) in self._res.items() if until <= now]:
+            del self._res[key]
+        return sum(w for w, _until in self._res.values())
+
+    def items(self) -> List[Tuple[Hashable, float, float]]:
+        return [(k, w, until) for k, (w, until) in self._res.items()]
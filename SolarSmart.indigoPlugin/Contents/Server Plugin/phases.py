@@ -0,0 +1,73 @@
+"""
+Per-phase headroom for three-phase sites with:
+- phase_headroom(): [L1, L2, L3] from per-phase PV / consumption / grid readings
+- Loads on one phase, or split evenly over all three
+- phase_short() / take(): check and book a load's share of each phase
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence
+
+PHASES = ("L1", "L2", "L3")
+QUANTITIES = ("pv", "cons", "grid")
+# (quantity, Main prop, label) of every per-phase source list
+SOURCE_KEYS = tuple((f"{q}_l{n}", f"{q}L{n}Sources", f"{label} L{n}")
+                    for q, label in (("pv", "PV"), ("cons", "Consumption"), ("grid", "Grid"))
+                    for n in (1, 2, 3))
+
+
+def phase_of(raw: Any) -> int:
+    """Load prop phase -> 1..3, or 0 for a three-phase load (all phases, split evenly)."""
+    s = str(raw or "").strip().upper()
+    return PHASES.index(s) + 1 if s in PHASES else 0
+
+
+def phase_headroom(vals: Dict[str, Optional[float]], pv_w: Optional[float], cons_w: Optional[float],
+                   batt_w: Optional[float], use_grid: bool) -> Optional[List[float]]:
+    """[L1, L2, L3] headroom from the per-phase readings in vals, or None if a phase cannot be worked out."""
+    out = []
+    for n in (1, 2, 3):
+        grid = vals.get(f"grid_l{n}")
+        if use_grid:
+            if grid is None:
+                return None
+            out.append(-grid)
+            continue
+        cons = vals.get(f"cons_l{n}")
+        if cons is None:
+            if grid is not None:
+                out.append(-grid)
+                continue
+            cons = cons_w / 3.0 if cons_w is not None else None
+        pv = vals.get(f"pv_l{n}")
+        if pv is None and pv_w is not None:
+            pv = pv_w / 3.0
+        if pv is None or cons is None:
+            return None
+        out.append(pv - cons - max(batt_w or 0.0, 0.0) / 3.0)
+    return out
+
+
+def share(phase: int, watts: float) -> List[float]:
+    """Watts on each phase of a load on `phase` (0 = all three, split evenly)."""
+    if phase in (1, 2, 3):
+        out = [0.0, 0.0, 0.0]
+        out[phase - 1] = float(watts)
+        return out
+    return [watts / 3.0] * 3
+
+
+def phase_short(budget: Sequence[float], phase: int, watts: float) -> int:
+    """First phase (1..3) whose budget cannot take its share of watts, 0 if every phase can."""
+    for n, (have, need) in enumerate(zip(budget, share(phase, watts)), 1):
+        if need > 0 and have < need:
+            return n
+    return 0
+
+
+def take(budget: List[float], phase: int, watts: float) -> List[float]:
+    """Book watts (negative: give back) on the load's phase(s); updates budget in place."""
+    for i, w in enumerate(share(phase, watts)):
+        budget[i] -= w
+    return budget
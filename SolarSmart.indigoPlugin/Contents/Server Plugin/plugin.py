@@ -40,8 +40,25 @@ from PIL import Image, ImageDraw, ImageFont
 import re
 # Add near the top with other imports
 from forecast_solar_service import ForecastSolarClient, PVPlane, ForecastSolarRateLimitError
+from telemetry import TelemetryRing, SlidingExtrema, SourceFreshness, EnergyIntegrator, INTERVAL_EDGES
+from source_adapters import SourceAdapterCache, SourcePlan, parse_source_list, parse_to_watts
+from estimator import HeadroomEstimator
+from meter_ingest import MeterConfig, MeterError, MeterHub, MODBUS_TYPES
+from load_config import LoadConfig
+from packing import ShedCandidate, StartCandidate, StartLedger, pack_starts, plan_shed
+from next_event import EventHeap
+from tick_snapshot import LoadSnap, TickSnapshot
+from state_publisher import StatePublisher
+from fair_queue import FairQueue, cost_per_min
+from load_power import PowerFigures, PowerLearner, power_figures
+from step_power import StepLearner, StepResult
+from setpoint import SetpointConfig, Tracked, plan_setpoints
+from phases import PHASES, SOURCE_KEYS as PHASE_SOURCE_KEYS, phase_headroom, phase_short, take as phase_take
+from stages import MAX_EXTRA_STAGES, Stage, active_w, credit_fraction, next_stage_need_w, stage_move, stages_from_props
 
 import re
+import bisect
+from collections import deque
 from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 Number = Union[int, float]
 import datetime as dt
@@ -72,29 +89,6 @@ def _valid_hhmm(s: str) -> bool:
     except Exception:
         return False
 
-def _time_window_allowed(props, now_dt: datetime) -> bool:
-    start = props.get("windowStart", "00:00")
-    end   = props.get("windowEnd", "23:59")
-    try:
-        sh, sm = [int(x) for x in start.split(":", 1)]
-        eh, em = [int(x) for x in end.split(":", 1)]
-    except Exception:
-        return True  # be permissive if misconfigured
-    cur = now_dt.hour*60 + now_dt.minute
-    s = sh*60 + sm
-    e = eh*60 + em
-    if s <= e:
-        return s <= cur <= e
-    else:
-        # window crosses midnight
-        return cur >= s or cur <= e
-
-def _dow_allowed(props, now_dt: datetime) -> bool:
-    dow_map = ["dowMon", "dowTue", "dowWed", "dowThu", "dowFri", "dowSat", "dowSun"]
-    allowed = [props.get(k, False) in (True, "true", "True") for k in dow_map]
-    # datetime.weekday(): Monday=0..Sunday=6
-    return allowed[now_dt.weekday()]
-
 # ---- small utils ----
 def _int(v, default=0):
     try:
@@ -142,6 +136,244 @@ class IndigoLogHandler(logging.Handler):
         except Exception as ex:
             indigo.server.log(f"Error in Logging: {ex}",type=self.displayName, isError=is_error, level=levelno)
 ################################################################################
+# Device-role registry
+################################################################################
+class DeviceRegistry:
+    """
+    In-memory index of this plugin's *started* devices by role, so the hot paths never
+    scan the Indigo device database (installs can hold thousands of devices).
+
+    Roles: Main / Test / Direct Meter (ordered by start), Load (by id and by tier), and
+    each Load's control target device and power meter device. Only ids are kept; live objects come from indigo.devices[id].
+    Each Load also gets its pre-parsed LoadConfig, rebuilt only when its props change.
+
+    Kept current by Plugin.deviceStartComm / deviceStopComm / deviceUpdated / deviceDeleted.
+    Indigo only starts enabled devices, so everything in here is enabled.
+    Mutated on the plugin thread, read from the asyncio thread: guarded by a lock,
+    and readers get tuples (snapshots).
+    """
+
+    ROLE_MAIN = "solarsmartMain"
+    ROLE_TEST = "solarsmartTest"
+    ROLE_LOAD = "solarsmartLoad"
+    ROLE_METER = "solarsmartMeter"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._roles: dict[int, str] = {}               # dev id -> role (deviceTypeId)
+        self._mains: list[int] = []
+        self._tests: list[int] = []
+        self._meters: list[int] = []
+        self._load_tier: dict[int, int] = {}           # load id -> tier
+        self._tiers: dict[int, list[int]] = {}         # tier -> [load ids] (sorted by id)
+        self._target: dict[int, int | None] = {}       # load id -> control device id
+        self._by_target: dict[int, set[int]] = {}      # control device id -> {load ids}
+        self._meter: dict[int, int | None] = {}        # load id -> power meter device id
+        self._by_meter: dict[int, set[int]] = {}       # power meter device id -> {load ids}
+        self._configs: dict[int, LoadConfig] = {}      # load id -> parsed props
+
+    # ----- maintenance -----
+    @staticmethod
+    def _target_of(cfg: LoadConfig) -> int | None:
+        if cfg.control_mode != "device":
+            return None
+        return cfg.control_device_id if cfg.control_device_id > 0 else None
+
+    @staticmethod
+    def _meter_of(cfg: LoadConfig) -> int | None:
+        return cfg.power_source[0] if cfg.power_source else None
+
+    def add(self, dev) -> None:
+        """Register (or re-index) a started device. Idempotent."""
+        role = dev.deviceTypeId
+        if role not in (self.ROLE_MAIN, self.ROLE_TEST, self.ROLE_LOAD, self.ROLE_METER):
+            return
+        with self._lock:
+            self._remove_locked(dev.id)
+            self._roles[dev.id] = role
+            if role == self.ROLE_MAIN:
+                self._mains.append(dev.id)
+            elif role == self.ROLE_TEST:
+                self._tests.append(dev.id)
+            elif role == self.ROLE_METER:
+                self._meters.append(dev.id)
+            else:
+                cfg = LoadConfig(dev.pluginProps or {})
+                tier = cfg.tier
+                target = self._target_of(cfg)
+                self._configs[dev.id] = cfg
+                self._load_tier[dev.id] = tier
+                bisect.insort(self._tiers.setdefault(tier, []), dev.id)
+                self._target[dev.id] = target
+                if target:
+                    self._by_target.setdefault(target, set()).add(dev.id)
+                meter = self._meter_of(cfg)
+                self._meter[dev.id] = meter
+                if meter:
+                    self._by_meter.setdefault(meter, set()).add(dev.id)
+
+    def remove(self, dev_id: int) -> None:
+        with self._lock:
+            self._remove_locked(dev_id)
+
+    def _remove_locked(self, dev_id: int) -> None:
+        role = self._roles.pop(dev_id, None)
+        if role == self.ROLE_MAIN:
+            self._mains.remove(dev_id)
+        elif role == self.ROLE_TEST:
+            self._tests.remove(dev_id)
+        elif role == self.ROLE_METER:
+            self._meters.remove(dev_id)
+        elif role == self.ROLE_LOAD:
+            tier = self._load_tier.pop(dev_id)
+            self._configs.pop(dev_id, None)
+            ids = self._tiers.get(tier, [])
+            ids.remove(dev_id)
+            if not ids:
+                self._tiers.pop(tier, None)
+            target = self._target.pop(dev_id, None)
+            if target:
+                owners = self._by_target.get(target, set())
+                owners.discard(dev_id)
+                if not owners:
+                    self._by_target.pop(target, None)
+            meter = self._meter.pop(dev_id, None)
+            if meter:
+                owners = self._by_meter.get(meter, set())
+                owners.discard(dev_id)
+                if not owners:
+                    self._by_meter.pop(meter, None)
+
+    def update(self, dev) -> bool:
+        """
+        Rebuild a registered Load's config if its props changed, re-indexing it if its tier,
+        control target or power meter moved (returns True then). Cheap no-op for state-only updates.
+        """
+        if self._roles.get(dev.id) != self.ROLE_LOAD:
+            return False
+        return self.set_config(dev.id, dev.pluginProps or {})
+
+    def set_config(self, load_id: int, props) -> bool:
+        """Replace a Load's config from (possibly not yet saved) props; True if re-indexed."""
+        cfg = self._configs.get(load_id)
+        if cfg is not None and cfg.source == dict(props):
+            return False
+        new = LoadConfig(props)
+        with self._lock:
+            if self._roles.get(load_id) != self.ROLE_LOAD:
+                return False
+            self._configs[load_id] = new
+            if (self._load_tier.get(load_id) == new.tier and self._target.get(load_id) == self._target_of(new)
+                    and self._meter.get(load_id) == self._meter_of(new)):
+                return False
+            self._reindex_load_locked(load_id, new)
+        return True
+
+    def _reindex_load_locked(self, load_id: int, cfg: LoadConfig) -> None:
+        old_tier = self._load_tier.get(load_id)
+        if old_tier != cfg.tier:
+            ids = self._tiers.get(old_tier, [])
+            if load_id in ids:
+                ids.remove(load_id)
+            if not ids:
+                self._tiers.pop(old_tier, None)
+            self._load_tier[load_id] = cfg.tier
+            bisect.insort(self._tiers.setdefault(cfg.tier, []), load_id)
+        old_target = self._target.get(load_id)
+        target = self._target_of(cfg)
+        if old_target != target:
+            if old_target:
+                owners = self._by_target.get(old_target, set())
+                owners.discard(load_id)
+                if not owners:
+                    self._by_target.pop(old_target, None)
+            self._target[load_id] = target
+            if target:
+                self._by_target.setdefault(target, set()).add(load_id)
+        old_meter = self._meter.get(load_id)
+        meter = self._meter_of(cfg)
+        if old_meter != meter:
+            if old_meter:
+                owners = self._by_meter.get(old_meter, set())
+                owners.discard(load_id)
+                if not owners:
+                    self._by_meter.pop(old_meter, None)
+            self._meter[load_id] = meter
+            if meter:
+                self._by_meter.setdefault(meter, set()).add(load_id)
+
+    # ----- lookups -----
+    def __contains__(self, dev_id) -> bool:
+        return dev_id in self._roles
+
+    def role(self, dev_id: int) -> str | None:
+        return self._roles.get(dev_id)
+
+    @staticmethod
+    def _get(dev_id: int):
+        try:
+            return indigo.devices[dev_id]
+        except Exception:
+            return None
+
+    def main_ids(self) -> tuple:
+        with self._lock:
+            return tuple(self._mains)
+
+    def mains(self) -> list:
+        return [d for d in (self._get(i) for i in self.main_ids()) if d is not None]
+
+    def first_main(self):
+        for i in self.main_ids():
+            dev = self._get(i)
+            if dev is not None:
+                return dev
+        return None
+
+    def meter_ids(self) -> tuple:
+        with self._lock:
+            return tuple(self._meters)
+
+    def test_device(self):
+        with self._lock:
+            tid = self._tests[0] if self._tests else None
+        return None if tid is None else self._get(tid)
+
+    def load_ids(self, tiers=None) -> tuple:
+        with self._lock:
+            if tiers:
+                return tuple(i for t in sorted(self._tiers) if t in tiers for i in self._tiers[t])
+            return tuple(i for t in sorted(self._tiers) for i in self._tiers[t])
+
+    def loads(self, tiers=None) -> list:
+        """Started Load devices, tier order (1 first), by id within a tier."""
+        return [d for d in (self._get(i) for i in self.load_ids(tiers)) if d is not None]
+
+    def loads_by_id(self, ids) -> list:
+        """Just these Load devices (skips ids that are gone)."""
+        return [d for d in (self._get(i) for i in ids) if d is not None]
+
+    def tier(self, load_id: int) -> int | None:
+        return self._load_tier.get(load_id)
+
+    def config(self, load_id: int) -> LoadConfig | None:
+        return self._configs.get(load_id)
+
+    def control_target(self, load_id: int) -> int | None:
+        return self._target.get(load_id)
+
+    def loads_for_target(self, target_id: int) -> tuple:
+        with self._lock:
+            return tuple(self._by_target.get(target_id, ()))
+
+    def loads_for_meter(self, meter_id: int) -> tuple:
+        with self._lock:
+            return tuple(self._by_meter.get(meter_id, ()))
+
+    def has_power_meters(self) -> bool:
+        return bool(self._by_meter)
+
+################################################################################
 # Async Smart Solar Class
 ################################################################################
 # ─────────────────────────────────────────────────────────────────────────────
@@ -274,6 +506,67 @@ class SolarSmartAsyncManager:
         self.loop = event_loop
         self._tasks = []
         self._ANCHOR_HOUR = 6  # 06:00 local
+        # Headroom channel: latest computed sample per Main id (only touched on the loop thread)
+        self._latest_sample = {}
+        # Event-driven recompute bookkeeping per Main id
+        self._event_last_run = {}
+        self._event_pending = {}
+        # Rolling telemetry ring buffer per Main id (array-backed, fixed memory)
+        self._telemetry = {}
+        # Sliding-window headroom min/max per Main id: {main_id: {window_sec: SlidingExtrema}}
+        self._extrema = {}
+        # Edge state of headroomAbove/headroomBelow plugin events: {trigger id: condition was true}
+        self._trigger_latched = {}
+        # Last input-watchdog reason logged per Main id
+        self._stale_logged = {}
+        # Energy integration per Main id (daily Wh + headroom between scheduler ticks)
+        self._energy = {}
+        self._interval_headroom = {}
+        # Main sampler schedule: next sample / next state publish time per Main id
+        self._next_sample_at = {}
+        self._next_publish_at = {}
+        # Direct meter ingestion (meter_ingest.py): shared connections + one task per meter,
+        # and per meter {"published": ts, "count": n, "errors": n, "status": str, "window": [ts...]}
+        self._meter_hub = MeterHub()
+        self._meter_stats = {}
+        # Headroom reserved by loads started in recent ticks, until the meter shows their draw
+        self._start_ledger = StartLedger()
+        # Next-event scheduling (next_event.py): upcoming timers, wake-up signals, idle Mains,
+        # what the last scheduler run saw, and the runtime-accrual clock (carry < 60 s)
+        self._events = EventHeap()
+        self._sched_wake = asyncio.Event()
+        self._sched_wake_reason = None
+        self._main_wake = asyncio.Event()
+        self._sched_ref = {}
+        self._idle_mains = set()
+        self._last_accrual_ts = None
+        self._accrue_carry_s = 0.0
+        self._last_table_text = None
+        # Incremental runs (Main prop incrementalTicks): what changed since the last evaluated
+        # run, and per load the headroom band [lo, hi) in which its last decision / row holds
+        self._dirty_all = True
+        self._dirty_loads = set()
+        self._load_bands = {}       # load id -> (lo, hi, table row)
+        self._band_ids = ()
+        self._shed_floor = None     # shedding starts below this (None = nothing running)
+        self._run_inputs = None
+        self._last_full_run = 0.0
+        self._running_ids = set()
+        self._sched_busy = False
+        # Loads of the scheduler run in progress (TickSnapshot); None between runs
+        self._snap = None
+        # Emergency shed (Main prop emergencyShed): since when headroom is below the floor,
+        # and no new shed before this time (the last one has to show in the readings first)
+        self._emergency_below_since = None
+        self._emergency_rearm_at = 0.0
+        # Fair share within a tier (Main prop fairShare "weighted"): virtual tags of the loads
+        self._fair = FairQueue()
+        # Measured load power (Load prop powerSource): load id -> PowerLearner
+        self._learners = {}
+        # Load power from the headroom steps around our own commands (Main prop learnStepPower)
+        self._steps = StepLearner()
+        # Setpoint tracking: (tier, W) the setpoint loads below the best waiting on/off start keep free
+        self._setpoint_yield = None
         # Log instantiation so it shows up in Indigo logs
         try:
             self.plugin.logger.info("SolarSmart AsyncManager initialised — async loop manager ready.")
@@ -303,45 +596,70 @@ class SolarSmartAsyncManager:
 
     # Insert these helpers inside class SolarSmartAsyncManager, near the other slot helpers.
 
-    def _catchup_window_key(self, props: dict) -> str:
+    def _cfg(self, dev) -> LoadConfig:
+        """Pre-parsed config of a Load (kept by the registry; built on the fly if not started)."""
+        cfg = self.plugin._registry.config(dev.id)
+        return cfg if cfg is not None else LoadConfig(dev.pluginProps or {})
+
+    def _power(self, dev) -> PowerFigures:
         """
-        Normalize the configured catch-up window period to a canonical key.
-        If not set, default to the quota/runtime window period for backward compatibility.
+        Start / reserve / keep / draw Watts of a Load: measured once learned, else inferred
+        from headroom steps (learnStepPower), else rated.
         """
-        # Accept same values as quotaWindow; treat "" or None as "same as quota"
-        raw = (props.get("catchupWindowPeriod") or "").lower().strip()
-        if raw in ("12h", "24h", "1d", "2d", "3d"):
-            if raw == "1d":
-                raw = "24h"
-            return raw
-        # Fallback to quota window key
-        return self._aligned_window_key(props)
-
-    def _aligned_last_next_cu_slot(self, props: dict, now: datetime | None = None) -> tuple[
+        cfg = self._cfg(dev)
+        step_w = self._steps.estimate(dev.id) if self._sched_ref.get("step_learning") else None
+        fig = power_figures(cfg, self._learner(dev, cfg), step_w)
+        cmd = self.plugin._setpoint_cmd.get(dev.id) if cfg.setpoint is not None else None
+        if cmd is not None:
+            fig = fig._replace(draw_w=int(round(cmd[0])))    # stopping it frees what it is set to
+        elif cfg.stages and self._stage(dev) > 1:
+            # Stopping it frees every active stage (the figures above are stage 1's)
+            fig = fig._replace(draw_w=fig.draw_w + active_w(cfg.stages[1:], self._stage(dev) - 1))
+        return fig
+
+    def _setpoint_flex_w(self, dev) -> float:
+        """Watts a running setpoint load can still be turned down by (0 for on/off loads)."""
+        cfg = self._cfg(dev)
+        cmd = self.plugin._setpoint_cmd.get(dev.id) if cfg.setpoint is not None else None
+        return max(0.0, cmd[0] - cfg.setpoint.min_w) if cmd is not None else 0.0
+
+    def _flex_w(self, dev) -> float:
+        """Watts a running load can give back without stopping: setting above its minimum, stages above 1."""
+        cfg = self._cfg(dev)
+        if cfg.stages:
+            return float(active_w(cfg.stages[1:], self._stage(dev) - 1))
+        return self._setpoint_flex_w(dev)
+
+    def _stage(self, dev) -> int:
+        """Active stages of a multi-stage load (0 = off); single-stage loads: 1 while running."""
+        if not self._is_running(dev):
+            return 0
+        if not self._cfg(dev).stages:
+            return 1
+        return max(1, int(self.plugin._load_state.get(dev.id, {}).get("stage") or 1))
+
+    def _aligned_last_next_cu_slot(self, cfg: LoadConfig, now: datetime | None = None) -> tuple[
         datetime, datetime, str]:
         """
         Same as _aligned_last_next_slot but using the catch-up window period
-        (independent from the quota/runtime window).
+        (independent from the quota/runtime window; blank = same as the quota window).
         """
         now = now or datetime.now()
-        key = self._catchup_window_key(props)
-        # Reuse the existing quota-slot function by passing a temp props dict
-        tmp_props = {"quotaWindow": key}
-        last_dt, next_dt, _slot_key = self._aligned_last_next_slot(tmp_props, now=now)
+        key = cfg.catchup_window
+        last_dt, next_dt, _slot_key = self._aligned_last_next_slot(key, now=now)
         slot_key = f"CU:{key}:{last_dt.strftime('%Y%m%d%H')}"
         return last_dt, next_dt, slot_key
 
-    def _is_final_catchup_phase(self, props: dict, now: datetime | None = None) -> bool:
+    def _is_final_catchup_phase(self, cfg: LoadConfig, now: datetime | None = None) -> bool:
         """
         True if we are within the FINAL 24 hours of the current CATCH-UP window slot.
         - For 12h/24h slots: always True.
         - For 2d/3d slots: True only when now >= next_slot_start - 24h.
         """
         now = now or datetime.now()
-        key = self._catchup_window_key(props)
-        if key in ("12h", "24h"):
+        if cfg.catchup_window in ("12h", "24h"):
             return True
-        last_dt, next_dt, _ = self._aligned_last_next_cu_slot(props, now=now)
+        last_dt, next_dt, _ = self._aligned_last_next_cu_slot(cfg, now=now)
         return now >= (next_dt - dt.timedelta(days=1))
 
     # --- Catch-up window runtime counters (independent of quota window) ---
@@ -355,14 +673,14 @@ class SolarSmartAsyncManager:
         val = int(minutes)
         st["served_cu_mins"] = val
         try:
-            dev.updateStateOnServer("RuntimeCatchupMins", val)
+            self.plugin._pub.set(dev, "RuntimeCatchupMins", val)
         except Exception:
             pass
 
     def _add_served_catchup_minutes(self, dev: indigo.Device, minutes: int):
         self._set_served_catchup_mins(dev, self._served_catchup_mins(dev) + int(minutes))
 
-    def _maybe_rollover_catchup_window(self, dev: indigo.Device, props: dict, now_ts: float | None = None):
+    def _maybe_rollover_catchup_window(self, dev: indigo.Device, cfg: LoadConfig, now_ts: float | None = None):
         """
         Align catch-up runtime window to fixed LOCAL slots (06:00-based), using catchupWindowPeriod.
         Resets served_cu_mins ONCE per slot.
@@ -371,14 +689,14 @@ class SolarSmartAsyncManager:
         try:
             now_dt = datetime.now()
             st = self.plugin._load_state.setdefault(dev.id, {})
-            last_dt, next_dt, slot_key = self._aligned_last_next_cu_slot(props, now=now_dt)
+            last_dt, next_dt, slot_key = self._aligned_last_next_cu_slot(cfg, now=now_dt)
             last_ts = last_dt.timestamp()
             next_ts = next_dt.timestamp()
 
             anchor = st.get("cu_anchor_ts")
             if anchor is None or not (last_ts <= float(anchor) < next_ts):
                 st["cu_anchor_ts"] = last_ts
-                dev.updateStateOnServer("CatchupAnchorTs", f"{last_ts:.3f}")
+                self.plugin._pub.set(dev, "CatchupAnchorTs", f"{last_ts:.3f}")
 
             applied_key = st.get("cu_aligned_slot_key")
             if applied_key == slot_key:
@@ -393,7 +711,7 @@ class SolarSmartAsyncManager:
 
             # New slot → reset catch-up window minutes
             st["served_cu_mins"] = 0
-            dev.updateStateOnServer("RuntimeCatchupMins", 0)
+            self.plugin._pub.set(dev, "RuntimeCatchupMins", 0)
 
             # Note: we intentionally DO NOT reset catchup_run_secs here; that counter
             # measures time under catchup_active. If you want it to be catch-up window
@@ -405,16 +723,9 @@ class SolarSmartAsyncManager:
             self.plugin.logger.exception(f"_maybe_rollover_catchup_window: error on {dev.name}")
 
     ################################################################################
-    def _aligned_window_key(self, props: dict) -> str:
-        """Normalize the configured quota window to a canonical key."""
-        period = (props.get("quotaWindow") or "24h").lower()
-        if period == "1d":
-            period = "24h"
-        return period if period in {"12h", "24h", "2d", "3d"} else "24h"
-
-    def _aligned_last_next_slot(self, props: dict, now: datetime | None = None) -> tuple[datetime, datetime, str]:
+    def _aligned_last_next_slot(self, key: str, now: datetime | None = None) -> tuple[datetime, datetime, str]:
+        """Current 06:00-anchored slot for a canonical window key (LoadConfig.quota_window / catchup_window)."""
         now = now or datetime.now()
-        key = self._aligned_window_key(props)
         h6 = datetime(now.year, now.month, now.day, self._ANCHOR_HOUR, 0, 0)
 
         if key == "12h":
@@ -468,6 +779,8 @@ class SolarSmartAsyncManager:
 
         # Main 30s ticker (pv/consumption/battery -> publish states)
         #self._tasks.append(self.loop.create_task(self._ticker_main_states(period_sec=30.0)))
+        for meter_id in self.plugin._registry.meter_ids():
+            self._start_meter(meter_id)
         await asyncio.sleep(5)
         self._track_task(self._ticker_main_states(period_sec=30.0), "main_states")
         self._track_task(self._ticker_load_scheduler(period_min=self.plugin.time_for_checks_frequency),
@@ -483,48 +796,113 @@ class SolarSmartAsyncManager:
         # Give tasks a chance to finish
         await asyncio.gather(*self._tasks, return_exceptions=True)
         self._tasks.clear()
+        await self._meter_hub.close()
 
-    # ----- forever loops -----
+    # ----- direct meters -----
+    def start_meter(self, meter_id: int):
+        """Thread-safe: (re)start a Direct Meter's polling / subscription."""
+        try:
+            self.loop.call_soon_threadsafe(self._start_meter, meter_id)
+        except RuntimeError:
+            pass
 
-    def _parse_hhmm(self, s: str) -> dtime:
-        s = (s or "").strip()
+    def stop_meter(self, meter_id: int):
+        """Thread-safe: stop a Direct Meter."""
         try:
-            hh, mm = s.split(":")
-            return dtime(hour=int(hh), minute=int(mm))
-        except Exception:
-            # Safe default if bad input
-            return dtime(0, 0)
+            self.loop.call_soon_threadsafe(self._meter_hub.stop, meter_id)
+        except RuntimeError:
+            pass
 
-    def _time_in_window(self, now_t: dtime, start_t: dtime, end_t: dtime) -> bool:
-        # Handles normal and overnight windows (e.g., 23:00 -> 06:00)
-        if start_t < end_t:
-            return start_t <= now_t < end_t
-        else:
-            return (now_t >= start_t) or (now_t < end_t)
+    def _start_meter(self, meter_id: int):
+        try:
+            dev = indigo.devices[meter_id]
+        except Exception:
+            return
+        try:
+            cfg = self.plugin._meter_config(dev.pluginProps or {})
+            self._meter_hub.start(meter_id, cfg,
+                                  lambda w, ts: self._on_meter_value(meter_id, w, ts),
+                                  lambda msg: self._on_meter_error(meter_id, msg))
+        except (MeterError, ValueError) as e:
+            self._on_meter_error(meter_id, f"config: {e}")
+            return
+        self._meter_stats[meter_id] = {"published": 0.0, "errors": 0, "status": "", "window": deque()}
+        if getattr(self.plugin, "debug5", False):
+            self.plugin.logger.debug(f"[METER] {dev.name}: started {cfg.protocol} "
+                                     f"({cfg.url or cfg.topic or f'{cfg.host}:{cfg.port} reg {cfg.register}'})")
+
+    def _on_meter_value(self, meter_id: int, watts: float, ts: float):
+        """A Direct Meter reading: hand it to the Mains (in-process) and publish states now and then."""
+        self.plugin._meter_values[meter_id] = (watts, ts)
+        st = self._meter_stats.setdefault(meter_id, {"published": 0.0, "errors": 0, "status": "", "window": deque()})
+        win = st["window"]
+        win.append(ts)
+        while win and win[0] < ts - 60.0:
+            win.popleft()
+        # Event-driven Mains recompute at once (still coalesced by eventMinIntervalSecs)
+        for main_id in self.plugin._source_watch.get(meter_id, ()):
+            self._on_source_change(main_id, meter_id)
+        if self.plugin._registry.loads_for_meter(meter_id):
+            self._observe_meter(meter_id)
+        self._publish_meter_states(meter_id, "OK")
+
+    def _on_meter_error(self, meter_id: int, msg: str):
+        prev = self.plugin._meter_values.get(meter_id)
+        self.plugin._meter_values[meter_id] = (None, prev[1] if prev else None)
+        st = self._meter_stats.setdefault(meter_id, {"published": 0.0, "errors": 0, "status": "", "window": deque()})
+        st["errors"] += 1
+        if st["status"] != f"error: {msg}":
+            self.plugin.logger.warning(f"Direct meter #{meter_id}: {msg}")
+        self._publish_meter_states(meter_id, f"error: {msg}")
+
+    def _publish_meter_states(self, meter_id: int, status: str):
+        """Write the meter's Indigo states every publishSecs, or at once when its status changes."""
+        st = self._meter_stats.get(meter_id)
+        now = time.time()
+        try:
+            dev = indigo.devices[meter_id]
+            publish_secs = max(1.0, float((dev.pluginProps or {}).get("publishSecs", "30") or 30))
+        except Exception:
+            return
+        if status == st["status"] and now - st["published"] < publish_secs:
+            return
+        st["status"], st["published"] = status, now
+        watts, ts = self.plugin._meter_values.get(meter_id, (None, None))
+        kv = [{"key": "Status", "value": status},
+              {"key": "ReadingsPerMin", "value": len(st["window"])},
+              {"key": "Errors", "value": st["errors"]}]
+        if watts is not None:
+            kv.append({"key": "Power", "value": int(round(watts))})
+        if ts:
+            kv.append({"key": "LastReading", "value": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")})
+        try:
+            self.plugin._pub.set_many(dev, kv)
+        except Exception as e:
+            if getattr(self.plugin, "debug5", False):
+                self.plugin.logger.debug(f"[METER] failed updating states for #{meter_id}: {e}")
 
+    # ----- forever loops -----
 
-    def _sync_running_flags_from_external(self, loads_by_tier: dict[int, list[indigo.Device]]):
+    def _sync_running_flag_from_external(self, d: indigo.Device):
         """
-        Mirror external device logical ON/OFF (already inverted inside _external_on_state)
-        into IsRunning. No physical commands are sent here.
+        Mirror external device logical ON/OFF (inversion already applied) into IsRunning.
+        No physical commands are sent here.
         """
-        for tier, devs in loads_by_tier.items():
-            for d in devs:
-                ext_logical = self.plugin._external_on_state(d)  # returns logical (inversion already applied)
-                if ext_logical is None:
-                    continue  # action group mode or invalid
-                if self._is_running(d) != bool(ext_logical):
-                    self._mark_running(d, bool(ext_logical))
-                    d.updateStateOnServer("LastReason", "Sync from external device")
-                    state_str = "ON" if ext_logical else "OFF"
-                    self.plugin.logger.info(
-                        f"External state change detected for '{d.name}': now {state_str} (mirrored into IsRunning)"
-                    )
-                    if getattr(self.plugin, "debug8", False):
-                        self.plugin.logger.debug(f"[DBG8][sync] {d.name} mirrored logical_on={ext_logical}")
-                elif getattr(self.plugin, "debug8", False):
-                    # Optional trace showing no change needed
-                    self.plugin.logger.debug(f"[DBG8][sync] {d.name} no change (logical_on={ext_logical})")
+        ext_logical = self._ext_on(d)  # returns logical (inversion already applied)
+        if ext_logical is None:
+            return  # action group mode or invalid
+        if self._is_running(d) != bool(ext_logical):
+            self._mark_running(d, bool(ext_logical))
+            self.plugin._pub.set(d, "LastReason", "Sync from external device")
+            state_str = "ON" if ext_logical else "OFF"
+            self.plugin.logger.info(
+                f"External state change detected for '{d.name}': now {state_str} (mirrored into IsRunning)"
+            )
+            if getattr(self.plugin, "debug8", False):
+                self.plugin.logger.debug(f"[DBG8][sync] {d.name} mirrored logical_on={ext_logical}")
+        elif getattr(self.plugin, "debug8", False):
+            # Optional trace showing no change needed
+            self.plugin.logger.debug(f"[DBG8][sync] {d.name} no change (logical_on={ext_logical})")
 
 
     def _update_runtime_progress(self, dev):
@@ -538,7 +916,7 @@ class SolarSmartAsyncManager:
             if dev.deviceTypeId != "solarsmartLoad":
                 return
 
-            props = dev.pluginProps or {}
+            cfg = self._cfg(dev)
 
             # Authoritative used minutes
             try:
@@ -547,12 +925,9 @@ class SolarSmartAsyncManager:
                 used = 0
 
             # Target (preferred runtime allowance)
-            try:
-                target_prop = int(props.get("maxRuntimePerQuotaMins") or 0)
-            except Exception:
-                target_prop = 0
+            target_prop = cfg.quota_target_mins
 
-            remaining_state = dev.states.get("RemainingQuotaMins")
+            remaining_state = self.plugin._pub.get(dev, "RemainingQuotaMins")
             try:
                 remaining = int(remaining_state) if remaining_state is not None else None
             except Exception:
@@ -571,10 +946,10 @@ class SolarSmartAsyncManager:
                 pct = 0
             pct = max(0, min(100, pct))
 
-            if dev.states.get("RuntimeQuotaPct") != pct:
-                dev.updateStateOnServer("RuntimeQuotaPct", pct)
+            if self.plugin._pub.get(dev, "RuntimeQuotaPct") != pct:
+                self.plugin._pub.set(dev, "RuntimeQuotaPct", pct)
 
-            inverted = bool(props.get("invertOnOff", False))
+            inverted = cfg.invert_on_off
             is_run = self._is_running(dev)
 
             if inverted:
@@ -586,8 +961,8 @@ class SolarSmartAsyncManager:
                 base_status = "RUNNING" if is_run else "OFF"
 
             new_status = f"{base_status} ({pct}%)"
-            if dev.states.get("Status", "") != new_status:
-                dev.updateStateOnServer("Status", new_status)
+            if self.plugin._pub.get(dev, "Status", "") != new_status:
+                self.plugin._pub.set(dev, "Status", new_status)
 
         except Exception:
             if getattr(self.plugin, "debug3", False):
@@ -625,21 +1000,27 @@ class SolarSmartAsyncManager:
             except Exception:
                 main_dev = None
         if not main_dev:
-            main_dev = next((d for d in indigo.devices
-                             if d.deviceTypeId == "solarsmartMain" and d.enabled), None)
+            main_dev = self.plugin._registry.first_main()
         return main_dev
 
     def _snapshot_main_metrics(self):
-        """Return (pv_w, cons_w, batt_w, headroom_w, ts_str) from the main device states."""
+        """Return (pv_w, cons_w, batt_w, headroom_w, ts_str) from the channel, else main device states."""
         main = self._get_main_device()
         if not main:
             return (None, None, None, None, None)
+        sample = self.latest_sample(main.id)
+        if sample is not None:
+            def _i(v):
+                return None if v is None else int(round(v))
+            ts = datetime.fromtimestamp(sample["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+            return (_i(sample.get("pv")), _i(sample.get("cons")), _i(sample.get("batt")),
+                    _i(sample.get("headroom")), ts)
         try:
-            pv = main.states.get("SolarProduction", None)
-            con = main.states.get("SiteConsumption", None)
-            bat = main.states.get("BatteryPower", None)
-            hdrm = main.states.get("Headroom", None)
-            ts = main.states.get("LastUpdate", None)
+            pv = self.plugin._pub.get(main, "SolarProduction", None)
+            con = self.plugin._pub.get(main, "SiteConsumption", None)
+            bat = self.plugin._pub.get(main, "BatteryPower", None)
+            hdrm = self.plugin._pub.get(main, "Headroom", None)
+            ts = self.plugin._pub.get(main, "LastUpdate", None)
             # coerce to ints if possible
             pv = None if pv is None else int(pv)
             con = None if con is None else int(con)
@@ -649,9 +1030,326 @@ class SolarSmartAsyncManager:
         except Exception:
             return (None, None, None, None, None)
 
+    # ----- headroom channel (poll + event driven samples) -----
+    _SAMPLE_MAX_AGE_SEC = 120.0  # older samples fall back to the Main device states
+
+    def push_sample(self, main_id: int, sample: dict):
+        """Thread-safe: hand a freshly computed Main sample to the asyncio loop."""
+        try:
+            self.loop.call_soon_threadsafe(self._on_sample, main_id, sample)
+        except RuntimeError:
+            # Loop already closed (shutdown) – nothing left to feed
+            pass
+
+    def _on_sample(self, main_id: int, sample: dict):
+        """Runs on the loop thread for every sample computed by _update_solarsmart_states."""
+        self._latest_sample[main_id] = sample
+        self._record_telemetry(main_id, sample)
+        self._integrate_energy(main_id, sample)
+        for ex in self._extrema.get(main_id, {}).values():
+            ex.push(sample.get("ts") or time.time(), sample.get("headroom"))
+        self._track_setpoints(main_id, sample)
+        self._maybe_emergency_shed(main_id, sample)
+        self._maybe_step_sample(main_id, sample)
+        self._evaluate_headroom_triggers(main_id)
+        self._maybe_wake_scheduler(main_id, sample)
+        if getattr(self.plugin, "debug5", False):
+            self.plugin.logger.debug(
+                f"[CHANNEL] Main #{main_id} {sample.get('origin')} sample: headroom={sample.get('headroom')} W"
+            )
+
+    def latest_sample(self, main_id: int) -> dict | None:
+        """Latest channel sample for a Main if it is still fresh, else None."""
+        sample = self._latest_sample.get(main_id)
+        if not sample or (time.time() - sample["ts"]) > self._SAMPLE_MAX_AGE_SEC:
+            return None
+        return sample
+
+    # ----- telemetry ring buffer -----
+    _TELEMETRY_MIN_SPACING_SEC = 1.0  # coalesce samples to at most one per second
+
+    def _telemetry_ring(self, main_id: int) -> TelemetryRing | None:
+        """
+        Lazily create the ring for a Main. Capacity covers telemetryHours at the
+        expected sample rate (1 s in event mode, the 30 s poll otherwise).
+        """
+        ring = self._telemetry.get(main_id)
+        if ring is not None:
+            return ring
+        try:
+            props = indigo.devices[main_id].pluginProps or {}
+        except Exception:
+            return None
+        try:
+            hours = max(1.0, min(168.0, float(props.get("telemetryHours", "24") or 24)))
+        except Exception:
+            hours = 24.0
+        step = 1.0 if (props.get("ingestMode") or "poll") == "event" else self._sample_secs(props)
+        compact = bool(props.get("telemetryCompact", False))
+        ring = TelemetryRing(capacity=int(hours * 3600 / step), delta_encode=compact)
+        self._telemetry[main_id] = ring
+        if getattr(self.plugin, "debug5", False):
+            self.plugin.logger.debug(
+                f"[TELEMETRY] Main #{main_id}: ring of {ring.capacity} samples "
+                f"({'delta' if compact else 'plain'}), ~{ring.nbytes() / 1024:.0f} KiB"
+            )
+        return ring
+
+    def reset_telemetry(self, main_id: int):
+        """Drop a Main's ring (config changed / device stopped); rebuilt on the next sample."""
+        try:
+            self.loop.call_soon_threadsafe(self._telemetry.pop, main_id, None)
+            self.loop.call_soon_threadsafe(self._extrema.pop, main_id, None)
+        except RuntimeError:
+            pass
+
+    def _record_telemetry(self, main_id: int, sample: dict):
+        ring = self._telemetry_ring(main_id)
+        if ring is None:
+            return
+        ts = sample.get("ts") or time.time()
+        if ring.last_ts is not None and (ts - ring.last_ts) < self._TELEMETRY_MIN_SPACING_SEC:
+            return
+        ring.append(ts, {"pv": sample.get("pv"), "cons": sample.get("cons"), "batt": sample.get("batt"),
+                         "grid": sample.get("grid"), "headroom": sample.get("headroom")})
+
+    def rolling_stats(self, main_id: int, col: str = "headroom", seconds: float = 300.0) -> dict | None:
+        """Windowed stats (count/mean/min/max/p10/p50/p90/ema) for a Main, or None if no ring yet."""
+        ring = self._telemetry.get(main_id)
+        if ring is None or len(ring) == 0:
+            return None
+        return ring.stats(col, seconds)
+
+    # ----- sustained headroom (sliding-window min/max) -----
+    def _headroom_extrema(self, main_id: int, window_sec: float) -> SlidingExtrema:
+        """
+        Sliding min/max of a Main's headroom over window_sec, created on first use and
+        backfilled from the telemetry ring so a new window does not start empty.
+        """
+        window_sec = float(int(window_sec))
+        per_main = self._extrema.setdefault(main_id, {})
+        ex = per_main.get(window_sec)
+        if ex is None:
+            ex = SlidingExtrema(window_sec)
+            ring = self._telemetry.get(main_id)
+            if ring is not None and len(ring):
+                for ts, v in reversed(list(ring.iter_back("headroom", window_sec * 2, now=time.time()))):
+                    ex.push(ts, v)
+            per_main[window_sec] = ex
+        return ex
+
+    def sustained_headroom(self, main_id: int, window_sec: float) -> tuple[float | None, float | None]:
+        """
+        (min, max) headroom over the last window_sec seconds, or (None, None) until the
+        observed history covers the whole window.
+        """
+        ex = self._headroom_extrema(main_id, window_sec)
+        now = time.time()
+        if not ex.covered(now):
+            return (None, None)
+        return (ex.min(now), ex.max(now))
+
+    def _sustain_blocks_start(self, d, cfg: LoadConfig, needed_w: int, tick_adjust_w: int) -> bool:
+        """
+        True if the load has sustainSecs set and the minimum headroom over that window
+        (plus any headroom reclaimed earlier this tick) does not cover needed_w.
+        """
+        sustain = cfg.sustain_secs
+        if sustain <= 0:
+            return False
+        main = self._get_main_device()
+        if not main:
+            return False
+        lo, _ = self.sustained_headroom(main.id, sustain)
+        blocked = lo is None or (lo + tick_adjust_w) < needed_w
+        if blocked and getattr(self.plugin, "debug2", False):
+            lo_txt = "n/a (history < window)" if lo is None else f"{int(lo)} W"
+            self.plugin.logger.debug(
+                f"[SUSTAIN] {d.name}: min headroom over {sustain}s = {lo_txt} "
+                f"(adjust {tick_adjust_w:+d} W) < needed {needed_w} W"
+            )
+        return blocked
+
+    def _evaluate_headroom_triggers(self, main_id: int):
+        """
+        Fire headroomAbove / headroomBelow plugin events on the rising edge of their
+        condition: above = min over duration >= threshold, below = max over duration < threshold.
+        """
+        triggers = list(getattr(self.plugin, "triggers", {}).values())
+        if not triggers:
+            return
+        now = time.time()
+        for trig in triggers:
+            if trig.pluginTypeId not in ("headroomAbove", "headroomBelow"):
+                continue
+            props = trig.pluginProps or {}
+            try:
+                target = int(props.get("mainDeviceId", 0) or 0)
+            except Exception:
+                target = 0
+            if target and target != main_id:
+                continue
+            try:
+                threshold = float(props.get("thresholdW", "0") or 0)
+                duration = max(0.0, float(props.get("durationMins", "0") or 0)) * 60.0
+            except Exception:
+                continue
+
+            ex = self._headroom_extrema(main_id, duration)
+            if not ex.covered(now):
+                met = False
+            elif trig.pluginTypeId == "headroomAbove":
+                lo = ex.min(now)
+                met = lo is not None and lo >= threshold
+            else:
+                hi = ex.max(now)
+                met = hi is not None and hi < threshold
+
+            was = self._trigger_latched.get(trig.id, False)
+            self._trigger_latched[trig.id] = met
+            if met and not was:
+                if getattr(self.plugin, "debug2", False):
+                    self.plugin.logger.debug(
+                        f"[EVENT] Trigger '{trig.name}' fired: headroom "
+                        f"{'above' if trig.pluginTypeId == 'headroomAbove' else 'below'} "
+                        f"{threshold:.0f} W for {duration / 60.0:g} min"
+                    )
+                try:
+                    indigo.trigger.execute(trig)
+                except Exception:
+                    self.plugin.logger.exception(f"Failed to execute trigger '{trig.name}'")
+
+    # ----- energy integration (between samples / between scheduler ticks) -----
+    _ENERGY_STATES = (("pv", "PVYieldTodayWh"), ("export", "ExportTodayWh"), ("import", "ImportTodayWh"),
+                      ("self", "SelfConsumedTodayWh"), ("cons", "ConsumptionTodayWh"))
+
+    def _energy_integrator(self, main_id: int) -> EnergyIntegrator:
+        """Lazily create a Main's integrator, restoring today's counters from its states after a restart."""
+        integ = self._energy.get(main_id)
+        if integ is None:
+            integ = EnergyIntegrator()
+            try:
+                states = indigo.devices[main_id].states
+                today = datetime.now().strftime("%Y-%m-%d")
+                if states.get("EnergyTodayDate") == today:
+                    integ.restore(today, {c: states.get(key) for c, key in self._ENERGY_STATES})
+            except Exception:
+                pass
+            self._energy[main_id] = integ
+        return integ
+
+    def _integrate_energy(self, main_id: int, sample: dict):
+        ts = sample.get("ts") or time.time()
+        self._energy_integrator(main_id).add(
+            ts, datetime.fromtimestamp(ts).strftime("%Y-%m-%d"),
+            pv=sample.get("pv"), cons=sample.get("cons"), batt=sample.get("batt"),
+            grid=sample.get("grid"), headroom=sample.get("headroom"))
+
+    def _take_interval_headroom(self, main) -> int | None:
+        """
+        Time-weighted (trapezoid) mean headroom since the previous scheduler tick.
+        Stored for headroomBasis=interval and published as HeadroomIntervalAvg.
+        """
+        avg = self._energy_integrator(main.id).take_interval_avg()
+        self._interval_headroom[main.id] = None if avg is None else int(round(avg))
+        if avg is not None:
+            try:
+                self.plugin._pub.set(main, "HeadroomIntervalAvg", int(round(avg)))
+            except Exception:
+                pass
+        return self._interval_headroom[main.id]
+
+    def _publish_telemetry_states(self, dev):
+        """Publish rolling headroom statistics on the Main device."""
+        try:
+            window_min = max(1.0, float((dev.pluginProps or {}).get("statsWindowMins", "5") or 5))
+        except Exception:
+            window_min = 5.0
+        stats = self.rolling_stats(dev.id, "headroom", window_min * 60.0)
+        if not stats or not stats.get("count"):
+            return
+
+        def _w(v):
+            return 0 if v is None else int(round(v))
+
+        ring = self._telemetry.get(dev.id)
+        integ = self._energy.get(dev.id)
+        if integ is not None and integ.day_key:
+            try:
+                self.plugin._pub.set_many(dev,
+                    [{"key": key, "value": int(round(integ.today[c]))} for c, key in self._ENERGY_STATES]
+                    + [{"key": "EnergyTodayDate", "value": integ.day_key}])
+            except Exception:
+                if getattr(self.plugin, "debug2", False):
+                    self.plugin.logger.exception(f"_publish_telemetry_states: energy states failed for {dev.name}")
+        try:
+            self.plugin._pub.set_many(dev, [
+                {"key": "HeadroomEMA", "value": _w(stats["ema"])},
+                {"key": "HeadroomAvg", "value": _w(stats["mean"])},
+                {"key": "HeadroomMin", "value": _w(stats["min"])},
+                {"key": "HeadroomMax", "value": _w(stats["max"])},
+                {"key": "HeadroomP10", "value": _w(stats["p10"])},
+                {"key": "HeadroomP90", "value": _w(stats["p90"])},
+                {"key": "TelemetrySamples", "value": len(ring) if ring is not None else 0},
+            ])
+        except Exception:
+            if getattr(self.plugin, "debug2", False):
+                self.plugin.logger.exception(f"_publish_telemetry_states: failed for {dev.name}")
+
+    def notify_source_change(self, main_id: int, source_id: int):
+        """Thread-safe: a watched PV/consumption/battery/grid source changed (from deviceUpdated)."""
+        try:
+            self.loop.call_soon_threadsafe(self._on_source_change, main_id, source_id)
+        except RuntimeError:
+            pass
+
+    def _on_source_change(self, main_id: int, source_id: int | None = None):
+        """
+        Recompute headroom for a Main as soon as one of its sources changes.
+        Bursts are coalesced: at most one recompute per eventMinIntervalSecs, with a
+        trailing recompute so the last change in a burst is never lost.
+        """
+        self._event_pending.pop(main_id, None)
+        try:
+            main = indigo.devices[main_id]
+        except Exception:
+            return
+        if not main.enabled:
+            return
+        try:
+            min_interval = max(0.0, float((main.pluginProps or {}).get("eventMinIntervalSecs", "2") or 2))
+        except Exception:
+            min_interval = 2.0
+
+        now = time.time()
+        wait = self._event_last_run.get(main_id, 0.0) + min_interval - now
+        if wait > 0:
+            if main_id not in self._event_pending:
+                self._event_pending[main_id] = self.loop.call_later(wait, self._on_source_change, main_id, source_id)
+            return
+
+        self._event_last_run[main_id] = now
+        if getattr(self.plugin, "debug5", False):
+            self.plugin.logger.debug(f"[EVENT] source #{source_id} changed → recompute headroom for {main.name}")
+        try:
+            with self.plugin._pub.batch():
+                self.plugin._update_solarsmart_states(main, origin="event")
+        except Exception:
+            self.plugin.logger.exception(f"_on_source_change: recompute failed for {main.name}")
+
+    @staticmethod
+    def _sample_secs(props, publish_secs: float = 30.0) -> float:
+        """Main prop sampleSecs: how often sources are read (1..publish period, default = publish period)."""
+        try:
+            return max(1.0, min(float(publish_secs), float(props.get("sampleSecs", publish_secs) or publish_secs)))
+        except Exception:
+            return float(publish_secs)
+
     async def _ticker_main_states(self, period_sec: float):
         """
-        Every ~period_sec: update all SolarSmart Main devices' custom states.
+        Sample every Main's sources at its own rate (sampleSecs, default period_sec) and
+        publish the Main device states every ~period_sec. Samples between publishes only
+        feed the headroom channel / telemetry / energy integration.
         """
         # Add tiny jitter so multiple plugins don't sync-beat the server
         jitter = random.uniform(0.0, 0.7)
@@ -661,24 +1359,45 @@ class SolarSmartAsyncManager:
             self.plugin.logger.debug(f"_ticker_main_states: starting (period={period_sec}s, jitter={jitter:.2f}s)")
 
         while not getattr(self.plugin, "stopThread", False):
+            next_due = time.time() + 1.0
             try:
+                now = time.time()
+                next_due = now + period_sec
                 # Iterate all enabled SolarSmart Main devices
                 count = 0
-                for dev in indigo.devices.iter("self"):  # all devices owned by this plugin
-                    if dev.deviceTypeId != "solarsmartMain":
-                        continue
-                    if not dev.enabled:
-                        if getattr(self.plugin, "debug2", False):
-                            self.plugin.logger.debug(f"_ticker_main_states: skip {dev.name} (disabled)")
+                updated = []
+                for dev in self.plugin._registry.mains():  # started (enabled) Main devices only
+                    due = self._next_sample_at.get(dev.id, 0.0)
+                    if now + 0.05 < due:
+                        next_due = min(next_due, due)
                         continue
+                    props = dev.pluginProps or {}
+                    rate = self._sample_secs(props, period_sec)
+                    if dev.id in self._idle_mains:
+                        # Idle mode: sampling parked until PV returns or a timed event is due
+                        rate = max(rate, self._sched_opts(props)["idle_sample_secs"])
+                    self._next_sample_at[dev.id] = now + rate
+                    next_due = min(next_due, now + rate)
+                    publish = now + 0.05 >= self._next_publish_at.get(dev.id, 0.0)
+                    if publish:
+                        self._next_publish_at[dev.id] = now + period_sec
 
                     # Update PV/Consumption/Battery/Headroom/LastUpdate
-                    if getattr(self.plugin, "debug2", False):
+                    if getattr(self.plugin, "debug2", False) and publish:
                         self.plugin.logger.debug(f"_ticker_main_states: updating {dev.name} (#{dev.id})")
-                    self.plugin._update_solarsmart_states(dev)  # uses helpers we wrote earlier
+                    with self.plugin._pub.batch():      # one server update per Main
+                        self.plugin._update_solarsmart_states(dev, publish=publish)  # uses helpers we wrote earlier
+                    if publish:
+                        updated.append(dev)
                     count += 1
 
-                if getattr(self.plugin, "debug2", False):
+                # Let the queued channel samples land in the telemetry rings, then publish stats
+                await asyncio.sleep(0)
+                for dev in updated:
+                    with self.plugin._pub.batch():
+                        self._publish_telemetry_states(dev)
+
+                if getattr(self.plugin, "debug2", False) and updated:
                     self.plugin.logger.debug(f"_ticker_main_states: updated {count} main device(s) at {datetime.now()}")
 
             except asyncio.CancelledError:
@@ -687,11 +1406,8 @@ class SolarSmartAsyncManager:
             except Exception as e:
                 self.plugin.logger.exception(f"_ticker_main_states: exception: {e}")
 
-            # Sleep the base period; wake earlier if plugin is stopping
-            for _ in range(int(period_sec)):
-                if getattr(self.plugin, "stopThread", False):
-                    break
-                await asyncio.sleep(1.0)
+            # Sleep until the next Main is due (or a Main leaves idle mode); stop() cancels the task
+            await self._wait_event(self._main_wake, next_due)
 
         if getattr(self.plugin, "debug2", False):
             self.plugin.logger.debug("_ticker_main_states: exiting (stopThread set)")
@@ -714,12 +1430,7 @@ class SolarSmartAsyncManager:
 
         If minRuntimeMins is 0/blank => treated as satisfied (returns True).
         """
-        props = dev.pluginProps or {}
-        try:
-            min_runtime_mins = int(props.get("minRuntimeMins") or 0)
-        except Exception:
-            min_runtime_mins = 0
-
+        min_runtime_mins = self._cfg(dev).min_runtime_mins
         if min_runtime_mins <= 0:
             return True
 
@@ -770,7 +1481,6 @@ class SolarSmartAsyncManager:
         """
         dbg5 = getattr(self.plugin, "debug6", False)
         now = datetime.now()
-        now_t = now.time()
 
         # Concurrency snapshot
         max_concurrent = self._get_max_concurrent_loads()
@@ -801,8 +1511,8 @@ class SolarSmartAsyncManager:
                     continue
                 total_devices += 1
                 try:
-                    props = d.pluginProps or {}
-                    if not bool(props.get("enableCatchup", False)):
+                    cfg = self._cfg(d)
+                    if not cfg.enable_catchup:
                         # Clear stale active flag
                         st = self.plugin._load_state.setdefault(d.id, {})
                         if dbg5:
@@ -811,7 +1521,7 @@ class SolarSmartAsyncManager:
                             if dbg5:
                                 self.plugin.logger.debug(f"[CATCHUP] {d.name}: disabling catchupActive (prop disabled)")
                             st["catchup_active"] = False
-                            d.updateStateOnServer("catchupActive", False)
+                            self.plugin._pub.set(d, "catchupActive", False)
                         continue
 
                     st = self.plugin._load_state.setdefault(d.id, {})
@@ -820,26 +1530,23 @@ class SolarSmartAsyncManager:
                     # Auto-clear stale catchup_active if device is actually OFF
                     if st.get("catchup_active") and not self._is_running(d):
                         st["catchup_active"] = False
-                        d.updateStateOnServer("catchupActive", False)
+                        self.plugin._pub.set(d, "catchupActive", False)
 
                     # Config target
-                    try:
-                        catchup_target = int(props.get("catchupRuntimeMins") or 0)
-                    except Exception:
-                        catchup_target = 0
+                    catchup_target = cfg.catchup_target_mins
 
                     # Publish target to device state for UI/table
-                    d.updateStateOnServer("catchupDailyTargetMins", catchup_target)
+                    self.plugin._pub.set(d, "catchupDailyTargetMins", catchup_target)
 
                     if catchup_target <= 0:
                         # Target is zero; publish zeros & clear flag
                         if st.get("catchup_active"):
                             st["catchup_active"] = False
-                            d.updateStateOnServer("catchupActive", False)
+                            self.plugin._pub.set(d, "catchupActive", False)
                         run_cu_mins = int(float(st.get("catchup_run_secs", 0.0)) // 60)
-                        d.updateStateOnServer("catchupRemainingTodayMins", 0)
-                        d.updateStateOnServer("catchupRunTodayMins", run_cu_mins)
-                        d.updateStateOnServer("catchupRunWindowAccumMins", run_cu_mins)
+                        self.plugin._pub.set(d, "catchupRemainingTodayMins", 0)
+                        self.plugin._pub.set(d, "catchupRunTodayMins", run_cu_mins)
+                        self.plugin._pub.set(d, "catchupRunWindowAccumMins", run_cu_mins)
                         if dbg5:
                             self.plugin.logger.debug(f"[CATCHUP] {d.name}: target=0 → nothing required")
                         continue
@@ -849,44 +1556,45 @@ class SolarSmartAsyncManager:
                     remaining_fallback = max(0, catchup_target - served)
 
                     # Honor Manual Override: do not start/stop under override
-                    ov_active, _ = self.plugin._override_status(d)
+                    ov_active, _ = self._override(d)
                     if ov_active:
                         # Publish remaining for visibility; stop managing catch-up
                         run_cu_mins = int(float(st.get("catchup_run_secs", 0.0)) // 60)
-                        d.updateStateOnServer("catchupRemainingTodayMins", remaining_fallback)
-                        d.updateStateOnServer("catchupRunTodayMins", run_cu_mins)
-                        d.updateStateOnServer("catchupRunWindowAccumMins", run_cu_mins)
+                        self.plugin._pub.set(d, "catchupRemainingTodayMins", remaining_fallback)
+                        self.plugin._pub.set(d, "catchupRunTodayMins", run_cu_mins)
+                        self.plugin._pub.set(d, "catchupRunWindowAccumMins", run_cu_mins)
                         if st.get("catchup_active"):
                             st["catchup_active"] = False
-                            d.updateStateOnServer("catchupActive", False)
+                            self.plugin._pub.set(d, "catchupActive", False)
                         if getattr(self.plugin, "debug6", False):  # your current catch-up debug gate
                             self.plugin.logger.debug(
                                 f"[CATCHUP][SKIP-OVERRIDE] {d.name}: override active; remaining={remaining_fallback}m")
                         continue
 
-                    start_t = self._parse_hhmm(props.get("catchupWindowStart", "00:00"))
-                    end_t = self._parse_hhmm(props.get("catchupWindowEnd", "06:00"))
-                    in_window = self._time_in_window(now_t, start_t, end_t)
-                    final_phase = self._is_final_catchup_phase(props, now)
+                    start_t, end_t = cfg.catchup_start, cfg.catchup_end
+                    in_window = cfg.in_catchup_window(now)
+                    final_phase = self._is_final_catchup_phase(cfg, now)
                     active = bool(st.get("catchup_active"))
                     is_running = self._is_running(d)
 
                     catchup_run_mins = int(float(st.get("catchup_run_secs", 0.0)) // 60)
-                    d.updateStateOnServer("catchupRemainingTodayMins", remaining_fallback)
-                    d.updateStateOnServer("catchupRunTodayMins", catchup_run_mins)
-                    d.updateStateOnServer("catchupRunWindowAccumMins", catchup_run_mins)
-                    d.updateStateOnServer("catchupActive", active)
+                    self.plugin._pub.set(d, "catchupRemainingTodayMins", remaining_fallback)
+                    self.plugin._pub.set(d, "catchupRunTodayMins", catchup_run_mins)
+                    self.plugin._pub.set(d, "catchupRunWindowAccumMins", catchup_run_mins)
+                    self.plugin._pub.set(d, "catchupActive", active)
 
                     total_candidates += 1
                     if active:
                         total_active += 1
 
                     if dbg5:
+                        flip = cfg.catchup_next_change(now)
                         self.plugin.logger.debug(
                             f"[CATCHUP][EVAL] {d.name} tier={tier} served={served}m "
                             f"target={catchup_target}m remaining={remaining_fallback}m "
                             f"active={active} running={is_running} inWindow={in_window} finalPhase={final_phase} "
                             f"win={start_t.strftime('%H:%M')}-{end_t.strftime('%H:%M')} "
+                            f"{'closes' if in_window else 'opens'}={flip.strftime('%a %H:%M') if flip else '-'} "
                             f"catchupRun={catchup_run_mins}m"
                         )
 
@@ -895,8 +1603,8 @@ class SolarSmartAsyncManager:
                         if remaining_fallback == 0:
                             self._ensure_off(d, "Catch-up target satisfied")
                             st["catchup_active"] = False
-                            d.updateStateOnServer("catchupActive", False)
-                            d.updateStateOnServer("catchupLastStop", now.strftime("%Y-%m-%d %H:%M:%S"))
+                            self.plugin._pub.set(d, "catchupActive", False)
+                            self.plugin._pub.set(d, "catchupLastStop", now.strftime("%Y-%m-%d %H:%M:%S"))
                             total_stopped += 1
                             total_satisfied += 1
                             if dbg5:
@@ -905,8 +1613,8 @@ class SolarSmartAsyncManager:
                         if not in_window:
                             self._ensure_off(d, "Catch-up window closed")
                             st["catchup_active"] = False
-                            d.updateStateOnServer("catchupActive", False)
-                            d.updateStateOnServer("catchupLastStop", now.strftime("%Y-%m-%d %H:%M:%S"))
+                            self.plugin._pub.set(d, "catchupActive", False)
+                            self.plugin._pub.set(d, "catchupLastStop", now.strftime("%Y-%m-%d %H:%M:%S"))
                             total_stopped += 1
                             if dbg5:
                                 self.plugin.logger.debug(
@@ -917,8 +1625,8 @@ class SolarSmartAsyncManager:
                         if not final_phase:
                             self._ensure_off(d,"Catch-up not allowed until final day of catch-up window")
                             st["catchup_active"] = False
-                            d.updateStateOnServer("catchupActive", False)
-                            d.updateStateOnServer("catchupLastStop", now.strftime("%Y-%m-%d %H:%M:%S"))
+                            self.plugin._pub.set(d, "catchupActive", False)
+                            self.plugin._pub.set(d, "catchupLastStop", now.strftime("%Y-%m-%d %H:%M:%S"))
                             total_skipped += 1
                             if dbg5:
                                 self.plugin.logger.debug(
@@ -969,7 +1677,7 @@ class SolarSmartAsyncManager:
                         continue
 
                     # NEW: respect cooldown for catch-up starts
-                    cooldown_ok = self._cooldown_met(d, int(props.get("cooldownMins") or 0))
+                    cooldown_ok = self._cooldown_met(d, cfg.cooldown_mins)
                     if not cooldown_ok:
                         total_skipped += 1
                         if dbg5:
@@ -997,8 +1705,8 @@ class SolarSmartAsyncManager:
                     # START for catch-up
                     self._ensure_on(d, f"Catch-up start (need {remaining_fallback}m)")
                     st["catchup_active"] = True
-                    d.updateStateOnServer("catchupActive", True)
-                    d.updateStateOnServer("catchupLastStart", now.strftime("%Y-%m-%d %H:%M:%S"))
+                    self.plugin._pub.set(d, "catchupActive", True)
+                    self.plugin._pub.set(d, "catchupLastStart", now.strftime("%Y-%m-%d %H:%M:%S"))
                     running_now += 1
                     catchup_starts_this_tick += 1
                     total_started += 1
@@ -1028,24 +1736,19 @@ class SolarSmartAsyncManager:
         if dbg:
             self.plugin.logger.debug(f"_shed_all: reason='{reason}' tiers={tiers if tiers else 'ALL'}")
 
-        for dev in indigo.devices.iter("self"):
-            if dev.deviceTypeId != "solarsmartLoad" or not dev.enabled:
-                continue
-            if tiers:
-                try:
-                    t = int(dev.pluginProps.get("tier", 0) or 0)
-                    if t not in tiers:
-                        continue
-                except Exception:
-                    pass
+        for dev in self.plugin._registry.loads(tiers):
             if self._is_running(dev):
                 self._ensure_off(dev, reason)
 
 
     async def _ticker_load_scheduler(self, period_min: float):
         """
-        Every ~period_sec: decide which solarsmartLoad devices should be ON/OFF
-        given current headroom, priorities, windows, quotas, and hysteresis.
+        Decide which solarsmartLoad devices should be ON/OFF given current headroom,
+        priorities, windows, quotas, and hysteresis.
+
+        Runs when the earliest timed event is due (see _plan_next_run), when headroom has
+        moved by schedWakeDeltaW since the last run, or at the latest every period_sec.
+        In idle mode (idleAtNight, no PV, nothing pending) the period_sec heartbeat is off.
         """
         if getattr(self.plugin, "debug2", False):
             self.plugin.logger.debug(f"_ticker_load_scheduler: starting (period={period_min} minutes)")
@@ -1064,77 +1767,813 @@ class SolarSmartAsyncManager:
 
 
         while not getattr(self.plugin, "stopThread", False):
-            # Ensure a Main device exists; if not, shed, pause, and retry
+            tick_ts = time.time()
+            deadline = tick_ts + period_sec
+            try:
+                # One run = one batch of state writes, flushed per device when it ends
+                with self.plugin._pub.batch():
+                    deadline = self._scheduler_run(tick_ts, period_sec)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self.plugin.logger.exception(f"_ticker_load_scheduler: exception: {e}")
+            finally:
+                self._snap = None
+
+            await self._sleep_until(deadline)
+
+        if getattr(self.plugin, "debug2", False):
+            self.plugin.logger.debug("_ticker_load_scheduler: exiting (stopThread set)")
 
+    def _scheduler_run(self, tick_ts: float, period_sec: float) -> float:
+        """One load scheduler run (no awaits: its state writes are one batch). Returns the next deadline."""
+        deadline = tick_ts + period_sec
+        self._snap = None
+        self._log_wake_reason(tick_ts)
+        # Ensure a Main device exists; if not, shed, pause, and retry
+        main = self._get_main_device()
+        if not main:
+            if getattr(self.plugin, "debug2", False):
+                self.plugin.logger.debug("_ticker_load_scheduler: no Main device found; pausing and retrying")
+            self._shed_all("No Main device available")
+            return deadline
+
+        # 1) Get best-available headroom from any enabled SolarSmart Main device
+        #    (interval average first: headroomBasis=interval reads it)
+        self._take_interval_headroom(main)
+        headroom_w = self._get_current_headroom_w()
+        if headroom_w is None:
+            # No main yet—shed all loads just in case
+            self._shed_all("No headroom available (no main readings)")
+            return deadline
+
+        # 1b) Input freshness policy (Main prop stalePolicy: none / freeze / shed)
+        stale_reason = self._stale_inputs_reason(main)
+        policy = ((main.pluginProps or {}).get("stalePolicy") or "none").lower()
+        if stale_reason and policy == "shed":
+            self._shed_all(f"Stale inputs: {stale_reason}")
+            self._accrue_runtime_for_running_loads(self._accrual_elapsed(tick_ts, period_sec))
+            return deadline
+        freeze_reason = stale_reason if policy == "freeze" else None
+
+        # 1c) Incremental runs: None = nothing changed (short-circuit), else rows to reuse
+        reuse = None
+        if bool((main.pluginProps or {}).get("incrementalTicks", False)):
+            reuse = self._reusable_rows(main, headroom_w, freeze_reason, tick_ts)
+            if reuse is None:
+                self._accrue_runtime_for_running_loads(self._accrual_elapsed(tick_ts, period_sec),
+                                                       load_ids=self._running_ids)
+                return self._plan_next_run(main, headroom_w, tick_ts, period_sec, rebuild=False)
+            self._dirty_all = False
+            self._dirty_loads = set()
+
+        # 2) One read of every load (device, control device, override) for the whole run
+        self._snap = self._take_snapshot(tick_ts)
+
+        # 2) Collect all loads grouped by tier + per-load skip reasons
+        #    (same pass: slot rollovers and IsRunning synced from the real devices)
+        loads_by_tier, skip_reasons = self._collect_loads_with_reasons(reuse)
+
+        # Then enforce simplified daily deficit catch-up
+        self._catchup_deficit_scheduler(loads_by_tier)
+
+        # 3) Decide ON/OFF per tier (waterfall), but keep all in the table
+        self._schedule_by_tier(loads_by_tier, headroom_w, skip_reasons, freeze_reason=freeze_reason,
+                               reuse_rows=reuse)
+        if reuse is not None:
+            self._run_inputs = (freeze_reason, self._estimator_margin_w())
+            if not reuse:
+                self._last_full_run = tick_ts
+
+        # First accrue runtime (updates run_today_secs before deficit calc)
+        self._accrue_runtime_for_running_loads(self._accrual_elapsed(tick_ts, period_sec))
+
+        # 4) Next run: earliest timed event, headroom change, or the cadence heartbeat
+        return self._plan_next_run(main, headroom_w, tick_ts, period_sec)
+
+    # ----- next-event scheduling -----
+    _SCHED_MIN_GAP_SEC = 5.0   # never re-run the scheduler faster than this after a wake-up
+    _EVENT_SLACK_SEC = 0.5     # wake just after an event so its minute / deadline has passed
+
+    @staticmethod
+    def _sched_opts(props) -> dict:
+        """Main props for scheduler wake-ups and idle mode."""
+        def _f(key, default, lo):
             try:
-                main = self._get_main_device()
-                if not main:
-                    if getattr(self.plugin, "debug2", False):
-                        self.plugin.logger.debug("_ticker_load_scheduler: no Main device found; pausing and retrying")
-                    self._shed_all("No Main device available")
-                    await asyncio.sleep(period_sec)
-                    continue
+                return max(lo, float(props.get(key, default) or default))
+            except Exception:
+                return float(default)
+        return {
+            "wake_delta_w": _f("schedWakeDeltaW", 250, 0.0),
+            "idle": bool(props.get("idleAtNight", False)),
+            "idle_pv_w": _f("idlePvW", 20, 0.0),
+            "idle_sample_secs": _f("idleSampleSecs", 300, 30.0),
+            # Emergency shed: None = off
+            "emergency_floor_w": (_f("emergencyFloorW", -1500, -math.inf)
+                                  if bool(props.get("emergencyShed", False)) else None),
+            "emergency_hold_secs": _f("emergencyHoldSecs", 10, 0.0),
+            "emergency_margin_w": _f("shedMarginW", 100, 0.0),
+            # Headroom-step power learning: steps are read this long after the last command
+            "step_learning": bool(props.get("learnStepPower", False)),
+            "step_settle_secs": _f("startSettleSecs", 60, 10.0),
+        }
 
-                # 1) Get best-available headroom from any enabled SolarSmart Main device
-                headroom_w = self._get_current_headroom_w()
-                if headroom_w is None:
-                    # No main yet—shed all loads just in case
-                    self._shed_all("No headroom available (no main readings)")
-                    await asyncio.sleep(period_sec)
-                    continue
+    @staticmethod
+    async def _wait_event(event: asyncio.Event, deadline: float):
+        """Wait until deadline (epoch, inf = no timeout) or until event is set; clears the event."""
+        timeout = None if math.isinf(deadline) else deadline - time.time()
+        if (timeout is None or timeout > 0) and not event.is_set():
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        event.clear()
 
-                # 2) Collect eligible loads grouped by tier
-                #loads_by_tier = self._collect_eligible_loads()
-                # 2) Collect all loads grouped by tier + per-load skip reasons
-                loads_by_tier, skip_reasons = self._collect_loads_with_reasons()
+    async def _sleep_until(self, deadline: float):
+        """Scheduler sleep: until deadline or a wake-up, then keep _SCHED_MIN_GAP_SEC since the last run."""
+        await self._wait_event(self._sched_wake, deadline)
+        gap = self._sched_ref.get("tick_ts", 0.0) + self._SCHED_MIN_GAP_SEC - time.time()
+        if gap > 0:
+            await asyncio.sleep(gap)
 
-                # 2) Sync IsRunning from real devices (no commands sent)
-                self._sync_running_flags_from_external(loads_by_tier)
-                # Then enforce simplified daily deficit catch-up
-                self._catchup_deficit_scheduler(loads_by_tier)
+    def mark_dirty(self, load_id: int | None, reason: str, wake: bool = False):
+        """
+        Thread-safe: a load's inputs changed (None = every load: Main settings, a load started
+        or stopped, ...). With wake=True the scheduler also runs now instead of at its next event.
+        """
+        try:
+            self.loop.call_soon_threadsafe(self._mark_dirty, load_id, reason, wake)
+        except RuntimeError:
+            pass
 
-                # 3) Decide ON/OFF per tier (waterfall), but keep all in the table
-                self._schedule_by_tier(loads_by_tier, headroom_w, skip_reasons)
+    def _mark_dirty(self, load_id: int | None, reason: str, wake: bool = False):
+        if load_id is None:
+            self._dirty_all = True
+        else:
+            self._dirty_loads.add(load_id)
+        if getattr(self.plugin, "debug2", False):
+            self.plugin.logger.debug(f"[DIRTY] {'all loads' if load_id is None else f'load #{load_id}'}: {reason}")
+        if wake:
+            self._wake_scheduler(reason)
 
-                # First accrue runtime (updates run_today_secs before deficit calc)
-                self._accrue_runtime_for_running_loads(period_sec)
+    def _wake_scheduler(self, reason: str):
+        if not self._sched_wake.is_set():
+            self._sched_wake_reason = reason
+            self._sched_wake.set()
 
+    def _maybe_wake_scheduler(self, main_id: int, sample: dict):
+        """
+        Called for every channel sample: wake the scheduler early when headroom moved by
+        schedWakeDeltaW since its last run, or, in idle mode, as soon as PV returns.
+        """
+        ref = self._sched_ref
+        if ref.get("main_id") != main_id or self._sched_wake.is_set():
+            return
+        if ref.get("idle"):
+            pv = sample.get("pv")
+            if pv is not None and pv > ref["idle_pv_w"]:
+                self._wake_scheduler(f"PV {pv:.0f} W")
+            return
+        h, last_h, delta = sample.get("headroom"), ref.get("headroom"), ref.get("wake_delta_w", 0.0)
+        if delta > 0 and h is not None and last_h is not None and abs(h - last_h) >= delta:
+            self._wake_scheduler(f"headroom {last_h} → {h:.0f} W")
+            return
+        # Three-phase site: one phase can swing while the total barely moves
+        phases, last_p = sample.get("phases"), ref.get("phases")
+        if delta > 0 and phases is not None and last_p is not None:
+            for name, p, last in zip(PHASES, phases, last_p):
+                if abs(p - last) >= delta:
+                    self._wake_scheduler(f"headroom {name} {last:.0f} → {p:.0f} W")
+                    return
 
+    # ----- emergency shed (between scheduler runs) -----
+    _EMERGENCY_REARM_SEC = 15.0     # at least this long between two emergency sheds
 
+    def _maybe_emergency_shed(self, main_id: int, sample: dict):
+        """
+        Called for every channel sample (keep it cheap): when headroom has stayed below
+        emergencyFloorW for emergencyHoldSecs, shed running loads right away instead of at
+        the next scheduler run. Options come from the last run (_sched_ref).
+        """
+        ref = self._sched_ref
+        floor = ref.get("emergency_floor_w")
+        if floor is None or ref.get("main_id") != main_id:
+            return
+        h = sample.get("headroom")
+        if h is None or h >= floor:
+            self._emergency_below_since = None
+            return
+        now = sample.get("ts") or time.time()
+        if self._emergency_below_since is None:
+            self._emergency_below_since = now
+        if now - self._emergency_below_since < ref["emergency_hold_secs"] or now < self._emergency_rearm_at:
+            return
+        self._emergency_below_since = None
+        self._emergency_rearm_at = now + max(self._EMERGENCY_REARM_SEC, ref["emergency_hold_secs"])
+        self._emergency_shed(main_id, int(round(h)), floor, ref["emergency_margin_w"], now)
 
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                self.plugin.logger.exception(f"_ticker_load_scheduler: exception: {e}")
+    def _emergency_shed(self, main_id: int, headroom_w: int, floor_w: float, margin_w: float, trigger_ts: float):
+        """
+        Shed enough running loads to cover the deficit (lowest priority first, Manual Override
+        and catch-up loads kept; same plan as shedMultiple). No table, no full run: the
+        scheduler catches up on its next run. Records the trigger-to-command latency.
+        """
+        registry = self.plugin._registry
+        running = [(self._cfg(d).tier, d) for d in registry.loads() if self._is_running(d)]
+        running.sort(key=lambda x: x[0], reverse=True)
+        with self.plugin._pub.batch():
+            after_w = self._shed_deficit(headroom_w, running, int(margin_w),
+                                         reason=f"Emergency shed (headroom {headroom_w} W below {floor_w:.0f} W)")
+            latency_ms = int(max(0.0, time.time() - trigger_ts) * 1000)
+            freed_w = after_w - headroom_w
+            main = self._tick_device(main_id)
+            if main is not None:
+                self.plugin._pub.set_many(main, [
+                    {"key": "EmergencyShedLatencyMs", "value": latency_ms},
+                    {"key": "LastEmergencyShed",
+                     "value": f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: {headroom_w} W, freed {freed_w} W"},
+                ])
+        self.plugin.logger.warning(
+            f"Emergency shed: headroom {headroom_w} W below the {floor_w:.0f} W floor → freed {freed_w} W "
+            f"in {latency_ms} ms (scheduler catches up on its next run)")
+
+    # ----- setpoint tracking (control mode "setpoint") -----
+    def _track_setpoints(self, main_id: int, sample: dict):
+        """
+        Called for every channel sample: moves the running setpoint loads so headroom stays at
+        their reserve (setpoint.plan_setpoints). Starting and stopping them is the scheduler's.
+        """
+        cmds = self.plugin._setpoint_cmd
+        if not cmds or self._sched_ref.get("main_id") != main_id:
+            return
+        h = sample.get("headroom")
+        if h is None:
+            return
+        now = sample.get("ts") or time.time()
+        tracked, devs = [], {}
+        for load_id, (watts, written, _value) in list(cmds.items()):
+            dev = self._tick_device(load_id)
+            cfg = self._cfg(dev) if dev is not None else None
+            if cfg is None or cfg.setpoint is None or not self._is_running(dev):
+                continue
+            learner = self._learners.get(load_id)
+            if learner is not None and learner.last_w is not None and now - (learner.last_ts or 0) < 30:
+                # Metered below its setting (e.g. a car tapering off): track from what it draws
+                watts = min(watts, max(cfg.setpoint.min_w, learner.last_w))
+            devs[load_id] = (dev, cfg.setpoint)
+            tracked.append(Tracked(load_id, cfg.tier, cfg.setpoint, watts, now - written))
+        plan = plan_setpoints(tracked, h, self._setpoint_yield)
+        for load_id, watts in plan.items():
+            dev, sp = devs[load_id]
+            self.plugin._write_setpoint(dev, sp, watts)
+        if plan and getattr(self.plugin, "debug2", False):
+            self.plugin.logger.debug(
+                f"[SETPOINT] headroom {h:.0f} W → " + ", ".join(f"{devs[k][0].name} {w:.0f} W" for k, w in plan.items())
+                + (f" (keeping {self._setpoint_yield[1]:.0f} W free for T{self._setpoint_yield[0]})"
+                   if self._setpoint_yield else ""))
 
-            # Sleep the cadence
-            for _ in range(int(period_sec)):
-                if getattr(self.plugin, "stopThread", False):
-                    break
-                await asyncio.sleep(1.0)
+    def _setpoint_yield_for(self, candidates, table_rows, budget_w: int, reserved_w: int):
+        """
+        Tier priority between on/off and setpoint loads: the first on/off start left waiting
+        for headroom that the running setpoint loads of lower priority tiers could make room
+        for. Returns (its tier, headroom it needs) for the tracker, or None.
+        """
+        cmds = self.plugin._setpoint_cmd
+        if not cmds or not candidates:
+            return None
+        flex = []
+        for load_id in list(cmds):
+            dev = self._tick_device(load_id)
+            if dev is not None:
+                flex.append((self._cfg(dev).tier, self._setpoint_flex_w(dev)))
+        for row_idx, cand, d, _name, _rated, _info in sorted(candidates, key=lambda c: c[1].tier):
+            row = table_rows[row_idx]
+            if row is None or row[8] != "SKIP (headroom)" or self._cfg(d).setpoint is not None:
+                continue
+            free = sum(f for tier, f in flex if tier > cand.tier)
+            if free > 0 and budget_w + free >= cand.need_w:
+                return (cand.tier, float(cand.need_w + reserved_w))
+        return None
 
+    def _log_wake_reason(self, tick_ts: float):
+        """Drop the events that are now due, mark their loads dirty and log what woke this run (debug2)."""
+        due = self._events.pop_due(tick_ts)
+        for e in due:
+            if e.key is None or e.kind == "start settled":
+                self._dirty_all = True      # slot / day rollover, ledger release: every load
+            else:
+                self._dirty_loads.add(e.key)
+        reason, self._sched_wake_reason = self._sched_wake_reason, None
+        if not getattr(self.plugin, "debug2", False):
+            return
+        names = {}
+        if due:
+            names = {d.id: d.name for d in self.plugin._registry.loads()}
+        parts = [f"{e.kind} {names.get(e.key, '')}".strip() for e in due]
+        if reason:
+            parts.append(reason)
+        self.plugin.logger.debug(f"[SCHED] run: {', '.join(parts) if parts else 'cadence'}")
+
+    def _collect_next_events(self, now_ts: float, now_dt: datetime) -> bool:
+        """
+        Rebuild self._events with every future timed event that can change a decision.
+        Returns True if something is pending now (a load running, a catch-up run active or
+        still owed inside its open window, a start settling) - which rules out idle mode.
+        """
+        heap = self._events
+        heap.clear()
+
+        def add(ts, kind, key=None):
+            if ts is not None and ts > now_ts:
+                heap.push(ts + self._EVENT_SLACK_SEC, kind, key)
+
+        busy = len(self._start_ledger) > 0
+        slots = {}  # quota window key -> next aligned slot start
+        self._running_ids = set()
+        for dev in self._tick_devices():
+            cfg = self._cfg(dev)
+            st = self.plugin._load_state.get(dev.id, {})
+            running = self._is_running(dev)
+            busy = busy or running or bool(st.get("catchup_active"))
+            if running:
+                self._running_ids.add(dev.id)
+
+            flip = cfg.run_next_change(now_dt)
+            add(flip.timestamp() if flip else None, "window", dev.id)
+            if cfg.enable_catchup:
+                flip = cfg.catchup_next_change(now_dt)
+                add(flip.timestamp() if flip else None, "catch-up window", dev.id)
+                _last, cu_next, _key = self._aligned_last_next_cu_slot(cfg, now_dt)
+                add(cu_next.timestamp(), "catch-up slot", dev.id)
+                if cfg.catchup_window not in ("12h", "24h"):
+                    add((cu_next - dt.timedelta(days=1)).timestamp(), "catch-up final phase", dev.id)
+                if cfg.in_catchup_window(now_dt) and cfg.catchup_target_mins > self._served_catchup_mins(dev):
+                    busy = True
+            if cfg.quota_window not in slots:
+                slots[cfg.quota_window] = self._aligned_last_next_slot(cfg.quota_window, now_dt)[1].timestamp()
+
+            add(st.get("override_until_ts"), "override ends", dev.id)
+            if running:
+                start_ts = st.get("start_ts")
+                if start_ts and cfg.min_runtime_mins > 0:
+                    add(float(start_ts) + cfg.min_runtime_mins * 60, "min-runtime", dev.id)
+                if cfg.quota_target_mins > 0:
+                    left = max(0, cfg.quota_target_mins - self._served_quota_mins(dev))
+                    add(now_ts + left * 60 - self._accrue_carry_s, "quota used", dev.id)
+                if cfg.stages:
+                    active = self._stage(dev)
+                    if active > 1 and cfg.stage_min_run_mins > 0:
+                        add(st.get("stage_on_ts", {}).get(active, 0.0) + cfg.stage_min_run_mins * 60,
+                            "stage min-runtime", dev.id)
+                    if active < len(cfg.stages) and cfg.stage_cooldown_mins > 0:
+                        add(st.get("stage_off_ts", {}).get(active + 1, 0.0) + cfg.stage_cooldown_mins * 60,
+                            "stage cooldown", dev.id)
+            else:
+                t0 = st.get("cooldown_start")
+                if t0 and cfg.cooldown_mins > 0:
+                    add(float(t0) + cfg.cooldown_mins * 60, "cooldown", dev.id)
+
+        for key, ts in slots.items():
+            add(ts, f"quota slot {key}")
+        for key, _w, until in self._start_ledger.items():
+            add(until, "start settled", key)
+        midnight = datetime.combine(now_dt.date() + dt.timedelta(days=1), dtime(0, 0))
+        add(midnight.timestamp(), "day rollover")
+        return busy
+
+    def _plan_next_run(self, main, headroom_w: int, tick_ts: float, period_sec: float,
+                       rebuild: bool = True) -> float:
+        """
+        After a run: rebuild the event heap, decide idle vs active, publish SchedulerMode /
+        NextEvent on the Main and return when the scheduler should run next.
+        Active: earliest event or tick_ts + period_sec. Idle: earliest event only (PV coming
+        back wakes it through _maybe_wake_scheduler).
+        rebuild=False (short-circuited incremental run): nothing changed, keep the heap.
+        """
+        opts = self._sched_opts(main.pluginProps or {})
+        if rebuild:
+            self._sched_busy = self._collect_next_events(tick_ts, datetime.fromtimestamp(tick_ts))
+        busy = self._sched_busy
+
+        idle = False
+        if opts["idle"] and not busy:
+            sample = self._latest_sample.get(main.id)   # may be older than the freshness limit while idle
+            pv = sample.get("pv") if sample else None
+            idle = pv is not None and pv <= opts["idle_pv_w"]
+        self._set_idle(main, idle, opts)
+
+        nxt = self._events.peek()
+        deadline = nxt.when if nxt else math.inf
+        if not idle:
+            deadline = min(deadline, tick_ts + period_sec)
+        sample = self._latest_sample.get(main.id)
+        self._sched_ref = {"main_id": main.id, "tick_ts": tick_ts, "headroom": headroom_w, "idle": idle,
+                           "phases": sample.get("phases") if sample else None, **opts}
+
+        if nxt:
+            name = ""
+            if nxt.key is not None:
+                try:
+                    name = f" {indigo.devices[nxt.key].name}"
+                except Exception:
+                    name = ""
+            next_txt = f"{datetime.fromtimestamp(nxt.when).strftime('%a %H:%M:%S')} {nxt.kind}{name}"
+        else:
+            next_txt = ""
+        try:
+            if self.plugin._pub.get(main, "NextEvent") != next_txt:
+                self.plugin._pub.set(main, "NextEvent", next_txt)
+        except Exception:
+            pass
         if getattr(self.plugin, "debug2", False):
-            self.plugin.logger.debug("_ticker_load_scheduler: exiting (stopThread set)")
+            wait = deadline - time.time()
+            self.plugin.logger.debug(
+                f"[SCHED] {'idle' if idle else 'active'}: {len(self._events)} timed events, next: {next_txt or '-'}; "
+                f"sleeping {'until woken' if math.isinf(wait) else f'{max(0.0, wait):.0f}s'}"
+            )
+        return deadline
+
+    def _set_idle(self, main, idle: bool, opts: dict):
+        """Enter / leave idle mode for a Main: parks or resumes its sampling, publishes SchedulerMode."""
+        was_idle = main.id in self._idle_mains
+        if idle and not was_idle:
+            self._idle_mains.add(main.id)
+            self.plugin.logger.info(
+                f"SolarSmart scheduler idle: no PV and nothing pending; sampling every "
+                f"{opts['idle_sample_secs']:.0f}s until PV returns or the next timed event.")
+        elif not idle and was_idle:
+            self._idle_mains.discard(main.id)
+            self._next_sample_at[main.id] = 0.0
+            self._main_wake.set()
+            self.plugin.logger.info("SolarSmart scheduler active again.")
+        mode = "idle" if idle else "active"
+        try:
+            if self.plugin._pub.get(main, "SchedulerMode") != mode:
+                self.plugin._pub.set(main, "SchedulerMode", mode)
+        except Exception:
+            pass
 
-    def _accrue_runtime_for_running_loads(self, period_sec: float):
+    # ----- per-run load snapshot -----
+    def _take_snapshot(self, now_ts: float) -> TickSnapshot:
+        """
+        Read every started Load once for this run: the device, its LoadConfig, the logical
+        on-state of its control device and its manual override status (which also expires
+        old overrides). Control and power meter devices are fetched once, even if shared;
+        a Load with a powerSource gets its meter reading fed to its PowerLearner.
         """
-        Accrue per-tick runtime:
+        fetched = {}    # control / meter device id -> device (None = missing)
+        snaps = []
+        for dev in self.plugin._registry.loads():
+            cfg = self._cfg(dev)
+            ext_on = None
+            target_id = cfg.control_device_id
+            if cfg.control_mode == "device" and target_id > 0:
+                on = self._read_physical_on(self._fetch(fetched, target_id))
+                if on is not None:
+                    ext_on = (not on) if cfg.invert_on_off else on
+            if cfg.power_source:
+                self._observe_power(dev, cfg, self._fetch(fetched, cfg.power_source[0]), now_ts)
+            snaps.append(LoadSnap(dev, cfg, ext_on, self.plugin._override_status(dev)))
+        if getattr(self.plugin, "debug8", False):
+            self.plugin.logger.debug(f"[DBG8][snapshot] {len(snaps)} load(s), {len(fetched)} control / meter device(s)")
+        return TickSnapshot(now_ts, snaps)
+
+    @staticmethod
+    def _fetch(fetched: dict, dev_id: int):
+        if dev_id not in fetched:
+            try:
+                fetched[dev_id] = indigo.devices[dev_id]
+            except Exception:
+                fetched[dev_id] = None
+        return fetched[dev_id]
+
+    @staticmethod
+    def _read_physical_on(tgt) -> bool | None:
+        if tgt is None:
+            return None
+        try:
+            return bool(tgt.onState)
+        except Exception:
+            return bool(tgt.states.get("onOffState", False))
+
+    # ----- measured load power -----
+    # A learned figure has to move this far before the load is re-evaluated (incremental runs)
+    _POWER_DIRTY_W = 50
+
+    def _learner(self, dev, cfg: LoadConfig) -> PowerLearner | None:
+        """The Load's PowerLearner (None without a powerSource), restored from its states."""
+        if not cfg.power_source:
+            return None
+        learner = self._learners.get(dev.id)
+        if learner is None:
+            num = self._state_watts
+            learner = self._learners[dev.id] = PowerLearner(
+                num(dev, "PowerSteadyW"), num(dev, "PowerInrushW"),
+                int(num(dev, "PowerSamples") or 0), int(num(dev, "PowerStarts") or 0))
+        return learner
+
+    def _state_watts(self, dev, key: str) -> float | None:
+        """A persisted numeric state (learned figures), None if unset / 0."""
+        try:
+            v = float(self.plugin._pub.get(dev, key, 0) or 0)
+        except (TypeError, ValueError):
+            v = 0.0
+        return v if v > 0 else None
+
+    def observe_power(self, meter_id: int):
+        """Thread-safe: a power meter device changed (deviceUpdated / Direct Meter reading)."""
+        try:
+            self.loop.call_soon_threadsafe(self._observe_meter, meter_id)
+        except RuntimeError:
+            pass
+
+    def reset_power_learner(self, dev_id: int):
+        """Thread-safe: a Load was pointed at another power meter; learn its figures from scratch."""
+        try:
+            self.loop.call_soon_threadsafe(self._learners.pop, dev_id, None)
+        except RuntimeError:
+            pass
+
+    def forget_load(self, dev_id: int):
+        """Thread-safe: a device was deleted; drop its fair-share tag, power learner and headroom steps."""
+        try:
+            self.loop.call_soon_threadsafe(self._forget_load, dev_id)
+        except RuntimeError:
+            pass
+
+    def _forget_load(self, dev_id: int):
+        self._fair.remove(dev_id)
+        self._learners.pop(dev_id, None)
+        self._steps.forget(dev_id)
+
+    def _observe_meter(self, meter_id: int):
+        try:
+            meter_dev = indigo.devices[meter_id]
+        except Exception:
+            meter_dev = None
+        now_ts = time.time()
+        for load_id in self.plugin._registry.loads_for_meter(meter_id):
+            try:
+                dev = indigo.devices[load_id]
+            except Exception:
+                continue
+            cfg = self._cfg(dev)
+            if cfg.power_source and cfg.power_source[0] == meter_id:
+                self._observe_power(dev, cfg, meter_dev, now_ts)
+
+    def _observe_power(self, dev, cfg: LoadConfig, meter_dev, now_ts: float):
+        """Feed one reading of a Load's power meter to its learner and publish the figures."""
+        meter_id, key, scale = cfg.power_source
+        live = self.plugin._meter_values.get(meter_id) if key == "Power" else None
+        if live is not None:
+            watts = live[0]     # Direct Meter: its latest in-process reading
+        elif meter_dev is not None:
+            watts = self.plugin._adapters.convert((meter_id, key, False), meter_dev.states.get(key, None), False)
+        else:
+            watts = None
+        if watts is None:
+            return
+        watts *= scale
+        learner = self._learner(dev, cfg)
+        start_ts = None
+        if self._is_running(dev):
+            start_ts = float(self.plugin._load_state.get(dev.id, {}).get("start_ts") or 0.0)
+        before = power_figures(cfg, learner)
+        kv = [{"key": "MeasuredPowerW", "value": int(round(watts))}]
+        if cfg.stages and self._stage(dev) > 1:
+            pass    # the learner's figures are stage 1's: readings with more stages on are not its draw
+        elif learner.observe(watts, now_ts, start_ts, cfg.power_inrush_secs, cfg.rated_w):
+            kv += [{"key": "PowerSteadyW", "value": int(round(learner.steady_w or 0))},
+                   {"key": "PowerInrushW", "value": int(round(learner.inrush_w or 0))},
+                   {"key": "PowerSamples", "value": learner.steady_n},
+                   {"key": "PowerStarts", "value": learner.starts}]
+            after = power_figures(cfg, learner)
+            if (before.measured != after.measured
+                    or max(abs(a - b) for a, b in zip(before[:4], after[:4])) >= self._POWER_DIRTY_W):
+                self._mark_dirty(dev.id, f"measured power {after.draw_w} W (start {after.needed_w} W)")
+        try:
+            self.plugin._pub.set_many(dev, kv)
+        except Exception:
+            pass
+
+    # ----- load power from headroom steps -----
+    def _step_actuated(self, dev, on: bool):
+        """A start / stop we commanded: a step the learner will measure (Main prop learnStepPower)."""
+        if not self._sched_ref.get("step_learning"):
+            return
+        cfg = self._cfg(dev)
+        if cfg.setpoint is not None or cfg.stages:
+            return      # its draw is what it is set to / what its stages add; no single step to fit
+        prior_w = power_figures(cfg, self._learner(dev, cfg)).draw_w
+        self._steps.actuated(dev.id, on, time.time(), prior_w,
+                             self._state_watts(dev, "StepPowerW"), int(self._state_watts(dev, "StepSamples") or 0))
+
+    def _maybe_step_sample(self, main_id: int, sample: dict):
+        """Called for every channel sample (keep it cheap): feeds the scheduler Main's headroom to the step learner."""
+        ref = self._sched_ref
+        if not ref.get("step_learning") or ref.get("main_id") != main_id:
+            return
+        self._steps.settle_secs = ref["step_settle_secs"]
+        result = self._steps.sample(sample.get("ts") or time.time(), sample.get("headroom"))
+        if result is not None:
+            self._step_measured(result)
+
+    def _step_measured(self, res: StepResult):
+        """Publish the estimates of the loads in a measured step and flag starts that showed no step."""
+        when = datetime.fromtimestamp(res.ts).strftime("%Y-%m-%d %H:%M:%S")
+        dbg = getattr(self.plugin, "debug2", False)
+        with self.plugin._pub.batch():
+            for load_id, d in res.dirs.items():
+                dev = self._tick_device(load_id)
+                if dev is None:
+                    continue
+                est = self._steps.estimate(load_id)
+                kv = [{"key": "StepSamples", "value": self._steps.samples(load_id)}]
+                if est is not None:
+                    kv.append({"key": "StepPowerW", "value": int(round(est))})
+                if d > 0:
+                    if load_id in res.failed:
+                        check = (f"{when} no step: headroom moved {res.drop_w:.0f} W, "
+                                 f"expected {res.expected_w:.0f} W")
+                        kv.append({"key": "StartFailures",
+                                   "value": int(self.plugin._pub.get(dev, "StartFailures", 0) or 0) + 1})
+                        self.plugin.logger.warning(
+                            f"'{dev.name}' was started but headroom did not drop (moved {res.drop_w:.0f} W, "
+                            f"expected {res.expected_w:.0f} W): the start command may not have taken effect.")
+                    elif res.checked:
+                        check = f"{when} ok: headroom dropped {res.drop_w:.0f} W (expected {res.expected_w:.0f} W)"
+                    else:
+                        check = f"{when} not verified: readings too noisy (±{res.noise_w:.0f} W)"
+                    kv.append({"key": "LastStartCheck", "value": check})
+                self.plugin._pub.set_many(dev, kv)
+                self._mark_dirty(load_id, "headroom step measured")
+        if dbg:
+            self.plugin.logger.debug(
+                f"[STEP] {dict(res.dirs)}: drop {res.drop_w:.0f} W, expected {res.expected_w:.0f} W, "
+                f"noise {res.noise_w:.0f} W, failed {list(res.failed)}")
+
+    def _tick_devices(self, ids=None) -> list:
+        """Load devices of the run in progress (snapshot), else fetched from Indigo."""
+        if self._snap is not None:
+            return self._snap.devices(ids)
+        registry = self.plugin._registry
+        return registry.loads() if ids is None else registry.loads_by_id(sorted(ids))
+
+    def _tick_device(self, load_id: int):
+        snap = self._snap.get(load_id) if self._snap is not None else None
+        if snap is not None:
+            return snap.dev
+        try:
+            return indigo.devices[load_id]
+        except Exception:
+            return None
+
+    def _override(self, dev) -> tuple[bool, float | None]:
+        """Manual override (active, until_ts) as read at the start of this run."""
+        snap = self._snap.get(dev.id) if self._snap is not None else None
+        if snap is not None:
+            return snap.override_active, snap.override_until
+        return self.plugin._override_status(dev)
+
+    def _ext_on(self, dev) -> bool | None:
+        """Logical on-state of the load's control device as read at the start of this run."""
+        snap = self._snap.get(dev.id) if self._snap is not None else None
+        if snap is not None:
+            return snap.ext_on
+        return self.plugin._external_on_state(dev)
+
+    # ----- incremental runs (dirty tracking) -----
+    _FULL_RUN_MAX_AGE_SEC = 600.0   # re-evaluate every load at least this often
+    _SHED_FLOOR_W = -100            # headroom (total or one phase) below this sheds; incremental runs wake on it
+    # Decisions that only change when one of the load's inputs does (timer, config, switch,
+    # or headroom crossing its threshold); anything else is looked at again on the next run
+    _STABLE_ACTIONS = frozenset(("KEEP", "SKIP (override)", "SKIP (window (DOW))", "SKIP (window (time))",
+                                 "SKIP (quota)", "SKIP (cooldown)", "SKIP (headroom)", "SKIP (cap)",
+                                 "SKIP (conc)"))
+
+    def _reusable_rows(self, main, headroom_w: int, freeze_reason: str | None, now_ts: float) -> dict | None:
+        """
+        Incremental runs: which loads' last decision and table row still hold.
+        Returns None when nothing at all changed (the run is skipped), else {load id: row}
+        for the loads that need no fresh look (empty = evaluate everything).
+        A load is dirty when it was marked (timer due, config edited, switch flipped) or when
+        headroom left the band in which its decision was made.
+        """
+        if self._dirty_all or now_ts - self._last_full_run >= self._FULL_RUN_MAX_AGE_SEC:
+            return {}
+        if self._run_inputs != (freeze_reason, self._estimator_margin_w()):
+            return {}
+        if self._band_ids != self.plugin._registry.load_ids():
+            return {}
+        instant_w = None
+        sample = self.latest_sample(main.id)
+        if sample is not None and sample.get("headroom") is not None:
+            instant_w = int(round(sample["headroom"]))
+        # Stops and shedding look at the lower of basis and instant headroom, starts at the basis
+        low_w = headroom_w if instant_w is None else min(headroom_w, instant_w)
+        if self._shed_floor is not None and low_w < self._shed_floor:
+            return {}
+        phases = sample.get("phases") if sample is not None else None
+        if phases is not None and self._shed_floor is not None and min(phases) < self._shed_floor:
+            return {}       # a phase importing: shed pass
+        reuse = {}
+        for load_id, (lo, hi, row) in self._load_bands.items():
+            if load_id not in self._dirty_loads and lo <= low_w and headroom_w < hi:
+                reuse[load_id] = row
+        if len(reuse) == len(self._load_bands):
+            if getattr(self.plugin, "debug2", False):
+                self.plugin.logger.debug(f"[SCHED] nothing changed: kept {len(reuse)} decisions, run skipped")
+            return None
+        if getattr(self.plugin, "debug2", False):
+            self.plugin.logger.debug(f"[SCHED] incremental run: {len(self._load_bands) - len(reuse)} load(s) "
+                                     f"re-evaluated, {len(reuse)} kept")
+        return reuse
+
+    def _record_bands(self, loads_by_tier, table_rows, row_of, headroom_w: int, reserved_w: int):
+        """
+        After an evaluated run: per load, the headroom band [lo, hi) in which its decision
+        holds. KEEP holds until headroom drops below -hysteresis; a start skipped for headroom
+        or slots until headroom crosses need + reserved; stable SKIPs hold at any headroom.
+        Everything else (START, STOP, sustain, catch-up, ...) gets an empty band.
+        """
+        bands, ids, any_running = {}, [], False
+        for _tier, devs in sorted(loads_by_tier.items()):
+            for d in devs:
+                ids.append(d.id)
+                idx = row_of.get(d.id)
+                row = table_rows[idx] if idx is not None else None
+                action = row[8] if row is not None else None
+                lo, hi = math.inf, -math.inf
+                if action in self._STABLE_ACTIONS:
+                    lo, hi = -math.inf, math.inf
+                    if action == "KEEP":
+                        any_running = True
+                        cfg = self._cfg(d)
+                        if self.plugin._load_state.get(d.id, {}).get("catchup_active"):
+                            lo, hi = math.inf, -math.inf
+                        else:
+                            lo = -cfg.shed_hysteresis_w
+                            # Multi-stage load below its top stage: until the next stage fits
+                            up_w = next_stage_need_w(cfg.stages, self._stage(d), cfg.surge_mult,
+                                                     cfg.start_margin) if cfg.stages else None
+                            if up_w is not None and headroom_w < up_w + reserved_w:
+                                hi = up_w + reserved_w
+                    elif action in ("SKIP (headroom)", "SKIP (cap)", "SKIP (conc)"):
+                        threshold = row[6] + reserved_w
+                        if headroom_w >= threshold:
+                            lo = threshold
+                        else:
+                            hi = threshold
+                bands[d.id] = (lo, hi, row)
+        self._load_bands = bands
+        self._band_ids = tuple(sorted(ids, key=lambda i: (self.plugin._registry.tier(i), i)))
+        self._shed_floor = self._SHED_FLOOR_W if any_running else None
+
+    def _reused_row(self, d, row: tuple) -> tuple:
+        """A kept row, with the run-time columns of a running load brought up to date."""
+        if row[3] != "RUN":
+            return row
+        cfg = self._cfg(d)
+        try:
+            run_min = int(self.plugin._pub.get(d, "RuntimeWindowMins", 0) or 0)
+        except Exception:
+            run_min = row[4]
+        remaining = max(0, cfg.quota_target_mins - self._served_quota_mins(d)) if cfg.quota_target_mins > 0 else 0
+        return row[:4] + (run_min, remaining) + row[6:]
+
+    def _accrual_elapsed(self, now_ts: float, period_sec: float) -> float:
+        """
+        Seconds to accrue for this run: real time since the previous accrual, capped at one
+        cadence period (a load is never unobserved for longer). The first run credits a period.
+        """
+        last = self._last_accrual_ts
+        self._last_accrual_ts = now_ts
+        if last is None:
+            return float(period_sec)
+        return max(0.0, min(now_ts - last, float(period_sec)))
+
+    def _accrue_runtime_for_running_loads(self, elapsed_sec: float, load_ids=None):
+        """
+        Accrue runtime for the elapsed time since the previous scheduler run:
           - Quota minutes (RuntimeQuotaMins)
           - Window runtime (RuntimeWindowMins) for UI
           - Per-day runtime seconds (run_today_secs) for simplified catch-up
           - RemainingQuotaMins
+        Runs are no longer evenly spaced, so whole minutes are credited and the remainder
+        carries over to the next run. load_ids limits the pass to those loads (short-circuited
+        incremental runs only touch the running ones). Uses the run's snapshot devices.
         """
-        add_m = self._quota_tick_minutes(period_sec)
+        total_s = max(0.0, float(elapsed_sec)) + self._accrue_carry_s
+        add_m = int(total_s // 60)
+        self._accrue_carry_s = total_s - add_m * 60
         add_s = add_m * 60
         now_ts = time.time()
         today_key = datetime.now().strftime("%Y-%m-%d")
 
-        for dev in indigo.devices.iter("self"):
-            if dev.deviceTypeId != "solarsmartLoad" or not dev.enabled:
-                continue
-            props = dev.pluginProps or {}
-            self._ensure_quota_anchor(dev, props, now_ts)
-            self._maybe_rollover_catchup_window(dev, props, now_ts)
+        for dev in self._tick_devices(load_ids):
+            cfg = self._cfg(dev)
+            self._ensure_quota_anchor(dev, cfg, now_ts)
+            self._maybe_rollover_catchup_window(dev, cfg, now_ts)
 
             st = self.plugin._load_state.setdefault(dev.id, {})
 
@@ -1145,21 +2584,27 @@ class SolarSmartAsyncManager:
                 # If a catch-up run was active, clear the flag (we'll re-evaluate deficit next scheduler pass)
                 if st.get("catchup_active"):
                     st["catchup_active"] = False
-                    dev.updateStateOnServer("catchupActive", False)
+                    self.plugin._pub.set(dev, "catchupActive", False)
 
-            if not self._is_running(dev):
+            if not self._is_running(dev) or add_m <= 0:
                 # Still refresh RemainingQuotaMins (quota may have rolled over)
-                self._quota_remaining_mins(dev, props, datetime.now())
+                self._quota_remaining_mins(dev, cfg, datetime.now())
                 continue
 
-            # 1. Quota minutes
-            self._add_served_minutes(dev, add_m)
-            self._add_served_catchup_minutes(dev, add_m)
+            # 1. Quota minutes (multi-stage loads: full-power minutes, the remainder carries over)
+            credit_m = add_m
+            if cfg.stages:
+                owed = float(st.get("stage_carry_m", 0.0)) + add_m * credit_fraction(cfg.stages, self._stage(dev))
+                credit_m = int(owed)
+                st["stage_carry_m"] = owed - credit_m
+            self._add_served_minutes(dev, credit_m)
+            self._fair.charge(dev.id, credit_m)
+            self._add_served_catchup_minutes(dev, credit_m)
 
             # 2. Window runtime minutes (purely cosmetic)
             try:
-                cur_window = int(dev.states.get("RuntimeWindowMins", 0) or 0)
-                dev.updateStateOnServer("RuntimeWindowMins", cur_window + add_m)
+                cur_window = int(self.plugin._pub.get(dev, "RuntimeWindowMins", 0) or 0)
+                self.plugin._pub.set(dev, "RuntimeWindowMins", cur_window + add_m)
             except Exception:
                 pass
 
@@ -1177,7 +2622,7 @@ class SolarSmartAsyncManager:
                     st["catchup_run_secs"] = add_s
 
             # 4. Refresh RemainingQuotaMins
-            self._quota_remaining_mins(dev, props, datetime.now())
+            self._quota_remaining_mins(dev, cfg, datetime.now())
 
 ## Render Table Code Base
 
@@ -1454,17 +2899,22 @@ class SolarSmartAsyncManager:
 # ========== Headroom ==========
     def _get_current_headroom_w(self) -> int | None:
         """
-        Pick the first enabled SolarSmart Main device and read Headroom if present.
+        Prefer the latest fresh channel sample for the Main device (poll or event driven).
+        Otherwise pick the first enabled SolarSmart Main device and read Headroom if present.
         If Headroom missing, compute PV - Consumption (best effort).
         """
-        for dev in indigo.devices.iter("self"):
-            if dev.deviceTypeId != "solarsmartMain":
-                continue
-            if not dev.enabled:
-                continue
-
+        main = self._get_main_device()
+        if main:
+            basis = self._headroom_basis_w(main)
+            if basis is not None:
+                return basis
+            sample = self.latest_sample(main.id)
+            if sample is not None and sample.get("headroom") is not None:
+                return int(round(sample["headroom"]))
+
+        for dev in self.plugin._registry.mains():
             # Prefer existing Headroom state if available
-            headroom = dev.states.get("Headroom", None)
+            headroom = self.plugin._pub.get(dev, "Headroom", None)
             if headroom is not None:
                 try:
                     return int(headroom)
@@ -1472,8 +2922,8 @@ class SolarSmartAsyncManager:
                     pass
 
             # Fallback compute
-            pv = dev.states.get("SolarProduction", None)
-            cons = dev.states.get("SiteConsumption", None)
+            pv = self.plugin._pub.get(dev, "SolarProduction", None)
+            cons = self.plugin._pub.get(dev, "SiteConsumption", None)
             if pv is not None and cons is not None:
                 try:
                     return int(pv) - int(cons)
@@ -1482,6 +2932,83 @@ class SolarSmartAsyncManager:
 
         return None
 
+    def _estimator_margin_w(self) -> int:
+        """
+        Extra Watts every start must clear when the Main fuses its sources (fuseHeadroom):
+        fuseMarginSigma x the estimator's current uncertainty. 0 when fusion is off.
+        """
+        main = self._get_main_device()
+        if not main:
+            return 0
+        props = main.pluginProps or {}
+        if not bool(props.get("fuseHeadroom", False)):
+            return 0
+        sample = self.latest_sample(main.id)
+        if not sample or sample.get("uncertainty") is None:
+            return 0
+        try:
+            k = max(0.0, float(props.get("fuseMarginSigma", "1") or 0))
+        except Exception:
+            k = 1.0
+        margin = int(round(k * sample["uncertainty"]))
+        if margin and getattr(self.plugin, "debug2", False):
+            self.plugin.logger.debug(f"[FUSED] start margin +{margin} W "
+                                     f"({k:g} x uncertainty {sample['uncertainty']:.0f} W)")
+        return margin
+
+    def _headroom_basis_w(self, main) -> int | None:
+        """
+        Optional smoothed headroom for scheduling decisions (Main prop headroomBasis):
+          instant (default) -> None, caller uses the latest sample
+          ema / mean / min / p10 -> rolling value over statsWindowMins from the telemetry ring
+          interval -> energy-integrated mean headroom since the previous scheduler tick
+        """
+        props = main.pluginProps or {}
+        basis = (props.get("headroomBasis") or "instant").lower()
+        if basis == "instant" or self.latest_sample(main.id) is None:
+            return None
+        if basis == "interval":
+            value = self._interval_headroom.get(main.id)
+            if value is not None and getattr(self.plugin, "debug2", False):
+                self.plugin.logger.debug(f"_get_current_headroom_w: basis=interval (trapezoid mean since last tick) -> {value} W")
+            return value
+        try:
+            window_min = max(1.0, float(props.get("statsWindowMins", "5") or 5))
+        except Exception:
+            window_min = 5.0
+        stats = self.rolling_stats(main.id, "headroom", window_min * 60.0)
+        if not stats or not stats.get("count"):
+            return None
+        value = stats.get(basis)
+        if value is None:
+            return None
+        if getattr(self.plugin, "debug2", False):
+            self.plugin.logger.debug(
+                f"_get_current_headroom_w: basis={basis} over {window_min:g} min -> {value:.0f} W "
+                f"({stats['count']} samples)"
+            )
+        return int(round(value))
+
+    def _stale_inputs_reason(self, main) -> str | None:
+        """
+        Why the headroom inputs cannot be trusted right now (None if they can): no fresh
+        channel sample at all, or the watchdog flagged a stale / stuck / unreadable source.
+        Logs once per change of reason.
+        """
+        sample = self.latest_sample(main.id)
+        if sample is None:
+            reason = f"no headroom sample for over {int(self._SAMPLE_MAX_AGE_SEC)}s"
+        else:
+            reason = "; ".join(sample.get("stale") or []) or None
+        last = self._stale_logged.get(main.id)
+        if reason != last:
+            self._stale_logged[main.id] = reason
+            if reason:
+                self.plugin.logger.warning(f"{main.name}: input watchdog: {reason}")
+            elif last:
+                self.plugin.logger.info(f"{main.name}: input watchdog: inputs fresh again")
+        return reason
+
     def _quota_window_minutes(self, props) -> int:
         """Map device's quotaWindow to minutes using the single source of truth."""
         period = (props.get("quotaWindow") or "24h").lower()
@@ -1501,7 +3028,7 @@ class SolarSmartAsyncManager:
         return days
 
         # Replace the entire body of _maybe_rollover_quota with this version
-    def _maybe_rollover_quota(self, dev: indigo.Device, props: dict, now_ts: float = None):
+    def _maybe_rollover_quota(self, dev: indigo.Device, cfg: LoadConfig, now_ts: float = None):
         """
             Align quota window to fixed LOCAL slots (06:00-based):
               - 12h: 06:00 and 18:00 daily
@@ -1514,7 +3041,7 @@ class SolarSmartAsyncManager:
         try:
             st = self.plugin._load_state.setdefault(dev.id, {})
             # Compute current aligned slot
-            last_dt, next_dt, slot_key = self._aligned_last_next_slot(props, now=datetime.now())
+            last_dt, next_dt, slot_key = self._aligned_last_next_slot(cfg.quota_window, now=datetime.now())
             last_ts = last_dt.timestamp()
             next_ts = next_dt.timestamp()
 
@@ -1522,7 +3049,7 @@ class SolarSmartAsyncManager:
             anchor = st.get("quota_anchor_ts")
             if anchor is None or not (last_ts <= float(anchor) < next_ts):
                 st["quota_anchor_ts"] = last_ts
-                dev.updateStateOnServer("QuotaAnchorTs", f"{last_ts:.3f}")
+                self.plugin._pub.set(dev, "QuotaAnchorTs", f"{last_ts:.3f}")
 
             # If we've already applied this slot's reset, nothing to do
             applied_key = st.get("aligned_slot_key")
@@ -1543,28 +3070,26 @@ class SolarSmartAsyncManager:
 
             # We advanced into a new slot -> reset counters
             st["served_quota_mins"] = 0
-            dev.updateStateOnServer("RuntimeQuotaMins", 0)
-            dev.updateStateOnServer("RuntimeWindowMins", 0)
+            self._fair.reset(dev.id)
+            self.plugin._pub.set(dev, "RuntimeQuotaMins", 0)
+            self.plugin._pub.set(dev, "RuntimeWindowMins", 0)
 
             # Reset catch-up run accumulation for the new slot
             st["catchup_run_secs"] = 0.0
             try:
-                dev.updateStateOnServer("catchupRunTodayMins", 0)
-                dev.updateStateOnServer("catchupRunWindowAccumMins", 0)
-                dev.updateStateOnServer("catchupRemainingTodayMins", 0)  # recomputed next tick
-                dev.updateStateOnServer("catchupActive", False)
+                self.plugin._pub.set(dev, "catchupRunTodayMins", 0)
+                self.plugin._pub.set(dev, "catchupRunWindowAccumMins", 0)
+                self.plugin._pub.set(dev, "catchupRemainingTodayMins", 0)  # recomputed next tick
+                self.plugin._pub.set(dev, "catchupActive", False)
             except Exception:
                 pass
 
             # Refill RemainingQuotaMins from device props
-            try:
-                target = int(props.get("maxRuntimePerQuotaMins") or 0)
-            except Exception:
-                target = 0
-            dev.updateStateOnServer("RemainingQuotaMins", max(0, target))
+            target = cfg.quota_target_mins
+            self.plugin._pub.set(dev, "RemainingQuotaMins", max(0, target))
 
             # Friendly log
-            period_key = self._aligned_window_key(props)
+            period_key = cfg.quota_window
             self.plugin.logger.info(
                 f"Quota window reset for '{dev.name}': aligned slot={slot_key} (period {period_key}); "
                 f"RemainingQuotaMins set to {target}."
@@ -1574,7 +3099,7 @@ class SolarSmartAsyncManager:
 
     # ========== Gather loads ==========
     # REPLACE the entire _collect_loads_with_reasons with this version
-    def _collect_loads_with_reasons(self) -> tuple[dict[int, list[indigo.Device]], dict[int, str]]:
+    def _collect_loads_with_reasons(self, reuse: dict | None = None) -> tuple[dict[int, list[indigo.Device]], dict[int, str]]:
         """
         Return:
           - dict of tier -> [all load devices], regardless of eligibility
@@ -1582,44 +3107,55 @@ class SolarSmartAsyncManager:
 
         Manual override:
           - If active, reason='override' (we will NOT enforce OFF; we only SKIP).
+
+        Also the per-load preparation of the run, in the same pass: quota / catch-up slot
+        rollovers, then IsRunning mirrored from the control device (no commands sent), so the
+        reasons below see the current slot and the real on/off state.
+
+        reuse (incremental runs): {load id: last table row}; those loads keep the skip reason
+        shown in that row instead of being checked again.
         """
         tiers: dict[int, list[indigo.Device]] = {}
         skip_reasons: dict[int, str] = {}
 
         now = datetime.now()
-
-        for dev in indigo.devices.iter("self"):
-            if dev.deviceTypeId != "solarsmartLoad" or not dev.enabled:
+        now_ts = now.timestamp()
+
+        for dev in self._tick_devices():
+            cfg = self._cfg(dev)
+            row = reuse.get(dev.id) if reuse else None
+            if row is not None:
+                # Kept decision: no slot rollover due (timed event) and its switch did not flip
+                tiers.setdefault(cfg.tier, []).append(dev)
+                action = row[8]
+                if action.startswith("SKIP (") and action[6:-1] in ("override", "window (DOW)", "window (time)", "quota"):
+                    skip_reasons[dev.id] = action[6:-1]
                 continue
 
-            props = dev.pluginProps or {}
+            self._maybe_rollover_quota(dev, cfg, now_ts)
+            self._maybe_rollover_catchup_window(dev, cfg, now_ts)
+            self._sync_running_flag_from_external(dev)
 
             # Manual override gate (auto-hydrates from states and clears if expired)
-            ov_active, ov_until = self.plugin._override_status(dev)
+            ov_active, ov_until = self._override(dev)
             reason: str | None = "override" if ov_active else None
 
             catchup_override = False
             try:
-                if bool(props.get("enableCatchup", False)):
-                    cu_start = self._parse_hhmm(props.get("catchupWindowStart", "00:00"))
-                    cu_end = self._parse_hhmm(props.get("catchupWindowEnd", "06:00"))
-                    now_time = now.time()
-                    if self._time_in_window(now_time, cu_start, cu_end) and self._is_final_catchup_phase(props, now):
-                        cu_raw = int(props.get("catchupRuntimeMins") or 0)
+                if cfg.enable_catchup:
+                    if cfg.in_catchup_window(now) and self._is_final_catchup_phase(cfg, now):
                         # Use catch-up window served minutes
                         served_cu = self._served_catchup_mins(dev)
-                        if cu_raw > served_cu:
+                        if cfg.catchup_target_mins > served_cu:
                             catchup_override = True
             except Exception:
                 catchup_override = False
 
             if reason != "override":  # only evaluate other reasons if not overridden
-                if not _dow_allowed(props, now) and not catchup_override:
-                    reason = "window (DOW)"
-                elif not _time_window_allowed(props, now) and not catchup_override:
-                    reason = "window (time)"
+                if not cfg.run_allowed(now) and not catchup_override:
+                    reason = "window (DOW)" if not cfg.dow_allowed(now) else "window (time)"
                 else:
-                    remaining = self._quota_remaining_mins(dev, props, now)
+                    remaining = self._quota_remaining_mins(dev, cfg, now)
                     if (remaining <= 0) and (not catchup_override):
                         reason = "quota"
 
@@ -1628,20 +3164,20 @@ class SolarSmartAsyncManager:
             if reason and reason != "override" and self._is_running(dev) and not st_local.get("catchup_active"):
                 self._ensure_off(dev, f"Not eligible: {reason}")
 
-            tier = int(props.get("tier", 2))
-            tiers.setdefault(tier, []).append(dev)
+            tiers.setdefault(cfg.tier, []).append(dev)
             if reason:
                 skip_reasons[dev.id] = reason
+            # Fair share: eligible loads (no skip reason) compete in their tier's queue
+            self._fair.update(dev.id, cfg.tier, cost_per_min(self._power(dev).draw_w, cfg.quota_target_mins),
+                              eligible=reason is None, served_mins=self._served_quota_mins(dev))
 
-        # Fairness: sort each tier by least served quota minutes
-        for t in tiers:
-            tiers[t].sort(key=lambda d: self._served_quota_mins(d))
-
+        # Within a tier the snapshot order (by id) holds; start candidates are put in fair
+        # order in _schedule_by_tier
         return dict(sorted(tiers.items(), key=lambda kv: kv[0])), skip_reasons
 
 
     # ========== ON/OFF decisions per tier ==========
-    def _should_stop(self, dev, props, headroom_w: int) -> str | None:
+    def _should_stop(self, dev, cfg: LoadConfig, headroom_w: int) -> str | None:
         """
         Decide if a RUNNING load should STOP. Return reason if yes, else None.
         Minimal criteria:
@@ -1650,12 +3186,12 @@ class SolarSmartAsyncManager:
         """
         # Quota
         # Honor manual override: never stop due to headroom/quota while override is active
-        ov_active, _ = self.plugin._override_status(dev)
+        ov_active, _ = self._override(dev)
         if ov_active:
             return None
 
         try:
-            remaining = int(self._quota_remaining_mins(dev, props, datetime.now()))
+            remaining = int(self._quota_remaining_mins(dev, cfg, datetime.now()))
         except Exception:
             remaining = 0
         if remaining <= 0:
@@ -1666,18 +3202,14 @@ class SolarSmartAsyncManager:
         if st.get("catchup_active"):
             return None
 
-        # Headroom sustain check
-
         # Headroom sustain check (simple + tiny hysteresis)
-        try:
-            rated = int(float(props.get("ratedWatts", 0)) or 0)
-        except Exception:
-            rated = 0
-        hysteresis_w = int(props.get("shedHysteresisW", 100) or 100)  # default 100W cushion
+        rated = self._power(dev).draw_w
+        hysteresis_w = cfg.shed_hysteresis_w  # default 100W cushion
 
         # If removing this load's rated draw still leaves us NEGATIVE beyond hysteresis → stop it.
         # i.e., (headroom - rated) < -hysteresis
-        if (headroom_w ) < (0 - hysteresis_w):
+        # (a setpoint load above its lowest setting / a load above stage 1 is turned down first)
+        if (headroom_w ) < (0 - hysteresis_w) and not self._flex_w(dev):
             return f"Headroom low (need {rated}W, have {headroom_w}W)"
 
         return None
@@ -1729,17 +3261,17 @@ class SolarSmartAsyncManager:
             start_ts = st.get("start_ts")
             cooldown_start = st.get("cooldown_start")
 
-            catch_active_state = dev.states.get("catchupActive")
+            catch_active_state = self.plugin._pub.get(dev, "catchupActive")
             catch_active_st = st.get("catchup_active")
-            catch_remaining = dev.states.get("catchupRemainingTodayMins")
-            catch_target = dev.states.get("catchupDailyTargetMins")
-            catch_run_today = dev.states.get("catchupRunTodayMins")
+            catch_remaining = self.plugin._pub.get(dev, "catchupRemainingTodayMins")
+            catch_target = self.plugin._pub.get(dev, "catchupDailyTargetMins")
+            catch_run_today = self.plugin._pub.get(dev, "catchupRunTodayMins")
             catch_run_secs = st.get("catchup_run_secs")
 
-            pct = dev.states.get("RuntimeQuotaPct")
-            run_quota_dev = dev.states.get("RuntimeQuotaMins")
-            rem_dev = dev.states.get("RemainingQuotaMins")
-            run_window_dev = dev.states.get("RuntimeWindowMins")
+            pct = self.plugin._pub.get(dev, "RuntimeQuotaPct")
+            run_quota_dev = self.plugin._pub.get(dev, "RuntimeQuotaMins")
+            rem_dev = self.plugin._pub.get(dev, "RemainingQuotaMins")
+            run_window_dev = self.plugin._pub.get(dev, "RuntimeWindowMins")
 
             def _fmt_ts(ts):
                 if not ts:
@@ -1805,7 +3337,7 @@ class SolarSmartAsyncManager:
 
             # 🛑 Manual Override
             try:
-                ov_active, ov_until_ts = self.plugin._override_status(dev)
+                ov_active, ov_until_ts = self._override(dev)
                 if ov_until_ts:
                     try:
                         ov_until_str = datetime.fromtimestamp(float(ov_until_ts)).strftime("%Y-%m-%d %H:%M:%S")
@@ -1819,7 +3351,7 @@ class SolarSmartAsyncManager:
             block.append("🛑 Manual Override")
             block.append(f"    Active: {ov_active}   Until: {ov_until_str}")
             try:
-                block.append(f"    Device states: overrideActive={dev.states.get('overrideActive')} until='{dev.states.get('overrideUntil')}'")
+                block.append(f"    Device states: overrideActive={self.plugin._pub.get(dev, 'overrideActive')} until='{self.plugin._pub.get(dev, 'overrideUntil')}'")
             except Exception:
                 pass
 
@@ -1865,36 +3397,179 @@ class SolarSmartAsyncManager:
             self.plugin.logger.exception(f"[DBG7] multi-line dump failed for {dev.name}")
 
 
-    def _schedule_by_tier(self, loads_by_tier: dict[int, list[indigo.Device]], headroom_w: int, skip_reasons: dict[int, str]):
+    _FAIR_LEAD_MINS = 30    # loads at most this many minutes of running ahead of the tier's least served lead
+
+    def _fair_order(self, candidates, fair_share: str):
+        """
+        Start candidates (tier order) in fair order within each tier.
+        "weighted": by fair-queue tag (FairQueue: served minutes x rated kW / target minutes, with
+        loads joining at the tier's virtual time); the lead set is every candidate within
+        _FAIR_LEAD_MINS of running of the least served one, so the packer serves them first.
+        "served": least served quota minutes first (previous behaviour), no lead set.
+        Returns (candidates, lead).
+        """
+        by_tier = {}
+        for item in candidates:
+            by_tier.setdefault(item[1].tier, []).append(item)
+        out, lead = [], None
+        if fair_share == "served":
+            for tier in sorted(by_tier):
+                out.extend(sorted(by_tier[tier], key=lambda it: self._served_quota_mins(it[2])))
+            return out, lead
+        lead = set()
+        fair = self._fair
+        for tier in sorted(by_tier):
+            items = {it[1].key: it for it in by_tier[tier]}
+            out.extend(items[key] for key in fair.order(items))
+            lead |= fair.lead(items, self._FAIR_LEAD_MINS)
+        if getattr(self.plugin, "debug2", False) and len(out) > 1:
+            self.plugin.logger.debug(
+                "[FAIR] " + ", ".join(f"{it[3]} +{fair.lag_mins(it[1].key):.0f}m{'' if it[1].key in lead else ' (wait)'}"
+                                      for it in out))
+        return out, lead
+
+    def _start_candidates(self, candidates, table_rows, row_of, running_pairs, budget_w: int, running_now: int,
+                          max_concurrent: int, strategy: str, settle_secs: float, enable_preempt: bool,
+                          now_ts: float, lead: set | None = None, phase_budget: list | None = None):
+        """
+        Start the best set of eligible OFF loads in one pass (packing.pack_starts) and fill in
+        their table rows. Every start books rated x surge in the headroom ledger, so later starts
+        in this tick - and in the next ticks, until settle_secs have passed - see it as used.
+
+        With enablePriorityPreempt, a candidate that fits the remaining budget but finds no free
+        slot stops one running lower-priority load (not override / catch-up) and starts in its
+        place. strategy "single" keeps the old behaviour: at most one start (or one preempt) per tick.
+        candidates come in fair order; lead (weighted fair share) are the ones due their share,
+        packed first in their tier. phase_budget (three-phase site): per-phase W left; a picked
+        start its phase cannot take waits, and every start books its share there.
+        Returns (budget_w, running_now, starts) after the starts.
+        """
+        dbg = getattr(self.plugin, "debug2", False)
+        single = (strategy == "single")
+        slots = max(0, max_concurrent - running_now)
+        picked = pack_starts([c for _i, c, _d, _n, _r, _info in candidates], budget_w, slots,
+                             max_starts=1 if single else None, lead=lead)
+        actions = {c.key: "START" for c in picked}
+        budget_left = budget_w - sum(c.reserve_w for c in picked)
+        slots_left = slots - len(picked)
+
+        # Priority preempt in the same pass: trade a lower-tier slot for a higher-tier start
+        victims = {}        # candidate key -> (victim dev, victim tier)
+        if enable_preempt and not (single and picked):
+            taken = set()
+            for _i, cand, _d, _n, _r, _info in candidates:
+                if cand.key in actions or slots_left > 0:
+                    continue
+                if not single and cand.need_w > budget_left:
+                    continue    # would free a slot it cannot use this tick
+                for rtier, rdev in running_pairs:
+                    if rtier <= cand.tier or rdev.id in taken or not self._is_running(rdev):
+                        continue
+                    st_v = self.plugin._load_state.get(rdev.id, {}) or {}
+                    ov_active, _ = self._override(rdev)
+                    if ov_active or st_v.get("catchup_active"):
+                        continue
+                    taken.add(rdev.id)
+                    victims[cand.key] = (rdev, rtier)
+                    break
+                if cand.key not in victims:
+                    continue
+                if single:
+                    # Old behaviour: the freed slot is used next tick
+                    actions[cand.key] = "SKIP (preempt lower tier)"
+                    break
+                actions[cand.key] = "START"
+                budget_left -= cand.reserve_w
+
+        starts = 0
+        budget_now = budget_w
+        for row_idx, cand, d, display_name, rated, info in candidates:
+            action = actions.get(cand.key)
+            load_phase = self._cfg(d).phase
+            if action == "START" and phase_budget is not None:
+                gap = phase_short(phase_budget, load_phase, cand.need_w)
+                if gap:
+                    action = f"SKIP (phase {PHASES[gap - 1]})"
+                    victims.pop(cand.key, None)
+            if cand.key in victims:
+                victim, victim_tier = victims[cand.key]
+                self._ensure_off(victim, f"Preempt lower tier T{victim_tier} for higher priority T{cand.tier}")
+                running_now = max(0, running_now - 1)
+                v_idx = row_of.get(victim.id)
+                if v_idx is not None and table_rows[v_idx] is not None:
+                    table_rows[v_idx] = table_rows[v_idx][:3] + ("OFF",) + table_rows[v_idx][4:8] + ("STOP (preempt)",)
+            if action == "START":
+                self._ensure_on(d, "Start ok (threshold met)", headroom_snapshot=budget_now)
+                self._start_ledger.reserve(d.id, cand.reserve_w, now_ts, settle_secs)
+                budget_now -= cand.reserve_w
+                if phase_budget is not None:
+                    phase_take(phase_budget, load_phase, cand.reserve_w)
+                starts += 1
+                running_now += 1
+                status = "RUN"
+                if dbg:
+                    self.plugin.logger.debug(f"[START] {display_name}: reserved {cand.reserve_w}W → start budget now {budget_now}W")
+            else:
+                status = "OFF"
+                if action is None:
+                    if single and (picked or victims):
+                        action = "SKIP (cap)"
+                    elif slots_left <= 0:
+                        action = "SKIP (conc)"
+                    else:
+                        action = "SKIP (headroom)"
+            table_rows[row_idx] = (info["tier"], display_name, rated, status, info["run_min"],
+                                   info["remaining"], info["needed_w"], info["catchup"], action)
+            self._debug7_log_device(d, status=status, action=action, headroom=budget_now,
+                                    starts_this_tick=starts, running_now=running_now, **info)
+        if dbg and len(candidates) > 1:
+            self.plugin.logger.debug(f"[PACK] {len(candidates)} candidates, {starts} started "
+                                     f"({strategy}), start budget left {budget_now}W")
+        return budget_now, running_now, starts
+
+    def _schedule_by_tier(self, loads_by_tier: dict[int, list[indigo.Device]], headroom_w: int, skip_reasons: dict[int, str],
+                          freeze_reason: str | None = None, reuse_rows: dict | None = None):
 
         max_concurrent = self._get_max_concurrent_loads()
         starts_this_tick = 0
         table_rows = []  # for final summary table
         # Read Main option for priority preempt (optional reclaim)
         enable_preempt = False
+        # Start strategy: "pack" = best set of loads per tick, "single" = one start per tick (legacy)
+        strategy = "pack"
+        settle_secs = 60.0
+        shed_multiple = False
+        shed_margin_w = 100
+        fair_share = "weighted"
         try:
             main_dev = self._get_main_device()
             if main_dev:
                 mprops = main_dev.pluginProps or {}
                 enable_preempt = bool(mprops.get("enablePriorityPreempt", False))
+                strategy = str(mprops.get("startStrategy", "pack") or "pack").lower()
+                fair_share = str(mprops.get("fairShare", "weighted") or "weighted").lower()
+                settle_secs = max(0.0, float(mprops.get("startSettleSecs", "60") or 0))
+                shed_multiple = bool(mprops.get("shedMultiple", False))
+                shed_margin_w = max(0, int(float(mprops.get("shedMarginW", "100") or 0)))
         except Exception:
             enable_preempt = False
 
-        # Rollover quota windows if needed (minimal change: just call it)
+        # Quota / catch-up slot rollovers already ran in _collect_loads_with_reasons
         now_ts = time.time()
-        for _, devs in loads_by_tier.items():
-            for d in devs:
-                props = d.pluginProps or {}
-                self._maybe_rollover_quota(d, props, now_ts)
-                self._maybe_rollover_catchup_window(d, props, now_ts)
 
+        # Fused headroom: widen every start requirement by the estimate's uncertainty
+        est_margin_w = self._estimator_margin_w()
+
+        # headroom_w comes from the channel (freshest sample); Main states are only for the log line
         pv, con, bat, hdrm, ts = self._snapshot_main_metrics()
-        headroom_w = hdrm if hdrm is not None else 0
+        if headroom_w is None:
+            headroom_w = hdrm if hdrm is not None else 0
+        observed_headroom_w = headroom_w
 #1.0.82
         dbg = getattr(self.plugin, "debug2", False)
         if dbg:
             self.plugin.logger.debug(f"===== LOAD SCHEDULER TICK =====")
-            self.plugin.logger.debug(f"Observed headroom from Main: {headroom_w} W (PV={pv}, Load={con}, Batt={bat})")
+            self.plugin.logger.debug(f"Observed headroom from Main: {headroom_w} W (PV={pv}, Load={con}, Batt={bat}, at {ts})")
 
         # Build list of currently running (tier, dev), lowest priority first for shedding
         running_pairs = []
@@ -1912,63 +3587,110 @@ class SolarSmartAsyncManager:
                 f"{[(d.name, f'T{t}') for t, d in running_pairs]}"
             )
 
+        # Shedding looks at the lower of the decision basis and the instantaneous sample, so a
+        # smoothed / interval-average basis never hides a live import
+        instant_w = None
+        main_for_instant = self._get_main_device()
+        if main_for_instant:
+            sample = self.latest_sample(main_for_instant.id)
+            if sample is not None and sample.get("headroom") is not None:
+                instant_w = int(round(sample["headroom"]))
+        shed_w = headroom_w if instant_w is None else min(headroom_w, instant_w)
+        # Three-phase site (Main phaseHeadroom): per-phase headroom of the same sample
+        phase_w = self._phase_headroom(main_for_instant)
+        phase_draws = self._phase_draws(running_pairs) if phase_w is not None else None
+
         # If negative headroom, shed exactly ONE load first, then re-evaluate next tick
-        if headroom_w < -100 and running_pairs:
-            headroom_w = self._shed_until_positive(headroom_w, running_pairs)
+        # (shedMultiple: shed every load needed to cover the deficit at once)
+        start_hold = None
+        total_shed = False
+        # Multi-stage loads give back their top stage before anything is shed
+        if shed_w < 0 and running_pairs:
+            stepped_w = self._stage_pass(running_pairs, shed_w, now_ts, settle_secs, down=True)
+            headroom_w += stepped_w - shed_w
+            shed_w = stepped_w
+        if shed_w < self._SHED_FLOOR_W and running_pairs:
+            if shed_multiple:
+                headroom_w += self._shed_deficit(shed_w, running_pairs, shed_margin_w) - shed_w
+                # The freed Watts are only an estimate until the next sample: start nothing this tick
+                start_hold = "shed"
+            else:
+                after_w = self._shed_until_positive(shed_w, running_pairs)
+                total_shed = after_w != shed_w      # a load was switched off
+                headroom_w += after_w - shed_w
+        # A phase can import while the total still exports: shed on that phase as well
+        # (one load per tick unless shedMultiple, so not when the total shed already took it)
+        if phase_w is not None and running_pairs:
+            self._phase_credit(phase_w, phase_draws)
+            freed_w = 0 if total_shed else self._shed_phases(phase_w, running_pairs, shed_multiple, shed_margin_w)
+            headroom_w += freed_w
+            if freed_w and shed_multiple:
+                start_hold = "shed"
 
         # Recompute running count after potential shed
         running_now = sum(1 for _, d in running_pairs if self._is_running(d))
 
+        # Headroom ledger: loads started in recent ticks may not show in the measured headroom
+        # yet; keep their reserve booked until it settles (or the load stops)
+        ledger = self._start_ledger
+        for key, _w, _until in ledger.items():
+            # (load id, stage) keys: stage step ups of a multi-stage load
+            ledger_dev = self._tick_device(key[0] if isinstance(key, tuple) else key)
+            if ledger_dev is None or not self._is_running(ledger_dev) or (
+                    isinstance(key, tuple) and self._stage(ledger_dev) < key[1]):
+                ledger.release(key)
+        reserved_w = int(round(ledger.pending(now_ts)))
+        budget_w = headroom_w - reserved_w
+        phase_budget = self._phase_budget(phase_w, now_ts) if phase_w is not None else None
+        if dbg and reserved_w:
+            self.plugin.logger.debug(f"[PACK] {reserved_w} W still reserved by recent starts → start budget {budget_w} W")
+        # Start candidates, decided together once every load has been looked at
+        candidates = []     # (row index, StartCandidate, dev, display_name, rated W, debug kwargs)
+        row_of = {}         # dev id -> table row index (preempted loads get their row rewritten)
+
         # Process tiers in priority order
         for tier, devs in sorted(loads_by_tier.items()):
             for d in devs:
-                props = d.pluginProps or {}
-                try:
-                    rated = int(float(props.get("ratedWatts", 0)) or 0)
-                except Exception:
-                    rated = 0
+                # Incremental run: keep the last row if the load is unchanged (and still in the same state)
+                kept = reuse_rows.get(d.id) if reuse_rows else None
+                if kept is not None and kept[3] == ("RUN" if self._is_running(d) else "OFF"):
+                    row_of[d.id] = len(table_rows)
+                    table_rows.append(self._reused_row(d, kept))
+                    continue
+
+                cfg = self._cfg(d)
+                rated = cfg.rated_w
 
-                remaining = self._quota_remaining_mins(d, props, datetime.now())
+                remaining = self._quota_remaining_mins(d, cfg, datetime.now())
 
                 # --- INSERT (derive display name with ECO state for inverted loads) ---
+                # IsRunning mirrors the control device (synced this run, updated on every
+                # command), so the ECO state follows from it without another device read:
+                # logical RUN = ECO OFF (consuming), logical OFF = ECO ON (saving)
                 display_name = d.name
-                inverted = bool(props.get("invertOnOff", False))
-                if inverted and (props.get("controlMode", "").lower() == "device"):
-                    physical_on = None
-                    try:
-                        target_id = int(props.get("controlDeviceId", 0) or 0)
-                        if target_id in indigo.devices:
-                            tgt_dev = indigo.devices[target_id]
-                            try:
-                                physical_on = bool(tgt_dev.onState)
-                            except Exception:
-                                physical_on = bool(tgt_dev.states.get("onOffState", False))
-                    except Exception:
-                        physical_on = None
-                    # physical_on True  = ECO ON (saving)  -> logical OFF
-                    # physical_on False = ECO OFF (consuming) -> logical RUN
-                    if physical_on is not None:
-                        eco_phrase = "ECO ON" if physical_on else "ECO OFF"
-                        display_name = f"{d.name} ({eco_phrase})"
+                if cfg.invert_on_off and cfg.control_mode == "device" and self._ext_on(d) is not None:
+                    eco_phrase = "ECO OFF" if self._is_running(d) else "ECO ON"
+                    display_name = f"{d.name} ({eco_phrase})"
                 # --- END INSERT ---
+                if cfg.stages and self._is_running(d):
+                    display_name = f"{display_name} (S{self._stage(d)}/{len(cfg.stages)})"
 
 
-                surge_mult = float(props.get("surgeMultiplier", "1.2") or 1.2)
-                start_margin = float(props.get("startMarginPct", "20") or 20.0) / 100.0
-                needed_w = int(rated * surge_mult * (1.0 + start_margin))
+                pw = self._power(d)     # measured figures once learned (powerSource), else rated
+                needed_w = pw.needed_w + est_margin_w
 
                 # Time already run in current window (simple, user‑visible)
                 try:
-                    run_min = int(d.states.get("RuntimeWindowMins", 0) or 0)
+                    run_min = int(self.plugin._pub.get(d, "RuntimeWindowMins", 0) or 0)
                 except Exception:
                     run_min = 0
 
                 # Catch-up descriptor (clear English)
                 try:
-                    props_enable_cu = bool(props.get("enableCatchup", False))
-                    cu_active = bool(d.states.get("catchupActive", False))
-                    cu_rem = int(d.states.get("catchupRemainingTodayMins") or 0)
-                    cu_target = int(d.states.get("catchupDailyTargetMins") or 0)
+                    props_enable_cu = cfg.enable_catchup
+                    cu_active = bool(self.plugin._pub.get(d, "catchupActive", False))
+                    cu_rem = int(self.plugin._pub.get(d, "catchupRemainingTodayMins") or 0)
+                    cu_target = int(self.plugin._pub.get(d, "catchupDailyTargetMins") or 0)
                 except Exception:
                     props_enable_cu = False
                     cu_active = False
@@ -1986,6 +3708,7 @@ class SolarSmartAsyncManager:
                     else:
                         catchup_str = f"Need {cu_rem}m"
                 before_headroom = headroom_w
+                row_of[d.id] = len(table_rows)
 
                 # 1) If there is a skip reason, show row and do not attempt start
                 skip_reason = skip_reasons.get(d.id)
@@ -2015,7 +3738,7 @@ class SolarSmartAsyncManager:
 
                 if self._is_running(d):
                     # Decide KEEP vs STOP
-                    stop_reason = self._should_stop(d, props, headroom_w)
+                    stop_reason = self._should_stop(d, cfg, headroom_w)
                     if stop_reason:
                         # Stop it and reclaim headroom
                         self._ensure_off(d, stop_reason)  # <- this must call self.plugin._execute_load_action(...)
@@ -2044,62 +3767,39 @@ class SolarSmartAsyncManager:
                     )
                     continue
                 # --- START constraints (device is currently OFF) ---
-                cooldown_ok = self._cooldown_met(d, int(props.get("cooldownMins") or 0))
-                can_run_now = (remaining > 0) and cooldown_ok  # eligible to start if resources allow
+                cooldown_ok = self._cooldown_met(d, cfg.cooldown_mins)
 
-                # start constraints
-                if starts_this_tick >= 1:
-                    action = "SKIP (cap)"
+                # start constraints (concurrency and headroom are settled by the packer below)
+                phase_gap = phase_short(phase_budget, cfg.phase, needed_w) if phase_budget is not None else 0
+                if freeze_reason:
+                    # Inputs stale and stalePolicy=freeze: keep what runs, start nothing new
+                    action = "SKIP (stale)"
+                    status = "OFF"
+                elif start_hold:
+                    action = f"SKIP ({start_hold})"
                     status = "OFF"
-                elif running_now >= max_concurrent:
-                    # Try preempt only if enabled and this higher-priority device is eligible
-                    if enable_preempt and can_run_now:
-                        victim = None
-                        victim_tier = None
-                        # running_pairs sorted with highest tier numbers first (lowest priority)
-                        for rtier, rdev in running_pairs:
-                            if rtier <= tier:
-                                continue  # only lower-priority (higher tier number)
-                            if not self._is_running(rdev):
-                                continue
-                            st_v = self.plugin._load_state.get(rdev.id, {}) or {}
-                            ov_active, _ = self.plugin._override_status(rdev)
-                            if ov_active or st_v.get("catchup_active"):
-                                continue
-                            victim = rdev
-                            victim_tier = rtier
-                            break
-                        if victim:
-                            self._ensure_off(victim, f"Preempt lower tier T{victim_tier} for higher priority T{tier}")
-                            running_now = max(0, running_now - 1)
-                            # Take only one action this tick; start will happen next tick
-                            starts_this_tick = 1
-                            action = "SKIP (preempt lower tier)"
-                            status = "OFF"
-                        else:
-                            action = "SKIP (conc)"
-                            status = "OFF"
-                    else:
-                        action = "SKIP (conc)"
-                        status = "OFF"
                 elif remaining <= 0:
                     action = "SKIP (quota)"
                     status = "OFF"
-                elif not self._cooldown_met(d, int(props.get("cooldownMins") or 0)):
+                elif not cooldown_ok:
                     action = "SKIP (cooldown)"
                     status = "OFF"
-                elif headroom_w >= needed_w:
-                    # Start exactly ONE load per tick
-                    self._ensure_on(d, "Start ok (threshold met)", headroom_snapshot=headroom_w)
-                    starts_this_tick += 1
-                    running_now += 1
-                    action = "START"
-                    status = "RUN"
-                    if dbg:
-                        self.plugin.logger.debug(f"[START] {display_name}: rated={rated}W → headroom now {headroom_w}W")
-                else:
-                    action = "SKIP (headroom)"
+                elif budget_w >= needed_w and self._sustain_blocks_start(d, cfg, needed_w,
+                                                                         budget_w - observed_headroom_w):
+                    # Enough headroom right now, but not for the whole sustain window
+                    action = "SKIP (sustain)"
                     status = "OFF"
+                elif phase_gap:
+                    # The total has room, but not the phase (or one of the phases) it draws on
+                    action = f"SKIP (phase {PHASES[phase_gap - 1]})"
+                    status = "OFF"
+                else:
+                    cand = StartCandidate(d.id, tier, pw.reserve_w + est_margin_w, needed_w)
+                    candidates.append((len(table_rows), cand, d, display_name, rated,
+                                       dict(tier=tier, run_min=run_min, remaining=remaining, needed_w=needed_w,
+                                            catchup=catchup_str, skip_reason=skip_reason)))
+                    table_rows.append(None)
+                    continue
 
             # (if you still build the table, append row here)
                 table_rows.append((tier, display_name, rated, status, run_min, remaining, needed_w, catchup_str, action))
@@ -2118,6 +3818,26 @@ class SolarSmartAsyncManager:
                     running_now=running_now
                 )
 
+        if candidates:
+            candidates, lead = self._fair_order(candidates, fair_share)
+            budget_w, running_now, starts_this_tick = self._start_candidates(
+                candidates, table_rows, row_of, running_pairs, budget_w, running_now, max_concurrent,
+                strategy, settle_secs, enable_preempt, now_ts, lead, phase_budget)
+            headroom_w = budget_w + reserved_w
+        self._setpoint_yield = self._setpoint_yield_for(candidates, table_rows, budget_w, reserved_w)
+
+        # Multi-stage loads: one stage up where the next stage fits, after the starts had their pick
+        if not freeze_reason and not start_hold and any(self._cfg(d).stages for _t, d in running_pairs):
+            waiting = [c.tier for row_idx, c, *_rest in candidates
+                       if table_rows[row_idx] is not None and table_rows[row_idx][8] == "SKIP (headroom)"]
+            budget_w = self._stage_pass(running_pairs, budget_w, now_ts, settle_secs, down=False,
+                                        blocked_tier=min(waiting) if waiting else None,
+                                        table_rows=table_rows, row_of=row_of, phase_budget=phase_budget)
+            headroom_w = budget_w + reserved_w
+
+        if reuse_rows is not None:
+            self._record_bands(loads_by_tier, table_rows, row_of, headroom_w, reserved_w)
+
         # OPTIONAL: final safety shed — shed only ONE more if still negative.
         # Comment this block out if you want strictly one action TOTAL per tick.
         # if headroom_w < 0 and running_pairs:
@@ -2198,6 +3918,8 @@ class SolarSmartAsyncManager:
 
             banner_top = "🌞📈  SolarSmart Scheduler  📊🔌"
             banner_bottom = f"🌤️  Final headroom: {headroom_w} W"
+            if instant_w is not None and instant_w != observed_headroom_w:
+                banner_bottom += f" (instant {instant_w} W)"
             if override_count:
                 banner_bottom += f"   |   🛑 Manual override active: {override_count}"
 
@@ -2225,15 +3947,16 @@ class SolarSmartAsyncManager:
                 except Exception:
                     main_dev = None
             if not main_dev:
-                main_dev = next(
-                    (d for d in indigo.devices if d.deviceTypeId == "solarsmartMain" and d.enabled),
-                    None
-                )
+                main_dev = self.plugin._registry.first_main()
+            if table_text == self._last_table_text:
+                # Nothing changed since the last run (typical in idle mode): keep the PNG
+                return
+            self._last_table_text = table_text
             if main_dev:
-                main_dev.updateStateOnServer("schedulerTable", table_text)
+                self.plugin._pub.set(main_dev, "schedulerTable", table_text)
             out_path = self._render_table_png(table_text, filename="scheduler.png")
             if main_dev:
-                main_dev.updateStateOnServer("schedulerImagePath", out_path)
+                self.plugin._pub.set(main_dev, "schedulerImagePath", out_path)
 
         except Exception as e:
             self.plugin.logger.exception(f"Error building schedulerTable: {e}")
@@ -2246,95 +3969,206 @@ class SolarSmartAsyncManager:
         - Use keep margin.
         - If headroom too low AND min runtime met, stop it.
         """
-        props = dev.pluginProps or {}
-        rated = _int(props.get("ratedWatts"), 0)
-        keep_margin = float(props.get("keepMarginPct", "5") or 5.0) / 100.0
-        min_runtime = _int(props.get("minRuntimeMins"), 0)
+        cfg = self._cfg(dev)
+        pw = self._power(dev)
 
         # Min runtime not met?
-        if not self._min_runtime_met(dev, min_runtime):
+        if not self._min_runtime_met(dev, cfg.min_runtime_mins):
             return headroom_w  # force keep even if headroom dips
 
         # Check headroom with keep margin
-        needed = int(rated * (1.0 + keep_margin))
+        needed = pw.keep_w
         if headroom_w >= needed:
             return headroom_w  # keep on
 
         # Not enough room -> stop (cooldown applies)
         self._ensure_off(dev, f"Headroom low for keep (need ≥ {needed}W, have {headroom_w}W)")
-        return headroom_w + rated  # freeing headroom approx by rated
+        return headroom_w + pw.draw_w  # freeing headroom approx by its draw (measured, else rated)
 
     def _try_start(self, dev: indigo.Device, headroom_w: int) -> tuple[bool, int]:
-        props = dev.pluginProps or {}
-        rated = _int(props.get("ratedWatts"), 0)
-        start_margin = float(props.get("startMarginPct", "20") or 20.0) / 100.0
-        surge_mult = float(props.get("surgeMultiplier", "1.2") or 1.2)
-        remaining = self._quota_remaining_mins(dev, props, datetime.now())
+        cfg = self._cfg(dev)
+        rated = cfg.rated_w
+        pw = self._power(dev)
+        remaining = self._quota_remaining_mins(dev, cfg, datetime.now())
         if remaining <= 0:
             return (False, headroom_w)
 
         # Cooldown check
-        if not self._cooldown_met(dev, _int(props.get("cooldownMins"), 0)):
+        if not self._cooldown_met(dev, cfg.cooldown_mins):
             return (False, headroom_w)
 
         # Start threshold: rated * surge * (1+margin)
-        needed = int(rated * surge_mult * (1.0 + start_margin))
+        needed = pw.needed_w
         if getattr(self.plugin, "debug2", False):
+            basis = f"measured inrush={pw.reserve_w}" if pw.measured else f"rated={rated}, surge={cfg.surge_mult}"
             self.plugin.logger.debug(
-                f"[THRESH] {dev.name}: needed={needed}W (rated={rated}, surge={surge_mult}, margin={start_margin * 100:.0f}%), headroom={headroom_w}W")
+                f"[THRESH] {dev.name}: needed={needed}W ({basis}, margin={cfg.start_margin * 100:.0f}%), headroom={headroom_w}W")
 
         if headroom_w < needed:
             return (False, headroom_w)
 
         self._ensure_on(dev, "Start ok (threshold met)")
-        return (True, headroom_w - rated)  # approximate impact by rated watts
+        return (True, headroom_w - pw.draw_w)  # approximate impact by its draw (measured, else rated)
 
     # ---------- Shedding ----------
 
 
     # ---------- Shedding (one at a time) ----------
-    # REPLACE the entire _shed_until_positive with this corrected version
-    def _shed_until_positive(self, headroom_w: int, running_by_tier: list[tuple[int, indigo.Device]]) -> int:
+    def _shed_candidates(self, running_by_tier: list[tuple[int, indigo.Device]],
+                         phase: int | None = None) -> list[tuple[int, indigo.Device, int]]:
         """
-        Shed exactly ONE running device to improve negative headroom.
-        Skips devices under Manual Override and those in catch-up active mode.
+        Running loads that may be shed: (tier, dev, W freed: measured draw, else rated).
+        Skips catch-up and Manual Override. phase (1..3): only loads drawing on that phase,
+        with the W they free there (a three-phase load a third of its draw).
         """
         dbg = getattr(self.plugin, "debug2", False)
-
-        if headroom_w >= 0 or not running_by_tier:
-            if dbg:
-                self.plugin.logger.debug(f"_shed_until_positive: headroom ok ({headroom_w}W) or no running loads")
-            return headroom_w
-
-        deficit = -headroom_w
-        if dbg:
-            self.plugin.logger.debug(f"_shed_until_positive: starting headroom={headroom_w}W (deficit={deficit}W)")
-
         candidates = []
         for tier, dev in running_by_tier:
-            try:
-                rated = int(float((dev.pluginProps or {}).get("ratedWatts", 0)) or 0)
-            except Exception:
-                rated = 0
+            rated = self._power(dev).draw_w
             if not self._is_running(dev) or rated <= 0:
                 continue
+            if phase is not None:
+                load_phase = self._cfg(dev).phase
+                if load_phase not in (0, phase):
+                    continue
+                rated = rated if load_phase == phase else rated // 3
 
             # Skip devices in catch-up mode (we started them for fallback)
             st = self.plugin._load_state.get(dev.id, {})
             if st.get("catchup_active"):
                 if dbg:
-                    self.plugin.logger.debug(f"_shed_until_positive: skip (catch-up active) {dev.name}")
+                    self.plugin.logger.debug(f"_shed_candidates: skip (catch-up active) {dev.name}")
                 continue
 
             # Skip devices under Manual Override
-            ov_active, _ = self.plugin._override_status(dev)
+            ov_active, _ = self._override(dev)
             if ov_active:
                 if dbg:
-                    self.plugin.logger.debug(f"_shed_until_positive: skip (manual override) {dev.name}")
+                    self.plugin.logger.debug(f"_shed_candidates: skip (manual override) {dev.name}")
+                continue
+
+            # Setpoint loads above their lowest setting: the tracker turns them down first
+            if self._setpoint_flex_w(dev):
+                if dbg:
+                    self.plugin.logger.debug(f"_shed_candidates: skip (setpoint above minimum) {dev.name}")
                 continue
 
             candidates.append((tier, dev, rated))
+        return candidates
+
+    # ----- per-phase headroom (three-phase sites) -----
+    def _phase_headroom(self, main) -> list | None:
+        """[L1, L2, L3] headroom of the latest sample, None unless the Main measures per phase."""
+        sample = self.latest_sample(main.id) if main is not None else None
+        phases = sample.get("phases") if sample is not None else None
+        return list(phases) if phases is not None else None
+
+    def _phase_draws(self, running_pairs) -> dict:
+        """{load id: (dev, phase, W drawn)} of the running loads, to credit back what a shed frees."""
+        return {d.id: (d, self._cfg(d).phase, self._power(d).draw_w)
+                for _t, d in running_pairs if self._is_running(d)}
+
+    def _phase_credit(self, phase_w: list, draws: dict) -> int:
+        """Give back on phase_w what the loads in draws no longer draw (stopped / stepped down); returns the total W."""
+        freed = 0
+        for dev, phase, was_w in draws.values():
+            now_w = self._power(dev).draw_w if self._is_running(dev) else 0
+            if now_w < was_w:
+                phase_take(phase_w, phase, now_w - was_w)
+                freed += was_w - now_w
+        return freed
+
+    def _phase_budget(self, phase_w: list, now_ts: float) -> list:
+        """Per-phase headroom minus what the start ledger still holds on each phase."""
+        budget = list(phase_w)
+        for key, w, until in self._start_ledger.items():
+            if until <= now_ts:
+                continue
+            dev = self._tick_device(key[0] if isinstance(key, tuple) else key)
+            if dev is not None:
+                phase_take(budget, self._cfg(dev).phase, w)
+        return budget
+
+    def _shed_phases(self, phase_w: list, running_pairs, shed_multiple: bool, margin_w: int) -> int:
+        """
+        Shed on phases below _SHED_FLOOR_W, with the loads on that phase only.
+        shedMultiple: enough on every such phase to cover its deficit; else ONE load, on the
+        worst phase. phase_w is updated with what the sheds free. Returns the total W freed.
+        """
+        short = sorted((w, n) for n, w in enumerate(phase_w, 1) if int(round(w)) < self._SHED_FLOOR_W)
+        if not shed_multiple:
+            short = short[:1]
+        freed = 0
+        for w, n in short:
+            h = int(round(w))
+            draws = self._phase_draws(running_pairs)
+            if shed_multiple:
+                self._shed_deficit(h, running_pairs, margin_w, phase=n,
+                                   reason=f"Phase shed {PHASES[n - 1]} (importing {-h} W)")
+            else:
+                self._shed_until_positive(h, running_pairs, phase=n)
+            freed += self._phase_credit(phase_w, draws)
+        return freed
 
+    def _shed_deficit(self, headroom_w: int, running_by_tier: list[tuple[int, indigo.Device]],
+                      margin_w: int = 100, reason: str | None = None, phase: int | None = None) -> int:
+        """
+        Shed as many running loads as it takes, in ONE tick, to cover the deficit plus margin_w
+        (Main option shedMultiple). packing.plan_shed keeps tier order (lowest priority first)
+        and picks the fewest loads; Manual Override and catch-up loads are never shed.
+        Returns headroom_w plus the Watts freed (measured draw, else rated), so the KEEP pass leaves the other
+        running loads alone instead of stopping every one of them on the same negative reading.
+        reason: LastReason for the shed loads (default: emergency shed with the deficit).
+        phase: headroom_w is that phase's (three-phase site); only loads on it are shed.
+        """
+        dbg = getattr(self.plugin, "debug2", False)
+        if headroom_w >= 0 or not running_by_tier:
+            return headroom_w
+        deficit = -headroom_w + max(0, margin_w)
+        candidates = self._shed_candidates(running_by_tier, phase)
+        if not candidates:
+            if dbg:
+                self.plugin.logger.debug("_shed_deficit: no valid running candidates to shed")
+            return headroom_w
+
+        by_id = {dev.id: (tier, dev) for tier, dev, _r in candidates}
+        plan = plan_shed([ShedCandidate(dev.id, tier, rated) for tier, dev, rated in candidates], deficit)
+        freed = sum(c.watts for c in plan)
+        if dbg:
+            self.plugin.logger.debug(
+                f"_shed_deficit: deficit {deficit}W (incl. {margin_w}W margin) → shedding {len(plan)} load(s), "
+                f"{freed}W rated: {[by_id[c.key][1].name for c in plan]}"
+            )
+        for c in plan:
+            tier, dev = by_id[c.key]
+            self._ensure_off(dev, reason or f"Emergency shed (headroom negative, {len(plan)} load(s) for {deficit}W)")
+        if freed < deficit:
+            self.plugin.logger.warning(
+                f"Shedding every eligible load frees only {freed} W of the {deficit} W deficit; "
+                f"the rest is override / catch-up or non-SolarSmart load."
+            )
+        return headroom_w + freed
+
+    def _shed_until_positive(self, headroom_w: int, running_by_tier: list[tuple[int, indigo.Device]],
+                             phase: int | None = None) -> int:
+        """
+        Shed exactly ONE running device to improve negative headroom.
+        Skips devices under Manual Override and those in catch-up active mode.
+        Returns the headroom with the shed load's draw given back (unchanged if nothing was shed).
+        phase: headroom_w is that phase's (three-phase site); only loads on it are shed.
+        """
+        dbg = getattr(self.plugin, "debug2", False)
+
+        if headroom_w >= 0 or not running_by_tier:
+            if dbg:
+                self.plugin.logger.debug(f"_shed_until_positive: headroom ok ({headroom_w}W) or no running loads")
+            return headroom_w
+
+        deficit = -headroom_w
+        if dbg:
+            self.plugin.logger.debug(f"_shed_until_positive: starting headroom={headroom_w}W (deficit={deficit}W)")
+
+        candidates = self._shed_candidates(running_by_tier, phase)
         if not candidates:
             if dbg:
                 self.plugin.logger.debug("_shed_until_positive: no valid running candidates to shed")
@@ -2358,7 +4192,10 @@ class SolarSmartAsyncManager:
                 f"_shed_until_positive: shedding ONE → {dev.name} (tier={tier}, rated={rated}W) — {choice_reason}"
             )
 
-        self._ensure_off(dev, "Emergency shed (headroom negative)")
+        self._ensure_off(dev, "Emergency shed (headroom negative)" if phase is None
+                         else f"Phase shed {PHASES[phase - 1]} (importing {deficit} W)")
+        if not self._is_running(dev):
+            headroom_w += rated     # its draw is free for this run's starts
 
         if dbg:
             self.plugin.logger.debug(f"_shed_until_positive: new headroom={headroom_w}W after shedding {dev.name}")
@@ -2369,32 +4206,32 @@ class SolarSmartAsyncManager:
     def _is_running(self, dev: indigo.Device) -> bool:
         # Device state is the source of truth
         try:
-            return bool(dev.states.get("IsRunning", False))
+            return bool(self.plugin._pub.get(dev, "IsRunning", False))
         except Exception:
             return bool(self.plugin._load_state.get(dev.id, {}).get("IsRunning", False))
 
     def _mark_running(self, dev: indigo.Device, running: bool):
+        self._dirty_all = True      # headroom / slots / concurrency change for every load
         st = self.plugin._load_state.setdefault(dev.id, {})
-        props = dev.pluginProps or {}
-        inverted = bool(props.get("invertOnOff", False))
+        inverted = self._cfg(dev).invert_on_off
         now = time.time()
         if running:
             now = time.time()
             st["start_ts"] = now
             st["IsRunning"] = True
             st.pop("cooldown_start", None)
-            dev.updateStateOnServer("LastStartTs", f"{now:.3f}")
-            dev.updateStateOnServer("IsRunning", True)
+            self.plugin._pub.set(dev, "LastStartTs", f"{now:.3f}")
+            self.plugin._pub.set(dev, "IsRunning", True)
             status_word = "CONSUMING" if inverted else "RUNNING"  # Inverted logical ON = consuming (physical OFF)
-            dev.updateStateOnServer("Status", status_word)
+            self.plugin._pub.set(dev, "Status", status_word)
         else:
             st["start_ts"] = None
             st["IsRunning"] = False
             st["cooldown_start"] = now
-            dev.updateStateOnServer("LastStartTs", "")
-            dev.updateStateOnServer("IsRunning", False)
+            self.plugin._pub.set(dev, "LastStartTs", "")
+            self.plugin._pub.set(dev, "IsRunning", False)
             status_word = "SAVING" if inverted else "OFF"          # Inverted logical OFF = saving (physical ON)
-            dev.updateStateOnServer("Status", status_word)
+            self.plugin._pub.set(dev, "Status", status_word)
 
     def _served_quota_mins(self, dev: indigo.Device) -> int:
         st = self.plugin._load_state.setdefault(dev.id, {})
@@ -2405,7 +4242,7 @@ class SolarSmartAsyncManager:
         st = self.plugin._load_state.setdefault(dev.id, {})
         st["served_quota_mins"] = int(minutes)
         try:
-            dev.updateStateOnServer("RuntimeQuotaMins", int(minutes))
+            self.plugin._pub.set(dev, "RuntimeQuotaMins", int(minutes))
         except Exception:
             pass
 
@@ -2433,25 +4270,21 @@ class SolarSmartAsyncManager:
             return True
         return (time.time() - t0) >= (cooldown_mins * 60)
 
-    def _quota_remaining_mins(self, dev, props, now_dt: datetime) -> int:
+    def _quota_remaining_mins(self, dev, cfg: LoadConfig, now_dt: datetime) -> int:
         """
         Return remaining minutes for the quota window and update RemainingQuotaMins state.
         Ensures the anchor is valid before computing.
         """
-        self._ensure_quota_anchor(dev, props, time.time())
-        max_per_quota = int(props.get("maxRuntimePerQuotaMins") or 0) or 0
+        self._ensure_quota_anchor(dev, cfg, time.time())
+        max_per_quota = cfg.quota_target_mins
         used = self._served_quota_mins(dev)
         remaining = max(0, max_per_quota - used) if max_per_quota > 0 else 0
         try:
-            dev.updateStateOnServer("RemainingQuotaMins", remaining)
+            self.plugin._pub.set(dev, "RemainingQuotaMins", remaining)
         except Exception:
             pass
         return remaining
 
-    def _quota_tick_minutes(self, period_sec: float) -> int:
-        """How many minutes to accrue per scheduler tick (usually 1 for a 60s tick)."""
-        return max(1, int(round(period_sec / 60.0)))
-
     def _quota_horizon_minutes(self, period: str) -> int:
         """Return the rolling quota horizon in minutes based on device props."""
         return {
@@ -2462,27 +4295,26 @@ class SolarSmartAsyncManager:
             "3d": 72 * 60,
         }.get((period or "24h").lower(), 24 * 60)
 
-    def _ensure_quota_anchor(self, dev, props, now_ts: float):
+    def _ensure_quota_anchor(self, dev, cfg: LoadConfig, now_ts: float):
         st = self.plugin._load_state.setdefault(dev.id, {})
-        period = (props.get("quotaWindow") or "24h").lower()
-        horizon_mins = self._quota_horizon_minutes(period)
+        horizon_mins = self._quota_horizon_minutes(cfg.quota_window)
         anchor = st.get("quota_anchor_ts")
 
         # First-time: set anchor, do NOT reset minutes
         if anchor is None:
             st["quota_anchor_ts"] = now_ts
-            dev.updateStateOnServer("QuotaAnchorTs", f"{now_ts:.3f}")
+            self.plugin._pub.set(dev, "QuotaAnchorTs", f"{now_ts:.3f}")
             return
 
         # Rollover: reset minutes only if horizon passed
         if (now_ts - anchor) >= (horizon_mins * 60):
             st["quota_anchor_ts"] = now_ts
             st["served_quota_mins"] = 0
-            dev.updateStateOnServer("QuotaAnchorTs", f"{now_ts:.3f}")
-            dev.updateStateOnServer("RuntimeQuotaMins", 0)
-            target = int(props.get("maxRuntimePerQuotaMins") or 0)
-            dev.updateStateOnServer("RemainingQuotaMins", target if target > 0 else 0)
-            dev.updateStateOnServer("RuntimeWindowMins", 0)
+            self.plugin._pub.set(dev, "QuotaAnchorTs", f"{now_ts:.3f}")
+            self.plugin._pub.set(dev, "RuntimeQuotaMins", 0)
+            target = cfg.quota_target_mins
+            self.plugin._pub.set(dev, "RemainingQuotaMins", target if target > 0 else 0)
+            self.plugin._pub.set(dev, "RuntimeWindowMins", 0)
             if getattr(self.plugin, "debug2", False):
                 self.plugin.logger.debug(f"{dev.name}: quota window rolled over, counters reset")
 
@@ -2492,7 +4324,7 @@ class SolarSmartAsyncManager:
         try:
             if self._is_running(dev):
                 # already marked running; just update reason for visibility
-                dev.updateStateOnServer("LastReason", reason)
+                self.plugin._pub.set(dev, "LastReason", reason)
                 return
 
             # If not marked as runningfire the action group
@@ -2503,15 +4335,13 @@ class SolarSmartAsyncManager:
             st = self.plugin._load_state.setdefault(dev.id, {})
             st["start_ts"] = time.time()
             self._mark_running(dev, True)
-            dev.updateStateOnServer("LastReason", reason)
+            self._step_actuated(dev, True)
+            self._stage_started(dev)
+            self.plugin._pub.set(dev, "LastReason", reason)
             self._update_runtime_progress(dev)
             # Build INFO line
-            props = dev.pluginProps or {}
-            tier = props.get("tier", "—")
-            try:
-                rated = int(float(props.get("ratedWatts", 0)) or 0)
-            except Exception:
-                rated = 0
+            cfg = self._cfg(dev)
+            tier, rated = cfg.tier, cfg.rated_w
 
             pv, con, bat, hdrm_main, ts = self._snapshot_main_metrics()
             hdrm = headroom_snapshot if headroom_snapshot is not None else hdrm_main
@@ -2533,14 +4363,14 @@ class SolarSmartAsyncManager:
             was_running = self._is_running(dev)
             if not was_running:
                 # Already off – just record reason and leave quietly
-                dev.updateStateOnServer("LastReason", reason)
+                self.plugin._pub.set(dev, "LastReason", reason)
                 ext_on = self.plugin._external_on_state(dev)
                 if ext_on:  # mismatch: external device is ON while we think OFF
                     if getattr(self.plugin, "debug2", False):
                         self.plugin.logger.debug(f"_ensure_off: {dev.name} external ON -> sending OFF ({reason})")
                     # Suppress state overwrites; we'll refresh percent after.
                     self.plugin._execute_load_action(dev, turn_on=False, reason=reason, update_states=False)
-                    dev.updateStateOnServer("IsRunning", False)
+                    self.plugin._pub.set(dev, "IsRunning", False)
                 else:
                     # No external ON, so we are already OFF
                     if getattr(self.plugin, "debug2", False):
@@ -2561,6 +4391,9 @@ class SolarSmartAsyncManager:
                 except Exception:
                     ran_secs = None
 
+            # Multi-stage load: the extra stages go off first, top stage first
+            self._stages_off(dev, reason)
+
             # PHYSICAL ACTUATION (needed for inverted devices to enter ECO / saving mode)
             # update_states=False to avoid temporarily overwriting logical state before we mark_running(False)
             try:
@@ -2569,7 +4402,8 @@ class SolarSmartAsyncManager:
                 pass
 
             self._mark_running(dev, False)
-            dev.updateStateOnServer("LastReason", reason)
+            self._step_actuated(dev, False)
+            self.plugin._pub.set(dev, "LastReason", reason)
             self._update_runtime_progress(dev)
 
             # Clear catch-up active flag if set
@@ -2577,8 +4411,8 @@ class SolarSmartAsyncManager:
             if st.get("catchup_active"):
                 st["catchup_active"] = False
                 try:
-                    dev.updateStateOnServer("catchupActive", False)
-                    dev.updateStateOnServer("catchupLastStop", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                    self.plugin._pub.set(dev, "catchupActive", False)
+                    self.plugin._pub.set(dev, "catchupLastStop", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
                 except Exception:
                     pass
             # Always log OFF at INFO
@@ -2592,11 +4426,119 @@ class SolarSmartAsyncManager:
                 f"Load {self._fmt_w(con)}, Battery {self._fmt_w(bat)}"
             )
 
-        except Exception:
-            self.plugin.logger.exception(f"_ensure_off: error while stopping {dev.name}")
+        except Exception:
+            self.plugin.logger.exception(f"_ensure_off: error while stopping {dev.name}")
+
+    # ---------- Multi-stage loads ----------
+    def _publish_stage(self, dev, cfg: LoadConfig, active: int):
+        self.plugin._pub.set_many(dev, [{"key": "Stage", "value": active},
+                                        {"key": "StageW", "value": active_w(cfg.stages, active)}])
+
+    def _stage_started(self, dev):
+        """The load was just started: stage 1 on."""
+        cfg = self._cfg(dev)
+        if not cfg.stages:
+            return
+        st = self.plugin._load_state.setdefault(dev.id, {})
+        now = time.time()
+        st["stage"] = 1
+        st.setdefault("stage_on_ts", {})[1] = now
+        st["stage_change_ts"] = now
+        self._publish_stage(dev, cfg, 1)
+
+    def _switch_stage(self, dev, cfg: LoadConfig, number: int, on: bool, reason: str) -> bool:
+        """Switch stage `number` (2..) of a running multi-stage load; the new top stage is recorded."""
+        if not self.plugin._execute_stage_action(dev, number, cfg.stages[number - 1], on):
+            return False
+        st = self.plugin._load_state.setdefault(dev.id, {})
+        now = time.time()
+        st.setdefault("stage_on_ts" if on else "stage_off_ts", {})[number] = now
+        st["stage"] = number if on else number - 1
+        st["stage_change_ts"] = now
+        if not on:
+            self._start_ledger.release((dev.id, number))
+        self._dirty_all = True      # headroom changes for every load
+        self._publish_stage(dev, cfg, st["stage"])
+        self.plugin._pub.set(dev, "LastReason", f"Stage {number} {'on' if on else 'off'}: {reason}")
+        self.plugin.logger.info(
+            f"{'Stepping up' if on else 'Stepping down'} '{dev.name}' to stage {st['stage']}/{len(cfg.stages)} "
+            f"({self._fmt_w(active_w(cfg.stages, st['stage']))}). Reason: {reason}")
+        return True
+
+    def _stages_off(self, dev, reason: str):
+        """Before a multi-stage load stops: its stages above 1 off, top stage first."""
+        cfg = self._cfg(dev)
+        if not cfg.stages:
+            return
+        st = self.plugin._load_state.setdefault(dev.id, {})
+        now = time.time()
+        for number in range(self._stage(dev), 1, -1):
+            self.plugin._execute_stage_action(dev, number, cfg.stages[number - 1], False)
+            st.setdefault("stage_off_ts", {})[number] = now
+            self._start_ledger.release((dev.id, number))
+        st.setdefault("stage_off_ts", {})[1] = now
+        st["stage"] = 0
+        self._publish_stage(dev, cfg, 0)
+
+    def _stage_pass(self, running_pairs, budget_w: int, now_ts: float, settle_secs: float,
+                    down: bool, blocked_tier: int | None = None, table_rows=None, row_of=None,
+                    phase_budget: list | None = None) -> int:
+        """
+        One stage step per running multi-stage load (stages.stage_move). down=True: only step
+        downs, lowest priority first (before shedding); else only step ups, highest priority
+        first, never for a tier below a start left waiting for headroom (blocked_tier). Step
+        ups book their reserve in the start ledger (and in phase_budget, which they must fit
+        on a three-phase site). Returns the budget left.
+        """
+        pairs = sorted(running_pairs, key=lambda p: p[0], reverse=down)
+        for tier, d in pairs:
+            cfg = self._cfg(d)
+            if not cfg.stages or not self._is_running(d):
+                continue
+            st = self.plugin._load_state.setdefault(d.id, {})
+            active = self._stage(d)
+            move, why = stage_move(
+                cfg.stages, active, budget_w, now_ts, st.get("stage_on_ts", {}), st.get("stage_off_ts", {}),
+                float(st.get("stage_change_ts") or st.get("start_ts") or 0.0),
+                cfg.surge_mult, cfg.start_margin, cfg.shed_hysteresis_w,
+                cfg.stage_min_run_mins * 60, cfg.stage_cooldown_mins * 60, settle_secs,
+                may_step_up=blocked_tier is None or tier <= blocked_tier)
+            if move > 0 and phase_budget is not None:
+                gap = phase_short(phase_budget, cfg.phase, next_stage_need_w(cfg.stages, active, cfg.surge_mult,
+                                                                             cfg.start_margin))
+                if gap:
+                    move, why = 0, f"phase {PHASES[gap - 1]} short"
+            if (move < 0) != down or not move:
+                if why and getattr(self.plugin, "debug2", False):
+                    self.plugin.logger.debug(f"[STAGE] {d.name} stays at stage {active}: {why}")
+                continue
+            number = active + 1 if move > 0 else active
+            if not self._switch_stage(d, cfg, number, move > 0, why):
+                continue
+            watts = cfg.stages[number - 1].watts
+            if move > 0:
+                reserve = int(watts * cfg.surge_mult)
+                self._start_ledger.reserve((d.id, number), reserve, now_ts, settle_secs)
+                budget_w -= reserve
+                if phase_budget is not None:
+                    phase_take(phase_budget, cfg.phase, reserve)
+            else:
+                budget_w += watts
+            if table_rows is not None and d.id in (row_of or {}):
+                row = table_rows[row_of[d.id]]
+                if row is not None:
+                    table_rows[row_of[d.id]] = row[:8] + (f"KEEP S{active}→{active + move}",)
+        return budget_w
 
 
 class Plugin(indigo.PluginBase):
+    # Watt states only worth re-publishing once they move this far (W)
+    _STATE_DEADBANDS = {k: 10 for k in (
+        "SolarProduction", "SiteConsumption", "BatteryPower", "GridPower", "Headroom", "HeadroomIntervalAvg",
+        "HeadroomEMA", "HeadroomAvg", "HeadroomMin", "HeadroomMax", "HeadroomP10", "HeadroomP90",
+        "HeadroomUncertaintyW", "HeadroomSourceSpreadW", "Power", "MeasuredPowerW",
+        "HeadroomL1", "HeadroomL2", "HeadroomL3")}
+
     def __init__(self, pluginId, pluginDisplayName, pluginVersion, pluginPrefs):
         indigo.PluginBase.__init__(self, pluginId, pluginDisplayName, pluginVersion, pluginPrefs)
         self._init_timezones(pluginPrefs)
@@ -2646,12 +4588,40 @@ class Plugin(indigo.PluginBase):
         self.logger.info("{0:<30} {1}".format("Python version:", sys.version.replace('\n', '')))
         self.logger.info("{0:<30} {1}".format("Python Directory:", sys.prefix.replace('\n', '')))
 
+        # Device-role registry (Main/Test/Load ids, tiers, control targets); filled by deviceStartComm.
+        # Seeded once here so the source summary below can see the devices before they start.
+        self._registry = DeviceRegistry()
+        # Every device state write goes through here: unchanged values and changes inside the
+        # deadband are dropped, scheduler runs / Main publishes flush once per device
+        self._pub = StatePublisher(self._STATE_DEADBANDS, on_error=self._state_write_failed)
+        # Per-source reading adapters: (device id, state key, invert) -> resolved parse strategy
+        self._adapters = SourceAdapterCache()
+        # Multi-source plans, keyed by the Main's source-config signature (see _source_plan)
+        self._source_plans = {}
+        # Freshness watchdog: source device id -> its Indigo lastChanged (epoch), and
+        # Main id -> {quantity: SourceFreshness}
+        self._source_changed_at = {}
+        self._freshness = {}
+        # Fused headroom (Main prop fuseHeadroom): Main id -> HeadroomEstimator
+        self._estimators = {}
+        # Direct meters: meter id -> (latest Watts or None after an error, epoch of last reading).
+        # Written on the asyncio thread, read by read_source_watts in place of the Power state.
+        self._meter_values = {}
+        # Control mode "setpoint": load id -> (commanded W, written at, setting)
+        self._setpoint_cmd = {}
+        for d in indigo.devices.iter("self"):
+            if d.enabled:
+                self._registry.add(d)
+
         self._log_effective_source_summary()
         #self.logger.info(u"{0:=^130}".format(""))
 
         self.triggers = {}
         # Internal in-memory map: { device.id: { state data } }
         self._load_state = {}
+        # Event-driven ingestion: source device id -> {main id: {state keys}}
+        self._source_watch = {}
+        self._changes_subscribed = False
 
         # Change to logging
         pfmt = logging.Formatter('%(asctime)s.%(msecs)03d\t[%(levelname)8s] %(name)20s.%(funcName)-25s%(msg)s',
@@ -2714,27 +4684,30 @@ class Plugin(indigo.PluginBase):
             return None
 
 
-    def _update_solarsmart_states(self, dev: indigo.Device) -> None:
+    def _update_solarsmart_states(self, dev: indigo.Device, origin: str = "poll", publish: bool = True) -> None:
         """
         Reads configured PV/Consumption/Battery, normalizes to Watts (numbers only),
         computes Headroom best-effort, and publishes to the SolarSmart device states.
+        The computed sample is also pushed straight to the scheduler's headroom channel
+        (origin = "poll" for the periodic ticker, "event" for a source device change).
+        publish=False (fast sampling between publishes) only feeds the channel.
         """
         props = dev.pluginProps or {}
         dbg2 = getattr(self, "debug2", False)
-        # --- Read numeric values ---
-        pv_w = self.read_pv_watts(props)  # required
-        cons_w = self.read_consumption_watts(props)  # optional
-        batt_w = self.read_battery_watts(props)  # optional
         # Defaults for grid logic (may be overridden by Test device)
         use_grid_headroom = bool(props.get("useGridHeadroom", False))
+        fuse = bool(props.get("fuseHeadroom", False))
+        # --- Read numeric values: all sources in one batched pass (PV required, rest optional) ---
+        quantities = ("pv", "cons", "batt", "grid") if (use_grid_headroom or fuse) else ("pv", "cons", "batt")
+        per_phase = bool(props.get("phaseHeadroom", False))
+        if per_phase:
+            quantities += tuple(q for q, _key, _label in PHASE_SOURCE_KEYS)
+        vals = self.read_source_watts(props, quantities)
+        pv_w, cons_w, batt_w = vals["pv"], vals["cons"], vals["batt"]
         grid_w = None
 
         # --- Override with SolarSmart Test Source if present/enabled ---
-        try:
-            test_dev = next((d for d in indigo.devices
-                             if d.deviceTypeId == "solarsmartTest" and d.enabled), None)
-        except Exception:
-            test_dev = None
+        test_dev = self._registry.test_device()
 
         if test_dev:
             tprops = test_dev.pluginProps or {}
@@ -2759,32 +4732,34 @@ class Plugin(indigo.PluginBase):
             cons_w = cons_override if cons_override is not None else cons_w
             batt_w = batt_override if batt_override is not None else batt_w
 
-            # Optional: mirror props to Test device states for Control Page use
-            try:
-                test_dev.updateStateOnServer("SolarTestW", pv_override)
-                if cons_override is not None:
-                    test_dev.updateStateOnServer("ConsumptionTestW", cons_override)
-                if batt_override is not None:
-                    test_dev.updateStateOnServer("BatteryTestW", batt_override)
-                if grid_test_w is not None:
-                    test_dev.updateStateOnServer("GridTestW", grid_test_w)
-                test_dev.updateStateOnServer("Status", "OVERRIDING SolarSmart Main")
-                test_dev.updateStateOnServer("LastUpdate", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            except Exception:
-                pass
+            # Optional: mirror props to Test device states for Control Page use (publish ticks only)
+            if publish:
+                try:
+                    self._pub.set(test_dev, "SolarTestW", pv_override)
+                    if cons_override is not None:
+                        self._pub.set(test_dev, "ConsumptionTestW", cons_override)
+                    if batt_override is not None:
+                        self._pub.set(test_dev, "BatteryTestW", batt_override)
+                    if grid_test_w is not None:
+                        self._pub.set(test_dev, "GridTestW", grid_test_w)
+                    self._pub.set(test_dev, "Status", "OVERRIDING SolarSmart Main")
+                    self._pub.set(test_dev, "LastUpdate", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                except Exception:
+                    pass
 
             # Informative log (once per tick)
             # If Test device requests grid-only and provides a value, USE IT
             if test_use_grid and (grid_test_w is not None):
                 use_grid_headroom = True
                 grid_w = grid_test_w
-                self.logger.info(
-                    f"Over-riding Solar Data with SolarSmart Test device '{test_dev.name}': "
-                    f"Grid={grid_w} W (grid-only mode), PV={pv_w} W, "
-                    f"Cons={'None' if cons_w is None else cons_w} W, "
-                    f"Batt={'None' if batt_w is None else batt_w} W"
-                )
-            else:
+                if publish:
+                    self.logger.info(
+                        f"Over-riding Solar Data with SolarSmart Test device '{test_dev.name}': "
+                        f"Grid={grid_w} W (grid-only mode), PV={pv_w} W, "
+                        f"Cons={'None' if cons_w is None else cons_w} W, "
+                        f"Batt={'None' if batt_w is None else batt_w} W"
+                    )
+            elif publish:
                 # Regular test log (no grid-only)
                 self.logger.info(
                     f"Over-riding Solar Data with SolarSmart Test device '{test_dev.name}': PV={pv_w} W, "
@@ -2795,14 +4770,24 @@ class Plugin(indigo.PluginBase):
         if getattr(self, "debug2", False):
             self.logger.debug(f"_update_solarsmart_states: raw PV={pv_w}, Cons={cons_w}, Batt={batt_w}")
 
-        if grid_w is None and use_grid_headroom:
-            # you likely already have this helper; if not, add the one I sent earlier
-            grid_w = self.read_grid_watts(props)
+        if grid_w is None and (use_grid_headroom or (fuse and not test_dev)):
+            grid_w = vals.get("grid")
 
         if dbg2:
             self.logger.debug(f"_update_solarsmart_states: useGridHeadroom={use_grid_headroom}, Grid={grid_w}, "
                               f"PV={pv_w}, Cons={cons_w}, Batt={batt_w}")
 
+        # --- Freshness watchdog (real sources only; Test device values are synthetic) ---
+        stale_inputs = []
+        if not test_dev:
+            stale_inputs = self._check_source_freshness(
+                dev, props, {"pv": pv_w, "cons": cons_w, "batt": batt_w, "grid": grid_w},
+                use_grid_headroom, origin, publish=publish, fused=fuse)
+
+        estimate = None
+        if fuse:
+            estimate = self._fused_headroom(dev, props, pv_w, cons_w, batt_w, grid_w, synthetic=bool(test_dev))
+
         # --- Publish required + optional states ---
         # If PV is missing (misconfig), publish 0 so UI isn’t blank and log it.
         if pv_w is None:
@@ -2813,8 +4798,14 @@ class Plugin(indigo.PluginBase):
         # Best-effort headroom (if consumption known). If batt_w is positive (charging), subtract it
         # from headroom as it already consumes PV/export capacity. If negative (discharging), it adds headroom.
         headroom = None
+        uncertainty = None
 
-        if use_grid_headroom and (grid_w is not None):
+        if estimate is not None:
+            headroom, uncertainty = estimate
+            if dbg2:
+                self.logger.debug(f"_update_solarsmart_states: fused headroom => {headroom:.0f} W "
+                                  f"(±{uncertainty:.0f} W)")
+        elif use_grid_headroom and (grid_w is not None):
             # Import positive → deficit → negative headroom; Export negative → positive headroom
             headroom = -grid_w
             # Optional info once per tick to make mode obvious
@@ -2827,45 +4818,78 @@ class Plugin(indigo.PluginBase):
                     # Subtract only charging power (positive); negative (discharge) increases margin
                     headroom -= max(batt_w, 0.0)
 
+        # Three-phase site: headroom of each phase (the Test device only simulates the total)
+        phases = None
+        if per_phase and not test_dev:
+            phases = phase_headroom(vals, pv_w, cons_w, batt_w, use_grid_headroom)
+            if dbg2:
+                self.logger.debug(f"_update_solarsmart_states: phase headroom => {phases}")
+
+        if not publish:
+            # Fast sample between publishes: feed the scheduler channel only
+            self._push_headroom_sample(dev, origin, pv_w, cons_w, batt_w, grid_w, headroom, stale_inputs,
+                                       uncertainty, phases)
+            return
+
         # --- Push to server (Integers for W states) ---
         try:
-            dev.updateStateOnServer("SolarProduction", int(round(pv_w)))
+            self._pub.set(dev, "SolarProduction", int(round(pv_w)))
         except Exception as e:
             if getattr(self, "debug2", False):
                 self.logger.debug(f"Failed updating SolarProduction: {e}")
 
         if cons_w is not None:
             try:
-                dev.updateStateOnServer("SiteConsumption", int(round(cons_w)))
+                self._pub.set(dev, "SiteConsumption", int(round(cons_w)))
             except Exception as e:
                 if getattr(self, "debug2", False):
                     self.logger.debug(f"Failed updating SiteConsumption: {e}")
 
         if batt_w is not None:
             try:
-                dev.updateStateOnServer("BatteryPower", int(round(batt_w)))
+                self._pub.set(dev, "BatteryPower", int(round(batt_w)))
             except Exception as e:
                 if getattr(self, "debug2", False):
                     self.logger.debug(f"Failed updating BatteryPower: {e}")
         # NEW: publish GridPower if present
         if grid_w is not None:
             try:
-                dev.updateStateOnServer("GridPower", int(grid_w))
+                self._pub.set(dev, "GridPower", int(grid_w))
             except Exception as e:
                 if dbg2:
                     self.logger.debug(f"Failed updating GridPower: {e}")
 
         if headroom is not None:
             try:
-                dev.updateStateOnServer("Headroom", int(round(headroom)))
+                self._pub.set(dev, "Headroom", int(round(headroom)))
             except Exception as e:
                 if getattr(self, "debug2", False):
                     self.logger.debug(f"Failed updating Headroom: {e}")
 
+        if phases is not None:
+            try:
+                self._pub.set_many(dev, [{"key": f"Headroom{name}", "value": int(round(w))}
+                                         for name, w in zip(PHASES, phases)])
+            except Exception as e:
+                if dbg2:
+                    self.logger.debug(f"Failed updating phase headroom: {e}")
+
+        if fuse:
+            est = self._estimators.get(dev.id)
+            try:
+                self._pub.set_many(dev, [
+                    {"key": "HeadroomConfidence", "value": est.confidence() if est else 0},
+                    {"key": "HeadroomUncertaintyW", "value": int(round(est.uncertainty)) if est else 0},
+                    {"key": "HeadroomSourceSpreadW", "value": int(round(est.spread)) if est else 0},
+                ])
+            except Exception as e:
+                if dbg2:
+                    self.logger.debug(f"Failed updating estimator states: {e}")
+
         # Timestamp for sanity
         try:
             ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            dev.updateStateOnServer("LastUpdate", ts)
+            self._pub.set(dev, "LastUpdate", ts)
         except Exception as e:
             if getattr(self, "debug2", False):
                 self.logger.debug(f"Failed updating LastUpdate: {e}")
@@ -2875,6 +4899,156 @@ class Plugin(indigo.PluginBase):
                 f"_update_solarsmart_states: published PV={pv_w}, Cons={cons_w}, Batt={batt_w}, Headroom={headroom}"
             )
 
+        self._push_headroom_sample(dev, origin, pv_w, cons_w, batt_w, grid_w, headroom, stale_inputs, uncertainty,
+                                   phases)
+
+    def _push_headroom_sample(self, dev, origin, pv_w, cons_w, batt_w, grid_w, headroom, stale_inputs,
+                              uncertainty=None, phases=None):
+        # In-process channel to the scheduler (no round-trip through the Headroom state)
+        mgr = getattr(self, "_ss_manager", None)
+        if mgr is not None:
+            mgr.push_sample(dev.id, {
+                "ts": time.time(),
+                "origin": origin,
+                "pv": pv_w,
+                "cons": cons_w,
+                "batt": batt_w,
+                "grid": grid_w,
+                "headroom": headroom,
+                "stale": stale_inputs,
+                "uncertainty": uncertainty,
+                "phases": phases,
+            })
+
+    # ========================
+    # Fused headroom estimator
+    # ========================
+    # Measurement noise of a fresh reading (W): a single grid meter vs. a PV - consumption
+    # - battery balance built from two or three meters
+    _EST_SIGMA_W = {"grid": 30.0, "balance": 60.0}
+
+    def _fused_headroom(self, dev, props, pv_w, cons_w, batt_w, grid_w, synthetic: bool = False):
+        """
+        Fuse every available reading of net export into one estimate (estimator.py):
+          grid    : -grid
+          balance : PV - consumption - battery
+        Each reading is weighted by its age (now - source device lastChanged), so the faster
+        meter leads. Like the PV/Consumption formula, battery discharge is not counted as
+        headroom. Returns (headroom W, uncertainty W), or None if nothing could be read.
+        """
+        now = time.time()
+        plan = self._source_plan(props)
+
+        def _age(quantities) -> float:
+            if synthetic:
+                return 0.0
+            stamps = [self._source_changed_at.get(d) for q in quantities for d in plan.device_ids(q)]
+            stamps = [ts for ts in stamps if ts is not None]
+            return max(0.0, now - min(stamps)) if stamps else 0.0
+
+        readings = []
+        if grid_w is not None:
+            readings.append((-float(grid_w), self._EST_SIGMA_W["grid"], _age(("grid",))))
+        if pv_w is not None and cons_w is not None:
+            readings.append((float(pv_w) - float(cons_w) - float(batt_w or 0.0),
+                             self._EST_SIGMA_W["balance"], _age(("pv", "cons", "batt"))))
+        est = self._estimators.setdefault(dev.id, HeadroomEstimator())
+        x = est.update(now, readings)
+        if x is None:
+            return None
+        if batt_w is not None:
+            x += min(float(batt_w), 0.0)
+        return x, est.uncertainty
+
+    # ========================
+    # Source freshness watchdog
+    # ========================
+    @staticmethod
+    def _fmt_age(secs) -> str:
+        if secs is None:
+            return "never"
+        secs = int(secs)
+        if secs < 120:
+            return f"{secs}s"
+        if secs < 7200:
+            return f"{secs // 60}m"
+        return f"{secs // 3600}h{(secs % 3600) // 60:02d}m"
+
+    def _check_source_freshness(self, dev, props, values: dict, use_grid: bool, origin: str,
+                                publish: bool = True, fused: bool = False) -> list:
+        """
+        Track last change / update intervals / stuck values for every source feeding this
+        Main's headroom, publish the watchdog states, and return a list of problems
+        (empty when all inputs are fresh).
+
+          stale : the source device has not changed for staleSecs (integration dead?)
+          stuck : the same non-zero reading held for stuckMins while the device is alive
+        """
+        now = time.time()
+        try:
+            stale_secs = max(30.0, float(props.get("staleSecs", "600") or 600))
+        except Exception:
+            stale_secs = 600.0
+        try:
+            stuck_secs = max(0.0, float(props.get("stuckMins", "30") or 0)) * 60.0
+        except Exception:
+            stuck_secs = 1800.0
+
+        trackers = self._freshness.setdefault(dev.id, {})
+        problems, ages, intervals = [], [], []
+        oldest = 0.0
+        newest_change = None
+        plan = self._source_plan(props)
+        for q, _dev_key, _state_key, _inv_key, _extra_key, label in self._SOURCE_QUANTITIES:
+            # Grid-only mode runs on the grid meter alone; otherwise grid is not an input
+            # (fused mode uses every configured source)
+            if (not fused and use_grid != (q == "grid")) or not plan.configured(q):
+                continue
+            # Several source devices: the quantity is only as fresh as its slowest device
+            changed = [self._source_changed_at.get(d) for d in plan.device_ids(q)]
+            tr = trackers.setdefault(q, SourceFreshness())
+            tr.observe(values.get(q), now, None if None in changed else min(changed))
+            age = tr.age(now)
+            if values.get(q) is None:
+                problems.append(f"{label} unreadable")
+            elif age is not None and age > stale_secs:
+                problems.append(f"{label} stale {self._fmt_age(age)}")
+            elif stuck_secs and tr.stuck_for(now) > stuck_secs:
+                problems.append(f"{label} stuck {self._fmt_age(tr.stuck_for(now))}")
+            ages.append(f"{label} {self._fmt_age(age)}")
+            p50, p90 = tr.interval_percentile(50), tr.interval_percentile(90)
+            if p50 is not None:
+                fmt = lambda v: f">{INTERVAL_EDGES[-1]:g}s" if v == float("inf") else f"≤{v:g}s"
+                intervals.append(f"{label} p50{fmt(p50)} p90{fmt(p90)}")
+            if age is not None:
+                oldest = max(oldest, age)
+            if tr.last_change is not None:
+                newest_change = tr.last_change if newest_change is None else max(newest_change, tr.last_change)
+
+        if not publish:
+            return problems
+        kv = [
+            {"key": "InputStatus", "value": "; ".join(problems) if problems else "OK"},
+            {"key": "InputsStale", "value": bool(problems)},
+            {"key": "SourceAges", "value": " · ".join(ages)},
+            {"key": "OldestSourceAgeSecs", "value": int(oldest)},
+            {"key": "SourceUpdateIntervals", "value": " · ".join(intervals)},
+        ]
+        if newest_change is not None:
+            kv.append({"key": "LastSourceChange",
+                       "value": datetime.fromtimestamp(newest_change).strftime("%Y-%m-%d %H:%M:%S")})
+            if origin == "event":
+                # Source change -> headroom recomputed (includes the event debounce)
+                kv.append({"key": "IngestLatencyMs", "value": int(max(0.0, now - newest_change) * 1000)})
+        try:
+            self._pub.set_many(dev, kv)
+        except Exception as e:
+            if getattr(self, "debug2", False):
+                self.logger.debug(f"Failed updating freshness states: {e}")
+        if problems and getattr(self, "debug2", False):
+            self.logger.debug(f"_check_source_freshness: {dev.name}: {'; '.join(problems)}")
+        return problems
+
     # ========================
     # Small helper
     # ========================
@@ -2922,7 +5096,7 @@ class Plugin(indigo.PluginBase):
         Accepts optional overrides so logs reflect just-edited config (valuesDict) before Indigo writes pluginProps.
         """
         # Prefer enabled Test device
-        test_dev = next((d for d in indigo.devices if d.deviceTypeId == "solarsmartTest" and d.enabled), None)
+        test_dev = self._registry.test_device()
         if test_dev:
             # Merge just-edited valuesDict over saved pluginProps (valuesDict wins)
             saved = test_dev.pluginProps or {}
@@ -2973,7 +5147,7 @@ class Plugin(indigo.PluginBase):
             return  # done
 
         # Otherwise, log Main device config if present (merge override if provided)
-        main = next((d for d in indigo.devices if d.deviceTypeId == "solarsmartMain" and d.enabled), None)
+        main = self._registry.first_main()
         if not main:
             return
 
@@ -2982,16 +5156,8 @@ class Plugin(indigo.PluginBase):
 
         use_grid = bool(props.get("useGridHeadroom", False))
 
-        grid_w = None
-        if use_grid and hasattr(self, "read_grid_watts"):
-            try:
-                grid_w = self.read_grid_watts(props)
-            except Exception:
-                grid_w = None
-
-        pv_w = self.read_pv_watts(props)
-        cons_w = self.read_consumption_watts(props)
-        batt_w = self.read_battery_watts(props)
+        vals = self.read_source_watts(props, ("pv", "cons", "batt", "grid") if use_grid else ("pv", "cons", "batt"))
+        pv_w, cons_w, batt_w, grid_w = vals["pv"], vals["cons"], vals["batt"], vals.get("grid")
 
         headroom = None
         if use_grid and grid_w is not None:
@@ -3006,6 +5172,12 @@ class Plugin(indigo.PluginBase):
         self.logger.info(u"{0:=^130}".format(""))
         self.logger.info("🔌🔌 SolarSmart Setup 🔌🔌")
         self.logger.info("")
+        plan = self._source_plan(props)
+        summed = [f"{row[5]} ×{len(plan.by_quantity[row[0]])}" for row in self._SOURCE_QUANTITIES
+                  if len(plan.by_quantity.get(row[0], ())) > 1]
+        if summed:
+            self.logger.info(f"Summing multiple sources: {', '.join(summed)} "
+                             f"({len(plan.by_device)} source device(s), read once per sample)")
         if use_grid and grid_w is not None:
             flow_desc = "⚡ Importing from grid" if grid_w > 0 else (
                 "🔋 Exporting to grid" if grid_w < 0 else "➖ Balanced (no net flow)")
@@ -3043,6 +5215,15 @@ class Plugin(indigo.PluginBase):
             self._log_effective_source_summary(test_props_override=valuesDict)
             return valuesDict
 
+        if typeId == "solarsmartLoad":
+            # Swap in the edited config now; deviceUpdated then finds it unchanged
+            if not userCancelled and devId in self._registry:
+                if self._registry.set_config(devId, valuesDict) and getattr(self, "debug2", False):
+                    self.logger.debug(f"closedDeviceConfigUi: re-indexed Load #{devId} (tier / control target changed)")
+                if getattr(self, "_ss_manager", None):
+                    self._ss_manager.mark_dirty(devId, f"Load #{devId} edited", wake=True)
+            return valuesDict
+
         if typeId != "solarsmartMain":
             return valuesDict
 
@@ -3058,7 +5239,8 @@ class Plugin(indigo.PluginBase):
         if not userCancelled:
             if getattr(self, "debug2", False):
                 self.logger.debug(f"closedDeviceConfigUi: applying immediate update for SolarSmart Main #{devId}")
-            self._update_solarsmart_states(dev)
+            with self._pub.batch():
+                self._update_solarsmart_states(dev)
 
         return valuesDict
 
@@ -3223,27 +5405,27 @@ class Plugin(indigo.PluginBase):
                 rated_val = int(float(props.get("ratedWatts", 0)) or 0)
             except Exception:
                 rated_val = 0
-            dev.updateStateOnServer("Tier", tier_val)
-            dev.updateStateOnServer("PowerRated", rated_val)
+            self._pub.set(dev, "Tier", tier_val)
+            self._pub.set(dev, "PowerRated", rated_val)
 
             # ---------- Persisted counters / anchors ----------
-            st["served_quota_mins"] = int(dev.states.get("RuntimeQuotaMins", 0) or 0)
+            st["served_quota_mins"] = int(self._pub.get(dev, "RuntimeQuotaMins", 0) or 0)
 
-            q_ts = dev.states.get("QuotaAnchorTs", "")
+            q_ts = self._pub.get(dev, "QuotaAnchorTs", "")
             st["quota_anchor_ts"] = float(q_ts) if q_ts not in ("", None) else None
 
             # NEW: Catch-up window persisted minutes and anchor
             try:
-                st["served_cu_mins"] = int(dev.states.get("RuntimeCatchupMins", 0) or 0)
+                st["served_cu_mins"] = int(self._pub.get(dev, "RuntimeCatchupMins", 0) or 0)
             except Exception:
                 st["served_cu_mins"] = 0
-            cu_ts = dev.states.get("CatchupAnchorTs", "")
+            cu_ts = self._pub.get(dev, "CatchupAnchorTs", "")
             st["cu_anchor_ts"] = float(cu_ts) if cu_ts not in ("", None) else None
 
-            s_ts = dev.states.get("LastStartTs", "")
+            s_ts = self._pub.get(dev, "LastStartTs", "")
             st["start_ts"] = float(s_ts) if s_ts not in ("", None) else None
 
-            s_ts = dev.states.get("LastStartTs", "")
+            s_ts = self._pub.get(dev, "LastStartTs", "")
             st["start_ts"] = float(s_ts) if s_ts not in ("", None) else None
 
             # Preferred runtime target (for Remaining computation only)
@@ -3257,7 +5439,7 @@ class Plugin(indigo.PluginBase):
             anchor = st.get("quota_anchor_ts")
             if anchor is None or not (last_slot_ts <= float(anchor) < next_slot_ts):
                 st["quota_anchor_ts"] = last_slot_ts
-                dev.updateStateOnServer("QuotaAnchorTs", f"{last_slot_ts:.3f}")
+                self._pub.set(dev, "QuotaAnchorTs", f"{last_slot_ts:.3f}")
 
             # ---------- Align catch-up anchor to current catch-up slot (no runtime reset) ----------
             try:
@@ -3311,24 +5493,24 @@ class Plugin(indigo.PluginBase):
                 cu_anchor = st.get("cu_anchor_ts")
                 if cu_anchor is None or not (cu_last_ts <= float(cu_anchor) < cu_next_ts):
                     st["cu_anchor_ts"] = cu_last_ts
-                    dev.updateStateOnServer("CatchupAnchorTs", f"{cu_last_ts:.3f}")
+                    self._pub.set(dev, "CatchupAnchorTs", f"{cu_last_ts:.3f}")
             except Exception:
                 pass
 
             # ---------- Cosmetic runtime window state ----------
             try:
-                run_window = int(dev.states.get("RuntimeWindowMins", 0) or 0)
+                run_window = int(self._pub.get(dev, "RuntimeWindowMins", 0) or 0)
             except Exception:
                 run_window = 0
-            if dev.states.get("RuntimeWindowMins", None) is None:
-                dev.updateStateOnServer("RuntimeWindowMins", run_window)
+            if self._pub.get(dev, "RuntimeWindowMins", None) is None:
+                self._pub.set(dev, "RuntimeWindowMins", run_window)
             # Keep window <= served (for table consistency)
             if run_window > st["served_quota_mins"]:
-                dev.updateStateOnServer("RuntimeWindowMins", st["served_quota_mins"])
+                self._pub.set(dev, "RuntimeWindowMins", st["served_quota_mins"])
 
             # ---------- Remaining (no clamp of served to target) ----------
             remaining = max(0, target_pref - st["served_quota_mins"]) if target_pref > 0 else 0
-            dev.updateStateOnServer("RemainingQuotaMins", remaining)
+            self._pub.set(dev, "RemainingQuotaMins", remaining)
 
             # ---------- Mirror external device ON/OFF if in device control mode ----------
             ext_on = None
@@ -3343,6 +5525,14 @@ class Plugin(indigo.PluginBase):
                             ext_on = bool(ext.onState)
                         except Exception:
                             ext_on = bool(ext.states.get("onOffState", False))
+                elif ctrl_mode == "setpoint":
+                    sp = SetpointConfig.from_props(props)
+                    value = self._read_setpoint(sp) if sp is not None else None
+                    if value is not None:
+                        ext_on = value != sp.off_value
+                        if ext_on:
+                            # Resume tracking from the setting it was left at
+                            self._setpoint_cmd[dev.id] = (sp.watts_for(value), 0.0, value)
             except Exception:
                 ext_on = None
 
@@ -3351,31 +5541,42 @@ class Plugin(indigo.PluginBase):
                 logical_on = (not ext_on) if inverted else bool(ext_on)
                 st["IsRunning"] = logical_on
                 if logical_on:
-                    dev.updateStateOnServer("IsRunning", True)
-                    dev.updateStateOnServer("Status", "CONSUMING" if inverted else "RUNNING")
-                    dev.updateStateOnServer("LastReason", "Hydrate from external onOffState")
+                    self._pub.set(dev, "IsRunning", True)
+                    self._pub.set(dev, "Status", "CONSUMING" if inverted else "RUNNING")
+                    self._pub.set(dev, "LastReason", "Hydrate from external onOffState")
                     # Seed start_ts if ON but missing
                     if not st.get("start_ts"):
                         now_ts = time.time()
                         st["start_ts"] = now_ts
-                        dev.updateStateOnServer("LastStartTs", f"{now_ts:.3f}")
+                        self._pub.set(dev, "LastStartTs", f"{now_ts:.3f}")
                         if getattr(self, "debug2", False):
                             self.logger.debug(
                                 f"Hydrate: seeded start_ts for {dev.name} because external device is ON without persisted LastStartTs")
                 else:
-                    dev.updateStateOnServer("IsRunning", False)
-                    dev.updateStateOnServer("Status", "SAVING" if inverted else "OFF")
-                    dev.updateStateOnServer("LastReason", "Hydrate from external onOffState")
+                    self._pub.set(dev, "IsRunning", False)
+                    self._pub.set(dev, "Status", "SAVING" if inverted else "OFF")
+                    self._pub.set(dev, "LastReason", "Hydrate from external onOffState")
             else:
                 st["IsRunning"] = False
-                dev.updateStateOnServer("IsRunning", False)
-                dev.updateStateOnServer("Status", "SAVING" if inverted else "OFF")
-                if not dev.states.get("LastReason"):
-                    dev.updateStateOnServer("LastReason", "Plugin restart recovery")
+                self._pub.set(dev, "IsRunning", False)
+                self._pub.set(dev, "Status", "SAVING" if inverted else "OFF")
+                if not self._pub.get(dev, "LastReason"):
+                    self._pub.set(dev, "LastReason", "Plugin restart recovery")
+
+            # ---------- Hydrate multi-stage load (carry on from the stage it was left at) ----------
+            stages = stages_from_props(props, 0)
+            if stages:
+                try:
+                    stage = int(self._pub.get(dev, "Stage", 0) or 0) if st.get("IsRunning") else 0
+                except Exception:
+                    stage = 0
+                st["stage"] = min(len(stages), max(1, stage)) if st.get("IsRunning") else 0
+                st["stage_change_ts"] = time.time()
+                self._pub.set(dev, "Stage", st["stage"])
 
             # ---------- Hydrate manual override ----------
             try:
-                raw_until = dev.states.get("overrideUntilTs", "")
+                raw_until = self._pub.get(dev, "overrideUntilTs", "")
                 if raw_until:
                     self._load_state.setdefault(dev.id, {})["override_until_ts"] = float(raw_until)
                     active, _ = self._override_status(dev)  # also clears if expired
@@ -3386,7 +5587,7 @@ class Plugin(indigo.PluginBase):
 
             # ---------- Hydrate catch-up run seconds ----------
             try:
-                cur_cu_run = int(dev.states.get("catchupRunTodayMins", 0) or 0)
+                cur_cu_run = int(self._pub.get(dev, "catchupRunTodayMins", 0) or 0)
                 st.setdefault("catchup_run_secs", cur_cu_run * 60)
             except Exception:
                 pass
@@ -3394,8 +5595,8 @@ class Plugin(indigo.PluginBase):
             if getattr(self, "debug2", False):
                 self.logger.debug(
                     f"Hydrated {dev.name}: served={st['served_quota_mins']}m (target={target_pref}m), "
-                    f"remaining={dev.states.get('RemainingQuotaMins')}m, "
-                    f"windowRun={dev.states.get('RuntimeWindowMins')}m, "
+                    f"remaining={self._pub.get(dev, 'RemainingQuotaMins')}m, "
+                    f"windowRun={self._pub.get(dev, 'RuntimeWindowMins')}m, "
                     f"anchor={st['quota_anchor_ts']}, start_ts={st.get('start_ts')}, "
                     f"IsRunning={st.get('IsRunning')} (ext_on={ext_on})"
                 )
@@ -3414,8 +5615,18 @@ class Plugin(indigo.PluginBase):
     def deviceStartComm(self, dev):
         """Indigo calls this when a device (of any type) starts communication."""
         dev.stateListOrDisplayStateIdChanged()
+        self._registry.add(dev)
         if dev.deviceTypeId == "solarsmartLoad":
             self._hydrate_load_state_from_device(dev)
+            cfg = self._registry.config(dev.id)
+            if cfg is not None and cfg.power_source:
+                self._rebuild_source_watch()    # subscribe so its meter's readings arrive
+        if dev.deviceTypeId == "solarsmartMeter":
+            # Before the async manager exists, its start() picks the meter up from the registry
+            mgr = getattr(self, "_ss_manager", None)
+            if mgr is not None:
+                mgr.start_meter(dev.id)
+            return
 
         if dev.deviceTypeId != "solarsmartMain":
             return
@@ -3424,12 +5635,171 @@ class Plugin(indigo.PluginBase):
         # Push an immediate refresh of custom states on startup
         if dev.deviceTypeId == "solarsmartMain":
             self.pluginPrefs["main_device_id"] = str(dev.id)
-        self._update_solarsmart_states(dev)
+        self._rebuild_source_watch()
+        with self._pub.batch():
+            self._update_solarsmart_states(dev)
 
     # Shut 'em down.
     def deviceStopComm(self, dev):
         if self.debug1:
             self.debugLog(u"deviceStopComm() method called.")
+        self._registry.remove(dev.id)
+        if dev.deviceTypeId == "solarsmartMain":
+            self._rebuild_source_watch(exclude_id=dev.id)
+        if dev.deviceTypeId == "solarsmartMeter":
+            mgr = getattr(self, "_ss_manager", None)
+            if mgr is not None:
+                mgr.stop_meter(dev.id)
+            self._meter_values.pop(dev.id, None)
+
+    def deviceUpdated(self, origDev, newDev):
+        """
+        Called for our own devices and (once subscribed) for every Indigo device.
+        Source devices feeding an event-driven Main trigger an immediate headroom recompute.
+        Changes that matter to the load scheduler mark the affected loads dirty (incremental runs).
+        """
+        indigo.PluginBase.deviceUpdated(self, origDev, newDev)
+        mgr = getattr(self, "_ss_manager", None)
+        if newDev.id in self._registry:
+            cfg_before = self._registry.config(newDev.id)
+            if self._registry.update(newDev):
+                if getattr(self, "debug2", False):
+                    self.logger.debug(f"deviceUpdated: re-indexed {newDev.name} (tier / control target / power meter changed)")
+                if self._registry.has_power_meters():
+                    self._rebuild_source_watch()
+            if mgr is not None and newDev.deviceTypeId == "solarsmartLoad":
+                cfg_now = self._registry.config(newDev.id)
+                if cfg_now is not cfg_before:
+                    mgr.mark_dirty(newDev.id, "settings changed")
+                    if cfg_before is not None and cfg_now is not None and cfg_now.power_source != cfg_before.power_source:
+                        # Another meter: learn from scratch
+                        mgr.reset_power_learner(newDev.id)
+                        self._pub.set_many(newDev, [{"key": k, "value": 0} for k in
+                                                    ("PowerSteadyW", "PowerInrushW", "PowerSamples", "PowerStarts")])
+                if origDev.states.get("IsRunning") != newDev.states.get("IsRunning"):
+                    mgr.mark_dirty(None, f"{newDev.name} IsRunning changed")
+        else:
+            # A load's control switch flipped outside the scheduler
+            owners = self._registry.loads_for_target(newDev.id)
+            if owners and mgr is not None and getattr(origDev, "onState", None) != getattr(newDev, "onState", None):
+                for load_id in owners:
+                    mgr.mark_dirty(load_id, f"control device '{newDev.name}' switched", wake=True)
+        if newDev.deviceTypeId == "solarsmartMain":
+            op, np_ = origDev.pluginProps or {}, newDev.pluginProps or {}
+            if mgr is not None and op != np_:
+                mgr.mark_dirty(None, f"{newDev.name} settings changed")
+            if op.get("incrementalTicks") != np_.get("incrementalTicks"):
+                self._rebuild_source_watch()
+            if any(op.get(k) != np_.get(k) for k in self._SOURCE_CONFIG_KEYS):
+                # Source selection / sign convention changed: re-resolve adapters on next read
+                self._adapters.invalidate()
+                self._estimators.pop(newDev.id, None)
+            # Ring geometry depends on these props: rebuild the telemetry buffer when they change
+            if any(op.get(k) != np_.get(k) for k in ("telemetryHours", "telemetryCompact", "ingestMode")):
+                if mgr is not None:
+                    mgr.reset_telemetry(newDev.id)
+        if newDev.deviceTypeId == "solarsmartMeter":
+            # Meter readings reach the Mains in-process; its own state writes are not source changes
+            return
+        if mgr is not None and self._registry.loads_for_meter(newDev.id):
+            # A Load's own power meter (Load prop powerSource)
+            mgr.observe_power(newDev.id)
+        watch = self._source_watch.get(newDev.id)
+        if not watch:
+            return
+        try:
+            if mgr is None:
+                return
+            for main_id, keys in watch.items():
+                if any(origDev.states.get(k) != newDev.states.get(k) for k in keys):
+                    mgr.notify_source_change(main_id, newDev.id)
+        except Exception:
+            self.logger.exception(f"deviceUpdated: error handling source change for {newDev.name}")
+
+    def deviceDeleted(self, dev):
+        indigo.PluginBase.deviceDeleted(self, dev)
+        self._registry.remove(dev.id)
+        self._pub.discard(dev.id)
+        if getattr(self, "_ss_manager", None):
+            self._ss_manager.forget_load(dev.id)
+        self._setpoint_cmd.pop(dev.id, None)
+        self._adapters.invalidate(dev.id)
+        if dev.deviceTypeId == "solarsmartMain" or dev.id in self._source_watch:
+            self._rebuild_source_watch(exclude_id=dev.id)
+
+    # ========================
+    # Plugin events (Events.xml)
+    # ========================
+    def triggerStartProcessing(self, trigger):
+        if self.debug1:
+            self.logger.debug(f"triggerStartProcessing: {trigger.name} ({trigger.pluginTypeId})")
+        self.triggers[trigger.id] = trigger
+
+    def triggerStopProcessing(self, trigger):
+        if self.debug1:
+            self.logger.debug(f"triggerStopProcessing: {trigger.name} ({trigger.pluginTypeId})")
+        self.triggers.pop(trigger.id, None)
+
+    def validateEventConfigUi(self, valuesDict, typeId, eventId):
+        errorDict = indigo.Dict()
+        try:
+            float((valuesDict.get("thresholdW") or "").replace(",", ""))
+        except Exception:
+            errorDict["thresholdW"] = "Enter a threshold in Watts (may be negative), e.g., 1500."
+        try:
+            if float(valuesDict.get("durationMins") or "") < 0:
+                raise ValueError()
+        except Exception:
+            errorDict["durationMins"] = "Enter a duration in minutes (0 or more)."
+        if len(errorDict):
+            return (False, valuesDict, errorDict)
+        valuesDict["thresholdW"] = valuesDict["thresholdW"].replace(",", "")
+        return (True, valuesDict)
+
+    # ========================
+    # Event-driven ingestion
+    # ========================
+    # (quantity, device prop, state prop, invert prop, additional sources prop, label)
+    _SOURCE_QUANTITIES = (("pv", "pvDeviceId", "pvStateId", "pvInvert", "pvExtraSources", "PV"),
+                          ("cons", "consDeviceId", "consStateId", "consInvert", "consExtraSources", "Consumption"),
+                          ("batt", "battDeviceId", "battStateId", "battInvert", "battExtraSources", "Battery"),
+                          ("grid", "gridDeviceId", "gridStateId", "gridInvert", "gridExtraSources", "Grid"))
+    _SOURCE_CONFIG_KEYS = tuple(k for row in _SOURCE_QUANTITIES for k in row[1:5]) + tuple(
+        k for _q, k, _label in PHASE_SOURCE_KEYS)
+
+    def _rebuild_source_watch(self, exclude_id: int | None = None):
+        """
+        Rebuild the map of source device id -> {main id: {state keys}} for every enabled
+        Main in event-driven ingest mode. Subscribes to Indigo device changes the first
+        time a watch is needed, or a Main uses incremental scheduler runs (those need to see
+        control switches flip) or a Load learns its draw from a power meter device (powerSource).
+        Indigo has no unsubscribe; unwatched changes are ignored.
+        """
+        watch: dict[int, dict[int, set[str]]] = {}
+        incremental = False
+        try:
+            for main in self._registry.mains():
+                if main.id == exclude_id:
+                    continue
+                props = main.pluginProps or {}
+                incremental = incremental or bool(props.get("incrementalTicks", False))
+                if (props.get("ingestMode") or "poll") != "event":
+                    continue
+                for src_id, entries in self._source_plan(props).by_device.items():
+                    watch.setdefault(src_id, {}).setdefault(main.id, set()).update(e[1] for e in entries)
+        except Exception:
+            self.logger.exception("_rebuild_source_watch: failed to build source map")
+            return
+
+        self._source_watch = watch
+        if (watch or incremental or self._registry.has_power_meters()) and not self._changes_subscribed:
+            indigo.devices.subscribeToChanges()
+            self._changes_subscribed = True
+            self.logger.info("Event-driven headroom / incremental scheduling / load power meters: "
+                             "subscribed to Indigo device changes.")
+        if getattr(self, "debug2", False):
+            self.logger.debug(f"_rebuild_source_watch: watching {len(watch)} source device(s): "
+                              f"{ {k: sorted(v) for k, v in watch.items()} }")
 
 
     def shutdown(self):
@@ -3525,6 +5895,18 @@ class Plugin(indigo.PluginBase):
         items.sort(key=lambda t: t[1].lower())
         return items
 
+    def main_device_list(self, filter="", valuesDict=None, typeId="", targetId=0):
+        """Menu of SolarSmart Main devices for Events ("0" = any Main)."""
+        items = []
+        try:
+            for d in indigo.devices.iter("self"):
+                if d.deviceTypeId == "solarsmartMain":
+                    items.append((str(d.id), f"{d.name} (#{d.id})"))
+        except Exception:
+            pass
+        items.sort(key=lambda t: t[1].lower())
+        return [("0", "— Any SolarSmart Main —")] + items
+
     def _override_status(self, dev) -> tuple[bool, float | None]:
         """
         Return (active, until_ts). Auto-expires and clears if past.
@@ -3536,7 +5918,7 @@ class Plugin(indigo.PluginBase):
         # Hydrate from device states if missing in memory
         if "override_until_ts" not in st:
             try:
-                raw = dev.states.get("overrideUntilTs")
+                raw = self._pub.get(dev, "overrideUntilTs")
                 if raw:
                     st["override_until_ts"] = float(raw)
             except Exception:
@@ -3547,11 +5929,11 @@ class Plugin(indigo.PluginBase):
             return True, float(until)
 
         # Expired or not set -> clear device states if needed
-        if dev.states.get("overrideActive", False):
+        if self._pub.get(dev, "overrideActive", False):
             try:
-                dev.updateStateOnServer("overrideActive", False)
-                dev.updateStateOnServer("overrideUntil", "")
-                dev.updateStateOnServer("overrideUntilTs", "")
+                self._pub.set(dev, "overrideActive", False)
+                self._pub.set(dev, "overrideUntil", "")
+                self._pub.set(dev, "overrideUntilTs", "")
             except Exception:
                 pass
         st["override_until_ts"] = None
@@ -3569,25 +5951,29 @@ class Plugin(indigo.PluginBase):
             until_str = str(int(until_ts))
 
         try:
-            dev.updateStateOnServer("overrideActive", True)
-            dev.updateStateOnServer("overrideUntil", until_str)
-            dev.updateStateOnServer("overrideUntilTs", f"{until_ts:.3f}")
-            dev.updateStateOnServer("LastReason", f"Manual override until {until_str}")
+            self._pub.set(dev, "overrideActive", True)
+            self._pub.set(dev, "overrideUntil", until_str)
+            self._pub.set(dev, "overrideUntilTs", f"{until_ts:.3f}")
+            self._pub.set(dev, "LastReason", f"Manual override until {until_str}")
         except Exception:
             pass
         self.logger.info(f"Manual override enabled for '{dev.name}' until {until_str}. Scheduler will not start/stop this load.")
+        if getattr(self, "_ss_manager", None):
+            self._ss_manager.mark_dirty(dev.id, "manual override set", wake=True)
 
     def _clear_manual_override(self, dev):
         st = self._load_state.setdefault(dev.id, {})
         st["override_until_ts"] = None
         try:
-            dev.updateStateOnServer("overrideActive", False)
-            dev.updateStateOnServer("overrideUntil", "")
-            dev.updateStateOnServer("overrideUntilTs", "")
-            dev.updateStateOnServer("LastReason", "Manual override cleared")
+            self._pub.set(dev, "overrideActive", False)
+            self._pub.set(dev, "overrideUntil", "")
+            self._pub.set(dev, "overrideUntilTs", "")
+            self._pub.set(dev, "LastReason", "Manual override cleared")
         except Exception:
             pass
         self.logger.info(f"Manual override cleared for '{dev.name}'. Scheduler control resumed.")
+        if getattr(self, "_ss_manager", None):
+            self._ss_manager.mark_dirty(dev.id, "manual override cleared", wake=True)
 
     def set_manual_override_action(self, pluginAction):
         try:
@@ -3636,7 +6022,7 @@ class Plugin(indigo.PluginBase):
                 days_fmt.append(f"{self._fmt_local_date(d, main_dev)}: {round(est.watt_hours_day[d] / 1000.0, 2)} kWh")
             summary_str = ", ".join(days_fmt)
             self.logger.debug(f"Forecast.Solar summary: {summary_str}")
-            main_dev.updateStateOnServer("forecastSolarSummary", summary_str)
+            self._pub.set(main_dev, "forecastSolarSummary", summary_str)
 
             # Peaks
             peaks = {}
@@ -3653,7 +6039,7 @@ class Plugin(indigo.PluginBase):
                     peak_parts.append(f"{fmt_ts} = {round(watts / 1000.0, 2)} kW")
                 peak_str = "Peaks: " + ", ".join(peak_parts)
                 self.logger.debug(f"Forecast.Solar peaks: {peak_str}")
-                main_dev.updateStateOnServer("forecastSolarPeaks", peak_str)
+                self._pub.set(main_dev, "forecastSolarPeaks", peak_str)
 
             # Raw payload
             self.logger.debug("Forecast.Solar raw payload:\n" + json.dumps(est.raw_payload, indent=2)[:100000])
@@ -3882,15 +6268,15 @@ class Plugin(indigo.PluginBase):
 
         days = summary.days
         if len(days) >= 1:
-            main_dev.updateStateOnServer("forecastTodayDate", days[0].date)
-            main_dev.updateStateOnServer("forecastTodayKWh", f"{days[0].kwh:.2f}")
-            main_dev.updateStateOnServer("forecastPeakKWToday", f"{days[0].peak_kw:.2f}")
-            main_dev.updateStateOnServer("forecastPeakTimeToday", days[0].peak_time or "")
+            self._pub.set(main_dev, "forecastTodayDate", days[0].date)
+            self._pub.set(main_dev, "forecastTodayKWh", f"{days[0].kwh:.2f}")
+            self._pub.set(main_dev, "forecastPeakKWToday", f"{days[0].peak_kw:.2f}")
+            self._pub.set(main_dev, "forecastPeakTimeToday", days[0].peak_time or "")
         if len(days) >= 2:
-            main_dev.updateStateOnServer("forecastTomorrowDate", days[1].date)
-            main_dev.updateStateOnServer("forecastTomorrowKWh", f"{days[1].kwh:.2f}")
-            main_dev.updateStateOnServer("forecastPeakKWTomorrow", f"{days[1].peak_kw:.2f}")
-            main_dev.updateStateOnServer("forecastPeakTimeTomorrow", days[1].peak_time or "")
+            self._pub.set(main_dev, "forecastTomorrowDate", days[1].date)
+            self._pub.set(main_dev, "forecastTomorrowKWh", f"{days[1].kwh:.2f}")
+            self._pub.set(main_dev, "forecastPeakKWTomorrow", f"{days[1].peak_kw:.2f}")
+            self._pub.set(main_dev, "forecastPeakTimeTomorrow", days[1].peak_time or "")
 
     def _forecast_thread_loop(self):
         """
@@ -3902,9 +6288,7 @@ class Plugin(indigo.PluginBase):
             self.logger.debug("Forecast thread started (interval 600s)")
         while not getattr(self, "stopThread", False) and not getattr(self, "_forecast_thread_stop", False):
             try:
-                for dev in indigo.devices.iter("self"):
-                    if dev.deviceTypeId != "solarsmartMain" or not dev.enabled:
-                        continue
+                for dev in self._registry.mains():
                     props = dev.pluginProps or {}
                     if not bool(props.get("enableSolarForecast", False)):
                         continue
@@ -4043,6 +6427,59 @@ class Plugin(indigo.PluginBase):
             self.logger.debug(f"{valuesDict=}")
             use_grid = bool(valuesDict.get("useGridHeadroom", False))
 
+            # Additional sources: "deviceId:state[*scale]" entries, devices must exist
+            errorDict = indigo.Dict()
+            for _q, _dev_key, _state_key, _inv_key, extra_key, label in self._SOURCE_QUANTITIES:
+                try:
+                    for src_id, _key, _scale in parse_source_list(valuesDict.get(extra_key, "")):
+                        if src_id not in indigo.devices:
+                            raise ValueError(f"device #{src_id} not found")
+                except ValueError as e:
+                    errorDict[extra_key] = f"Additional {label} Sources: {e}"
+            if bool(valuesDict.get("phaseHeadroom", False)):
+                for _q, extra_key, label in PHASE_SOURCE_KEYS:
+                    try:
+                        for src_id, _key, _scale in parse_source_list(valuesDict.get(extra_key, "")):
+                            if src_id not in indigo.devices:
+                                raise ValueError(f"device #{src_id} not found")
+                    except ValueError as e:
+                        errorDict[extra_key] = f"{label} Sources: {e}"
+                if use_grid and not all(str(valuesDict.get(f"gridL{n}Sources", "")).strip() for n in (1, 2, 3)):
+                    errorDict["gridL1Sources"] = "“Use Grid Data Only” needs a grid source for every phase."
+            if bool(valuesDict.get("fuseHeadroom", False)):
+                try:
+                    if float(valuesDict.get("fuseMarginSigma", "1") or 0) < 0:
+                        raise ValueError()
+                except Exception:
+                    errorDict["fuseMarginSigma"] = "Enter a number ≥ 0 (e.g. 1)."
+            try:
+                if float(valuesDict.get("startSettleSecs", "60") or 0) < 0:
+                    raise ValueError()
+            except Exception:
+                errorDict["startSettleSecs"] = "Enter seconds ≥ 0 (e.g. 60)."
+            try:
+                if float(valuesDict.get("shedMarginW", "100") or 0) < 0:
+                    raise ValueError()
+            except Exception:
+                errorDict["shedMarginW"] = "Enter Watts ≥ 0 (e.g. 100)."
+            for key, lo, msg in (("schedWakeDeltaW", 0, "Enter Watts ≥ 0 (e.g. 250)."),
+                                 ("idlePvW", 0, "Enter Watts ≥ 0 (e.g. 20)."),
+                                 ("idleSampleSecs", 30, "Enter seconds ≥ 30 (e.g. 300)."),
+                                 ("emergencyHoldSecs", 0, "Enter seconds ≥ 0 (e.g. 10).")):
+                try:
+                    if float(valuesDict.get(key, "") or lo) < lo:
+                        raise ValueError()
+                except Exception:
+                    errorDict[key] = msg
+            if valuesDict.get("emergencyShed", False) in (True, "true", "True"):
+                try:
+                    if float(valuesDict.get("emergencyFloorW", "") or "x") >= 0:
+                        raise ValueError()
+                except Exception:
+                    errorDict["emergencyFloorW"] = "Enter a negative number of Watts (e.g. -1500)."
+            if errorDict:
+                return (False, valuesDict, errorDict)
+
             if use_grid:
                 grid_dev_ok = self._is_valid_device_choice(valuesDict.get("gridDeviceId", ""))
                 grid_st_ok = self._is_valid_state_choice(valuesDict.get("gridStateId", ""))
@@ -4068,6 +6505,30 @@ class Plugin(indigo.PluginBase):
                 errorDict["pvStateId"] = "Select the PV state."
             return (False, valuesDict, errorDict)
 
+        if typeId == "solarsmartMeter":
+            errorDict = indigo.Dict()
+            try:
+                cfg = self._meter_config(valuesDict)
+            except ValueError:
+                errorDict["scale"] = "Port, unit, register, scale and intervals must be numbers."
+                return (False, valuesDict, errorDict)
+            if cfg.protocol == "http":
+                if not cfg.url.lower().startswith(("http://", "https://")):
+                    errorDict["url"] = "Enter an http:// or https:// URL."
+            elif not cfg.host:
+                errorDict["host"] = "Enter the meter / broker address."
+            if cfg.protocol == "mqtt" and not cfg.topic:
+                errorDict["topic"] = "Enter the topic carrying the reading."
+            if cfg.protocol == "modbus" and not (0 <= cfg.register <= 65535 and 0 <= cfg.unit <= 255):
+                errorDict["register"] = "Register 0–65535, unit 0–255."
+            if cfg.protocol == "modbus" and cfg.data_type not in MODBUS_TYPES:
+                errorDict["dataType"] = "Select a data type."
+            if cfg.scale == 0:
+                errorDict["scale"] = "Scale cannot be 0."
+            if errorDict:
+                return (False, valuesDict, errorDict)
+            return (True, valuesDict)
+
         if typeId != "solarsmartLoad":
             return (True, valuesDict)
 
@@ -4111,6 +6572,26 @@ class Plugin(indigo.PluginBase):
             errorDict["maxRuntimePerQuotaMins"] = "Enter minutes (positive integer)."
             ok = False
 
+        # Sustain window (optional, 0 = off)
+        if not (valuesDict.get("sustainSecs") or "0").strip().isdigit():
+            errorDict["sustainSecs"] = "Enter seconds (0 = off)."
+            ok = False
+
+        # Measured power (optional): one deviceId:state[*scale] entry, device must exist
+        try:
+            sources = parse_source_list(valuesDict.get("powerSource", ""))
+            if len(sources) > 1:
+                raise ValueError("enter a single source")
+            for src_id, _key, _scale in sources:
+                if src_id not in indigo.devices:
+                    raise ValueError(f"device #{src_id} not found")
+        except ValueError as e:
+            errorDict["powerSource"] = f"Power Meter: {e}"
+            ok = False
+        if not (valuesDict.get("powerInrushSecs") or "20").strip().isdigit():
+            errorDict["powerInrushSecs"] = "Enter seconds (e.g. 20)."
+            ok = False
+
         # Control mode requirements
         mode = valuesDict.get("controlMode", "actionGroup")
         if mode == "actionGroup":
@@ -4120,11 +6601,59 @@ class Plugin(indigo.PluginBase):
             if not _is_valid_choice(valuesDict.get("offActionGroupId")):
                 errorDict["offActionGroupId"] = "Select an Action Group to turn OFF."
                 ok = False
+        elif mode == "setpoint":
+            if not _is_valid_choice(valuesDict.get("setpointTargetId")):
+                errorDict["setpointTargetId"] = "Select the dimmer, thermostat or variable to set."
+                ok = False
+            sp_num = {}
+            for key in ("setpointMinW", "setpointMaxW", "setpointMinValue", "setpointMaxValue", "setpointStep",
+                        "setpointOffValue", "setpointReserveW", "setpointRampWps", "setpointIntervalSecs"):
+                try:
+                    sp_num[key] = float(str(valuesDict.get(key, "")).replace(",", "").strip())
+                except ValueError:
+                    errorDict[key] = "Enter a number."
+                    ok = False
+            if "setpointMinW" in sp_num and "setpointMaxW" in sp_num and not 0 <= sp_num["setpointMinW"] < sp_num["setpointMaxW"]:
+                errorDict["setpointMaxW"] = "Maximum Watts must be above the minimum (and the minimum 0 or more)."
+                ok = False
+            if sp_num.get("setpointMinValue") == sp_num.get("setpointMaxValue") and "setpointMinValue" in sp_num:
+                errorDict["setpointMaxValue"] = "The settings for minimum and maximum power must differ."
+                ok = False
+            for key in ("setpointStep", "setpointReserveW", "setpointRampWps", "setpointIntervalSecs"):
+                if sp_num.get(key, 0) < 0:
+                    errorDict[key] = "Enter a number ≥ 0."
+                    ok = False
         else:
             if not _is_valid_choice(valuesDict.get("controlDeviceId")):
                 errorDict["controlDeviceId"] = "Select the target device to control."
                 ok = False
 
+        # Multi-stage load: every extra stage needs Watts and a device or both Action Groups
+        extra = min(MAX_EXTRA_STAGES, max(0, self._safe_int(valuesDict.get("extraStages")) or 0))
+        if extra and mode == "setpoint":
+            errorDict["extraStages"] = "A setpoint load sets its power itself: it has no stages."
+            ok = False
+        elif extra:
+            for k in range(2, extra + 2):
+                try:
+                    if float(str(valuesDict.get(f"stage{k}Watts", "")).replace(",", "").strip()) <= 0:
+                        raise ValueError
+                except ValueError:
+                    errorDict[f"stage{k}Watts"] = f"Enter the Watts stage {k} adds (> 0)."
+                    ok = False
+                if not _is_valid_choice(valuesDict.get(f"stage{k}DeviceId")) and not (
+                        _is_valid_choice(valuesDict.get(f"stage{k}OnActionGroupId"))
+                        and _is_valid_choice(valuesDict.get(f"stage{k}OffActionGroupId"))):
+                    errorDict[f"stage{k}DeviceId"] = f"Select a device, or ON and OFF Action Groups, for stage {k}."
+                    ok = False
+            for key in ("stageMinRunMins", "stageCooldownMins"):
+                try:
+                    if float(str(valuesDict.get(key, "0") or 0).strip()) < 0:
+                        raise ValueError
+                except ValueError:
+                    errorDict[key] = "Enter minutes ≥ 0."
+                    ok = False
+
         if not ok:
             return (False, valuesDict, errorDict)
         return (True, valuesDict)
@@ -4156,8 +6685,8 @@ class Plugin(indigo.PluginBase):
 
             self._execute_load_action_with_props(dev, turn_on=turn_on,
                                                  reason=f"Manual TEST {'ON' if turn_on else 'OFF'}", props=props)
-            dev.updateStateOnServer("Status", f"{'ON' if turn_on else 'OFF'} (test)")
-            dev.updateStateOnServer("LastReason", f"Manual TEST {'ON' if turn_on else 'OFF'}")
+            self._pub.set(dev, "Status", f"{'ON' if turn_on else 'OFF'} (test)")
+            self._pub.set(dev, "LastReason", f"Manual TEST {'ON' if turn_on else 'OFF'}")
 
         except Exception as e:
             self.logger.exception(f"test_button_common error: {e}")
@@ -4179,6 +6708,11 @@ class Plugin(indigo.PluginBase):
             if on_ag is None or on_ag <= 0 or off_ag is None or off_ag <= 0:
                 return False, "Select valid Action Groups for ON and OFF before testing."
             return True, ""
+        elif mode == "setpoint":
+            target_id = self._safe_int(props.get("setpointTargetId"))
+            if target_id is None or target_id <= 0:
+                return False, "Select a setpoint target before testing."
+            return True, ""
         else:
             dev_id = self._safe_int(props.get("controlDeviceId"))
             if dev_id is None or dev_id <= 0:
@@ -4215,6 +6749,14 @@ class Plugin(indigo.PluginBase):
                 else:
                     raise ValueError(f"No valid Action Group ID for {load_dev.name}")
 
+            elif mode == "setpoint":
+                # Variable power: start at the lowest setting (the tracking loop takes it up), stop = off setting
+                sp = SetpointConfig.from_props(props)
+                if sp is None or sp.target_id <= 0:
+                    raise ValueError(f"No valid setpoint target for {load_dev.name}")
+                if not self._write_setpoint(load_dev, sp, sp.min_w if turn_on else None):
+                    return
+
             else:  # Device mode
                 target_id = self._safe_int(props.get("controlDeviceId"))
                 if not target_id or target_id <= 0:
@@ -4251,15 +6793,15 @@ class Plugin(indigo.PluginBase):
 
             # If called from scheduler (or if explicitly told), update the states
             if update_states:
-                load_dev.updateStateOnServer("IsRunning", turn_on)
-                load_dev.updateStateOnServer("LastReason", reason)
+                self._pub.set(load_dev, "IsRunning", turn_on)
+                self._pub.set(load_dev, "LastReason", reason)
                 inverted = bool((props or {}).get("invertOnOff", False))
                 if inverted:
                     # Logical turn_on=True => consuming; False => saving
                     status_word = "CONSUMING" if turn_on else "SAVING"
                 else:
                     status_word = "RUNNING" if turn_on else "OFF"
-                load_dev.updateStateOnServer("Status", status_word)
+                self._pub.set(load_dev, "Status", status_word)
                 try:
                     if hasattr(self, "_ss_manager"):
                         self._ss_manager._update_runtime_progress(load_dev)
@@ -4270,6 +6812,69 @@ class Plugin(indigo.PluginBase):
         except Exception as e:
             self.logger.error(f"Error executing action for {load_dev.name}: {e}")
 
+    def _execute_stage_action(self, load_dev: indigo.Device, number: int, stage: Stage, turn_on: bool) -> bool:
+        """Switch stage `number` (2..) of a multi-stage Load: its device, else its Action Groups."""
+        try:
+            if stage.device_id > 0:
+                if turn_on:
+                    indigo.device.turnOn(stage.device_id)
+                else:
+                    indigo.device.turnOff(stage.device_id)
+            else:
+                ag_id = stage.on_group_id if turn_on else stage.off_group_id
+                if ag_id <= 0:
+                    raise ValueError(f"no device or Action Group for stage {number}")
+                indigo.actionGroup.execute(ag_id)
+            if self.debug2:
+                self.logger.debug(f"Stage {number} of {load_dev.name} → {'ON' if turn_on else 'OFF'}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error switching stage {number} of {load_dev.name}: {e}")
+            return False
+
+    def _read_setpoint(self, sp: SetpointConfig) -> float | None:
+        """Current setting of a setpoint target (None if it cannot be read)."""
+        try:
+            if sp.kind == "variable":
+                return float(str(indigo.variables[sp.target_id].value).replace(",", "").strip())
+            target = indigo.devices[sp.target_id]
+            if sp.kind == "heatSetpoint":
+                return float(target.heatSetpoint)
+            return float(target.brightness)
+        except Exception:
+            return None
+
+    def _write_setpoint(self, load_dev: indigo.Device, sp: SetpointConfig, watts: float | None) -> bool:
+        """
+        Control mode "setpoint": write the setting for watts (None = the off setting) to the
+        dimmer, thermostat or variable. An unchanged setting is not written again.
+        """
+        value = sp.off_value if watts is None else sp.value_for(watts)
+        prev = self._setpoint_cmd.get(load_dev.id)
+        if watts is not None and prev is not None and prev[2] == value:
+            return True
+        try:
+            if sp.kind == "variable":
+                indigo.variable.updateValue(sp.target_id, value=f"{value:g}")
+            elif sp.kind == "heatSetpoint":
+                indigo.thermostat.setHeatSetpoint(sp.target_id, value=value)
+            else:
+                indigo.dimmer.setBrightness(sp.target_id, value=int(round(value)))
+        except Exception as e:
+            self.logger.error(f"Setpoint write for {load_dev.name} (#{sp.target_id} = {value:g}) failed: {e}")
+            return False
+        if watts is None:
+            self._setpoint_cmd.pop(load_dev.id, None)
+        else:
+            self._setpoint_cmd[load_dev.id] = (sp.watts_for(value), time.time(), value)
+        self._pub.set_many(load_dev, [
+            {"key": "SetpointValue", "value": f"{value:g}"},
+            {"key": "SetpointW", "value": 0 if watts is None else int(round(sp.watts_for(value)))}])
+        if getattr(self, "debug2", False):
+            self.logger.debug(f"Setpoint {load_dev.name}: #{sp.target_id} {sp.kind} = {value:g}"
+                              + ("" if watts is None else f" (~{sp.watts_for(value):.0f} W)"))
+        return True
+
     def _execute_load_action_with_props(self, load_dev: indigo.Device, turn_on: bool, reason: str, props: dict):
         """Fire ON/OFF using the provided props (valuesDict-merged). No scheduler side-effects."""
         mode = (props.get("controlMode") or "actionGroup").strip()
@@ -4285,6 +6890,11 @@ class Plugin(indigo.PluginBase):
                     self.logger.debug(f"Executed Action Group #{ag_id} for {load_dev.name}")
             else:
                 raise ValueError("No valid Action Group selected for test.")
+        elif mode == "setpoint":
+            sp = SetpointConfig.from_props(props)
+            if sp is None or sp.target_id <= 0:
+                raise ValueError("No valid setpoint target selected for test.")
+            self._write_setpoint(load_dev, sp, sp.min_w if turn_on else None)
         else:
             target_id = self._safe_int(props.get("controlDeviceId"))
             on_cmd = (props.get("onCommand") or "turnOn").strip()
@@ -4395,6 +7005,19 @@ class Plugin(indigo.PluginBase):
 
         self.pluginPrefs[u"logLevel"] = self.logLevel
         return
+
+    def logStateWriteStats(self):
+        """Menu: how many device state writes the publication layer saved."""
+        st = self._pub.stats()
+        pct = (100.0 * st["saved"] / st["requested"]) if st["requested"] else 0.0
+        self.logger.info(
+            f"State writes: {st['requested']} requested, {st['calls']} server updates ({st['written']} states); "
+            f"saved {st['saved']} ({pct:.0f}%): {st['dropped']} unchanged / inside deadband, "
+            f"{st['merged']} overwritten in the same run, rest batched")
+
+    def _state_write_failed(self, dev, e):
+        if getattr(self, "debug2", False):
+            self.logger.debug(f"Failed updating states of {getattr(dev, 'name', dev)}: {e}")
         ## Triggers
 
     ## Genereate Device lists
@@ -4435,15 +7058,33 @@ class Plugin(indigo.PluginBase):
         mode = valuesDict.get("controlMode", "actionGroup")
         if getattr(self, "debug2", False):
             self.logger.debug(f"control_mode_changed: mode={mode} for device #{devId}")
-        if mode == "actionGroup":
+        if mode in ("actionGroup", "setpoint"):
             valuesDict["controlDeviceId"] = "-1"
             valuesDict["onCommand"] = "turnOn"
             valuesDict["offCommand"] = "turnOff"
-        else:
+        if mode != "actionGroup":
             valuesDict["onActionGroupId"] = "-1"
             valuesDict["offActionGroupId"] = "-1"
         return valuesDict
 
+    def setpoint_target_list(self, filter="", valuesDict=None, typeId="", targetId=0):
+        """Setpoint targets for the chosen kind: dimmers, thermostats or variables."""
+        kind = (valuesDict or {}).get("setpointKind", "brightness")
+        if kind == "variable":
+            items = [("-1", "— None —")]
+            try:
+                items += [(str(v.id), f"{v.name} (#{v.id})") for v in indigo.variables]
+            except Exception:
+                pass
+            return sorted(items, key=lambda t: t[1].lower())
+        cls = indigo.ThermostatDevice if kind == "heatSetpoint" else indigo.DimmerDevice
+        return [item for item in self._all_devices_menu(include_blank=True)
+                if item[0] == "-1" or isinstance(indigo.devices.get(int(item[0])), cls)]
+
+    def setpoint_kind_changed(self, valuesDict, typeId, devId):
+        valuesDict["setpointTargetId"] = "-1"
+        return valuesDict
+
     def control_device_changed(self, valuesDict, typeId, devId):
         if getattr(self, "debug2", False):
             self.logger.debug(
@@ -4525,30 +7166,99 @@ class Plugin(indigo.PluginBase):
     # ────────────────────────────────────────────────────────────
 
     def read_pv_watts(self, props: indigo.Dict) -> Optional[Number]:
-        """Return PV production in Watts as a number, or None."""
-        return self._read_numeric_state_watts(props.get("pvDeviceId"), props.get("pvStateId"))
+        """Return PV production in Watts as a number (sum of all PV sources), or None."""
+        return self.read_source_watts(props, ("pv",))["pv"]
 
     def read_consumption_watts(self, props: indigo.Dict) -> Optional[Number]:
         """Return site consumption in Watts as a number, or None if not configured."""
-        dev_id, state_id = props.get("consDeviceId"), props.get("consStateId")
-        if not dev_id or not state_id:
-            return None
-        return self._read_numeric_state_watts(dev_id, state_id)
+        return self.read_source_watts(props, ("cons",))["cons"]
 
     def read_battery_watts(self, props: indigo.Dict) -> Optional[Number]:
         """Return battery power in Watts as a number (+charge, -discharge if source uses that convention)."""
-        dev_id, state_id = props.get("battDeviceId"), props.get("battStateId")
-        if not dev_id or not state_id:
-            return None
-        return self._read_numeric_state_watts(dev_id, state_id)
+        return self.read_source_watts(props, ("batt",))["batt"]
 
     def read_grid_watts(self, props: indigo.Dict) -> Optional[Number]:
-        """Return battery power in Watts as a number (+charge, -discharge if source uses that convention)."""
-        dev_id, state_id = props.get("gridDeviceId"), props.get("gridStateId")
-        if not dev_id or not state_id:
-            return None
-        return self._read_numeric_state_watts(dev_id, state_id)
+        """Return grid power in Watts as a number (+import, -export if source uses that convention)."""
+        return self.read_source_watts(props, ("grid",))["grid"]
+
+    def read_source_watts(self, props: indigo.Dict, quantities: Iterable[str]) -> dict:
+        """
+        Read several quantities ('pv', 'cons', 'batt', 'grid') in one batched pass.
+        Each quantity is the sum of its sources (primary state + Additional Sources,
+        each times its scale); every source device is fetched once per call. A Direct
+        Meter's Power comes from its latest in-process reading, not the Indigo state.
+        A quantity is None if it has no sources or any of its sources is unreadable
+        (a partial sum would silently under-count).
+        """
+        plan = self._source_plan(props)
+        totals = {q: 0.0 for q in quantities if plan.configured(q)}
+        meters = self._meter_values
+        for dev_id, entries in plan.by_device.items():
+            wanted = [e for e in entries if e[0] in totals]
+            if not wanted:
+                continue
+            live = meters.get(dev_id)
+            if live is not None:
+                # Direct Meter: its latest reading in-process (the Power state lags by publishSecs)
+                val, self._source_changed_at[dev_id] = live
+                for q, key, scale, invert in [e for e in wanted if e[1] == "Power"]:
+                    if totals[q] is not None:
+                        totals[q] = None if val is None else totals[q] + val * scale * (-1.0 if invert else 1.0)
+                wanted = [e for e in wanted if e[1] != "Power"]
+                if not wanted:
+                    continue
+            try:
+                dev = indigo.devices[dev_id]
+                states = dev.states
+            except Exception:
+                for e in wanted:
+                    totals[e[0]] = None
+                continue
+            try:
+                # Liveness clock for the freshness watchdog
+                self._source_changed_at[dev_id] = dev.lastChanged.timestamp()
+            except Exception:
+                pass
+            for q, key, scale, invert in wanted:
+                if totals[q] is None:
+                    continue
+                val = self._adapters.convert((dev_id, key, invert), states.get(key, None), invert)
+                totals[q] = None if val is None else totals[q] + (val if scale == 1.0 else val * scale)
+        return {q: totals.get(q) for q in quantities}
 
+    def _source_plan(self, props) -> SourcePlan:
+        """
+        Resolve a Main's source config into a SourcePlan. Plans are cached by the config
+        signature, so an edited Main (or a just-edited valuesDict) gets a fresh plan.
+        """
+        sig = tuple(str(props.get(k, "")) for k in self._SOURCE_CONFIG_KEYS)
+        plan = self._source_plans.get(sig)
+        if plan is not None:
+            return plan
+        sources = {}
+        for q, dev_key, state_key, inv_key, extra_key, label in self._SOURCE_QUANTITIES:
+            lst = []
+            src_id = self._safe_int(props.get(dev_key))
+            if src_id and src_id > 0 and self._is_valid_state_choice(props.get(state_key)):
+                lst.append((src_id, str(props.get(state_key)), 1.0, bool(props.get(inv_key, False))))
+            try:
+                lst.extend((d, k, sc, False) for d, k, sc in parse_source_list(props.get(extra_key, "")))
+            except ValueError as e:
+                self.logger.warning(f"Additional {label} Sources ignored: {e}")
+            sources[q] = lst
+        # Per-phase sources (three-phase sites, phaseHeadroom): lists only
+        for q, extra_key, label in PHASE_SOURCE_KEYS:
+            try:
+                sources[q] = [(d, k, sc, False) for d, k, sc in parse_source_list(props.get(extra_key, ""))]
+            except ValueError as e:
+                self.logger.warning(f"{label} Sources ignored: {e}")
+        plan = SourcePlan(sources)
+        if len(self._source_plans) >= 16:
+            self._source_plans.clear()
+        self._source_plans[sig] = plan
+        if getattr(self, "debug2", False):
+            self.logger.debug(f"_source_plan: resolved {plan}")
+        return plan
 
     # ────────────────────────────────────────────────────────────
     # Internals
@@ -4627,85 +7337,38 @@ class Plugin(indigo.PluginBase):
             self.logger.debug(f"_state_list_for_device: device #{dev_id_int} -> {len(items)} items")
         return items
 
-    def _read_numeric_state_watts(self, dev_id_val: Any, state_key: Any) -> Optional[Number]:
-        """
-        Read a device.state, parse to Watts (number only). Handles:
-          - raw numeric (int/float)
-          - strings with units ('123 W', '1.2 kW', '1,234W', etc.)
-          - leading/trailing text ('Power: 750W', '750 watts')
-        Returns None if not available or unparsable.
-        """
-        try:
-            dev_id = int(dev_id_val)
-            key = str(state_key)
-        except Exception:
-            return None
-
-        try:
-            dev = indigo.devices[dev_id]
-            raw = dev.states.get(key, None)
-        except Exception:
-            return None
-
-        if raw is None:
-            return None
-
-        # If already numeric, treat as Watts.
-        if isinstance(raw, (int, float)):
-            return float(raw)
-
-        # Normalize strings
-        if isinstance(raw, str):
-            watts = self._parse_to_watts(raw)
-            return watts
-
-        # Fallback: try str() then parse
-        return self._parse_to_watts(str(raw))
-
     # ────────────────────────────────────────────────────────────
     # Parsing helpers (pure functions)
     # ────────────────────────────────────────────────────────────
 
-    _NUM_RE = re.compile(r"([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)")
-
     @staticmethod
     def _parse_to_watts(s: str) -> Optional[Number]:
-        """
-        Extract the first number and unit from a string and convert to Watts.
-        Supported hints:
-          - 'kW' => multiply by 1000
-          - 'W' or 'watt(s)' => as-is
-          - If no unit present, assume Watts
-        Examples:
-          '2.4 kW' -> 2400
-          '950 W' -> 950
-          'Power: 1,200w' -> 1200
-          '1.2e3' -> 1200 (assumed Watts)
-        """
-        if not s:
-            return None
-
-        s_clean = s.replace(",", "").strip()
-        m = Plugin._NUM_RE.search(s_clean)
-        if not m:
-            return None
+        """Regex + unit-sniffing parser (see source_adapters.parse_to_watts); adapters fall back to it."""
+        return parse_to_watts(s)
 
-        try:
-            val = float(m.group(1))
-        except Exception:
-            return None
-
-        tail = s_clean[m.end():].lower()
-
-        # Unit inference
-        if "kw" in tail:
-            return val * 1000.0
-        if "w" in tail or "watt" in tail:
-            return val
-        # If the string before/after number mentions amps/volts, we don't convert — caller must compute P.
-        if "amp" in s_clean.lower() or "volt" in s_clean.lower():
-            return val  # best effort; caller can decide what to do
-
-        # Default: assume Watts
-        return val
+    @staticmethod
+    def _meter_config(props) -> MeterConfig:
+        """Direct Meter pluginProps -> MeterConfig. Raises ValueError on a bad number."""
+        def _num(key, default, cast=float):
+            raw = str(props.get(key, "") or "").strip()
+            return cast(raw) if raw else default
+
+        protocol = props.get("protocol", "modbus") or "modbus"
+        return MeterConfig(
+            protocol=protocol,
+            host=str(props.get("host", "") or "").strip(),
+            port=_num("port", 0, int),
+            poll_secs=max(1.0, _num("pollSecs", 1.0)),
+            scale=_num("scale", 1.0),
+            unit=_num("unitId", 1, int),
+            function=_num("registerType", 3, int),
+            register=_num("register", 0, int),
+            data_type=props.get("dataType", "int16") or "int16",
+            word_order=props.get("wordOrder", "big") or "big",
+            url=str(props.get("url", "") or "").strip(),
+            topic=str(props.get("topic", "") or "").strip(),
+            username=str(props.get("username", "") or ""),
+            password=str(props.get("password", "") or ""),
+            json_path=str(props.get("jsonPath", "") or "").strip(),
+        )
 
@@ -0,0 +1,127 @@
+"""
+Setpoint control for variable-power loads with:
+- SetpointConfig: Watts <-> dimmer brightness, heat setpoint or variable value
+- plan_setpoints(): one pass of the tracking loop - deficit from the lowest tier first,
+  spare to the highest tier first, ramp- and interval-limited
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Hashable, List, Mapping, NamedTuple, Optional, Tuple
+
+KINDS = ("brightness", "heatSetpoint", "variable")
+MIN_STEP_W = 50.0       # an increase needs at least this much room (or one value step)
+
+
+def _num(v: Any, default: float) -> float:
+    try:
+        return float(str(v).replace(",", "").strip())
+    except Exception:
+        return default
+
+
+class SetpointConfig(NamedTuple):
+    kind: str               # "brightness" | "heatSetpoint" | "variable"
+    target_id: int          # dimmer / thermostat device id, or variable id
+    min_w: float            # lowest power it runs at (its minimum setting)
+    max_w: float
+    min_value: float        # setting for min_w ...
+    max_value: float        # ... and for max_w
+    step: float             # settings are rounded to this (0 = no rounding)
+    off_value: float        # setting that turns it off
+    reserve_w: float        # headroom kept back while tracking
+    ramp_wps: float         # largest increase per second since its last write
+    interval_secs: float    # no two writes closer than this
+
+    @classmethod
+    def from_props(cls, props: Mapping[str, Any]) -> Optional["SetpointConfig"]:
+        """The setpoint settings of a Load in control mode "setpoint", else None."""
+        if (props.get("controlMode") or "").lower() != "setpoint":
+            return None
+        kind = props.get("setpointKind") or "brightness"
+        min_w = max(0.0, _num(props.get("setpointMinW"), 0.0))
+        max_w = max(min_w, _num(props.get("setpointMaxW"), 0.0) or _num(props.get("ratedWatts"), 0.0))
+        return cls(kind if kind in KINDS else "brightness",
+                   int(_num(props.get("setpointTargetId"), 0)),
+                   min_w, max_w,
+                   _num(props.get("setpointMinValue"), 0.0), _num(props.get("setpointMaxValue"), 100.0),
+                   max(0.0, _num(props.get("setpointStep"), 1.0)),
+                   _num(props.get("setpointOffValue"), 0.0),
+                   max(0.0, _num(props.get("setpointReserveW"), 100.0)),
+                   max(1.0, _num(props.get("setpointRampWps"), 100.0)),
+                   max(1.0, _num(props.get("setpointIntervalSecs"), 5.0)))
+
+    def value_for(self, watts: float, round_down: bool = False) -> float:
+        """Setting for watts (clamped to min..max W, rounded to the step; round_down: to the lower power)."""
+        span = self.max_w - self.min_w
+        frac = 0.0 if span <= 0 else (min(max(watts, self.min_w), self.max_w) - self.min_w) / span
+        value = self.min_value + frac * (self.max_value - self.min_value)
+        if self.step > 0:
+            units = value / self.step
+            if round_down:
+                units = math.floor(units + 1e-9) if self.max_value >= self.min_value else math.ceil(units - 1e-9)
+            value = round(units) * self.step
+        lo, hi = sorted((self.min_value, self.max_value))
+        return min(max(value, lo), hi)
+
+    def watts_for(self, value: float) -> float:
+        """Power a setting stands for (inverse of value_for, before rounding)."""
+        span = self.max_value - self.min_value
+        if span == 0:
+            return self.max_w
+        return self.min_w + (value - self.min_value) / span * (self.max_w - self.min_w)
+
+    def step_w(self) -> float:
+        """Watts of one value step."""
+        span = abs(self.max_value - self.min_value)
+        if span == 0 or self.step <= 0:
+            return MIN_STEP_W
+        return max(MIN_STEP_W, self.step / span * (self.max_w - self.min_w))
+
+
+class Tracked(NamedTuple):
+    key: Hashable
+    tier: int
+    cfg: SetpointConfig
+    watts: float            # what it draws now (last command, or less if metered lower)
+    since_write: float      # seconds since its last write
+
+
+def plan_setpoints(loads: List[Tracked], headroom_w: float,
+                   yield_to: Optional[Tuple[int, float]] = None) -> Dict[Hashable, float]:
+    """
+    New power for the running setpoint loads that should move: {key: watts}, already
+    quantised to a setting (only loads whose setting changes are listed).
+    yield_to: (tier, W) - loads of lower priority (higher tier number) keep W more headroom.
+    """
+    avail = float(headroom_w)
+    new: Dict[Hashable, float] = {}
+
+    def floor(t: Tracked) -> float:
+        extra = yield_to[1] if yield_to is not None and t.tier > yield_to[0] else 0.0
+        return t.cfg.reserve_w + extra
+
+    ready = [t for t in loads if t.since_write >= t.cfg.interval_secs]
+    # Deficit: lowest priority first, down to its minimum
+    for t in sorted(ready, key=lambda t: (-t.tier, repr(t.key))):
+        short = floor(t) - avail
+        if short <= 0:
+            continue
+        q = t.cfg.watts_for(t.cfg.value_for(max(t.cfg.min_w, t.watts - short), round_down=True))
+        if t.cfg.value_for(q) != t.cfg.value_for(t.watts):
+            new[t.key] = q
+            avail += t.watts - q
+    # Spare: highest priority first, up to its maximum, ramp-limited
+    for t in sorted(ready, key=lambda t: (t.tier, repr(t.key))):
+        if t.key in new:
+            continue
+        room = avail - floor(t)
+        if room < t.cfg.step_w():
+            continue
+        target = min(t.cfg.max_w, t.watts + min(room, t.cfg.ramp_wps * t.since_write))
+        q = t.cfg.watts_for(t.cfg.value_for(target, round_down=True))    # never more than there is room for
+        if q > t.watts and t.cfg.value_for(q) != t.cfg.value_for(t.watts):
+            new[t.key] = q
+            avail -= q - t.watts
+    return new
@@ -0,0 +1,272 @@
+"""
+Source reading with:
+- Adapters resolved once per (device, state): numeric text, unit scale, regex fallback
+- Plain int / float states converted directly
+- Optional sign inversion per source
+- parse_to_watts(): the original regex + unit parser
+- Multi-source plans: several (device, state, scale) sources per quantity
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
+
+Number = Union[int, float]
+
+# Returned by an adapter when the raw value no longer matches the strategy it was built for
+MISMATCH = object()
+
+_NUM_RE = re.compile(r"([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)")
+
+# "<number> <unit>" with nothing else around it: exactly the units parse_to_watts() scales,
+# so the cached path and the fallback agree. Anything else ('MW', 'mW', ...) takes the fallback.
+_UNIT_RE = re.compile(r"^\s*([-+]?[\d,]*\.?\d+(?:[eE][-+]?\d+)?)\s*(kW|KW|kw|W|w|[Ww]atts?)\s*$")
+_UNIT_SCALE = {
+    "kW": 1000.0, "KW": 1000.0, "kw": 1000.0,
+    "W": 1.0, "w": 1.0, "Watt": 1.0, "Watts": 1.0, "watt": 1.0, "watts": 1.0,
+}
+
+
+def parse_to_watts(s: str) -> Optional[Number]:
+    """
+    Extract the first number and unit from a string and convert to Watts.
+    Supported hints:
+      - 'kW' => multiply by 1000
+      - 'W' or 'watt(s)' => as-is
+      - If no unit present, assume Watts
+    Examples:
+      '2.4 kW' -> 2400
+      '950 W' -> 950
+      'Power: 1,200w' -> 1200
+      '1.2e3' -> 1200 (assumed Watts)
+    """
+    if not s:
+        return None
+
+    s_clean = s.replace(",", "").strip()
+    m = _NUM_RE.search(s_clean)
+    if not m:
+        return None
+
+    try:
+        val = float(m.group(1))
+    except Exception:
+        return None
+
+    tail = s_clean[m.end():].lower()
+
+    # Unit inference
+    if "kw" in tail:
+        return val * 1000.0
+    if "w" in tail or "watt" in tail:
+        return val
+    # If the string before/after number mentions amps/volts, we don't convert — caller must compute P.
+    if "amp" in s_clean.lower() or "volt" in s_clean.lower():
+        return val  # best effort; caller can decide what to do
+
+    # Default: assume Watts
+    return val
+
+
+class SourceAdapter:
+    """
+    Converts one source's raw state value to Watts using a strategy fixed at resolve time.
+
+      numeric : int/float state -> float(raw) * sign
+      numstr  : numeric string ('1234.5', '1,234') -> float * sign
+      unit    : '<number> <unit>' with a known unit -> float * scale * sign (suffix checked, no regex)
+      regex   : anything else -> parse_to_watts(raw) * sign (original behaviour)
+
+    The strategy is compiled into a small closure (self.convert) so a cached read is one
+    type check plus one float(). convert() returns MISMATCH when the value no longer fits
+    the strategy (type changed, different unit suffix); the cache then resolves a new adapter.
+    """
+
+    __slots__ = ("kind", "scale", "sign", "value_type", "suffix", "commas", "convert")
+
+    def __init__(self, kind: str, value_type: type, scale: float = 1.0, sign: float = 1.0,
+                 suffix: str = "", commas: bool = False):
+        self.kind = kind
+        self.value_type = value_type
+        self.scale = scale
+        self.sign = sign
+        self.suffix = suffix
+        self.commas = commas          # source formats thousands with ',' (strip before float())
+        self.convert = self._compile()
+
+    def __repr__(self) -> str:
+        extra = f" {self.suffix}x{self.scale:g}" if self.kind == "unit" else ""
+        inv = " inverted" if self.sign < 0 else ""
+        return f"<SourceAdapter {self.kind} {self.value_type.__name__}{extra}{inv}>"
+
+    def _compile(self):
+        vt, sign, kind, commas = self.value_type, self.sign, self.kind, self.commas
+        mult = self.scale * sign
+
+        if kind == "numeric":
+            if mult == 1.0:
+                def _conv(raw):
+                    return float(raw) if type(raw) is vt else (None if raw is None else MISMATCH)
+            else:
+                def _conv(raw):
+                    return float(raw) * mult if type(raw) is vt else (None if raw is None else MISMATCH)
+            return _conv
+
+        if kind == "unit":
+            suffix, cut = self.suffix, -len(self.suffix)
+
+            def _conv(raw):
+                if type(raw) is not vt:
+                    return None if raw is None else MISMATCH
+                s = raw.rstrip()
+                if not s.endswith(suffix):
+                    return MISMATCH
+                try:
+                    return float(s[:cut].replace(",", "") if commas else s[:cut]) * mult
+                except ValueError:
+                    return MISMATCH
+            return _conv
+
+        if kind == "numstr":
+            def _conv(raw):
+                if type(raw) is not vt:
+                    return None if raw is None else MISMATCH
+                try:
+                    val = float(raw.replace(",", "") if commas else raw)
+                except ValueError:
+                    return MISMATCH
+                # 'nan' / 'inf' parse as floats but are not readings
+                return val * sign if math.isfinite(val) else MISMATCH
+            return _conv
+
+        def _conv(raw):
+            if type(raw) is not vt:
+                return None if raw is None else MISMATCH
+            val = parse_to_watts(raw if isinstance(raw, str) else str(raw))
+            return None if val is None else val * sign
+        return _conv
+
+
+def resolve_adapter(raw: Any, invert: bool = False) -> Optional[SourceAdapter]:
+    """Pick the cheapest strategy that handles this sample value. None if raw is None."""
+    if raw is None:
+        return None
+    sign = -1.0 if invert else 1.0
+    vt = type(raw)
+    if isinstance(raw, (int, float)):
+        return SourceAdapter("numeric", vt, sign=sign)
+    if isinstance(raw, str):
+        try:
+            if math.isfinite(float(raw.replace(",", ""))):
+                return SourceAdapter("numstr", vt, sign=sign, commas="," in raw)
+        except ValueError:
+            pass
+        m = _UNIT_RE.match(raw)
+        if m:
+            unit = m.group(2)
+            return SourceAdapter("unit", vt, scale=_UNIT_SCALE[unit], sign=sign, suffix=unit, commas="," in raw)
+    return SourceAdapter("regex", vt, sign=sign)
+
+
+class SourceAdapterCache:
+    """
+    Adapters keyed by (device id, state key, invert). Entries live until invalidate()
+    (source / Main config changed, device deleted) or until a value stops matching.
+    int / float states are converted directly and never get an adapter.
+    """
+
+    def __init__(self):
+        self._adapters: Dict[Tuple[Hashable, ...], SourceAdapter] = {}
+        self.resolves = 0   # number of (re)resolutions, for diagnostics
+
+    def __len__(self) -> int:
+        return len(self._adapters)
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[SourceAdapter]:
+        return self._adapters.get(key)
+
+    def convert(self, key: Tuple[Hashable, ...], raw: Any, invert: bool = False) -> Optional[Number]:
+        vt = type(raw)
+        if vt is float or vt is int:
+            return -float(raw) if invert else float(raw)    # plain number: no adapter needed
+        if raw is None:
+            return None
+        adapter = self._adapters.get(key)
+        if adapter is not None:
+            val = adapter.convert(raw)
+            if val is not MISMATCH:
+                return val
+        adapter = resolve_adapter(raw, invert)
+        self._adapters[key] = adapter
+        self.resolves += 1
+        val = adapter.convert(raw)
+        return None if val is MISMATCH else val
+
+    def invalidate(self, dev_id: Optional[int] = None) -> None:
+        """Drop all adapters, or only those reading from dev_id."""
+        if dev_id is None:
+            self._adapters.clear()
+            return
+        for key in [k for k in list(self._adapters) if k[0] == dev_id]:
+            self._adapters.pop(key, None)
+
+
+# ── Multi-source plans ──────────────────────────────────────
+# One entry of an "additional sources" field: "<device id>:<state>" or "<device id>:<state>*<scale>"
+_SPEC_RE = re.compile(r"^(\d+)\s*:\s*([^*\s]+)\s*(?:\*\s*([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?))?$")
+_SPEC_SPLIT_RE = re.compile(r"[,;\n]+")
+
+
+def parse_source_list(text: Any) -> List[Tuple[int, str, float]]:
+    """
+    Parse an additional-sources field into [(device id, state key, scale), ...].
+    Entries are separated by commas, semicolons or newlines, e.g.
+      '12345:acPower, 67890:power_kw*1000, 555:watts*-1'
+    A negative scale flips the sign. Raises ValueError naming the first bad entry.
+    """
+    out: List[Tuple[int, str, float]] = []
+    for entry in _SPEC_SPLIT_RE.split(str(text or "")):
+        entry = entry.strip()
+        if not entry:
+            continue
+        m = _SPEC_RE.match(entry)
+        if not m:
+            raise ValueError(f"'{entry}' is not deviceId:state or deviceId:state*scale")
+        scale = float(m.group(3)) if m.group(3) else 1.0
+        if not math.isfinite(scale) or scale == 0.0:
+            raise ValueError(f"'{entry}' has an invalid scale")
+        out.append((int(m.group(1)), m.group(2), scale))
+    return out
+
+
+class SourcePlan:
+    """
+    Every source feeding one Main's quantities (pv / cons / batt / grid), resolved once
+    from its config. by_device groups the reads so a sample fetches each Indigo device
+    once, however many states or quantities it supplies.
+
+      by_quantity : quantity -> [(device id, state key, scale, invert), ...]
+      by_device   : device id -> [(quantity, state key, scale, invert), ...]
+    """
+
+    __slots__ = ("by_quantity", "by_device")
+
+    def __init__(self, sources: Dict[str, List[Tuple[int, str, float, bool]]]):
+        self.by_quantity = {q: tuple(lst) for q, lst in sources.items() if lst}
+        by_device: Dict[int, List[Tuple[str, str, float, bool]]] = {}
+        for q, lst in self.by_quantity.items():
+            for dev_id, key, scale, invert in lst:
+                by_device.setdefault(dev_id, []).append((q, key, scale, invert))
+        self.by_device = {d: tuple(v) for d, v in by_device.items()}
+
+    def __repr__(self) -> str:
+        counts = ", ".join(f"{q}x{len(v)}" for q, v in self.by_quantity.items())
+        return f"<SourcePlan {counts} over {len(self.by_device)} device(s)>"
+
+    def configured(self, quantity: str) -> bool:
+        return quantity in self.by_quantity
+
+    def device_ids(self, quantity: str) -> Tuple[int, ...]:
+        return tuple(dict.fromkeys(d for d, _k, _s, _i in self.by_quantity.get(quantity, ())))
@@ -0,0 +1,94 @@
+"""
+Multi-stage loads with:
+- Stage: the Watts and switch (device or Action Groups) of each extra stage
+- stage_move(): one step up or down per run, with per-stage min runtime and cooldown
+- credit_fraction(): quota credit as full-power minutes
+"""
+
+from __future__ import annotations
+
+from typing import Any, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+MAX_EXTRA_STAGES = 3
+
+
+def _int(v: Any, default: int = 0) -> int:
+    try:
+        return int(float(str(v).replace(",", "").strip()))
+    except Exception:
+        return default
+
+
+class Stage(NamedTuple):
+    watts: int
+    device_id: int          # > 0: switched with device on / off ...
+    on_group_id: int        # ... else with these Action Groups
+    off_group_id: int
+
+
+def stages_from_props(props: Mapping[str, Any], rated_w: int) -> Tuple[Stage, ...]:
+    """All stages of a multi-stage Load (stage 1 first), or () for a single-stage Load."""
+    extra = min(MAX_EXTRA_STAGES, max(0, _int(props.get("extraStages"), 0)))
+    if not extra or (props.get("controlMode") or "").lower() == "setpoint":
+        return ()
+    stages = [Stage(int(rated_w), 0, 0, 0)]
+    for k in range(2, extra + 2):
+        stages.append(Stage(max(0, _int(props.get(f"stage{k}Watts"), 0)),
+                            _int(props.get(f"stage{k}DeviceId"), 0),
+                            _int(props.get(f"stage{k}OnActionGroupId"), 0),
+                            _int(props.get(f"stage{k}OffActionGroupId"), 0)))
+    return tuple(stages)
+
+
+def active_w(stages: Sequence[Stage], active: int) -> int:
+    """Watts of stages 1..active."""
+    return sum(s.watts for s in stages[:max(0, active)])
+
+
+def credit_fraction(stages: Sequence[Stage], active: int) -> float:
+    """Share of a full-power minute one minute at `active` stages counts for (1.0 single-stage)."""
+    total = active_w(stages, len(stages))
+    if not stages or total <= 0:
+        return 1.0
+    return min(1.0, active_w(stages, active) / total)
+
+
+def stage_move(stages: Sequence[Stage], active: int, budget_w: float, now: float,
+               on_ts: Mapping[int, float], off_ts: Mapping[int, float], last_change_ts: float,
+               surge: float, start_margin: float, hysteresis_w: float,
+               min_run_secs: float, cooldown_secs: float, settle_secs: float,
+               may_step_up: bool = True) -> Tuple[int, str]:
+    """
+    One stage decision for a running multi-stage Load at `active` stages (>= 1):
+    (+1, reason) step up, (-1, reason) step down, or (0, why not / "").
+    budget_w: headroom left for new draw this run. on_ts / off_ts: stage number -> when it
+    last switched on / off. last_change_ts: the Load's last start or stage change.
+    """
+    if budget_w < -hysteresis_w:
+        if active <= 1:
+            return 0, ""                # stage 1: stopping the Load is the scheduler's
+        ran = now - on_ts.get(active, 0.0)
+        if ran < min_run_secs:
+            return 0, f"stage {active} min runtime ({int(min_run_secs - ran)}s left)"
+        return -1, f"headroom {budget_w:.0f} W"
+    if active >= len(stages):
+        return 0, ""
+    nxt = active + 1
+    need = next_stage_need_w(stages, active, surge, start_margin)
+    if budget_w < need:
+        return 0, ""
+    if not may_step_up:
+        return 0, "higher tier waiting"
+    if now - last_change_ts < settle_secs:
+        return 0, "settling"
+    since_off = now - off_ts.get(nxt, -1e18)
+    if since_off < cooldown_secs:
+        return 0, f"stage {nxt} cooldown ({int(cooldown_secs - since_off)}s left)"
+    return 1, f"headroom {budget_w:.0f} W ≥ {need} W"
+
+
+def next_stage_need_w(stages: Sequence[Stage], active: int, surge: float, start_margin: float) -> Optional[int]:
+    """Headroom the next stage needs to start (its Watts x surge x (1 + start margin)), None at the top."""
+    if active >= len(stages):
+        return None
+    return int(stages[active].watts * surge * (1.0 + start_margin))
@@ -0,0 +1,179 @@
+"""
+Device state writes with:
+- Unchanged values and moves inside a deadband dropped
+- Per-thread batches flushed as one updateStatesOnServer call per device
+- get() that sees the calling thread's pending writes
+- Counters of requested vs. written states
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+
+_MISSING = object()
+
+
+class StatePublisher:
+    """
+    Buffered, de-duplicated device state writes.
+
+    deadbands: state key -> minimum change (absolute) worth publishing for numeric values.
+    Batches are per thread (the asyncio loop batches; Indigo callback threads write through).
+    """
+
+    def __init__(self, deadbands: Optional[Mapping[str, float]] = None,
+                 on_error: Optional[Callable[[Any, Exception], None]] = None):
+        self._deadbands: Dict[str, float] = dict(deadbands or {})
+        self._on_error = on_error
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        # thread id -> dev id -> {key: value} (insertion order) / device object to flush through
+        self._pending: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self._devs: Dict[int, Dict[int, Any]] = {}
+        self._published: Dict[int, Dict[str, Any]] = {}  # dev id -> {key: last value sent}
+        self.requested = 0      # state values handed to set()
+        self.dropped = 0        # unchanged / inside the deadband
+        self.merged = 0         # overwritten by a later set() in the same batch
+        self.written = 0        # state values sent to the server
+        self.calls = 0          # updateStatesOnServer calls (IPC round-trips)
+
+    # ----- batching -----
+    @contextmanager
+    def batch(self):
+        """Buffer this thread's writes; flush every device once when the outermost batch ends."""
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        try:
+            yield self
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                self.flush()
+
+    def _batching(self) -> bool:
+        return getattr(self._local, "depth", 0) > 0
+
+    # ----- writes -----
+    def set(self, dev: Any, key: str, value: Any, force: bool = False) -> None:
+        """Publish one state (force=True skips the unchanged / deadband check)."""
+        self.set_many(dev, ((key, value),), force=force)
+
+    def set_many(self, dev: Any, items: Iterable, force: bool = False) -> None:
+        """
+        Publish several states of one device: (key, value) pairs or Indigo's
+        [{"key": k, "value": v}, ...] list.
+        """
+        tid = threading.get_ident()
+        with self._lock:
+            mine = self._pending.setdefault(tid, {})
+            pending = mine.get(dev.id)
+            for item in items:
+                if isinstance(item, Mapping):
+                    key, value = item["key"], item["value"]
+                else:
+                    key, value = item
+                self.requested += 1
+                if pending is not None and key in pending:
+                    self.merged += 1
+                    del pending[key]
+                if not force and not self._differs(dev, key, value):
+                    self.dropped += 1
+                    continue
+                if pending is None:
+                    pending = mine.setdefault(dev.id, {})
+                pending[key] = value
+            if pending:
+                self._devs.setdefault(tid, {})[dev.id] = dev
+            else:
+                mine.pop(dev.id, None)
+                if not mine:
+                    self._pending.pop(tid, None)
+        if not self._batching():
+            self.flush(dev.id)
+
+    def _differs(self, dev: Any, key: str, value: Any) -> bool:
+        # Compare with what we last sent (device objects fetched earlier may be stale),
+        # else with the server value the device object carries
+        current = self._published.get(dev.id, {}).get(key, _MISSING)
+        if current is _MISSING:
+            try:
+                current = dev.states.get(key, _MISSING)
+            except Exception:
+                return True
+        if current is _MISSING:
+            return True
+        band = self._deadbands.get(key)
+        if band and _is_number(value) and _is_number(current):
+            return abs(float(value) - float(current)) >= band
+        if _is_number(value) and _is_number(current):
+            return float(value) != float(current)
+        return value != current
+
+    # ----- reads -----
+    def get(self, dev: Any, key: str, default: Any = None) -> Any:
+        """State value as it will be once this thread's batch is flushed."""
+        with self._lock:
+            pending = self._pending.get(threading.get_ident(), {}).get(dev.id)
+            if pending is not None and key in pending:
+                return pending[key]
+            published = self._published.get(dev.id)
+            if published is not None and key in published:
+                return published[key]
+        try:
+            return dev.states.get(key, default)
+        except Exception:
+            return default
+
+    # ----- flushing -----
+    def flush(self, dev_id: Optional[int] = None) -> int:
+        """Send this thread's pending writes (one device or all) as one key / value list per device."""
+        tid = threading.get_ident()
+        with self._lock:
+            mine, devs = self._pending.get(tid, {}), self._devs.get(tid, {})
+            ids = list(mine) if dev_id is None else ([dev_id] if dev_id in mine else [])
+            out = [(devs.pop(i), mine.pop(i)) for i in ids]
+            if not mine:
+                self._pending.pop(tid, None)
+                self._devs.pop(tid, None)
+        sent = 0
+        for dev, kv in out:
+            if not kv:
+                continue
+            try:
+                dev.updateStatesOnServer([{"key": k, "value": v} for k, v in kv.items()])
+            except Exception as e:
+                if self._on_error is not None:
+                    self._on_error(dev, e)
+                continue
+            with self._lock:
+                self._published.setdefault(dev.id, {}).update(kv)
+                self.calls += 1
+                self.written += len(kv)
+            sent += len(kv)
+        return sent
+
+    def discard(self, dev_id: int) -> None:
+        """Forget a device that went away (pending writes and last published values)."""
+        with self._lock:
+            for mine in self._pending.values():
+                mine.pop(dev_id, None)
+            for devs in self._devs.values():
+                devs.pop(dev_id, None)
+            self._published.pop(dev_id, None)
+
+    # ----- stats -----
+    @property
+    def saved(self) -> int:
+        """State writes requested that did not cost their own IPC round-trip."""
+        return self.requested - self.calls
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requested": self.requested, "written": self.written, "calls": self.calls,
+                    "dropped": self.dropped, "merged": self.merged, "saved": self.saved}
+
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
@@ -0,0 +1,279 @@
+"""
+Load power from headroom steps with:
+- StepLearner: each commanded start / stop measured as a step in headroom
+- Huber-weighted least squares over the step history, pulled towards rated Watts
+- Starts that show no step flagged and left out of the fit
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from itertools import combinations
+from typing import Deque, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+MIN_STEPS = 3           # steps (or restored samples) before an estimate replaces the rating
+MIN_CHECK_W = 100.0     # starts expected to draw less than this are not verified
+MAX_CHECK_STARTS = 6    # more starts in one step: only "none of them took" is flagged
+HUBER_K = 1.345         # Huber threshold in robust standard deviations
+SCALE_FLOOR_W = 25.0    # residual scale never drops below this (meter resolution)
+IRLS_ITERATIONS = 10
+
+
+class StepResult(NamedTuple):
+    ts: float                       # when the step was measured (end of the post window)
+    dirs: Dict[Hashable, int]       # load -> +1 started / -1 stopped
+    drop_w: float                   # median headroom before - after
+    expected_w: float               # drop the current estimates predicted
+    noise_w: float                  # spread of the readings around the step
+    checked: bool                   # starts were verifiable (expected step well above the noise)
+    failed: Tuple[Hashable, ...]    # started loads that showed no step
+
+
+class _Step:
+    __slots__ = ("first_ts", "last_ts", "dirs")
+
+    def __init__(self, ts: float):
+        self.first_ts = ts
+        self.last_ts = ts
+        self.dirs: Dict[Hashable, int] = {}
+
+
+def _median(vals: List[float]) -> float:
+    s = sorted(vals)
+    n = len(s)
+    return s[n // 2] if n % 2 else 0.5 * (s[n // 2 - 1] + s[n // 2])
+
+
+def _solve(a: List[List[float]], b: List[float]) -> List[float]:
+    """Gaussian elimination with partial pivoting (a is small and positive definite)."""
+    n = len(b)
+    m = [row[:] + [b[i]] for i, row in enumerate(a)]
+    for c in range(n):
+        p = max(range(c, n), key=lambda r: abs(m[r][c]))
+        m[c], m[p] = m[p], m[c]
+        piv = m[c][c]
+        if abs(piv) < 1e-12:
+            continue
+        for r in range(c + 1, n):
+            f = m[r][c] / piv
+            if f:
+                mr, mc = m[r], m[c]
+                for j in range(c, n + 1):
+                    mr[j] -= f * mc[j]
+    x = [0.0] * n
+    for c in range(n - 1, -1, -1):
+        piv = m[c][c]
+        if abs(piv) < 1e-12:
+            continue
+        x[c] = (m[c][n] - sum(m[c][j] * x[j] for j in range(c + 1, n))) / piv
+    return x
+
+
+def huber_fit(rows, priors: Dict[Hashable, Tuple[float, float]], k: float = HUBER_K,
+              iterations: int = IRLS_ITERATIONS) -> Dict[Hashable, float]:
+    """
+    Robust fit of per-load Watts from (dirs, drop_w) rows: minimises the Huber loss of the
+    row residuals plus weight x (P - prior)^2 per load (priors: key -> (watts, weight)).
+    A prior's weight shrinks as the load's rows pile up, and a row is only down-weighted
+    when it disagrees with the other rows of its loads (per-load centre and scale), so a
+    load that consistently draws far from its rating is not held at the rating.
+    """
+    keys = sorted({key for dirs, _y in rows for key in dirs} | set(priors), key=repr)
+    if not keys:
+        return {}
+    idx = {key: i for i, key in enumerate(keys)}
+    n = len(keys)
+    est = [priors.get(key, (0.0, 0.0))[0] for key in keys]
+    sparse = [([(idx[key], float(d)) for key, d in dirs.items() if d], y) for dirs, y in rows]
+    sparse = [(x, y) for x, y in sparse if x]
+    weights = [1.0] * len(sparse)
+    count = [0] * n
+    for x, _y in sparse:
+        for i, _xi in x:
+            count[i] += 1
+    for _ in range(max(1, iterations)):
+        a = [[0.0] * n for _ in range(n)]
+        b = [0.0] * n
+        for (x, y), w in zip(sparse, weights):
+            for i, xi in x:
+                b[i] += w * xi * y
+                row = a[i]
+                for j, xj in x:
+                    row[j] += w * xi * xj
+        for key, (pw, lam) in priors.items():
+            i = idx[key]
+            lam = lam / (1 + count[i])
+            a[i][i] += lam
+            b[i] += lam * pw
+        for i in range(n):
+            if a[i][i] <= 0.0:      # no rows and no prior: pin it at 0
+                a[i][i] = 1.0
+        new = _solve(a, b)
+        if not sparse:
+            return dict(zip(keys, new))
+        resid = [y - sum(new[i] * xi for i, xi in x) for x, y in sparse]
+        weights = _row_weights(sparse, resid, count, n, k)
+        moved = max(abs(p - q) for p, q in zip(new, est))
+        est = new
+        if moved < 1.0:
+            break
+    return dict(zip(keys, est))
+
+
+def _row_weights(sparse, resid: List[float], count: List[int], n: int, k: float) -> List[float]:
+    """
+    Huber weight of each row against the loads it moved that have MIN_STEPS rows or more:
+    its residual's distance from the median residual of each such load's rows, in that
+    load's robust scale (MAD); the worst of its loads counts. Other rows keep weight 1.
+    """
+    by_load: List[List[float]] = [[] for _ in range(n)]
+    for (x, _y), r in zip(sparse, resid):
+        for i, _xi in x:
+            by_load[i].append(r)
+    centre, scale = [0.0] * n, [0.0] * n
+    for i, rs in enumerate(by_load):
+        if count[i] >= MIN_STEPS:
+            centre[i] = _median(rs)
+            scale[i] = max(SCALE_FLOOR_W, 1.4826 * _median([abs(r - centre[i]) for r in rs]))
+    weights = []
+    for (x, _y), r in zip(sparse, resid):
+        z = max((abs(r - centre[i]) / scale[i] for i, _xi in x if count[i] >= MIN_STEPS), default=0.0)
+        weights.append(1.0 if z <= k else k / z)
+    return weights
+
+
+class StepLearner:
+    """Headroom steps around the scheduler's own commands -> per-load Watts and start checks."""
+
+    def __init__(self, settle_secs: float = 60.0, pre_secs: float = 60.0, post_secs: float = 60.0,
+                 history: int = 240, fail_fraction: float = 0.3, prior_weight: float = 0.5):
+        self.settle_secs = float(settle_secs)
+        self.pre_secs = float(pre_secs)
+        self.post_secs = float(post_secs)
+        self.fail_fraction = float(fail_fraction)
+        self.prior_weight = float(prior_weight)
+        self._samples: Deque[Tuple[float, float]] = deque()
+        self._pending: Optional[_Step] = None
+        self._rows: Deque[Tuple[Dict[Hashable, int], float]] = deque(maxlen=int(history))
+        self._priors: Dict[Hashable, Tuple[float, float]] = {}
+        self._restored: Dict[Hashable, int] = {}
+        self._est: Dict[Hashable, float] = {}
+        self._count: Dict[Hashable, int] = {}
+        self._idle: set = set()     # flagged starts: their stop frees nothing
+
+    # ----- inputs -----
+    def actuated(self, key: Hashable, on: bool, ts: float, prior_w: float,
+                 restored_w: Optional[float] = None, restored_n: int = 0) -> None:
+        """
+        The scheduler switched a load. prior_w: what it should draw (rated / metered); a
+        restart passes the last estimate and its sample count to carry on from.
+        """
+        if key not in self._priors:
+            if restored_w and restored_n > 0:
+                n = min(int(restored_n), 2 * MIN_STEPS)
+                self._priors[key] = (float(restored_w), float(n))
+                self._restored[key] = n
+                self._est[key] = float(restored_w)
+            else:
+                self._priors[key] = (float(prior_w or 0.0), self.prior_weight)
+        if not on and key in self._idle:
+            self._idle.discard(key)
+            return
+        self._idle.discard(key)
+        step = self._pending
+        if step is None:
+            step = self._pending = _Step(ts)
+        step.first_ts = min(step.first_ts, ts)
+        step.last_ts = max(step.last_ts, ts)
+        step.dirs[key] = step.dirs.get(key, 0) + (1 if on else -1)
+
+    def sample(self, ts: float, headroom: Optional[float]) -> Optional[StepResult]:
+        """One headroom reading; returns the step it completed, if any. O(1) while nothing is pending."""
+        if headroom is not None:
+            self._samples.append((ts, float(headroom)))
+        step = self._pending
+        if step is None:
+            self._trim(ts - self.pre_secs)
+            return None
+        if ts < step.last_ts + self.settle_secs + self.post_secs:
+            return None
+        self._pending = None
+        pre = [h for t, h in self._samples if step.first_ts - self.pre_secs <= t < step.first_ts]
+        post = [h for t, h in self._samples if step.last_ts + self.settle_secs <= t]
+        self._trim(ts - self.pre_secs)
+        dirs = {key: d for key, d in step.dirs.items() if d}
+        if not pre or not post or not dirs:
+            return None
+        return self._record(ts, dirs, _median(pre) - _median(post),
+                            max(max(pre) - min(pre), max(post) - min(post)))
+
+    def forget(self, key: Hashable) -> None:
+        for store in (self._priors, self._restored, self._est, self._count):
+            store.pop(key, None)
+        self._idle.discard(key)
+        self._rows = deque(((dirs, y) for dirs, y in self._rows if key not in dirs), maxlen=self._rows.maxlen)
+        if self._pending is not None:
+            self._pending.dirs.pop(key, None)
+
+    # ----- reads -----
+    def estimate(self, key: Hashable) -> Optional[float]:
+        """Fitted Watts once the load was seen in MIN_STEPS steps (restored ones count), else None."""
+        if self.samples(key) < MIN_STEPS:
+            return None
+        return self._est.get(key)
+
+    def samples(self, key: Hashable) -> int:
+        return self._count.get(key, 0) + self._restored.get(key, 0)
+
+    def pending(self) -> bool:
+        return self._pending is not None
+
+    # ----- internals -----
+    def _trim(self, oldest: float) -> None:
+        samples = self._samples
+        while samples and samples[0][0] < oldest:
+            samples.popleft()
+
+    def _watts(self, key: Hashable) -> float:
+        est = self._est.get(key)
+        return est if est is not None else self._priors.get(key, (0.0, 0.0))[0]
+
+    def _record(self, ts: float, dirs: Dict[Hashable, int], drop: float, noise: float) -> StepResult:
+        expected = sum(d * self._watts(key) for key, d in dirs.items())
+        # The starts' share of the step: the drop plus what the stops should have freed
+        on_keys = tuple(key for key, d in dirs.items() if d > 0)
+        expected_on = sum(d * self._watts(key) for key, d in dirs.items() if d > 0)
+        seen_on = drop - sum(d * self._watts(key) for key, d in dirs.items() if d < 0)
+        checked = bool(on_keys) and expected_on >= MIN_CHECK_W and noise < (1.0 - self.fail_fraction) * expected_on
+        failed = self._failed_starts(dirs, on_keys, seen_on, noise) if checked else ()
+        self._idle.update(failed)
+        if not failed:
+            self._rows.append((dirs, drop))
+            for key in dirs:
+                self._count[key] = self._count.get(key, 0) + 1
+            self._est.update(huber_fit(self._rows, self._priors))
+        return StepResult(ts, dirs, drop, expected, noise, checked, failed)
+
+    def _failed_starts(self, dirs, on_keys, seen_on: float, noise: float) -> Tuple[Hashable, ...]:
+        """
+        The started loads whose absence explains seen_on best: their Watts must clear the
+        noise and the rest must match seen_on within fail_fraction of them. A tie between
+        two different sets (e.g. two equal loads) flags nothing.
+        """
+        watts = {key: dirs[key] * self._watts(key) for key in on_keys}
+        sizes = range(1, len(on_keys) + 1) if len(on_keys) <= MAX_CHECK_STARTS else (len(on_keys),)
+        best, best_err, tie = (), math.inf, False
+        for size in sizes:
+            for missing in combinations(on_keys, size):
+                gone = sum(watts[key] for key in missing)
+                if gone < MIN_CHECK_W or noise >= (1.0 - self.fail_fraction) * gone:
+                    continue
+                err = abs(seen_on - (sum(watts.values()) - gone))
+                if err > self.fail_fraction * gone:
+                    continue
+                if err < best_err - SCALE_FLOOR_W:
+                    best, best_err, tie = missing, err, False
+                elif err <= best_err + SCALE_FLOOR_W:
+                    tie = True
+        return () if tie else best
@@ -0,0 +1,468 @@
+"""
+Telemetry helpers with:
+- Fixed-memory ring buffer of Main samples, optionally delta-encoded
+- EMA, windowed stats and sliding min / max
+- Per-source freshness (last change, update intervals, stuck values)
+- Trapezoid energy integration
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+COLUMNS: Tuple[str, ...] = ("pv", "cons", "batt", "grid", "headroom")
+
+_NAN = float("nan")
+_I16_ESC = -32768          # escape marker in delta mode (real delta kept in a side dict)
+_TS_ESC = 0xFFFF           # escape marker for timestamp deltas (deciseconds)
+
+
+class TelemetryRing:
+    """
+    Ring buffer holding the most recent `capacity` samples of a Main device.
+
+    Plain layout   : ts float64 + 5 x float32           = 28 bytes/sample
+    Delta layout   : ts uint16 deciseconds + 5 x int16
+                     deltas + 1 byte missing-mask        = 13 bytes/sample
+
+    86,400 samples (24 h at 1 s) is ~2.4 MB plain or ~1.1 MB delta encoded.
+    Deltas that do not fit int16 are escaped into a small side dict, so the
+    encoding is lossless apart from rounding values to whole Watts.
+
+    Window queries walk backwards from the newest sample, which is all the
+    scheduler needs (the last N minutes) and keeps delta decoding O(window).
+    """
+
+    def __init__(self, capacity: int = 86400, delta_encode: bool = False, ema_tau_sec: float = 60.0):
+        self.capacity = max(16, int(capacity))
+        self.delta_encode = bool(delta_encode)
+        self.ema_tau_sec = max(1.0, float(ema_tau_sec))
+        self._count = 0
+        self._head = -1                     # slot index of the newest sample
+        self._last_ts: Optional[float] = None
+        self._last: Dict[str, Optional[float]] = {c: None for c in COLUMNS}
+        self._ema: Dict[str, Optional[float]] = {c: None for c in COLUMNS}
+
+        n = self.capacity
+        if self.delta_encode:
+            self._ts = array("H", bytes(2 * n))
+            self._cols = {c: array("h", bytes(2 * n)) for c in COLUMNS}
+            self._missing = bytearray(n)    # bit i set => COLUMNS[i] missing in that slot
+            self._ts_esc: Dict[int, float] = {}   # slot -> gap seconds (too big for uint16)
+            self._val_esc: Dict[Tuple[str, int], int] = {}
+            # Running (decoded) value per column, carried across missing samples
+            self._carry: Dict[str, int] = {c: 0 for c in COLUMNS}
+            self._enc_ts: Optional[float] = None
+        else:
+            self._ts = array("d", bytes(8 * n))
+            self._cols = {c: array("f", bytes(4 * n)) for c in COLUMNS}
+
+    # ----- size -----
+    def __len__(self) -> int:
+        return self._count
+
+    def nbytes(self) -> int:
+        """Approximate resident size of the column storage in bytes."""
+        size = self._ts.itemsize * len(self._ts)
+        size += sum(a.itemsize * len(a) for a in self._cols.values())
+        if self.delta_encode:
+            size += len(self._missing)
+        return size
+
+    @property
+    def last_ts(self) -> Optional[float]:
+        return self._last_ts
+
+    def last(self, col: str) -> Optional[float]:
+        return self._last.get(col)
+
+    # ----- append -----
+    def append(self, ts: float, values: Dict[str, Optional[float]]) -> None:
+        """Add one sample. Missing/None values are recorded as missing, not zero."""
+        ts = float(ts)
+        slot = (self._head + 1) % self.capacity
+        if self._count == self.capacity and self.delta_encode:
+            # Slot being overwritten: drop its escapes
+            self._ts_esc.pop(slot, None)
+            for c in COLUMNS:
+                self._val_esc.pop((c, slot), None)
+
+        if self.delta_encode:
+            self._append_delta(slot, ts, values)
+        else:
+            self._ts[slot] = ts
+            for c in COLUMNS:
+                v = values.get(c)
+                self._cols[c][slot] = _NAN if v is None else float(v)
+
+        # Time-aware EMA: alpha = 1 - exp(-dt / tau)
+        dt = (ts - self._last_ts) if self._last_ts is not None else None
+        for c in COLUMNS:
+            v = values.get(c)
+            if v is None:
+                continue
+            prev = self._ema[c]
+            if prev is None or dt is None:
+                self._ema[c] = float(v)
+            else:
+                alpha = 1.0 - math.exp(-max(0.0, dt) / self.ema_tau_sec)
+                self._ema[c] = prev + alpha * (float(v) - prev)
+            self._last[c] = float(v)
+
+        self._head = slot
+        self._last_ts = ts
+        self._count = min(self._count + 1, self.capacity)
+
+    def _append_delta(self, slot: int, ts: float, values: Dict[str, Optional[float]]) -> None:
+        # Timestamp delta in deciseconds against the *encoded* previous ts (no drift);
+        # gaps that do not fit uint16 are escaped
+        gap = 0.0 if self._enc_ts is None else ts - self._enc_ts
+        d = int(round(gap * 10.0))
+        if 0 <= d < _TS_ESC:
+            self._ts[slot] = d
+            self._enc_ts = (ts if self._enc_ts is None else self._enc_ts + d / 10.0)
+        else:
+            self._ts[slot] = _TS_ESC
+            self._ts_esc[slot] = gap
+            self._enc_ts = ts
+
+        mask = 0
+        for i, c in enumerate(COLUMNS):
+            v = values.get(c)
+            if v is None:
+                mask |= (1 << i)
+                self._cols[c][slot] = 0          # carry previous decoded value
+                continue
+            iv = int(round(float(v)))
+            d = iv - self._carry[c]
+            if -32767 <= d <= 32767:
+                self._cols[c][slot] = d
+            else:
+                self._cols[c][slot] = _I16_ESC
+                self._val_esc[(c, slot)] = d
+            self._carry[c] = iv
+        self._missing[slot] = mask
+
+    # ----- iteration (newest -> oldest) -----
+    def iter_back(self, col: str, seconds: Optional[float] = None,
+                  now: Optional[float] = None) -> Iterator[Tuple[float, float]]:
+        """Yield (ts, value) newest first, skipping missing values, limited to the last `seconds`."""
+        if self._count == 0:
+            return
+        if col not in self._cols:
+            raise KeyError(col)
+        ref = self._last_ts if now is None else float(now)
+        cutoff = None if seconds is None else ref - float(seconds)
+        cap = self.capacity
+        slot = self._head
+
+        if not self.delta_encode:
+            ts_a = self._ts
+            col_a = self._cols[col]
+            for _ in range(self._count):
+                ts = ts_a[slot]
+                if cutoff is not None and ts < cutoff:
+                    return
+                v = col_a[slot]
+                if v == v:  # not NaN
+                    yield ts, v
+                slot = (slot - 1) % cap
+            return
+
+        bit = 1 << COLUMNS.index(col)
+        ts = self._enc_ts
+        value = self._carry[col]
+        col_a = self._cols[col]
+        for _ in range(self._count):
+            if cutoff is not None and ts < cutoff:
+                return
+            missing = self._missing[slot] & bit
+            if not missing:
+                yield ts, float(value)
+            # Step back: undo this slot's deltas
+            d = col_a[slot]
+            if d == _I16_ESC and (col, slot) in self._val_esc:
+                d = self._val_esc[(col, slot)]
+            if not missing:
+                value -= d
+            tsd = self._ts[slot]
+            ts -= self._ts_esc.get(slot, 0.0) if tsd == _TS_ESC else tsd / 10.0
+            slot = (slot - 1) % cap
+
+    def window(self, col: str, seconds: float, now: Optional[float] = None) -> List[float]:
+        """Values (newest first) of `col` over the last `seconds`."""
+        return [v for _, v in self.iter_back(col, seconds, now)]
+
+    # ----- rolling stats -----
+    def ema(self, col: str) -> Optional[float]:
+        return self._ema.get(col)
+
+    def mean(self, col: str, seconds: float) -> Optional[float]:
+        vals = self.window(col, seconds)
+        return (sum(vals) / len(vals)) if vals else None
+
+    def min(self, col: str, seconds: float) -> Optional[float]:
+        vals = self.window(col, seconds)
+        return min(vals) if vals else None
+
+    def max(self, col: str, seconds: float) -> Optional[float]:
+        vals = self.window(col, seconds)
+        return max(vals) if vals else None
+
+    def percentile(self, col: str, seconds: float, q: float) -> Optional[float]:
+        """Linear-interpolated percentile (q in 0..100) over the last `seconds`."""
+        vals = self.window(col, seconds)
+        return _percentile(sorted(vals), q) if vals else None
+
+    def stats(self, col: str, seconds: float) -> Dict[str, Optional[float]]:
+        """One pass over the window: count, mean, min, max, p10, p50, p90 and the EMA."""
+        vals = sorted(self.window(col, seconds))
+        if not vals:
+            return {"count": 0, "mean": None, "min": None, "max": None,
+                    "p10": None, "p50": None, "p90": None, "ema": self.ema(col)}
+        return {
+            "count": len(vals),
+            "mean": sum(vals) / len(vals),
+            "min": vals[0],
+            "max": vals[-1],
+            "p10": _percentile(vals, 10),
+            "p50": _percentile(vals, 50),
+            "p90": _percentile(vals, 90),
+            "ema": self.ema(col),
+        }
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    if len(sorted_vals) == 1:
+        return sorted_vals[0]
+    pos = (max(0.0, min(100.0, float(q))) / 100.0) * (len(sorted_vals) - 1)
+    lo = int(math.floor(pos))
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    frac = pos - lo
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * frac
+
+
+class SlidingExtrema:
+    """
+    Min and max of a value over the last `window_sec` seconds, via two monotonic deques.
+
+    Each sample is pushed and popped at most once per deque, so the cost per
+    sample is amortised O(1) regardless of window length, and min()/max() are O(1).
+
+    `covered(now)` tells whether the observed history spans the whole window; a gap
+    longer than the window (stale source, restart) starts coverage over again.
+    """
+
+    __slots__ = ("window_sec", "_min", "_max", "_since", "_last_ts")
+
+    def __init__(self, window_sec: float):
+        self.window_sec = max(0.0, float(window_sec))
+        self._min: deque = deque()   # (ts, v), values increasing front -> back
+        self._max: deque = deque()   # (ts, v), values decreasing front -> back
+        self._since: Optional[float] = None
+        self._last_ts: Optional[float] = None
+
+    def push(self, ts: float, value: Optional[float]) -> None:
+        if value is None:
+            return
+        ts, value = float(ts), float(value)
+        if self._last_ts is not None and (ts - self._last_ts) > self.window_sec:
+            self._min.clear()
+            self._max.clear()
+            self._since = None
+        if self._since is None:
+            self._since = ts
+        self._last_ts = ts
+
+        q = self._min
+        while q and q[-1][1] >= value:
+            q.pop()
+        q.append((ts, value))
+        q = self._max
+        while q and q[-1][1] <= value:
+            q.pop()
+        q.append((ts, value))
+        self._expire(ts)
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window_sec
+        for q in (self._min, self._max):
+            # Always keep the newest sample: it is the current value
+            while len(q) > 1 and q[0][0] < cutoff:
+                q.popleft()
+
+    def covered(self, now: float) -> bool:
+        return self._since is not None and self._since <= (float(now) - self.window_sec)
+
+    def min(self, now: Optional[float] = None) -> Optional[float]:
+        if now is not None:
+            self._expire(float(now))
+        return self._min[0][1] if self._min else None
+
+    def max(self, now: Optional[float] = None) -> Optional[float]:
+        if now is not None:
+            self._expire(float(now))
+        return self._max[0][1] if self._max else None
+
+
+# Update-interval histogram bucket upper edges (seconds); the last bucket is open-ended
+INTERVAL_EDGES: Tuple[float, ...] = (2.0, 5.0, 15.0, 60.0, 300.0, 900.0)
+
+
+class SourceFreshness:
+    """
+    Freshness of one input source (PV, consumption, battery or grid).
+
+    Two clocks are tracked:
+      - last_change : when the *source device* last changed (Indigo's lastChanged if the
+                      caller passes it, else when the value we read changed). A dead
+                      integration stops moving this clock.
+      - value_since : when the *value* last changed. A live integration that keeps
+                      re-publishing the same non-zero reading is "stuck".
+
+    Intervals between successive changes are counted into INTERVAL_EDGES buckets.
+    """
+
+    __slots__ = ("value", "value_since", "last_change", "last_read", "hist", "changes")
+
+    def __init__(self):
+        self.value: Optional[float] = None
+        self.value_since: Optional[float] = None
+        self.last_change: Optional[float] = None
+        self.last_read: Optional[float] = None
+        self.hist: List[int] = [0] * (len(INTERVAL_EDGES) + 1)
+        self.changes = 0
+
+    def observe(self, value: Optional[float], now: float, changed_at: Optional[float] = None) -> None:
+        self.last_read = now
+        if value is None:
+            return
+        if value != self.value or self.value_since is None:
+            self.value = value
+            self.value_since = now
+            if changed_at is None:
+                changed_at = now
+        if changed_at is None:
+            return
+        prev = self.last_change
+        if prev is None or changed_at > prev:
+            if prev is not None:
+                self.hist[_bucket(changed_at - prev)] += 1
+                self.changes += 1
+            self.last_change = changed_at
+
+    def age(self, now: float) -> Optional[float]:
+        """Seconds since the source last changed (None if never seen)."""
+        return None if self.last_change is None else max(0.0, now - self.last_change)
+
+    def stuck_for(self, now: float) -> float:
+        """Seconds the same non-zero value has been held (0 for zero/None: idle PV at night is normal)."""
+        if not self.value or self.value_since is None:
+            return 0.0
+        return max(0.0, now - self.value_since)
+
+    def interval_percentile(self, q: float) -> Optional[float]:
+        """Approximate update-interval percentile from the histogram (bucket upper edge)."""
+        total = sum(self.hist)
+        if total == 0:
+            return None
+        need = total * max(0.0, min(100.0, q)) / 100.0
+        run = 0
+        for i, n in enumerate(self.hist):
+            run += n
+            if run >= need and n:
+                return INTERVAL_EDGES[i] if i < len(INTERVAL_EDGES) else float("inf")
+        return float("inf")
+
+
+def _bucket(interval: float) -> int:
+    for i, edge in enumerate(INTERVAL_EDGES):
+        if interval <= edge:
+            return i
+    return len(INTERVAL_EDGES)
+
+
+ENERGY_COUNTERS: Tuple[str, ...] = ("pv", "cons", "export", "import", "self")
+
+
+class EnergyIntegrator:
+    """
+    Integrates power samples into energy with the trapezoid rule over the real sample
+    timestamps (samples need not be evenly spaced).
+
+    Per sample the instantaneous rates are:
+      pv     = max(pv, 0)
+      cons   = max(cons, 0)
+      grid   = measured grid (+import / -export), else estimated cons + batt - pv
+      export = max(-grid, 0), import = max(grid, 0)
+      self   = max(pv - export, 0)   (PV used on site, incl. battery charging)
+
+    Daily counters (Wh) roll over when day_key changes. Headroom is integrated as well,
+    so take_interval_avg() returns the time-weighted mean headroom since the last call
+    (e.g. between two scheduler ticks). Gaps longer than max_gap_sec are not bridged.
+    """
+
+    def __init__(self, max_gap_sec: float = 600.0):
+        self.max_gap_sec = float(max_gap_sec)
+        self.day_key: Optional[str] = None
+        self.today: Dict[str, float] = {c: 0.0 for c in ENERGY_COUNTERS}
+        self._prev_ts: Optional[float] = None
+        self._prev_rates: Optional[Dict[str, float]] = None
+        self._prev_headroom: Optional[float] = None
+        self._hr_ws = 0.0        # headroom integral (W*s) since last take
+        self._hr_secs = 0.0      # seconds covered by that integral
+
+    @staticmethod
+    def rates(pv, cons, batt, grid) -> Optional[Dict[str, float]]:
+        pv_w = max(float(pv or 0.0), 0.0)
+        if grid is None:
+            if cons is None:
+                return None
+            grid = float(cons) + float(batt or 0.0) - pv_w
+        grid = float(grid)
+        export = max(-grid, 0.0)
+        return {
+            "pv": pv_w,
+            "cons": max(float(cons), 0.0) if cons is not None else max(pv_w + grid - float(batt or 0.0), 0.0),
+            "export": export,
+            "import": max(grid, 0.0),
+            "self": max(pv_w - export, 0.0),
+        }
+
+    def restore(self, day_key: str, today: Dict[str, float]) -> None:
+        """Seed today's counters (e.g. from device states after a restart)."""
+        self.day_key = day_key
+        for c in ENERGY_COUNTERS:
+            self.today[c] = float(today.get(c) or 0.0)
+
+    def add(self, ts: float, day_key: str, pv=None, cons=None, batt=None, grid=None, headroom=None) -> None:
+        if self.day_key != day_key:
+            self.day_key = day_key
+            self.today = {c: 0.0 for c in ENERGY_COUNTERS}
+        rates = self.rates(pv, cons, batt, grid)
+        hr = None if headroom is None else float(headroom)
+
+        if self._prev_ts is not None:
+            dt = ts - self._prev_ts
+            if 0.0 < dt <= self.max_gap_sec:
+                if rates is not None and self._prev_rates is not None:
+                    k = dt / 7200.0    # trapezoid: (a + b) / 2 * dt, seconds -> hours
+                    for c in ENERGY_COUNTERS:
+                        self.today[c] += (self._prev_rates[c] + rates[c]) * k
+                if hr is not None and self._prev_headroom is not None:
+                    self._hr_ws += (self._prev_headroom + hr) * 0.5 * dt
+                    self._hr_secs += dt
+        if ts >= (self._prev_ts or 0.0):
+            self._prev_ts = ts
+            self._prev_rates = rates
+            self._prev_headroom = hr
+
+    def take_interval_avg(self) -> Optional[float]:
+        """Time-weighted mean headroom since the previous call (None if < 2 samples), then reset."""
+        avg = (self._hr_ws / self._hr_secs) if self._hr_secs > 0 else None
+        self._hr_ws = 0.0
+        self._hr_secs = 0.0
+        return avg
@@ -0,0 +1,48 @@
+"""
+Per-run load snapshot with:
+- LoadSnap: a Load's device, LoadConfig, control on-state and override status
+- TickSnapshot: every started Load in tier order, read once at the start of a run
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class LoadSnap:
+    """One Load as seen at the start of a run."""
+
+    __slots__ = ("dev", "cfg", "ext_on", "override_active", "override_until")
+
+    def __init__(self, dev: Any, cfg: Any, ext_on: Optional[bool],
+                 override: Tuple[bool, Optional[float]]):
+        self.dev = dev
+        self.cfg = cfg
+        self.ext_on = ext_on                        # logical on (inversion applied); None = no control device
+        self.override_active, self.override_until = override
+
+
+class TickSnapshot:
+    """Loads of one scheduler run, tier order (1 first), by id within a tier."""
+
+    __slots__ = ("ts", "loads", "by_id")
+
+    def __init__(self, ts: float, loads: Iterable[LoadSnap]):
+        self.ts = ts
+        self.loads: Tuple[LoadSnap, ...] = tuple(loads)
+        self.by_id: Dict[int, LoadSnap] = {s.dev.id: s for s in self.loads}
+
+    def __len__(self) -> int:
+        return len(self.loads)
+
+    def __contains__(self, load_id) -> bool:
+        return load_id in self.by_id
+
+    def get(self, load_id: int) -> Optional[LoadSnap]:
+        return self.by_id.get(load_id)
+
+    def devices(self, ids: Optional[Iterable[int]] = None) -> List[Any]:
+        """Device objects, all of them or just these ids (unknown ids are skipped)."""
+        if ids is None:
+            return [s.dev for s in self.loads]
+        return [self.by_id[i].dev for i in ids if i in self.by_id]
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Fairness within a tier: the old full sort by served quota minutes on every scheduler run vs.
+the FairQueue (start-time fair queuing, tags weighted by quota target and rated Watts;
+candidates sorted by tag).
+
+Simulates ten hours of scheduler runs every --period secs for N loads with mixed sizes
+(300 W .. 3 kW) and quota targets (30 .. 240 min); some run windows open later in the day.
+The surplus only covers about --share of the connected Watts, so loads have to take turns: a
+running load stops after --slice minutes and the free headroom is handed out again in each
+policy's order (first fit). Reports the ordering cost per run (fair queue: charging the
+running loads, eligibility changes, ordering the candidates and their lag behind the tier's
+virtual time, as the scheduler's lead set needs) and how evenly the surplus was shared among
+the loads that wanted more all day: Jain's index over kWh per target minute (1.0 = perfectly
+even), plus the loads that got less than 10 % of their target.
+With --tiers > 1 the lower tiers only get what the higher ones leave, so their share also
+depends on how the leftover headroom happens to fit.
+
+    python3 benchmarks/bench_fair_queue.py [--loads 10 100 500] [--share 0.08] [--tiers 1]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "SolarSmart.indigoPlugin", "Contents", "Server Plugin"))
+
+from fair_queue import FairQueue, cost_per_min  # noqa: E402
+
+
+def make_loads(n, tiers, seed=7):
+    rnd = random.Random(seed)
+    return [{"id": i, "tier": 1 + i % tiers, "rated": rnd.choice([300, 500, 800, 1200, 2000, 3000]),
+             "target": rnd.choice([30, 60, 120, 240]),
+             "opens": rnd.choice([0, 0, 0, 2, 4]) * 3600}     # some windows open later in the day
+            for i in range(n)]
+
+
+def simulate(loads, args, policy):
+    budget_total = int(sum(l["rated"] for l in loads) * args.share)
+    min_w = min(l["rated"] for l in loads)
+    served = {l["id"]: 0.0 for l in loads}
+    started = {}
+    by_tier = {}
+    for l in loads:
+        by_tier.setdefault(l["tier"], []).append(l)
+    fq = FairQueue() if policy == "fair" else None
+    eligible = {}
+    order_s = 0.0
+    runs = 0
+    step_m = args.period / 60.0
+    for t in range(0, 10 * 3600, int(args.period)):
+        runs += 1
+        # accrue runtime; a load that ran its slice (or met its target) stops and re-queues
+        t0 = time.perf_counter()
+        if fq is not None:
+            for lid in started:
+                fq.charge(lid, step_m)
+        order_s += time.perf_counter() - t0
+        for lid in list(started):
+            served[lid] += step_m
+            if t - started[lid] >= args.slice * 60 or served[lid] >= loads[lid]["target"]:
+                del started[lid]
+        budget = budget_total - sum(loads[lid]["rated"] for lid in started)
+        picks = []
+        for tier in sorted(by_tier):
+            group = by_tier[tier]
+            # eligibility comes out of the scheduler's collect pass either way (not timed)
+            ok = {l["id"]: t >= l["opens"] and served[l["id"]] < l["target"] for l in group}
+            flips = [l for l in group if eligible.get(l["id"]) != ok[l["id"]]]
+            t0 = time.perf_counter()
+            if fq is not None:
+                for l in flips:
+                    eligible[l["id"]] = ok[l["id"]]
+                    fq.update(l["id"], tier, cost_per_min(l["rated"], l["target"]), ok[l["id"]], served[l["id"]])
+                ordered = fq.order([l["id"] for l in group if ok[l["id"]] and l["id"] not in started])
+                fq.lead(ordered, 30)        # the scheduler's lead set
+            else:
+                ordered = [l["id"] for l in sorted(group, key=lambda l: served[l["id"]])
+                           if ok[l["id"]] and l["id"] not in started]
+            order_s += time.perf_counter() - t0
+            for lid in ordered:             # first fit in policy order
+                if budget < min_w:
+                    break
+                if loads[lid]["rated"] <= budget:
+                    picks.append(lid)
+                    budget -= loads[lid]["rated"]
+        for lid in picks:
+            started[lid] = t
+    # Even sharing among the loads that competed all day and still wanted more at the end
+    jains = []
+    for group in by_tier.values():
+        norm = [served[l["id"]] * l["rated"] / 1000.0 / l["target"] for l in group
+                if l["opens"] == 0 and served[l["id"]] < l["target"]]
+        if len(norm) > 1 and any(norm):
+            jains.append(sum(norm) ** 2 / (len(norm) * sum(x * x for x in norm)))
+    jain = sum(jains) / len(jains) if jains else 1.0
+    starved = sum(1 for l in loads if served[l["id"]] < 0.1 * l["target"])
+    return order_s / runs * 1e6, jain, starved
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--loads", type=int, nargs="+", default=[10, 100, 500])
+    ap.add_argument("--tiers", type=int, default=1)
+    ap.add_argument("--period", type=float, default=300.0, help="scheduler run interval (s)")
+    ap.add_argument("--slice", type=float, default=15.0, help="minutes a load runs before it re-queues")
+    ap.add_argument("--share", type=float, default=0.08, help="surplus as a share of the connected Watts")
+    args = ap.parse_args()
+    for n in args.loads:
+        loads = make_loads(n, args.tiers)
+        o_us, o_j, o_st = simulate(loads, args, "sort")
+        f_us, f_j, f_st = simulate(loads, args, "fair")
+        print(f"{n:4d} loads: sort by served mins {o_us:7.1f} us/run, Jain {o_j:.2f}, starved {o_st:3d}   |   "
+              f"fair queue {f_us:7.1f} us/run, Jain {f_j:.2f}, starved {f_st:3d}")
+
+
+if __name__ == "__main__":
+    main()
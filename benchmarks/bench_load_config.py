@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Per-tick cost of reading Load settings: re-parsing pluginProps vs. a pre-built LoadConfig.
+
+"props" replays what one scheduler tick used to do per load: fetch pluginProps (Indigo hands
+out a fresh copy on every access; modelled with dict()), then the float()/int()/HH:MM parses
+spread over _collect_loads_with_reasons, _catchup_deficit_scheduler, _schedule_by_tier,
+_should_stop, _quota_remaining_mins and the rollover helpers.
+"config" reads the same values from LoadConfig attributes.
+
+    python3 benchmarks/bench_load_config.py [--loads 10 100 500] [--ticks 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "SolarSmart.indigoPlugin", "Contents", "Server Plugin"))
+
+from load_config import LoadConfig  # noqa: E402
+
+PROPS = {
+    "tier": "2", "ratedWatts": "2000", "controlMode": "device", "controlDeviceId": "12345",
+    "invertOnOff": False, "windowStart": "08:00", "windowEnd": "20:00",
+    "dowMon": True, "dowTue": True, "dowWed": True, "dowThu": True, "dowFri": True, "dowSat": True, "dowSun": True,
+    "minRuntimeMins": "30", "maxRuntimeMins": "120", "quotaWindow": "24h", "maxRuntimePerQuotaMins": "180",
+    "enableCatchup": True, "catchupWindowPeriod": "", "catchupWindowStart": "00:00", "catchupWindowEnd": "06:00",
+    "catchupRuntimeMins": "60", "cooldownMins": "10", "startMarginPct": "20", "keepMarginPct": "5",
+    "surgeMultiplier": "1.2", "sustainSecs": "0", "onActionGroupId": "-1", "offActionGroupId": "-1",
+}
+
+
+def _hhmm(s):
+    hh, mm = s.split(":")
+    return int(hh) * 60 + int(mm)
+
+
+def tick_props(devs, now):
+    acc = 0
+    for props_src in devs:
+        # collect: catch-up window, DOW, time window, quota, tier
+        props = dict(props_src)
+        if bool(props.get("enableCatchup", False)):
+            acc += _hhmm(props.get("catchupWindowStart", "00:00")) + _hhmm(props.get("catchupWindowEnd", "06:00"))
+            acc += int(props.get("catchupRuntimeMins") or 0)
+        acc += props.get(("dowMon", "dowTue", "dowWed", "dowThu", "dowFri", "dowSat", "dowSun")[now.weekday()],
+                         False) in (True, "true", "True")
+        acc += _hhmm(props.get("windowStart", "00:00")) + _hhmm(props.get("windowEnd", "23:59"))
+        acc += int(props.get("maxRuntimePerQuotaMins") or 0) + len((props.get("quotaWindow") or "24h").lower())
+        acc += int(props.get("tier", 2))
+        # catch-up scheduler
+        props = dict(props_src)
+        acc += int(props.get("catchupRuntimeMins") or 0) + int(props.get("cooldownMins") or 0)
+        acc += _hhmm(props.get("catchupWindowStart", "00:00")) + _hhmm(props.get("catchupWindowEnd", "06:00"))
+        # schedule_by_tier: rollovers, quota, thresholds, keep / stop, sustain
+        props = dict(props_src)
+        acc += len((props.get("quotaWindow") or "24h").lower()) + len((props.get("catchupWindowPeriod") or ""))
+        acc += int(float(props.get("ratedWatts", 0)) or 0)
+        acc += int(props.get("maxRuntimePerQuotaMins") or 0)
+        needed = int(float(props.get("ratedWatts", 0)) * float(props.get("surgeMultiplier", "1.2") or 1.2)
+                     * (1.0 + float(props.get("startMarginPct", "20") or 20.0) / 100.0))
+        acc += needed + int(props.get("cooldownMins") or 0) + int(props.get("shedHysteresisW", 100) or 100)
+        acc += int(float(props.get("sustainSecs", "0") or 0)) + bool(props.get("enableCatchup", False))
+        # accrual + runtime progress
+        props = dict(props_src)
+        acc += len((props.get("quotaWindow") or "24h").lower()) + int(props.get("maxRuntimePerQuotaMins") or 0)
+    return acc
+
+
+def tick_config(cfgs, now):
+    acc = 0
+    for cfg in cfgs:
+        if cfg.enable_catchup:
+            acc += cfg.in_catchup_window(now) + cfg.catchup_target_mins
+        acc += cfg.dow_allowed(now) + cfg.run_allowed(now)
+        acc += cfg.quota_target_mins + cfg.tier
+        acc += cfg.catchup_target_mins + cfg.cooldown_mins + cfg.in_catchup_window(now)
+        acc += cfg.rated_w + cfg.quota_target_mins + cfg.needed_w + cfg.cooldown_mins
+        acc += cfg.shed_hysteresis_w + cfg.sustain_secs + cfg.enable_catchup + cfg.quota_target_mins
+    return acc
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--loads", type=int, nargs="+", default=[10, 100, 500])
+    ap.add_argument("--ticks", type=int, default=200)
+    args = ap.parse_args()
+    now = datetime.now()
+    for n in args.loads:
+        devs = [dict(PROPS, ratedWatts=str(500 + i)) for i in range(n)]
+        t0 = time.perf_counter()
+        cfgs = [LoadConfig(p) for p in devs]
+        build_ms = (time.perf_counter() - t0) * 1000.0
+        res = {}
+        for name, fn, arg in (("props", tick_props, devs), ("config", tick_config, cfgs)):
+            t0 = time.perf_counter()
+            for _ in range(args.ticks):
+                fn(arg, now)
+            res[name] = (time.perf_counter() - t0) / args.ticks * 1000.0
+        print(f"{n:4d} loads  props {res['props']:8.3f} ms/tick   config {res['config']:8.3f} ms/tick   "
+              f"({res['props'] / res['config']:.1f}x)   one-off build {build_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Direct meter ingestion against local stand-in servers (no hardware, stdlib only).
+
+Starts three stand-ins on 127.0.0.1 and points a MeterHub at them:
+  - Modbus TCP server  : holding/input registers, value changes every 100 ms
+  - HTTP JSON server   : HTTP/1.1 keep-alive, {"Body": {"Data": {"Site": {"P_Grid": ...}}}}
+  - MQTT broker        : accepts one subscriber, publishes a JSON reading every 250 ms
+
+Reports readings per meter, read latency (poll -> value) and how many connections each
+endpoint needed; several meters on one endpoint should share a single connection.
+
+    python3 benchmarks/bench_meter_ingest.py [--seconds 5] [--poll 1] [--meters-per-endpoint 3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "SolarSmart.indigoPlugin", "Contents", "Server Plugin"))
+
+from meter_ingest import MeterConfig, MeterHub, _mqtt_packet, _mqtt_str  # noqa: E402
+
+
+def _watts() -> float:
+    # Slowly varying stand-in reading
+    return 1500.0 + 500.0 * ((time.time() * 10) % 20 - 10) / 10
+
+
+# ────────────────────────────────────────────────────────────
+# Stand-in servers
+# ────────────────────────────────────────────────────────────
+
+class Counters:
+    def __init__(self):
+        self.connections = {"modbus": 0, "http": 0, "mqtt": 0}
+        self.requests = {"modbus": 0, "http": 0, "mqtt": 0}
+
+
+async def modbus_server(counters: Counters):
+    async def handle(reader, writer):
+        counters.connections["modbus"] += 1
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                tid, _proto, length, unit = struct.unpack(">HHHB", header)
+                pdu = await reader.readexactly(length - 1)
+                function, address, count = struct.unpack(">BHH", pdu[:5])
+                counters.requests["modbus"] += 1
+                if function not in (3, 4):
+                    body = bytes([function | 0x80, 1])
+                else:
+                    # register N holds int32 watts (big-endian words) at N, N+1
+                    regs = list(struct.unpack(">2H", struct.pack(">i", int(_watts()))))
+                    regs = (regs * count)[:count]
+                    body = bytes([function, 2 * count]) + struct.pack(f">{count}H", *regs)
+                writer.write(struct.pack(">HHHB", tid, 0, len(body) + 1, unit) + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def http_server(counters: Counters):
+    async def handle(reader, writer):
+        counters.connections["http"] += 1
+        try:
+            while True:
+                request = await reader.readuntil(b"\r\n\r\n")
+                if not request:
+                    break
+                counters.requests["http"] += 1
+                doc = {"Body": {"Data": {"Site": {"P_Grid": round(-_watts(), 1), "P_PV": 4000}}}}
+                body = json.dumps(doc).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Connection: keep-alive\r\nContent-Length: " + str(len(body)).encode()
+                             + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def mqtt_broker(counters: Counters, period: float = 0.25):
+    async def read_packet(reader):
+        first = (await reader.readexactly(1))[0]
+        length, shift = 0, 0
+        while True:
+            b = (await reader.readexactly(1))[0]
+            length |= (b & 0x7F) << shift
+            if not b & 0x80:
+                break
+            shift += 7
+        return first, await reader.readexactly(length)
+
+    async def handle(reader, writer):
+        counters.connections["mqtt"] += 1
+        topics = set()
+
+        async def publisher():
+            while True:
+                await asyncio.sleep(period)
+                for topic in list(topics):
+                    payload = json.dumps({"power": round(_watts(), 1)}).encode()
+                    writer.write(_mqtt_packet(0x30, _mqtt_str(topic) + payload))
+                    counters.requests["mqtt"] += 1
+
+        pub = asyncio.get_running_loop().create_task(publisher())
+        try:
+            while True:
+                first, body = await read_packet(reader)
+                kind = first >> 4
+                if kind == 1:                                   # CONNECT
+                    writer.write(b"\x20\x02\x00\x00")
+                elif kind == 8:                                 # SUBSCRIBE
+                    pos, granted = 2, b""
+                    while pos < len(body):
+                        n = struct.unpack(">H", body[pos:pos + 2])[0]
+                        topics.add(body[pos + 2:pos + 2 + n].decode())
+                        pos += 2 + n + 1
+                        granted += b"\x00"
+                    writer.write(_mqtt_packet(0x90, body[:2] + granted))
+                elif kind == 12:                                # PINGREQ
+                    writer.write(b"\xd0\x00")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            pub.cancel()
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+# ────────────────────────────────────────────────────────────
+# Benchmark
+# ────────────────────────────────────────────────────────────
+
+def _pct(vals, q):
+    if not vals:
+        return float("nan")
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(round(q / 100.0 * (len(vals) - 1))))]
+
+
+async def run(args):
+    counters = Counters()
+    servers = [await modbus_server(counters), await http_server(counters), await mqtt_broker(counters)]
+    mb_port, http_port, mqtt_port = (s.sockets[0].getsockname()[1] for s in servers)
+
+    configs = {}
+    mid = 0
+    for i in range(args.meters_per_endpoint):
+        mid += 1
+        configs[mid] = ("modbus", MeterConfig("modbus", "127.0.0.1", mb_port, poll_secs=args.poll,
+                                              register=40000 + 2 * i, data_type="int32"))
+        mid += 1
+        configs[mid] = ("http", MeterConfig("http", poll_secs=args.poll, scale=-1.0,
+                                            url=f"http://127.0.0.1:{http_port}/status?i={i}",
+                                            json_path="Body.Data.Site.P_Grid"))
+        mid += 1
+        configs[mid] = ("mqtt", MeterConfig("mqtt", "127.0.0.1", mqtt_port, topic=f"site/meter{i}/power",
+                                            json_path="power"))
+
+    readings = {m: [] for m in configs}
+    errors = {m: [] for m in configs}
+    hub = MeterHub()
+    for m, (_proto, cfg) in configs.items():
+        hub.start(m, cfg,
+                  lambda w, ts, m=m: readings[m].append((time.time(), ts, w)),
+                  lambda msg, m=m: errors[m].append(msg))
+
+    # Latency of a single poll (request -> decoded value), per polled protocol
+    lat = {"modbus": [], "http": []}
+    await asyncio.sleep(0.5)
+    t_end = time.monotonic() + args.seconds
+    while time.monotonic() < t_end:
+        for m, (proto, cfg) in configs.items():
+            if proto in lat:
+                t0 = time.perf_counter()
+                await hub.read_once(cfg)
+                lat[proto].append((time.perf_counter() - t0) * 1000.0)
+        await asyncio.sleep(0.05)
+
+    await hub.close()
+    await asyncio.sleep(0.2)          # let the stand-ins see the disconnects
+    for s in servers:
+        s.close()
+        await s.wait_closed()
+
+    print(f"{len(configs)} meters ({args.meters_per_endpoint} per endpoint), poll {args.poll:g} s, "
+          f"{args.seconds:g} s run")
+    for proto in ("modbus", "http", "mqtt"):
+        ids = [m for m, (p, _c) in configs.items() if p == proto]
+        n = sum(len(readings[m]) for m in ids)
+        e = sum(len(errors[m]) for m in ids)
+        last = [readings[m][-1][2] for m in ids if readings[m]]
+        print(f"  {proto:<7} readings {n:5d}  errors {e:3d}  server connections {counters.connections[proto]}  "
+              f"last {last[0] if last else 'n/a'} W")
+        if proto in lat:
+            print(f"          read latency p50 {_pct(lat[proto], 50):.2f} ms  p95 {_pct(lat[proto], 95):.2f} ms "
+                  f"({len(lat[proto])} reads)")
+        for m in ids:
+            if errors[m]:
+                print(f"          meter {m}: {errors[m][-1]}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--poll", type=float, default=1.0)
+    ap.add_argument("--meters-per-endpoint", type=int, default=3)
+    asyncio.run(run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
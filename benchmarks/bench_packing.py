@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Time to full solar utilisation: the old waterfall (one start per tick) vs. the packing solver.
+
+Simulates a site whose surplus changes in one of two ways:
+  - step : a cloud clears and the surplus jumps from 0 to --surplus W at t=0
+  - ramp : morning ramp, surplus rises linearly to --surplus W over --ramp-mins
+and a set of OFF loads spread over three tiers. Each scheduler tick (--tick secs) sees the
+surplus minus what the meter has seen running (it lags --lag secs).
+
+  - waterfall: the old _schedule_by_tier. Loads in tier order; the first one whose start
+    requirement fits the measured headroom starts, then every other load is "SKIP (cap)"
+    until the next tick. No ledger, nothing subtracted for the start
+  - pack: pack_starts() with the headroom ledger (settles after --lag secs)
+
+Reports, per strategy, minutes until no further load fits ("fully used"), Watts put to
+use at the end, and the surplus energy left unused (exported) over the run. Also times the solver.
+
+    python3 benchmarks/bench_packing.py [--surplus 6000] [--tick 300] [--loads 8]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "SolarSmart.indigoPlugin", "Contents", "Server Plugin"))
+
+from packing import StartCandidate, StartLedger, pack_starts  # noqa: E402
+
+SURGE = 1.2
+MARGIN = 0.2
+
+
+def make_loads(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    loads = []
+    for i in range(n):
+        rated = rnd.choice([300, 450, 600, 800, 1200, 1500, 2000, 2400])
+        loads.append((100 + i, 1 + i * 3 // n, rated))        # (id, tier, rated W)
+    return loads
+
+
+def surplus_at(t: float, args) -> float:
+    if args.scenario == "step":
+        return args.surplus
+    return args.surplus * min(1.0, t / (args.ramp_mins * 60.0))
+
+
+def waterfall(cands, headroom: float, slots: int):
+    """The old per-tick loop: first fitting load in tier order, at most one start, headroom never reduced."""
+    for c in sorted(cands, key=lambda c: (c.tier, c.key)):
+        if slots > 0 and headroom >= c.need_w:
+            return [c]
+    return []
+
+
+def simulate(loads, args, strategy: str):
+    running = {}                  # id -> rated
+    ledger = StartLedger()
+    lagged_draw = 0.0             # what the meter shows (one lag behind)
+    t, unused_wh, full_at = 0.0, 0.0, None
+    horizon = args.horizon_mins * 60.0
+    draw_hist = [(0.0, 0.0)]
+    while t <= horizon:
+        # Meter view of the headroom: surplus minus the draw it has seen so far
+        seen = [d for ts, d in draw_hist if ts <= t - args.lag]
+        lagged_draw = seen[-1] if seen else 0.0
+        headroom = surplus_at(t, args) - lagged_draw
+        cands = [StartCandidate(i, tier, int(r * SURGE), int(r * SURGE * (1 + MARGIN)))
+                 for i, tier, r in loads if i not in running]
+        slots = args.max_concurrent - len(running)
+        if strategy == "waterfall":
+            picked = waterfall(cands, headroom, slots)
+        else:
+            # Ledger only knows starts whose draw the meter may not show yet
+            picked = pack_starts(cands, int(headroom - ledger.pending(t)), slots)
+        for c in picked:
+            rated = next(r for i, _t, r in loads if i == c.key)
+            running[c.key] = rated
+            ledger.reserve(c.key, c.reserve_w, t, args.lag)
+        draw = float(sum(running.values()))
+        draw_hist.append((t, draw))
+        spare = surplus_at(t, args) - draw
+        fits = [c for c in cands if c.key not in running and c.need_w <= spare]
+        if full_at is None and t >= (0 if args.scenario == "step" else args.ramp_mins * 60.0) \
+                and (not fits or len(running) >= args.max_concurrent):
+            full_at = t
+        unused_wh += max(0.0, spare) * args.tick / 3600.0
+        t += args.tick
+    return full_at, sum(running.values()), unused_wh, len(running)
+
+
+def time_solver(n: int, reps: int = 200) -> float:
+    loads = make_loads(n, seed=n)
+    cands = [StartCandidate(i, tier, int(r * SURGE), int(r * SURGE * (1 + MARGIN))) for i, tier, r in loads]
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        pack_starts(cands, 8000, n)
+    return (time.perf_counter() - t0) / reps * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--surplus", type=float, default=6000.0)
+    ap.add_argument("--loads", type=int, default=8)
+    ap.add_argument("--max-concurrent", type=int, default=8)
+    ap.add_argument("--tick", type=float, default=300.0, help="scheduler cadence (s)")
+    ap.add_argument("--lag", type=float, default=60.0, help="meter lag / ledger settle time (s)")
+    ap.add_argument("--ramp-mins", type=float, default=120.0)
+    ap.add_argument("--horizon-mins", type=float, default=240.0)
+    args = ap.parse_args()
+
+    loads = make_loads(args.loads)
+    print(f"{len(loads)} loads {[f'T{t}:{r}W' for _i, t, r in loads]}, surplus {args.surplus:g} W, "
+          f"tick {args.tick:g} s, meter lag {args.lag:g} s")
+    for scenario in ("step", "ramp"):
+        args.scenario = scenario
+        print(f"  {scenario}:")
+        for strategy in ("waterfall", "pack"):
+            full_at, used, unused_wh, n = simulate(loads, args, strategy)
+            full = f"{full_at / 60.0:6.1f} min" if full_at is not None else "   never"
+            print(f"    {strategy:<9} fully used after {full}   running {n} loads / {used:5.0f} W   "
+                  f"unused surplus {unused_wh:6.0f} Wh")
+    for n in (8, 16, 32, 64):
+        print(f"  solver: {n:3d} candidates  {time_solver(n):8.0f} µs per tick")
+
+
+if __name__ == "__main__":
+    main()
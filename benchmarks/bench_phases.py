@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Per-phase headroom: grid import on a three-phase site whose meter counts each phase on its
+own, when single-phase loads are started / shed on total headroom compared with the phase
+they draw on (phases.phase_short / take).
+
+Simulates one day every --tick secs: a balanced three-phase PV inverter peaking at --peak W
+with clouds, and a house load that is mostly on L1 (--l1-share). Six 1.2 kW single-phase
+loads, two per phase, in priority order. A load starts when its need (start margin 20 %)
+fits and a load is shed when headroom drops below -100 W (lowest priority first, one per
+tick). Reports surplus used by the loads and energy imported summed over the phases.
+
+    python3 benchmarks/bench_phases.py [--peak 7000] [--l1-share 0.6]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "SolarSmart.indigoPlugin", "Contents", "Server Plugin"))
+
+from phases import phase_short, share, take  # noqa: E402
+
+MARGIN = 0.2
+LOADS = tuple((1200.0, phase) for phase in (1, 2, 3, 1, 2, 3))
+
+
+def phase_profile(args, seed=5):
+    """[(t, [surplus L1, L2, L3])] before any managed load."""
+    rnd = random.Random(seed)
+    out, cloud_until, house = [], -1.0, float(args.house)
+    split = (args.l1_share, (1 - args.l1_share) / 2, (1 - args.l1_share) / 2)
+    for k in range(int(86400 / args.tick)):
+        t = k * args.tick
+        sun = max(0.0, math.sin((t / 3600.0 - 6.0) / 14.0 * math.pi)) if 6 * 3600 <= t <= 20 * 3600 else 0.0
+        if t >= cloud_until and rnd.random() < 0.02:
+            cloud_until = t + rnd.uniform(120, 900)
+        pv = args.peak * sun * (rnd.uniform(0.3, 0.5) if t < cloud_until else 1.0)
+        house = max(300.0, house + rnd.gauss(0.0, 120.0) + 0.05 * (args.house - house))
+        out.append((t, [pv / 3 - house * f for f in split]))
+    return out
+
+
+def simulate(profile, args, per_phase):
+    on = [False] * len(LOADS)
+    used, grid = 0.0, 0.0
+    for _t, surplus in profile:
+        phase_w = list(surplus)
+        for i, (watts, phase) in enumerate(LOADS):
+            if on[i]:
+                take(phase_w, phase, watts)
+        # Shed: lowest priority first, one load per tick
+        for i in reversed(range(len(LOADS))):
+            watts, phase = LOADS[i]
+            if not on[i]:
+                continue
+            short = phase_w[phase - 1] < -100 if per_phase else sum(phase_w) < -100
+            if short:
+                on[i] = False
+                take(phase_w, phase, -watts)
+                break
+        else:
+            # Start: highest priority first, everything that fits
+            for i, (watts, phase) in enumerate(LOADS):
+                need = watts * (1 + MARGIN)
+                if on[i]:
+                    continue
+                fits = not phase_short(phase_w, phase, need) if per_phase else sum(phase_w) >= need
+                if fits:
+                    on[i] = True
+                    take(phase_w, phase, watts)
+        imported = [0.0, 0.0, 0.0]
+        for n in range(3):
+            draw = sum(share(phase, watts)[n] for (watts, phase), running in zip(LOADS, on) if running)
+            imported[n] = max(0.0, draw - max(0.0, surplus[n])) if draw else 0.0
+            used += (draw - imported[n]) * args.tick / 3600.0
+            grid += imported[n] * args.tick / 3600.0
+    return used, grid
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--peak", type=float, default=7000.0, help="PV peak (W, balanced over the phases)")
+    ap.add_argument("--house", type=float, default=900.0, help="mean house load (W)")
+    ap.add_argument("--l1-share", type=float, default=0.6, help="share of the house load on L1")
+    ap.add_argument("--tick", type=float, default=60.0, help="scheduler interval (s)")
+    args = ap.parse_args()
+    profile = phase_profile(args)
+    spare = sum(max(0.0, s) for _t, ph in profile for s in ph) * args.tick / 3600.0
+    print(f"surplus over the day (summed per phase): {spare / 1000:6.1f} kWh")
+    for name, per_phase in (("total headroom", False), ("per-phase headroom", True)):
+        used, grid = simulate(profile, args, per_phase)
+        print(f"{name:18s}: surplus used {used / 1000:6.1f} kWh ({100 * used / spare:5.1f} %), "
+              f"imported {grid / 1000:5.2f} kWh")
+
+
+if __name__ == "__main__":
+    main()
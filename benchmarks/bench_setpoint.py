@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Setpoint control: how much of a day's surplus a variable-power load (an EV charger,
+6 .. 32 A = 1400 .. 7400 W) soaks up when it follows every headroom reading
+(plan_setpoints) compared with switching it on / off at a fixed power.
+
+Simulates one day of readings every --sample secs: a clear-sky PV curve peaking at --peak W
+with clouds (down to 30 % for a few minutes) and a house load wandering around --house W.
+On / off: starts at --onoff-w when the surplus covers it (+ the start margin) and stops
+when it has drawn from the grid for --stop-secs; the scheduler runs every --tick secs.
+Setpoint: the scheduler starts it at the minimum the same way; the tracker moves it on
+every reading. Reports surplus used by the load, grid energy it drew, writes per hour.
+
+    python3 benchmarks/bench_setpoint.py [--peak 9000] [--onoff-w 3700] [--sample 5]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "SolarSmart.indigoPlugin", "Contents", "Server Plugin"))
+
+from setpoint import SetpointConfig, Tracked, plan_setpoints  # noqa: E402
+
+EV = {"controlMode": "setpoint", "setpointKind": "variable", "setpointTargetId": "1",
+      "setpointMinW": "1400", "setpointMaxW": "7400", "setpointMinValue": "6", "setpointMaxValue": "32",
+      "setpointStep": "1", "setpointOffValue": "0", "setpointReserveW": "100",
+      "setpointRampWps": "100", "setpointIntervalSecs": "5"}
+
+
+def surplus_profile(args, seed=5):
+    rnd = random.Random(seed)
+    out, cloud_until, house = [], -1.0, float(args.house)
+    for k in range(int(86400 / args.sample)):
+        t = k * args.sample
+        sun = max(0.0, math.sin((t / 3600.0 - 6.0) / 14.0 * math.pi)) if 6 * 3600 <= t <= 20 * 3600 else 0.0
+        if t >= cloud_until and rnd.random() < 0.004:
+            cloud_until = t + rnd.uniform(60, 600)
+        pv = args.peak * sun * (rnd.uniform(0.3, 0.5) if t < cloud_until else 1.0)
+        house = max(150.0, house + rnd.gauss(0.0, 40.0) + 0.01 * (args.house - house))
+        out.append((t, pv - house))
+    return out
+
+
+def simulate(profile, args, tracking):
+    sp = SetpointConfig.from_props(EV)
+    on, watts, written, start_margin = False, 0.0, -1e9, 0.05
+    below_since, used = None, 0.0
+    grid = writes = 0.0
+    for t, surplus in profile:
+        headroom = surplus - (watts if on else 0.0)
+        if t % args.tick < args.sample:         # scheduler run
+            need = (sp.min_w if tracking else args.onoff_w) * (1.0 + start_margin)
+            if not on and headroom >= need:
+                on, watts, written = True, (sp.min_w if tracking else args.onoff_w), t
+                writes += 1
+            elif on and below_since is not None and t - below_since >= args.stop_secs:
+                on, watts, below_since = False, 0.0, None
+                writes += 1
+        if on and tracking:
+            plan = plan_setpoints([Tracked("ev", 1, sp, watts, t - written)], surplus - watts)
+            if "ev" in plan:
+                watts, written = plan["ev"], t
+                writes += 1
+        if on:
+            headroom = surplus - watts
+            if tracking and watts > sp.min_w:
+                below_since = None
+            elif headroom < 0:
+                below_since = t if below_since is None else below_since
+            else:
+                below_since = None
+            from_grid = max(0.0, -headroom)
+            grid += min(watts, from_grid) * args.sample / 3600.0
+            used += max(0.0, watts - from_grid) * args.sample / 3600.0
+    return used, grid, writes / 24.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--peak", type=float, default=9000.0, help="PV peak (W)")
+    ap.add_argument("--house", type=float, default=600.0, help="mean house load (W)")
+    ap.add_argument("--onoff-w", type=float, default=3700.0, help="fixed power when switched on / off (W)")
+    ap.add_argument("--sample", type=float, default=5.0, help="headroom reading interval (s)")
+    ap.add_argument("--tick", type=float, default=60.0, help="scheduler interval (s)")
+    ap.add_argument("--stop-secs", type=float, default=300.0, help="grid draw tolerated before a stop (s)")
+    args = ap.parse_args()
+    profile = surplus_profile(args)
+    spare = sum(max(0.0, s) for _t, s in profile) * args.sample / 3600.0
+    print(f"surplus over the day: {spare / 1000:6.1f} kWh")
+    for name, tracking in (("on / off", False), ("setpoint", True)):
+        used, grid, wph = simulate(profile, args, tracking)
+        print(f"{name:9s}: surplus used {used / 1000:6.1f} kWh ({100 * used / spare:5.1f} %), "
+              f"from the grid {grid / 1000:5.2f} kWh, {wph:6.1f} writes / h")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: cached source adapters vs the original regex parse path.
+
+Each simulated source keeps one value format (as real Indigo devices do) and is read
+many times, which is the access pattern of the Main ticker / event recompute.
+
+    python3 benchmarks/bench_source_adapters.py [--reads 200000] [--sources 32]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "SolarSmart.indigoPlugin", "Contents", "Server Plugin"))
+
+from source_adapters import SourceAdapterCache, parse_to_watts  # noqa: E402
+
+# State value shapes seen from common inverter / meter plugins
+FORMATS = [
+    lambda w: round(w, 1),                          # float state (Tesla / Fronius)
+    lambda w: int(w),                               # integer state
+    lambda w: f"{w:.0f}",                           # numeric string
+    lambda w: f"{w:,.0f}",                          # numeric string with thousands separator
+    lambda w: f"{w / 1000:.2f} kW",                 # Enphase / SolarEdge display states
+    lambda w: f"{w / 1000:.3f}kW",
+    lambda w: f"{w:.0f} W",
+    lambda w: f"{w:,.0f}W",
+    lambda w: f"{w:.0f} watts",
+    lambda w: f"Power: {w:.0f}W",                   # free text -> regex fallback
+]
+
+
+def _old_path(raw):
+    """Plugin._read_numeric_state_watts before adapters (minus the device fetch)."""
+    if raw is None:
+        return None
+    if isinstance(raw, (int, float)):
+        return float(raw)
+    if isinstance(raw, str):
+        return parse_to_watts(raw)
+    return parse_to_watts(str(raw))
+
+
+def build_reads(n_reads: int, n_sources: int, seed: int = 7):
+    rnd = random.Random(seed)
+    fmt_of = [FORMATS[i % len(FORMATS)] for i in range(n_sources)]
+    reads = []
+    for _ in range(n_reads):
+        src = rnd.randrange(n_sources)
+        watts = rnd.uniform(-5000.0, 12000.0) if src % 3 else rnd.uniform(0.0, 9000.0)
+        reads.append(((src, "power", False), fmt_of[src](watts)))
+    return reads
+
+
+def _timed(fn, reads):
+    t0 = time.perf_counter()
+    fn(reads)
+    return time.perf_counter() - t0
+
+
+def bench(label, fn, reads, repeat=7):
+    best = min(_timed(fn, reads) for _ in range(repeat))
+    per = best / len(reads) * 1e9
+    print(f"{label:<22} {best * 1000:9.1f} ms   {per:7.0f} ns/read")
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--reads", type=int, default=200_000)
+    ap.add_argument("--sources", type=int, default=32)
+    args = ap.parse_args()
+
+    reads = build_reads(args.reads, args.sources)
+    cache = SourceAdapterCache()
+
+    # Same answers on every sample (units the old parser knows about)
+    for key, raw in reads[:5000]:
+        a, b = cache.convert(key, raw), _old_path(raw)
+        assert (a is None and b is None) or abs(a - b) < 1e-6, (raw, a, b)
+
+    def run_old(rs):
+        for _, raw in rs:
+            _old_path(raw)
+
+    def run_adapters(rs):
+        conv = cache.convert
+        for key, raw in rs:
+            conv(key, raw)
+
+    print(f"{args.reads:,} reads over {args.sources} sources ({len(FORMATS)} value formats)")
+    t_old = bench("regex path", run_old, reads)
+    t_new = bench("cached adapters", run_adapters, reads)
+    print(f"speed-up: {t_old / t_new:.2f}x   adapter resolves: {cache.resolves}")
+
+    # Per-format breakdown
+    print()
+    for i, fmt in enumerate(FORMATS):
+        sample = fmt(2345.6)
+        subset = [(("f", i, False), fmt(random.uniform(0, 9000))) for _ in range(20_000)]
+        t_o = min(_timed(run_old, subset) for _ in range(5))
+        t_a = min(_timed(run_adapters, subset) for _ in range(5))
+        adapter = cache.get(("f", i, False))
+        print(f"  {repr(sample):<16} {repr(adapter) if adapter else 'plain number (no adapter)':<44} "
+              f"{t_o / len(subset) * 1e9:6.0f} -> {t_a / len(subset) * 1e9:6.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
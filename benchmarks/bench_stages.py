@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Multi-stage loads: how much of a day's surplus a 3 x 1.2 kW immersion heater soaks up when
+the scheduler steps it one element at a time (stage_move) compared with switching all
+three elements together as one 3.6 kW load.
+
+Simulates one day of headroom every --tick secs (the scheduler interval): a clear-sky PV
+curve peaking at --peak W with clouds and a house load wandering around --house W. The
+heater starts when its first step fits (start margin 20 %, surge 1.0) and stops when
+headroom stays below -100 W; stage min runtime / cooldown --stage-mins. Reports surplus
+used by the heater, grid energy it drew and how often it switched.
+
+    python3 benchmarks/bench_stages.py [--peak 6000] [--stage-mins 2]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "SolarSmart.indigoPlugin", "Contents", "Server Plugin"))
+
+from stages import Stage, active_w, stage_move  # noqa: E402
+
+MARGIN, HYST = 0.2, 100.0
+
+
+def surplus_profile(args, seed=3):
+    rnd = random.Random(seed)
+    out, cloud_until, house = [], -1.0, float(args.house)
+    for k in range(int(86400 / args.tick)):
+        t = k * args.tick
+        sun = max(0.0, math.sin((t / 3600.0 - 6.0) / 14.0 * math.pi)) if 6 * 3600 <= t <= 20 * 3600 else 0.0
+        if t >= cloud_until and rnd.random() < 0.02:
+            cloud_until = t + rnd.uniform(120, 900)
+        pv = args.peak * sun * (rnd.uniform(0.3, 0.5) if t < cloud_until else 1.0)
+        house = max(150.0, house + rnd.gauss(0.0, 80.0) + 0.05 * (args.house - house))
+        out.append((t, pv - house))
+    return out
+
+
+def simulate(profile, args, stages):
+    active, used, grid, switches = 0, 0.0, 0.0, 0
+    on_ts, off_ts, changed = {}, {}, -1e9
+    hold = args.stage_mins * 60
+    for t, surplus in profile:
+        headroom = surplus - active_w(stages, active)
+        if not active:
+            if headroom >= stages[0].watts * (1 + MARGIN) and t - off_ts.get(1, -1e9) >= hold:
+                active, changed, on_ts[1] = 1, t, t
+                switches += 1
+        else:
+            move, _why = stage_move(stages, active, headroom, t, on_ts, off_ts, changed, 1.0, MARGIN, HYST,
+                                    hold, hold, 0.0)
+            if move > 0:
+                active += 1
+                on_ts[active], changed = t, t
+                switches += 1
+            elif move < 0:
+                off_ts[active], changed = t, t
+                active -= 1
+                switches += 1
+            elif active == 1 and headroom < -HYST and t - on_ts[1] >= hold:
+                off_ts[1], active = t, 0
+                switches += 1
+        draw = active_w(stages, active)
+        from_grid = min(draw, max(0.0, draw - surplus))
+        grid += from_grid * args.tick / 3600.0
+        used += (draw - from_grid) * args.tick / 3600.0
+    return used, grid, switches
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--peak", type=float, default=6000.0, help="PV peak (W)")
+    ap.add_argument("--house", type=float, default=600.0, help="mean house load (W)")
+    ap.add_argument("--tick", type=float, default=60.0, help="scheduler interval (s)")
+    ap.add_argument("--stage-mins", type=float, default=2.0, help="min runtime / cooldown per stage (mins)")
+    args = ap.parse_args()
+    profile = surplus_profile(args)
+    spare = sum(max(0.0, s) for _t, s in profile) * args.tick / 3600.0
+    print(f"surplus over the day: {spare / 1000:6.1f} kWh")
+    for name, stages in (("one 3.6 kW block", (Stage(3600, 0, 0, 0),)),
+                         ("3 x 1.2 kW stages", tuple(Stage(1200, 0, 0, 0) for _ in range(3)))):
+        used, grid, switches = simulate(profile, args, stages)
+        print(f"{name:17s}: surplus used {used / 1000:6.1f} kWh ({100 * used / spare:5.1f} %), "
+              f"from the grid {grid / 1000:5.2f} kWh, {switches:4d} switchings")
+
+
+if __name__ == "__main__":
+    main()
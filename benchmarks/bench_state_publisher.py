@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Server round-trips for device state writes: one updateStateOnServer per write (old) vs. the
+StatePublisher (unchanged values dropped, +-10 W deadband on Watt states, one batched
+updateStatesOnServer per device and run).
+
+Replays the write pattern of one hour: the Main publishes PV / consumption / battery /
+grid / headroom / LastUpdate every --sample secs with a few Watts of noise; every scheduler
+run writes per load RemainingQuotaMins (several times), RuntimeQuotaPct, Status and the five
+catch-up states, and now and then a load starts or stops.
+
+    python3 benchmarks/bench_state_publisher.py [--loads 10 60] [--sample 30] [--period 60]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "SolarSmart.indigoPlugin", "Contents", "Server Plugin"))
+
+from state_publisher import StatePublisher  # noqa: E402
+
+DEADBANDS = {k: 10 for k in ("SolarProduction", "SiteConsumption", "BatteryPower", "GridPower", "Headroom")}
+
+
+class FakeDevice:
+    """Counts server round-trips like an Indigo device would cost them."""
+
+    def __init__(self, dev_id):
+        self.id = dev_id
+        self.states = {}
+        self.calls = 0
+
+    def updateStateOnServer(self, key, value):
+        self.calls += 1
+        self.states[key] = value
+
+    def updateStatesOnServer(self, kv):
+        self.calls += 1
+        for item in kv:
+            self.states[item["key"]] = item["value"]
+
+
+def replay(n_loads, args, pub):
+    rnd = random.Random(5)
+    main = FakeDevice(1)
+    loads = [FakeDevice(10 + i) for i in range(n_loads)]
+    running = set()
+    served = {d.id: 0 for d in loads}
+
+    def write(dev, key, value):
+        if pub is None:
+            dev.updateStateOnServer(key, value)
+        else:
+            pub.set(dev, key, value)
+
+    def batch():
+        return pub.batch() if pub is not None else _NoBatch()
+
+    for t in range(0, 3600, int(args.sample)):
+        pv = 4000 + rnd.uniform(-8, 8)
+        cons = 900 + 500 * len(running) + rnd.uniform(-6, 6)
+        with batch():
+            for key, val in (("SolarProduction", pv), ("SiteConsumption", cons), ("BatteryPower", 0),
+                             ("GridPower", cons - pv), ("Headroom", pv - cons)):
+                write(main, key, int(round(val)))
+            write(main, "LastUpdate", t)
+        if t % int(args.period):
+            continue
+        with batch():
+            for d in loads:
+                if rnd.random() < 0.02:
+                    running.symmetric_difference_update({d.id})
+                    write(d, "IsRunning", d.id in running)
+                    write(d, "LastReason", f"toggle at {t}")
+                if d.id in running:
+                    served[d.id] += 1
+                rem = max(0, 180 - served[d.id])
+                for _ in range(4):              # collect / decide / stop check / accrual
+                    write(d, "RemainingQuotaMins", rem)
+                write(d, "RuntimeQuotaPct", int(100 * served[d.id] / 180))
+                write(d, "Status", ("RUNNING" if d.id in running else "OFF") + f" ({int(100 * served[d.id] / 180)}%)")
+                for key in ("catchupDailyTargetMins", "catchupRemainingTodayMins", "catchupRunTodayMins",
+                            "catchupRunWindowAccumMins", "catchupActive"):
+                    write(d, key, 0 if key != "catchupActive" else False)
+    return main.calls + sum(d.calls for d in loads)
+
+
+class _NoBatch:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--loads", type=int, nargs="+", default=[10, 60])
+    ap.add_argument("--sample", type=float, default=30.0, help="Main publish interval (s)")
+    ap.add_argument("--period", type=float, default=60.0, help="scheduler cadence (s)")
+    args = ap.parse_args()
+    for n in args.loads:
+        old = replay(n, args, None)
+        pub = StatePublisher(DEADBANDS)
+        t0 = time.perf_counter()
+        new = replay(n, args, pub)
+        ms = (time.perf_counter() - t0) * 1000.0
+        st = pub.stats()
+        print(f"{n:4d} loads, 1 h: {old:6d} round-trips per write -> {new:5d} batched ({old / max(1, new):.0f}x)   "
+              f"saved {st['saved']} of {st['requested']} (dropped {st['dropped']}, merged {st['merged']})   "
+              f"publisher overhead {ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
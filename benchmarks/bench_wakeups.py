@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Loop wake-ups over one simulated day: fixed-cadence loops (old) vs. next-event scheduling.
+
+Old: both loops sleep in 1 s slices (86,400 wake-ups each per day); the scheduler runs every
+--period secs and sources are sampled every --sample secs, day and night.
+New: the scheduler runs at the earliest timed event (window open / close from the LoadConfig
+bitmaps, midnight), on a headroom change of --delta W, or at the latest every
+--period secs while active. With idle mode (no PV, nothing running) the heartbeat stops and
+sampling slows to --idle-sample secs.
+
+Also reports how long after a run window opens the scheduler first looks at it (reaction).
+
+    python3 benchmarks/bench_wakeups.py [--loads 6] [--period 60] [--sample 30]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "SolarSmart.indigoPlugin", "Contents", "Server Plugin"))
+
+from load_config import LoadConfig  # noqa: E402
+from next_event import EventHeap  # noqa: E402
+
+DAY = 86400
+
+
+def pv_at(sec: float, peak: float) -> float:
+    """Clear-sky-ish bell from 06:30 to 19:30 with a little noise added by the caller."""
+    sunrise, sunset = 6.5 * 3600, 19.5 * 3600
+    if not sunrise < sec < sunset:
+        return 0.0
+    return peak * math.sin(math.pi * (sec - sunrise) / (sunset - sunrise)) ** 1.5
+
+
+def make_loads(n: int, seed: int = 3):
+    rnd = random.Random(seed)
+    loads = []
+    for i in range(n):
+        start = rnd.choice(["07:00", "08:30", "10:00", "11:15", "12:00", "22:00"])
+        end = rnd.choice(["15:00", "16:30", "18:00", "20:00", "06:00"])
+        props = {"windowStart": start, "windowEnd": end, "cooldownMins": "10",
+                 **{k: True for k in ("dowMon", "dowTue", "dowWed", "dowThu", "dowFri", "dowSat", "dowSun")}}
+        loads.append(LoadConfig(props))
+    return loads
+
+
+def opens(loads, day0):
+    """(second of day, load index) of every window opening during the day."""
+    out = []
+    for i, cfg in enumerate(loads):
+        t = day0
+        while True:
+            flip = cfg.run_next_change(t)
+            if flip is None or flip >= day0 + timedelta(days=1):
+                break
+            if cfg.run_allowed(flip):
+                out.append(((flip - day0).total_seconds(), i))
+            t = flip
+    return out
+
+
+def simulate_old(args, open_secs):
+    # Runs every period from whenever the plugin started: average over every start phase
+    period = int(args.period)
+    react = [sum((ph - s) % period for ph in range(period)) / period for s, _i in open_secs]
+    return {"sched_wakeups": DAY, "sched_runs": DAY // period, "sample_wakeups": DAY,
+            "samples": DAY // int(args.sample), "react": react}
+
+
+def simulate_new(args, loads, day0, open_secs):
+    rnd = random.Random(11)
+    heap = EventHeap()
+    t, runs, samples, last_h = 0.0, [], 0, None
+    ns = 0.0                              # next sample
+    running = set()
+    idle = False
+    deadline = 0.0
+    while t < DAY:
+        # next sample or scheduler deadline, whichever first
+        if ns <= deadline:
+            t = ns
+            samples += 1
+            pv = pv_at(t, args.peak) * (1 + rnd.uniform(-0.1, 0.1)) if pv_at(t, args.peak) else 0.0
+            h = pv - 400 - 500 * len(running)
+            ns = t + (args.idle_sample if idle else args.sample)
+            woke = (idle and pv > 20) or (not idle and last_h is not None and abs(h - last_h) >= args.delta)
+            if woke and t >= (runs[-1] if runs else -1e9) + 5:
+                deadline = t
+            continue
+        t = deadline
+        if t >= DAY:
+            break
+        runs.append(t)
+        now_dt = day0 + timedelta(seconds=t)
+        pv = pv_at(t, args.peak)
+        last_h = pv - 400 - 500 * len(running)
+        # toy decisions: run while allowed and the sun is up
+        for i, cfg in enumerate(loads):
+            if cfg.run_allowed(now_dt) and pv > 1500:
+                running.add(i)
+            else:
+                running.discard(i)
+        heap.clear()
+        for cfg in loads:
+            flip = cfg.run_next_change(now_dt)
+            if flip:
+                heap.push((flip - day0).total_seconds() + 0.5, "window")
+        heap.push(DAY, "day rollover")
+        idle = args.idle and pv <= 20 and not running
+        nxt = heap.peek().when
+        deadline = nxt if idle else min(nxt, t + args.period)
+    react = [min([r for r in runs if r >= s] + [DAY]) - s for s, _i in open_secs]
+    return {"sched_wakeups": len(runs), "sched_runs": len(runs), "sample_wakeups": samples,
+            "samples": samples, "react": react}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--loads", type=int, default=6)
+    ap.add_argument("--period", type=float, default=60.0, help="scheduler cadence (s)")
+    ap.add_argument("--sample", type=float, default=30.0, help="Main sample interval (s)")
+    ap.add_argument("--idle-sample", type=float, default=300.0)
+    ap.add_argument("--delta", type=float, default=250.0, help="headroom change that re-runs the scheduler (W)")
+    ap.add_argument("--peak", type=float, default=5000.0, help="PV peak (W)")
+    args = ap.parse_args()
+
+    day0 = datetime(2026, 6, 1)
+    loads = make_loads(args.loads)
+    open_secs = opens(loads, day0)
+    print(f"{len(loads)} loads, {len(open_secs)} window openings, cadence {args.period:g} s, "
+          f"sample {args.sample:g} s, PV peak {args.peak:g} W")
+    for name, res in (("fixed cadence", simulate_old(args, open_secs)),
+                      ("next-event", simulate_new(argparse.Namespace(**vars(args), idle=False), loads, day0, open_secs)),
+                      ("next-event + idle", simulate_new(argparse.Namespace(**vars(args), idle=True), loads, day0, open_secs))):
+        react = res["react"]
+        avg = sum(react) / len(react) if react else 0.0
+        print(f"  {name:<18} scheduler wake-ups {res['sched_wakeups']:6d} (runs {res['sched_runs']:5d})   "
+              f"sampler wake-ups {res['sample_wakeups']:6d}   window-open reaction avg {avg:5.1f} s, "
+              f"max {max(react) if react else 0:5.1f} s")
+
+
+if __name__ == "__main__":
+    main()